@@ -116,7 +116,6 @@ def checkConditionalStatement(annualHourlyData, conditionalStatement):
         
         # replace the right list in the conditional statement
         statement = conditionalStatement.split(' ')
-        finalStatement = 'pattern = '
         titleStatement = '...                         ...                         ...\n' +\
                          'Conditional Selection Applied:\n'
         
@@ -125,10 +124,8 @@ def checkConditionalStatement(annualHourlyData, conditionalStatement):
             
             if statemntPart!='and' and statemntPart!='or':
                 for num in listNum:
-                    toBeReplacedWith = 'selList[this][HOY]'.replace('this', `num`)
                     titleToBeReplacedWith = listInfo[num][2]
                     
-                    statemntPart = statemntPart.replace(letters[num], toBeReplacedWith, 20000)
                     statementCopy = statementCopy.replace(letters[num], titleToBeReplacedWith, 20000)
                     if statementCopy.find(letters[num])!=-1: break
                     
@@ -136,18 +133,14 @@ def checkConditionalStatement(annualHourlyData, conditionalStatement):
             else:
                 
                 titleStatement = titleStatement + '\n' + statementCopy
-            finalStatement = finalStatement + ' ' + statemntPart
         print titleStatement
         
         # check for the pattern
-        patternList = []
-       
-        for HOY in range(8760):
-            try:
-                exec(finalStatement)
-                patternList.append(pattern)
-            except:
-                pass
+        # hours that are not in the data are not included
+        try:
+            patternList = sc.sticky["ladybug_ConditionalStatement"](conditionalStatement).evaluate(selList, min(8760, len(selList[0])))
+        except:
+            patternList = []
                 
         return titleStatement, patternList
 
@@ -1150,101 +1150,26 @@ def createFrequencyMesh(orgY, dryBulbTemperature, relativeHumidity, cullMesh, lb
     for count, ratio in enumerate(relativeHumidity):
         hourPts.append(rc.Geometry.Point3d(dryBulbTemperature[count], relativeHumidity[count], 0))
     
-    #Make a mesh.
+    #Make the chart points at the corners of the mesh faces (relative humidity along x and 2 x temperature along y).
     gridSize = 5
-    joinedMesh = rc.Geometry.Mesh()
-    
-    meshPoints = []
-    for yVal in range(orgY, 100, gridSize):
-    #####for yVal in range(0, 100, gridSize):
-        for xVal in range(0, 100, gridSize):
-            point1 = rc.Geometry.Point3d(xVal, yVal, 0)
-            point2 = rc.Geometry.Point3d(xVal+gridSize, yVal, 0)
-            point3 = rc.Geometry.Point3d(xVal+gridSize, yVal+gridSize, 0)
-            point4 = rc.Geometry.Point3d(xVal, yVal+gridSize, 0)
-            meshPoints.append([point1, point2, point3, point4])
-    
-    for list in  meshPoints:
-        mesh = rc.Geometry.Mesh()
-        for point in list:
-            mesh.Vertices.Add(point)
-        
-        mesh.Faces.AddFace(0, 1, 2, 3)
-        joinedMesh.Append(mesh)
-    
-    polyCurveList = []
-    for list in  meshPoints:
-        pointList = [list[0], list[1], list[2], list[3],list[0]]
-        polyLine = rc.Geometry.PolylineCurve(pointList)
-        polyCurveList.append(polyLine)
-    
-    #Make a list to hold values for all of the mesh faces.
-    meshFrequency = []
-    for count, value in enumerate(range(orgY, 100, 5)):
-    ####for count, value in enumerate(range(0, 100, 5)):
-        meshFrequency.append([])
-        for face in range(0, 100, 5):
-            meshFrequency[count].append([])
-    
-    def getHumidityIndex(hour):
-        if   relativeHumidity[hour] < 5:  index = 0
-        elif relativeHumidity[hour] < 10: index = 1
-        elif relativeHumidity[hour] < 15: index = 2
-        elif relativeHumidity[hour] < 20: index = 3
-        elif relativeHumidity[hour] < 25: index = 4
-        elif relativeHumidity[hour] < 30: index = 5
-        elif relativeHumidity[hour] < 35: index = 6
-        elif relativeHumidity[hour] < 40: index = 7
-        elif relativeHumidity[hour] < 45: index = 8
-        elif relativeHumidity[hour] < 50: index = 9
-        elif relativeHumidity[hour] < 55: index = 10
-        elif relativeHumidity[hour] < 60: index = 11
-        elif relativeHumidity[hour] < 65: index = 12
-        elif relativeHumidity[hour] < 70: index = 13
-        elif relativeHumidity[hour] < 75: index = 14
-        elif relativeHumidity[hour] < 80: index = 15
-        elif relativeHumidity[hour] < 85: index = 16
-        elif relativeHumidity[hour] < 90: index = 17
-        elif relativeHumidity[hour] < 95: index = 18
-        else:                             index = 19
-        
-        return index
-    
-    addGridToIndex = abs(orgY/2)
-    module = gridSize/2
-    
-    for hour, temp in enumerate(dryBulbTemperature):
-        tempIndex = int((float(temp)+addGridToIndex) / module)
-        humIndex = getHumidityIndex(hour)
-        if tempIndex < 28:
-            meshFrequency[tempIndex][humIndex].append(1)
-        
-        
-    #Sum all of the lists together to get the frequency.
-    finalMeshFrequency = []
-    for templist in meshFrequency:
-        for humidlist in templist:
-            finalMeshFrequency.append(sum(humidlist))
+    yVals = [orgY + row*gridSize for row in range(len(range(orgY, 100, gridSize)) + 1)]
+    gridPoints = []
+    for yVal in yVals:
+        gridPoints.append([rc.Geometry.Point3d(xVal, yVal, 0) for xVal in range(0, 100 + gridSize, gridSize)])
+    
+    #Bin the input humidity and temperatures into the mesh faces and get the frequency.
+    tempEdges = [yVal/2.0 for yVal in yVals]
+    lb_chartHistogram = sc.sticky["ladybug_ChartHistogram"](range(0, 100 + gridSize, gridSize), tempEdges, True, False)
+    faceIndices = lb_chartHistogram.faceIndices(relativeHumidity, dryBulbTemperature)
+    finalMeshFrequency = lb_chartHistogram.frequency(faceIndices)
     
     #Get a list of colors
     colors = lb_visualization.gradientColor(finalMeshFrequency, lowB, highB, customColors)
     
-    # color the mesh faces.
-    joinedMesh.VertexColors.CreateMonotoneMesh(System.Drawing.Color.Gray)
-    
-    for srfNum in range (joinedMesh.Faces.Count):
-        joinedMesh.VertexColors[4 * srfNum + 0] = colors[srfNum]
-        joinedMesh.VertexColors[4 * srfNum + 1] = colors[srfNum]
-        joinedMesh.VertexColors[4 * srfNum + 3] = colors[srfNum]
-        joinedMesh.VertexColors[4 * srfNum + 2] = colors[srfNum]
-    
     # Remove the mesh faces that do not have any hour associated with them.
-    if cullMesh == True:
-        cullFaceIndices = []
-        for count, freq in enumerate(finalMeshFrequency):
-            if freq == 0:
-                cullFaceIndices.append(count)
-        joinedMesh.Faces.DeleteFaces(cullFaceIndices)
+    if cullMesh == True: meshFaces = [count for count, freq in enumerate(finalMeshFrequency) if freq != 0]
+    else: meshFaces = None
+    joinedMesh = lb_chartHistogram.chartMesh(gridPoints, colors, meshFaces)
     
     #Return everything that's useful.
     return hourPts, joinedMesh, finalMeshFrequency
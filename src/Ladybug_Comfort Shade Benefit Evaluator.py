@@ -85,8 +85,6 @@ except: pass
 
 import rhinoscriptsyntax as rs
 import Rhino as rc
-import collections
-import System.Threading.Tasks as tasks
 import System
 import scriptcontext as sc
 import math
@@ -531,60 +529,38 @@ def checkSkyResolution(skyResolution, allDataDict, analysisPeriod, latitude, lon
     return allDataDict, finalSunVecs
 
 
-def nonparallel_projection(analysisMesh, sunLines, regionTestPts):
-    #Intersect the sun lines with the test mesh
-    faceInt = []
-    for face in range(analysisMesh.Faces.Count): faceInt.append([])
+def hitCountMatrix(analysisMesh, contextMesh, regionTestPts, sunVectors, lineLength):
+    #Cast the sun rays of all test points at once and count the hits on the closest face of the shade mesh for each hour.
+    #Only the hours in which a face is hit are stored so the result is a list with a {hour: hit count} dictionary for each face.
+    lb_occlusionEngine = sc.sticky["ladybug_OcclusionEngine"]
     
-    for ptCount, pt in enumerate(regionTestPts):
-        try:
-            for hour, sunLine in enumerate(sunLines[ptCount]):
-                if sunLine != 0:
-                    intPt, i = rc.Geometry.Intersect.Intersection.MeshLine(analysisMesh, sunLine)
-                    if len(intPt)!=0: faceInt[i[0]].append(hour)
-                else: pass
-        except Exception, e:
-            print `e`
+    #Discount the vectors that are blocked by the context.
+    if contextMesh != None:
+        visibility = lb_occlusionEngine([contextMesh]).visibilityMatrix(regionTestPts, sunVectors, parallel = parallel_ == True)
+    else: visibility = None
+    
+    faceHits = lb_occlusionEngine([analysisMesh]).faceHits(regionTestPts, sunVectors, visibility, lineLength, parallel_ == True)
+    
+    hitCounts = [{} for face in range(analysisMesh.Faces.Count)]
+    for hours, faces in faceHits:
+        for hour, face in zip(hours, faces):
+            faceHitCounts = hitCounts[face]
+            faceHitCounts[hour] = faceHitCounts.get(hour, 0) + 1
     
-    return faceInt
+    return hitCounts
 
 
-def parallel_projection(analysisMesh, sunLines, regionTestPts):
-    #Intersect the sun lines with the test mesh using parallel processing
-    faceInt = []
-    for face in range(analysisMesh.Faces.Count): faceInt.append([]) #place holder for result
-    
-    def intersect(i):
-        try:
-            for hour, sunLine in enumerate(sunLines[i]):
-                if sunLine != 0:
-                    intPt, indx = rc.Geometry.Intersect.Intersection.MeshLine(analysisMesh, sunLine)
-                    if len(intPt)!=0: faceInt[indx[0]].append(hour)
-                else: pass
-        except Exception, e:
-            print `e`
-    
-    tasks.Parallel.ForEach(range(len(regionTestPts)), intersect)
-    
-    return faceInt
-
-
-def valCalc(percentBlocked, deltaBal, cellArea, numDaySteps):
-    #Multiply the percentBlocked by the deltaBal to get a measure of how helpful or harmful the shade is in each hour of the year
-    hourlyEffect = [a*b for a,b in zip(percentBlocked,deltaBal)]
-    
-    #Sum up all of resulting hourly effects depending on whether the effect is negative or positive to get the effect of the cell on the total heating, temperture degree days felt by the window.
-    coolEffectList = []
-    heatEffectList = []
-    for effect in hourlyEffect:
-        if effect > 0:
-            coolEffectList.append(effect)
-        elif effect < 0:
-            heatEffectList.append(effect)
-        else: pass
-    
-    coolEffectInit = sum(coolEffectList)
-    heatEffectInit = sum(heatEffectList)
+def valCalc(faceHitCounts, deltaBal, testPtsCount, cellArea, numDaySteps):
+    #Multiply the percent of the sun blocked in each hour by the deltaBal to get a measure of how helpful or harmful the shade is in each hour of the year.
+    #Hours in which the cell doesn't block the sun have no effect so only the hours in the sparse row are summed.
+    coolEffectInit = 0
+    heatEffectInit = 0
+    for hour in sorted(faceHitCounts.keys()):
+        if hour >= len(deltaBal): continue
+        effect = (faceHitCounts[hour]/testPtsCount) * deltaBal[hour]
+        #Sum up all of resulting hourly effects depending on whether the effect is negative or positive to get the effect of the cell on the total heating, temperture degree days felt by the window.
+        if effect > 0: coolEffectInit += effect
+        elif effect < 0: heatEffectInit += effect
     netEffectInit = coolEffectInit + heatEffectInit
     
     #Normalize the effects by the area of the cell such that there is a consistent metric between cells of different areas.  Also, divide the value by 24 such that the final unit is in degree-days/model unit instead of degree-hours/model unit.
@@ -609,8 +585,8 @@ def evaluateShade(temperatures, balanceTemp, temperatureOffest, numHrs, analysis
     #Multiply the largest dimension of the bounding box by 2 to ensure that the lines are definitely long enough to intersect the shade.
     lineLength = (max(boundBox.Max - boundBox.Min)) * 2
     
-    #Generate the sun lines for intersection and discount the vector if it intersects a context.
-    sunLines = []
+    #Mesh the context.
+    contextMesh = None
     if context_:
         contextMeshes = []
         for brep in context_:
@@ -618,38 +594,9 @@ def evaluateShade(temperatures, balanceTemp, temperatureOffest, numHrs, analysis
         contextMesh = joinMesh(contextMeshes)
     else: pass
     
-    for pt in regionTestPts: sunLines.append([]) 
-    
-    for ptCount, pt in enumerate(regionTestPts):
-        for vec in sunVectors:
-            if context_:
-                if rc.Geometry.Intersect.Intersection.MeshRay(contextMesh, rc.Geometry.Ray3d(pt, vec)) < 0:
-                    sunLines[ptCount].append(rc.Geometry.Line(pt, lineLength * vec))
-                else: sunLines[ptCount].append(0)
-            else:
-                sunLines[ptCount].append(rc.Geometry.Line(pt, lineLength * vec))
-            
-    
-    #If parallel is true, then run the intersection through the parallel function.  If not, run it through the normal function.
-    if parallel_ == True:
-        faceInt = parallel_projection(analysisMesh, sunLines, regionTestPts)
-    else:
-        faceInt = nonparallel_projection(analysisMesh, sunLines, regionTestPts)
-    
-    #Convert the Number Of Intersections for Each Mesh Face into a Percent of Sun Blocked by Each Mesh Face for Each Hour of the Year.
-    percentBlocked = []
-    for face in range(analysisMesh.Faces.Count):
-        percentBlocked.append(len(sunVectors) *[0])
-    
-    testPtsCount = len(regionTestPts) 
-    # for each mesh surface,
-    for faceCount, faceData in enumerate(faceInt):
-        # check the number of intersections for each hour
-        counter= collections.Counter(faceData)
-        
-        for hour in counter.keys():
-             # store the result in the new percentBlocked list
-             percentBlocked[faceCount][hour] = counter[hour]/testPtsCount
+    #Get the number of intersections of the sun rays with each mesh face for each hour of the year.
+    hitCounts = hitCountMatrix(analysisMesh, contextMesh, regionTestPts, sunVectors, lineLength)
+    testPtsCount = len(regionTestPts)
     
     #Calculate how far the hourly temperatures are from the balance point, allowing for a range of +/- 2C in which people will be comfortable.
     comfortRange = temperatureOffest
@@ -681,8 +628,8 @@ def evaluateShade(temperatures, balanceTemp, temperatureOffest, numHrs, analysis
     shadeHelpfulness = []
     shadeHarmfulness = []
     shadeNetEffect = []
-    for cellCount, cell in enumerate(percentBlocked):
-        shadeHelp, shadeHarm, shadeNet = valCalc(cell, deltaBal, analysisAreas[cellCount], numDaySteps)
+    for cellCount, faceHitCounts in enumerate(hitCounts):
+        shadeHelp, shadeHarm, shadeNet = valCalc(faceHitCounts, deltaBal, testPtsCount, analysisAreas[cellCount], numDaySteps)
         shadeHelpfulness.append(shadeHelp)
         shadeHarmfulness.append(shadeHarm)
         shadeNetEffect.append(shadeNet)
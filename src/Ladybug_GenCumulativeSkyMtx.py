@@ -22,9 +22,9 @@
 
 
 """
-This component uses Radiance's gendaymtx function to calculate the sky's radiation for each hour of the year. This is a necessary pre-step before doing radiation analysis with Rhino geometry or generating a radiation rose.
+This component calculates the sky's radiation for each hour of the year the same way as Radiance's gendaymtx function. This is a necessary pre-step before doing radiation analysis with Rhino geometry or generating a radiation rose.
 
-The first time you use this component, you will need to be connected to the internet so that the component can download the "gendaymtx.exe" function to your system.
+The sky is calculated inside Grasshopper with the Perez all-weather sky model so gendaymtx.exe is not needed anymore.
 
 Gendaymtx is written by Ian Ashdown and Greg Ward. For more information, check the Radiance manual at:
 http://www.radiance-online.org/learning/documentation/manual-pages/pdfs/gendaymtx.pdf
@@ -36,11 +36,11 @@ Provided by Ladybug 0.0.63
         _epwFile: The output of the Ladybug Open EPW component or the file path location of the epw weather file on your system.
         _skyDensity_: Set to 0 to generate a Tregenza sky, which will divide up the sky dome with a coarse density of 145 sky patches.  Set to 1 to generate a Reinhart sky, which will divide up the sky dome using a very fine density of 580 sky patches.  Note that, while the Reinhart sky is more accurate, it will result in considerably longer calculation times.  Accordingly, the default is set to 0 for a Tregenza sky.
         workingDir_: An optional working directory in your system where the sky will be generated. Default is set to C:\Ladybug or C:\Users\yourUserName\AppData\Roaming\Ladybug.  The latter is used if you cannot write to the C:\ drive of your computer.  Any valid file path location can be connected.
-        useOldRes_: Set this to "True" if you have already run this component previously and you want to use the already-generated data for this weather file.
+        useOldRes_: Set this to "True" if you have already run this component previously and you want to use the already-generated data for this weather file.  The sky is saved as a binary .npy file in the working directory. The .mtx files from the older versions of this component which used gendaymtx are also imported.
         _runIt: Set to "True" to run the component and generate a sky matrix.
     Returns:
         readMe!: ...
-        cumulativeSkyMtx: The result of the gendaymtx function. Use the selectSkyMtx component to select a desired sky matrix from this output for use in a radiation study, radition rose, or sky dome visualization.
+        cumulativeSkyMtx: The hourly radiation of the sky patches. Use the selectSkyMtx component to select a desired sky matrix from this output for use in a radiation study, radition rose, or sky dome visualization.
 """
 
 ghenv.Component.Name = "Ladybug_GenCumulativeSkyMtx"
@@ -57,15 +57,9 @@ except: pass
 import os
 import scriptcontext as sc
 import Grasshopper.Kernel as gh
-from itertools import izip
-import shutil
-
-def date2Hour(month, day, hour):
-    # fix the end day
-    numOfDays = [0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334]
-    # dd = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
-    JD = numOfDays[int(month)-1] + int(day)
-    return (JD - 1) * 24 + hour
+import array
+import sys
+import re
 
 def hour2Date(hour):
     
@@ -84,42 +78,27 @@ def hour2Date(hour):
     
     return str(day), str(month), str(time)
 
-def getRadiationValues(epw_file, analysisPeriod, weaFile):
-    # start hour and end hour
-    stHour = 0
-    endHour = 8760
-    epwfile = open(epw_file,"r")
+def getRadiationValues(epwFile):
+    # direct normal and diffuse horizontal radiation of each hour of the year
+    dirRad = []; difRad = []
+    epwfile = open(epwFile,"r")
     for lineCount, line in enumerate(epwfile):
-        hour = lineCount - 8
-        if  int(stHour) <= hour <= int(endHour):
-            dirRad = (line.split(',')[14])
-            difRad = (line.split(',')[15])
-            day, month, time = hour2Date(hour)
-            weaFile.write(month + " " + day + " " + time + " " + dirRad + " " + difRad + "\n")
+        if lineCount < 8: continue
+        data = line.split(',')
+        dirRad.append(float(data[14]))
+        difRad.append(float(data[15]))
     epwfile.close()
-    return weaFile
-
-def weaHeader(epwFileAddress, lb_preparation):
-    
-    locName, lat, long, timeZone, elev, dataStr = lb_preparation.epwLocation(epwFileAddress)
-    
-    #print locName, lat, long, timeZone, elev
-    
-    return  "place " + locName + "\n" + \
-            "latitude " + lat + "\n" + \
-            "longitude " + `-float(long)` + "\n" + \
-            "time_zone " + `-float(timeZone) * 15` + "\n" + \
-            "site_elevation " + elev + "\n" + \
-            "weather_data_file_units 1\n"
+    return dirRad, difRad
 
-def epw2wea(weatherFile, analysisPeriod, lb_preparation):
-    outputFile = weatherFile.replace(".epw", ".wea")
-    header = weaHeader(weatherFile, lb_preparation)
-    weaFile = open(outputFile, 'w')
-    weaFile.write(header)
-    weaFile = getRadiationValues(weatherFile, analysisPeriod, weaFile)
-    weaFile.close()
-    return outputFile
+def calculateSkyMtx(epwFile, n, newLocName, lat, lngt, timeZone):
+    # calculate the sky in process with the same Perez sky that gendaymtx uses
+    SkyResultsCollection = sc.sticky["ladybug_SkyResultsCollection"]
+    lb_perezSkyMtx = sc.sticky["ladybug_PerezSkyMatrix"](n, lat, lngt, timeZone)
+    dirRad, difRad = getRadiationValues(epwFile)
+    if len(dirRad) < 8760:
+        raise Exception("%s doesn't have the data for all the hours of the year." % epwFile)
+    skyMtx = SkyResultsCollection.empty(lb_perezSkyMtx.numOfPatches, newLocName, lat, lngt, timeZone)
+    return lb_perezSkyMtx.fill(skyMtx, dirRad, difRad, parallel = True)
 
 def main(epwFile, skyType, workingDir, useOldRes):
     # import the classes
@@ -143,32 +122,7 @@ def main(epwFile, skyType, workingDir, useOldRes):
         
         # make sure the directory has been created
         if workingDir == -1: return -2
-        workingDrive = workingDir[0:1]
-        
-        # GenCumulativeSky
-        gendaymtxFile = os.path.join(workingDir, 'gendaymtx.exe')
         
-        if not os.path.isfile(gendaymtxFile):
-            # let's see if we can grab it from radiance folder
-            if os.path.isfile("c:/radiance/bin/gendaymtx.exe"):
-                # just copy this file
-                shutil.copyfile("c:/radiance/bin/gendaymtx.exe", gendaymtxFile)
-                # in newer versions of radiance you also need msvcr120.dll
-                if os.path.isfile("c:/radiance/bin/msvcr120.dll"):
-                    shutil.copyfile("c:/radiance/bin/msvcr120.dll",
-                                    os.path.join(workingDir, 'msvcr120.dll'))
-                    
-            else:
-                # download the file
-                lb_preparation.downloadGendaymtx(workingDir)
-        
-        #check if the file is there
-        if not os.path.isfile(gendaymtxFile) or  os.path.getsize(gendaymtxFile)< 15000 : return -3
-        
-        if not os.access(gendaymtxFile, os.X_OK):
-            raise Exception("%s is blocked by system! Right click on the file,"%gendaymtxFile + \
-                " select properties and unblock it.")
-                
         ## check for epw file to be connected
         if epwFile != None and epwFile[-3:] == 'epw':
             if not os.path.isfile(epwFile):
@@ -187,45 +141,30 @@ def main(epwFile, skyType, workingDir, useOldRes):
             # copy .epw file to sub-directory
             weatherFileAddress = lb_preparation.copyFile(epwFile, subWorkingDir + "\\" + newLocName + '.epw')
             
-            # create weaFile
-            weaFile = epw2wea(weatherFileAddress, [], lb_preparation)
-        
-            outputFile = weaFile.replace(".wea", ".mtx")
-            outputFileDif = weaFile.replace(".wea", "_dif_" + `skyType` + ".mtx")
-            outputFileDir = weaFile.replace(".wea", "_dir_" + `skyType` + ".mtx")
+            outputFileDif = weatherFileAddress.replace(".epw", "_dif_" + `skyType` + ".mtx")
+            outputFileDir = weatherFileAddress.replace(".epw", "_dir_" + `skyType` + ".mtx")
+            cacheFile = weatherFileAddress.replace(".epw", "_skyMtx_" + `skyType` + ".npy")
             
             # check if the study is already ran for this weather file
-            if useOldRes and os.path.isfile(outputFileDif) and os.path.isfile(outputFileDir):
-                # ask the user if he wants to re-run the study
-                print "Sky matrix files for this epw file are already existed on your system.\n" + \
+            if useOldRes and (os.path.isfile(cacheFile) or (os.path.isfile(outputFileDif) and os.path.isfile(outputFileDir))):
+                print "Sky matrix for this epw file is already existed on your system.\n" + \
                       "The component won't recalculate the sky and imports the available result.\n" + \
-                      "In case you don't want to use these files, set useOldRes input to False and re-run the study.\n" + \
+                      "In case you don't want to use this result, set useOldRes input to False and re-run the study.\n" + \
                       "If you found the lines above confusing just ignore it! It's all fine. =)\n"
-            else:
-                batchFile = weaFile.replace(".wea", ".bat")
+                if os.path.isfile(outputFileDif) and os.path.isfile(outputFileDir):
+                    # sky matrix from an older version which used gendaymtx
+                    return readMTXFile(outputFileDif, outputFileDir, skyType, newLocName, lat, lngt, timeZone)
                 try:
-                    username = ' %s' % os.getenv("USERNAME")
-                except:
-                    username = ''
-                
-                command = '@echo off \necho.\n echo HELLO{0}!\n' \
-                          'echo DO NOT CLOSE THIS WINDOW. \necho.\necho IT WILL BE CLOSED AUTOMATICALLY WHEN THE CALCULATION IS OVER!\n' \
-                          'echo.\necho AND MAY TAKE FEW MINUTES...\n' \
-                          'echo.\n' \
-                          'echo CALCULATING DIFFUSE COMPONENT OF THE SKY...\n' \
-                          '"{1}\\gendaymtx" -m {2} -s -O1 "{3}"> "{4}"\n' \
-                          'echo.\necho CALCULATING DIRECT COMPONENT OF THE SKY...\n' \
-                          '"{1}\\gendaymtx" -m {2} -d -O1 "{3}"> "{5}"\n'
-                         
-                command = command.format(username, workingDir, n, weaFile,
-                                         outputFileDif, outputFileDir)
-                file = open(batchFile, 'w')
-                file.write(command.encode('utf-8'))
-                file.close()
-        
-                os.system('"%s"' % batchFile)
+                    skyMtx = sc.sticky["ladybug_SkyResultsCollection"].load(cacheFile, newLocName, lat, lngt, timeZone)
+                    if skyMtx.numOfPatches == sc.sticky["ladybug_PerezSkyMatrix"](skyType, lat, lngt, timeZone).numOfPatches:
+                        return skyMtx
+                except Exception, e:
+                    print "Failed to load the cached sky matrix. The sky will be re-calculated.\n" + `e`
             
-            return outputFileDif, outputFileDir, newLocName, lat, lngt, timeZone
+            skyMtx = calculateSkyMtx(weatherFileAddress, skyType, newLocName, lat, lngt, timeZone)
+            try: skyMtx.save(cacheFile)
+            except Exception, e: print "Failed to write the sky matrix cache file.\n" + `e`
+            return skyMtx
             
         else:
             print "epwWeatherFile address is not a valid .epw file"
@@ -237,7 +176,78 @@ def main(epwFile, skyType, workingDir, useOldRes):
         w = gh.GH_RuntimeMessageLevel.Warning
         ghenv.Component.AddRuntimeMessage(w, "You should first let the Ladybug fly...")
         return -1
-        
+
+def readMTXHeader(resFile):
+    # new version of gendaymtx genrates a radiance header which ends with an empty line
+    # returns the header as a dictionary and leaves the file at the start of the data
+    header = {}
+    firstLine = resFile.readline()
+    if not firstLine.startswith("#?RADIANCE"):
+        resFile.seek(0)
+        return header
+    while True:
+        line = resFile.readline()
+        if line == "" or line.strip() == "": break
+        line = line.strip()
+        if "=" in line:
+            key, value = line.split("=", 1)
+            header[key.strip()] = value.strip()
+    return header
+
+recordLinePattern = re.compile(r"^[ \t\r]*\S+[ \t]+\S+[ \t]+\S+[ \t\r]*$", re.M)
+nonEmptyLinePattern = re.compile(r"^[ \t\r]*\S", re.M)
+
+def mtxBlocks(resFile, header, blockSize = 8760):
+    # yield the RGB values of the file in blocks of up to blockSize records as flat arrays
+    # binary files (-of/-od) are decoded directly. failed ascii records are returned as nan
+    fileFormat = header.get("FORMAT", "ascii")
+    if fileFormat in ("float", "double"):
+        rgb = array.array('f' if fileFormat == "float" else 'd')
+        recordSize = 3 * rgb.itemsize
+        byteOrder = header.get("BYTEORDER", sys.byteorder).lower()
+        swap = byteOrder.startswith("b") != (sys.byteorder == "big")
+        leftover = ""
+        while True:
+            chunk = resFile.read(blockSize * recordSize)
+            if not chunk: break
+            chunk = leftover + chunk
+            cut = len(chunk) - len(chunk) % recordSize
+            leftover = chunk[cut:]
+            rgb = array.array(rgb.typecode)
+            rgb.fromstring(chunk[:cut])
+            if swap: rgb.byteswap()
+            yield rgb
+        return
+    
+    leftover = ""
+    while True:
+        chunk = resFile.read(blockSize * 32)
+        if not chunk:
+            if leftover.strip() == "": break
+            chunk = "\n"
+        chunk = leftover + chunk
+        cut = chunk.rfind("\n") + 1
+        leftover = chunk[cut:]
+        if cut == 0: continue
+        block = chunk[:cut]
+        tokens = block.split()
+        try:
+            # fast path for blocks where every record has exactly 3 values
+            recordCount = len(recordLinePattern.findall(block))
+            if recordCount != len(nonEmptyLinePattern.findall(block)) or len(tokens) != 3 * recordCount: raise ValueError
+            yield array.array('d', map(float, tokens))
+        except ValueError:
+            rgb = array.array('d')
+            for line in block.split("\n"):
+                items = line.split()
+                if len(items) == 0: continue
+                try:
+                    R, G, B = items
+                    rgb.extend((float(R), float(G), float(B)))
+                except:
+                    rgb.extend((float("nan"), float("nan"), float("nan")))
+            yield rgb
+
 def readMTXFile(daylightMtxDif, daylightMtxDir, n, newLocName, lat, lngt, timeZone):
     # All the patches on top high get the same values so maybe
     # I should re-create the geometry 577 instead of 580
@@ -257,88 +267,61 @@ def readMTXFile(daylightMtxDif, daylightMtxDir, n, newLocName, lat, lngt, timeZo
     
     numOfSkyPatches = skyPatchesDict[n]
     
-    # create an empty dictionary
-    radValuesDict = {}
-    for skyPatch in range(numOfSkyPatches):
-        radValuesDict[skyPatch] = {}
-        
-    resFileDif = open(daylightMtxDif, "r") 
-    resFileDir = open(daylightMtxDir, "r") 
+    # values are cached as a binary .npy file next to the .mtx files
+    # and it will be re-used as long as it is newer than both .mtx files
+    SkyResultsCollection = sc.sticky["ladybug_SkyResultsCollection"]
+    cacheFile = daylightMtxDif.replace("_dif_", "_skyMtx_")[:-4] + ".npy"
+    if os.path.isfile(cacheFile) and \
+        os.path.getmtime(cacheFile) >= max(os.path.getmtime(daylightMtxDif), os.path.getmtime(daylightMtxDir)):
+        try:
+            skyMtx = SkyResultsCollection.load(cacheFile, newLocName, lat, lngt, timeZone)
+            if skyMtx.numOfPatches == numOfSkyPatches: return skyMtx
+        except Exception, e:
+            print "Failed to load the cached sky matrix. The .mtx files will be re-read.\n" + `e`
+    
+    # create an empty sky matrix
+    skyMtx = SkyResultsCollection.empty(numOfSkyPatches, newLocName, lat, lngt, timeZone)
+    values = skyMtx.values
+    numOfHours = skyMtx.numOfHours
+    
+    # steradian conversion factor of each sky patch
+    patchConv = array.array('d')
+    for rowNumber, patchCountInRow in enumerate(numOfPatchesInEachRow[n]):
+        patchConv.extend([strConv[n][rowNumber]] * patchCountInRow)
     
-    def getValue(line, rowNumber):
-        R, G, B = line.split(' ')
-        value = (.265074126 * float(R) + .670114631 * float(G) + .064811243 * float(B)) * strConv[n][rowNumber]
-        return value
-        
-    lineCount = 0
-    extraHeadingLines = 0 # no heading
-    warnOff = False
     failedHours = {}
-    for difLine, dirLine in izip(resFileDif, resFileDir):
-        # each line is the data for each hour for a single patch
-        
-        # new version of gendaymtx genrates a header
-        # this is a check to make sure the component will work for both versions
-        if lineCount == 0 and difLine.startswith("#?RADIANCE"):
-            # the file has a header
-            extraHeadingLines = -8
-            
-        if lineCount + extraHeadingLines < 0:
-            # pass heading line
-            lineCount += 1
-            continue
-        
-        # these lines is an empty line to separate patches do let's pass them
-        hour = (lineCount + 1 + extraHeadingLines)% 8761
-        
-        #print lineCount, hour
-        
-        if hour != 0:
-            patchNumber = int((lineCount + 1 + extraHeadingLines) /8761)
-            
-            # first patch is ground!
-            if patchNumber != 0: #and patchNumber < numOfSkyPatches:
-                for rowCount, patchCountInRow in enumerate(numOfPatchesInEachRow[n]):
-                    if patchNumber - 1 < sum(numOfPatchesInEachRow[n][:rowCount+1]):
-                        rowNumber = rowCount
-                        # print rowNumber
-                        break
-                try:
-                    difValue = getValue(difLine, rowNumber)
-                    dirValue = getValue(dirLine, rowNumber)
-                except Exception, e:
-                    value = 0
-                    if not warnOff:
-                        print "genDayMtx returns null Values for few hours. The study will run anyways." + \
-                              "\nMake sure that you are using an standard epw file." + \
-                              "\nThe failed hours are listed below in [Month/Day @Hour] format."
-                    warnOff = True
-                    day, month, time = hour2Date(hour - 1)
-                    if hour-1 not in failedHours.keys():
-                        failedHours[hour-1] = [day, month, time]
-                        print "Failed to read the results > " + month + "/" + day + " @" + time
-                    
-                try: radValuesDict[patchNumber-1][hour] = [difValue, dirValue]
-                except:print patchNumber-1, hour, value
-            
-        lineCount += 1
+    for offset, mtxFile in enumerate([daylightMtxDif, daylightMtxDir]):
+        resFile = open(mtxFile, "rb")
+        try:
+            header = readMTXHeader(resFile)
+            # each record is the data for a single hour of a single patch and first patch is ground!
+            patchNumber = 0; hour = 0
+            for rgb in mtxBlocks(resFile, header):
+                for i in xrange(0, len(rgb), 3):
+                    if 0 < patchNumber <= numOfSkyPatches:
+                        value = (.265074126 * rgb[i] + .670114631 * rgb[i + 1] + .064811243 * rgb[i + 2]) * patchConv[patchNumber - 1]
+                        if value != value:
+                            value = 0
+                            if not failedHours:
+                                print "genDayMtx returns null Values for few hours. The study will run anyways." + \
+                                      "\nMake sure that you are using an standard epw file." + \
+                                      "\nThe failed hours are listed below in [Month/Day @Hour] format."
+                            if hour not in failedHours:
+                                day, month, time = hour2Date(hour)
+                                failedHours[hour] = [day, month, time]
+                                print "Failed to read the results > " + month + "/" + day + " @" + time
+                        values[((patchNumber - 1) * numOfHours + hour) * 2 + offset] = value
+                    hour += 1
+                    if hour == numOfHours:
+                        hour = 0; patchNumber += 1
+        finally:
+            resFile.close()
+    skyMtx.invalidate()
     
-    resFileDif.close()
-    resFileDir.close()
-
+    try: skyMtx.save(cacheFile)
+    except Exception, e: print "Failed to write the sky matrix cache file.\n" + `e`
     
-    class SkyResultsCollection(object):
-        def __init__(self, valuesDict, locationName, lat, lngt, timeZone):
-            self.d = valuesDict
-            self.location = locationName
-            self.lat = lat
-            self.lngt = lngt
-            self.timeZone = timeZone
-        
-        def ToString(self):
-            return 'AnnualDaylightMatrix::%s' % self.location
-            
-    return SkyResultsCollection(radValuesDict, newLocName, lat, lngt, timeZone)
+    return skyMtx
     
 if _runIt and _epwFile!=None:
     
@@ -347,20 +330,14 @@ if _runIt and _epwFile!=None:
     
     result = main(_epwFile, n, workingDir_, useOldRes_)
     w = gh.GH_RuntimeMessageLevel.Warning
-    if result== -3:
-        warning = 'Download failed!!! You need GenDayMtx.exe to use this component.' + \
-                '\nPlease check your internet connection, and try again!'
-        print warning
-        ghenv.Component.AddRuntimeMessage(w, warning)
-    elif result == -2:
+    if result == -2:
         warning = 'Working directory cannot be created! Please set workingDir to a new path'
         print warning
         ghenv.Component.AddRuntimeMessage(w, warning)
     elif result == -1:
         pass
     else:
-        daylightMtxDiffueFile, daylightMtxDirectFile, newLocName, lat, lngt, timeZone = result
-        cumulativeSkyMtx = readMTXFile(daylightMtxDiffueFile, daylightMtxDirectFile, n, newLocName, lat, lngt, timeZone)
+        cumulativeSkyMtx = result
 else:
     warn = "Set runIt to True and connect a valid epw file address"
     print warn
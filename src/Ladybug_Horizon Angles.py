@@ -344,96 +344,29 @@ def checkInputData(analysisGeometry, contextMeshes, north, scale, outputGeometry
     return srfCornerPtsLL, srfCentroidL, srfCentroid, contextMeshJoined, northRad, northVec, scale, outputGeometryIndex, workingSubFolderPath, horizonFileType, horizonFileTypeLabel, unitConversionFactor, validInputData, printMsg
 
 
-def calculateHorizonAngles(contextMeshJoined, origin, northRad, unitConversionFactor):
+def calculateHorizonAngles(horizonProfileD, originLifted, northRad, unitConversionFactor):
     
-    originLifted = Rhino.Geometry.Point3d(origin.X, origin.Y, origin.Z + 0.01)  # fix for rays intersection, if user inputted a ground surface to "_contex" input
-    
-    # create skyDome
+    # horizonProfileD has the maximal obstruction angle for each azimuth: 0,1,2,3... 358,359
     skyDomeRadius = 200 / unitConversionFactor  # in meters
-    skyDomeSphere = Rhino.Geometry.Sphere(originLifted, skyDomeRadius)
-    skyDomeSrf = skyDomeSphere.ToBrep().Faces[0]
-    
-    # small number of rays (for example: precisionU = 30, precisionV = 10) can result in rays missing the contextMeshJoined, thererfor the shadingMaskSrf will not be created
-    precisionU = 3600  # rays shot per 0.1 degrees (10th of a degree)
-    precisionV = 1200  # rays shot per 0.075 degrees - more denser than precisionU
-    
-    halvedSkyDomeSrf = skyDomeSrf.Trim(Rhino.Geometry.Interval(skyDomeSrf.Domain(0)[0], skyDomeSrf.Domain(0)[1]), Rhino.Geometry.Interval(0, skyDomeSrf.Domain(1)[1])) # split the skyDome sphere in half
-    halvedSkyDomeSrf.SetDomain(1, Rhino.Geometry.Interval(0, halvedSkyDomeSrf.Domain(1)[1]))  # shrink the halvedSkyDomeSrf V start domain
-    
-    clockwise = True
-    if clockwise == True:
-        # reverse the U domain (from counter-clockwise to clockwise)
-        uStart,uEnd = halvedSkyDomeSrf.Domain(0)
-        interval0 = Rhino.Geometry.Interval(-uEnd, -uStart)
-        halvedSkyDomeSrf.SetDomain(0,interval0)
-        halvedSkyDomeSrf = halvedSkyDomeSrf.Reverse(0)
-    else:
-        pass
-    
-    # rotate the halvedSkyDomeSrf by 90 degrees so that it starts at 0 degrees (+Y axis)
-    transformMatrixRotate1 = Rhino.Geometry.Transform.Rotation(math.radians(90), Rhino.Geometry.Vector3d(0,0,1), originLifted)
-    halvedSkyDomeSrf.Transform(transformMatrixRotate1)
-    
-    # rotation due to north angle position
-    #transformMatrixRotate2 = Rhino.Geometry.Transform.Rotation(-northRad, Rhino.Geometry.Vector3d(0,0,1), originLifted)  # counter-clockwise
-    transformMatrixRotate2 = Rhino.Geometry.Transform.Rotation(northRad, Rhino.Geometry.Vector3d(0,0,1), originLifted)  # clockwise
-    halvedSkyDomeSrf.Transform(transformMatrixRotate2)
-    
-    skyDomeDomainUmin, skyDomeDomainUmax = halvedSkyDomeSrf.Domain(0)
-    skyDomeDomainVmin, skyDomeDomainVmax = halvedSkyDomeSrf.Domain(1)
-    stepU = (skyDomeDomainUmax - skyDomeDomainUmin)/precisionU
-    stepV = (skyDomeDomainVmax - skyDomeDomainVmin)/precisionV
-    
-    
-    # check for intersection between the contextMeshJoined and rays
-    horizonAnglesRoseMeshPts = []
-    lastRowPoints = []
-    
-    hitted = False  # initial switch
-    for i in xrange(0,precisionU):
-        u = skyDomeDomainUmin + stepU*i
-        if (i % 10 == 0):
-            horizonAnglesRoseMeshPts.append(originLifted)
-            firstRowPt = halvedSkyDomeSrf.PointAt(u,0)
-            horizonAnglesRoseMeshPts.append(firstRowPt)
-        for k in xrange(0,precisionV):
-            v = skyDomeDomainVmin + stepV*k
-            skyDomePt = halvedSkyDomeSrf.PointAt(u,v)
-            rayVector = skyDomePt-originLifted
-            ray = Rhino.Geometry.Ray3d(originLifted, rayVector)
-            rayIntersectParam = Rhino.Geometry.Intersect.Intersection.MeshRay(contextMeshJoined,ray)
-            if rayIntersectParam >= 0:
-                # ray hitted something in that column
-                hitted = True
-                lastRowPt = skyDomePt
-                continue
-            else:
-                # ray did not hit anything in that column
-                pass
-        if hitted == False:
-            lastRowPt = halvedSkyDomeSrf.PointAt(u,0)
-        lastRowPoints.append(lastRowPt)
-        hitted = False  # reset the hitted switch
-    
     
-    # calculate the horizonAngles from lastRowPoints:
-    azimuthsD = []  # depends on precisionU and precisionV
+    azimuthsD = []
     horizonAnglesD = []
     horizonAnglesD_for_colors = []  # made of horizonAnglesD duplicates to account for the origin point of the horizonAnglesRoseMeshPts
-    for azimuth,lastRowPt in enumerate(lastRowPoints):
-        if (azimuth % 10 == 0):  # only take azimuths 0,10,20,30... 3580,3590
-            projectedLastRowPt = Rhino.Geometry.Point3d(lastRowPt.X, lastRowPt.Y, originLifted.Z)
-            tangent_horizonAngleR = (lastRowPt.Z - originLifted.Z)/originLifted.DistanceTo(projectedLastRowPt)
-            if tangent_horizonAngleR < 0.001:  # fix if horizonAngle = 0
-                tangent_horizonAngleR = 0
-            horizonAngleR = math.atan(tangent_horizonAngleR)
-            horizonAngleD = math.degrees(horizonAngleR)  # .hor files have integer values for horizon angles
-            
-            horizonAnglesD.append(int(horizonAngleD))
-            azimuthsD.append(int(azimuth/10))  # convert the azimuths from 0,10,20,30... 3580,3590 to 0,1,2,3... 358,359
-            
-            horizonAnglesD_for_colors.append(horizonAngleD)
-            horizonAnglesD_for_colors.append(horizonAngleD)
+    horizonAnglesRoseMeshPts = []
+    for azimuth,horizonAngleD in enumerate(horizonProfileD):
+        if math.tan(math.radians(horizonAngleD)) < 0.001:  # fix if horizonAngle = 0
+            horizonAngleD = 0
+        
+        horizonAnglesD.append(int(horizonAngleD))  # .hor files have integer values for horizon angles
+        azimuthsD.append(azimuth)
+        
+        horizonAnglesD_for_colors.append(horizonAngleD)
+        horizonAnglesD_for_colors.append(horizonAngleD)
+        
+        azimuthR = math.radians(azimuth) - northRad
+        firstRowPt = Rhino.Geometry.Point3d(originLifted.X + skyDomeRadius*math.sin(azimuthR), originLifted.Y + skyDomeRadius*math.cos(azimuthR), originLifted.Z)
+        horizonAnglesRoseMeshPts.append(originLifted)
+        horizonAnglesRoseMeshPts.append(firstRowPt)
     
     
     # possible future creation of contextShadingMask (more precisely contextShadingMaskUnscaledUnrotated), the same as from "Terrain shading mask" component by its code starting from "    if maskStyle == 0:  # spherical terrain shading mask" (line ?)
@@ -449,10 +382,17 @@ def main(contextMeshJoined, srfCentroidL, northRad, outputGeometryIndex, unitCon
     maximalAzimuthD_dataTree = Grasshopper.DataTree[object]()
     maximalHorizonAngleD_dataTree = Grasshopper.DataTree[object]()
     
+    # horizon profiles of all the analysis points are calculated at once, from the edges of the contextMeshJoined triangles
+    originsLifted = [Rhino.Geometry.Point3d(srfCentroid.X, srfCentroid.Y, srfCentroid.Z + 0.01) for srfCentroid in srfCentroidL if srfCentroid != None]  # fix for rays intersection, if user inputted a ground surface to "_contex" input
+    horizonProfile = lb_horizonProfile([contextMeshJoined], 360, northRad)
+    horizonProfilesD = horizonProfile.profiles(originsLifted, True)
+    
     paths = _analysisGeometry.Paths
+    profileIndex = 0
     for index,srfCentroid in enumerate(srfCentroidL):
         if srfCentroid != None:  # the inputted _analysisGeometry is not a point nor a single faced brep
-            azimuthsD, horizonAnglesD, originLifted, horizonAnglesRoseMeshPts_notPicked, horizonAnglesD_for_colors_notPicked, contextShadingMaskUnscaledUnrotated_notPicked = calculateHorizonAngles(contextMeshJoined, srfCentroid, northRad, unitConversionFactor)
+            azimuthsD, horizonAnglesD, originLifted, horizonAnglesRoseMeshPts_notPicked, horizonAnglesD_for_colors_notPicked, contextShadingMaskUnscaledUnrotated_notPicked = calculateHorizonAngles(horizonProfilesD[profileIndex], originsLifted[profileIndex], northRad, unitConversionFactor)
+            profileIndex += 1
             
            # maximualHorizonAngle, maximalAzimuth
             maximalHorizonAngle_maximalAzimuth = []
@@ -709,6 +649,7 @@ if sc.sticky.has_key("ladybug_release"):
         lb_meshpreparation = sc.sticky["ladybug_Mesh"]()
         lb_visualization = sc.sticky["ladybug_ResultVisualization"]()
         lb_photovoltaics = sc.sticky["ladybug_Photovoltaics"]()
+        lb_horizonProfile = sc.sticky["ladybug_HorizonProfile"]
         
         if _location:
             locationLatitudeD, locationLongitudeD, locationName, fileNameIncomplete, validLocationData, printMsg = getLocationData(_location)
@@ -996,153 +996,53 @@ def main(method, baseTempType, radTemp, infraredRad, mannequinMesh, groundMesh,
             solarAdjustedMRT.append(analysisStart)
             solarAdjustedMRT.append(analysisEnd)
             
-            #Define functions for computing the radiation for each hour, which is in parallal and not in parallel.
-            def nonParallelRadCalc():
-                try:
-                    for count, hour in enumerate(HOYS):
-                        if gh.GH_Document.IsEscapeKeyDown(): assert False
-                        
-                        if count != len(HOYS)-1: lastVal = 1
-                        else: lastVal = 0
-                        if altitudes[count] > 0 or altitudes[count-1] > 0 or altitudes[count+lastVal] > 0:
-                            skyMtxLists, _analysisPeriodOrHOY_ = getHourlySky(cumSkyMtx.d, hour)
-                            selSkyMatrix = prepareLBList(skyMtxLists, _analysisPeriodOrHOY_, location, unit, False, False)
-                            
-                            indexList, listInfo = lb_preparation.separateList(selSkyMatrix, lb_preparation.strToBeFound)
-                            #separate total, diffuse and direct radiations
-                            separatedLists = []
-                            for i in range(len(indexList)-1):
-                                selList = []
-                                [selList.append(float(x)) for x in selSkyMatrix[indexList[i] + 7:indexList[i+1]]]
-                                separatedLists.append(selList)
-                            
-                            skyMatrix = separatedLists[0]
-                            
-                            radiationResult = []
-                            for ptCount in  intDict.keys():
-                                radValue = 0
-                                for patchCount in intDict[ptCount].keys():
-                                    if intDict[ptCount][patchCount]['isIntersect']:
-                                        radValue = radValue + (skyMatrix[patchCount] * math.cos(intDict[ptCount][patchCount]['vecAngle']))
-                                radiationResult.append(radValue)
-                            
-                            personRad = radiationResult[:-1]
-                            groundRad = radiationResult[-1]
-                            totalPersonBeamDiffRad = sum([a*b for a,b in zip(personRad,personMeshAreas)])
-                            
-                            #Account for the transmissivity of glass.
-                            if finalWinTransmiss[count] != 1:
-                                groundRad = groundRad*(finalWinTransmiss[count])
-                                totalPersonBeamDiffRad = totalPersonBeamDiffRad*(finalWinTransmiss[count])
-                            
-                            #Calculate the additional radiation reflected to the person by the ground.
-                            groundRefRad = 0.5 * groundRad * fracEff * groundR
-                            
-                            #Calculate the total person radiation and the ERF.
-                            totalPersonRad = totalPersonBeamDiffRad + groundRefRad
-                            radiantFlux = totalPersonRad/totalPersonArea
-                            hourERF = (radiantFlux * cloA)/0.95
-                            ERF.append(hourERF/1000)
-                            
-                            #Calculate the MRT delta, the solar adjusted MRT, and the solar adjusted operative temperature.
-                            mrtDelt = (hourERF/(fracEff*radTransCoeff))
-                            MRTDelta.append(mrtDelt)
-                            if baseTempType == False:
-                                hourMRT = mrtDelt + (radTemp[count])
-                            else:
-                                hourMRT = mrtDelt + (skyTemp[count]*(skyViewFac) + radTemp[count]*(1-(skyViewFac)))
-                            solarAdjustedMRT.append(hourMRT)
-                        else:
-                            ERF.append(0)
-                            MRTDelta.append(0)
-                            if baseTempType == False:
-                                hourMRT = radTemp[count]
-                            else:
-                                hourMRT = (skyTemp[count]*(skyViewFac) + radTemp[count]*(1-(skyViewFac)))
-                            solarAdjustedMRT.append(hourMRT)
-                    return True
-                except:
-                    print "The calculation has been terminated by the user!"
-                    e = gh.GH_RuntimeMessageLevel.Warning
-                    ghenv.Component.AddRuntimeMessage(e, "The calculation has been terminated by the user!")
-                    return False
+            #Find the hours when the sun is up (or up in the hour before or after), which are the only ones with solar radiation.
+            sunHours = []
+            for count, hour in enumerate(HOYS):
+                if count != len(HOYS)-1: lastVal = 1
+                else: lastVal = 0
+                if altitudes[count] > 0 or altitudes[count-1] > 0 or altitudes[count+lastVal] > 0:
+                    sunHours.append(count)
             
-            def parallelRadCalc():
-                def radCalc(count):
-                    if count != len(HOYS)-1: lastVal = 1
-                    else: lastVal = 0
-                    if altitudes[count] > 0 or altitudes[count-1] > 0 or altitudes[count+lastVal] > 0:
-                        skyMtxLists, _analysisPeriodOrHOY_ = getHourlySky(cumSkyMtx.d, HOYS[count])
-                        selSkyMatrix = prepareLBList(skyMtxLists, _analysisPeriodOrHOY_, location, unit, False, False)
-                        
-                        indexList, listInfo = lb_preparation.separateList(selSkyMatrix, lb_preparation.strToBeFound)
-                        #separate total, diffuse and direct radiations
-                        separatedLists = []
-                        for i in range(len(indexList)-1):
-                            selList = []
-                            [selList.append(float(x)) for x in selSkyMatrix[indexList[i] + 7:indexList[i+1]]]
-                            separatedLists.append(selList)
-                        
-                        skyMatrix = separatedLists[0]
-                        
-                        radiationResult = []
-                        for ptCount in  intDict.keys():
-                            radValue = 0
-                            for patchCount in intDict[ptCount].keys():
-                                if intDict[ptCount][patchCount]['isIntersect']:
-                                    radValue = radValue + (skyMatrix[patchCount] * math.cos(intDict[ptCount][patchCount]['vecAngle']))
-                            radiationResult.append(radValue)
-                        
-                        personRad = radiationResult[:-1]
-                        groundRad = radiationResult[-1]
-                        totalPersonBeamDiffRad = sum([a*b for a,b in zip(personRad,personMeshAreas)])
-                        
-                        #Account for the transmissivity of glass.
-                        if (finalWinTransmiss[count]) != 1:
-                            groundRad = groundRad*(finalWinTransmiss[count])
-                            totalPersonBeamDiffRad = totalPersonBeamDiffRad*(finalWinTransmiss[count])
-                        
-                        #Calculate the additional radiation reflected to the person by the ground.
-                        groundRefRad = 0.5 * groundRad * fracEff * groundR
-                        
-                        #Calculate the total person radiation and the ERF.
-                        totalPersonRad = totalPersonBeamDiffRad + groundRefRad
-                        radiantFlux = totalPersonRad/totalPersonArea
-                        hourERF = (radiantFlux * cloA)/0.95
-                        ERF[count+7] = hourERF/1000
-                        
-                        #Calculate the MRT delta, the solar adjusted MRT, and the solar adjusted operative temperature.
-                        mrtDelt = (hourERF/(fracEff*radTransCoeff))
-                        MRTDelta[count+7] = mrtDelt
-                        if baseTempType == False:
-                            hourMRT = mrtDelt + (radTemp[count])
-                        else:
-                            hourMRT = mrtDelt + (skyTemp[count]*(skyViewFac) + radTemp[count]*(1-(skyViewFac)))
-                        solarAdjustedMRT[count+7] = hourMRT
-                    else:
-                        ERF[count+7] = 0
-                        MRTDelta[count+7] = 0
-                        if baseTempType == False:
-                            hourMRT = radTemp[count]
-                        else:
-                            hourMRT = (skyTemp[count]*(skyViewFac) + radTemp[count]*(1-(skyViewFac)))
-                        solarAdjustedMRT[count+7] = hourMRT
-                
-                
-                tasks.Parallel.ForEach(range(len(HOYS)), radCalc)
-                
-                return True
+            #Collapse the intersection matrix into the patch weights of the whole person (weighted by the mesh face areas) and of the ground.
+            #Then multiply the hourly skies by both of them, a chunk of hours at a time so the user can cancel the process.
+            personWeights = intDict.combinedWeights(personMeshAreas + [0])
+            groundWeights = intDict.combinedWeights([0]*len(personMeshAreas) + [1])
+            totalPersonBeamDiffRads, groundRads = [], []
+            runSuccess = True
+            chunkSize = 730
+            for start in range(0, len(sunHours), chunkSize):
+                if gh.GH_Document.IsEscapeKeyDown():
+                    runSuccess = False
+                    break
+                chunkPersonRads, chunkGroundRads = cumSkyMtx.hourlyProducts([personWeights, groundWeights], [HOYS[count] for count in sunHours[start:start + chunkSize]], parallel)
+                totalPersonBeamDiffRads.extend(chunkPersonRads)
+                groundRads.extend(chunkGroundRads)
             
-            # Compute the radiation for each hour of the year.
-            runSuccess = False
-            if parallel == False:
-                runSuccess = nonParallelRadCalc()
-            else:
-                for count, hour in enumerate(HOYS):
-                    ERF.append(0)
-                    MRTDelta.append(0)
-                    solarAdjustedMRT.append(0)
-                runSuccess = parallelRadCalc()
+            if runSuccess == True:
+                hourERFs = [0] * len(HOYS)
+                for sunHourCount, count in enumerate(sunHours):
+                    #Account for the transmissivity of glass.
+                    groundRad = groundRads[sunHourCount]*(finalWinTransmiss[count])
+                    totalPersonBeamDiffRad = totalPersonBeamDiffRads[sunHourCount]*(finalWinTransmiss[count])
+                    
+                    #Calculate the additional radiation reflected to the person by the ground.
+                    groundRefRad = 0.5 * groundRad * fracEff * groundR
+                    
+                    #Calculate the total person radiation and the ERF.
+                    totalPersonRad = totalPersonBeamDiffRad + groundRefRad
+                    radiantFlux = totalPersonRad/totalPersonArea
+                    hourERFs[count] = (radiantFlux * cloA)/0.95
+                
+                #Calculate the MRT delta, the solar adjusted MRT, and the solar adjusted operative temperature for all hours.
+                if baseTempType == False:
+                    baseMRTs = radTemp
+                else:
+                    baseMRTs = [skyTemp[count]*(skyViewFac) + radTemp[count]*(1-(skyViewFac)) for count in range(len(HOYS))]
+                mrtDelts = [hourERF/(fracEff*radTransCoeff) for hourERF in hourERFs]
+                ERF.extend([hourERF/1000 for hourERF in hourERFs])
+                MRTDelta.extend(mrtDelts)
+                solarAdjustedMRT.extend([mrtDelt + baseMRT for mrtDelt, baseMRT in zip(mrtDelts, baseMRTs)])
             
             if runSuccess == True:
                 #If the user has requested to bake the results, then bake them.
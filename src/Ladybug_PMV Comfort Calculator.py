@@ -486,26 +486,57 @@ def main():
             standardEffectiveTemperature.extend([epwStr[0], epwStr[1], 'Standard Effective Temperature' + ' for ' + epwStr[2].split('for ')[-1], 'C', epwStr[4], runPeriod[0], runPeriod[1]])
             comfortableOrNot.extend([epwStr[0], epwStr[1], 'Comfortable Or Not' + ' for ' + epwStr[2].split('for ')[-1], 'Boolean', epwStr[4], runPeriod[0], runPeriod[1]])
         if checkData == True:
-            try:
-                for count in HOYS:
-                    # let the user cancel the process
-                    if gh.GH_Document.IsEscapeKeyDown(): assert False
-                    
-                    pmv, ppd, set, taAdj, coolingEffect = lb_comfortModels.comfPMVElevatedAirspeed(airTemp[count], radTemp[count], windSpeed[count], relHumid[count], metRate[count], cloLevel[count], exWork[count])
+            # repeated conditions are found over the whole period and only the unique ones are calculated,
+            # in chunks so the user can cancel the process between them
+            # errors of the comfort model are not caught here so they reach the user
+            hourInputs = zip([airTemp[count] for count in HOYS], [radTemp[count] for count in HOYS], [windSpeed[count] for count in HOYS], \
+                [relHumid[count] for count in HOYS], [metRate[count] for count in HOYS], [cloLevel[count] for count in HOYS], [exWork[count] for count in HOYS])
+            uniqueIndex = {}
+            uniqueInputs = []
+            for inputs in hourInputs:
+                if inputs not in uniqueIndex:
+                    uniqueIndex[inputs] = len(uniqueInputs)
+                    uniqueInputs.append(inputs)
+            
+            cancelled = False
+            chunkSize = 730
+            uniquePMVs, uniquePPDs, uniqueSETs = [], [], []
+            for start in range(0, len(uniqueInputs), chunkSize):
+                # let the user cancel the process
+                if gh.GH_Document.IsEscapeKeyDown():
+                    cancelled = True
+                    break
+                ta, tr, vel, rh, met, clo, wme = [list(column) for column in zip(*uniqueInputs[start:start + chunkSize])]
+                chunkPMVs, chunkPPDs, chunkSETs, _, _ = lb_comfortModels.comfPMVElevatedAirspeedArray(ta, tr, vel, rh, met, clo, wme, True)
+                uniquePMVs.extend(chunkPMVs); uniquePPDs.extend(chunkPPDs); uniqueSETs.extend(chunkSETs)
+            
+            if not cancelled:
+                failedHours = 0
+                for i, count in enumerate(HOYS):
+                    index = uniqueIndex[hourInputs[i]]
+                    pmv, ppd, set = uniquePMVs[index], uniquePPDs[index], uniqueSETs[index]
                     predictedMeanVote.append(pmv)
                     percentPeopleDissatisfied.append(ppd)
                     standardEffectiveTemperature.append(set)
-                    if humidRatioUp != 0.03 or humidRatioLow != 0.0:
+                    if ppd == None:
+                        # the PMV model didn't converge for the hour, which is not counted as comfortable
+                        failedHours += 1
+                        comfortableOrNot.append(0)
+                    elif humidRatioUp != 0.03 or humidRatioLow != 0.0:
                         HR, EN, vapPress, satPress = lb_comfortModels.calcHumidRatio(airTemp[count], relHumid[count], 101325)
                         if ppd < PPDComfortThresh and HR < humidRatioUp and HR > humidRatioLow: comfortableOrNot.append(1)
                         else: comfortableOrNot.append(0)
                     else:
                         if ppd < PPDComfortThresh: comfortableOrNot.append(1)
                         else: comfortableOrNot.append(0)
+                if failedHours != 0:
+                    warning = "The PMV model did not converge for " + str(failedHours) + " hours. Their PMV and PPD are None and they are not counted as comfortable."
+                    print warning
+                    ghenv.Component.AddRuntimeMessage(gh.GH_RuntimeMessageLevel.Warning, warning)
                 if epwData == True:
                     percentOfTimeComfortable = ((sum(comfortableOrNot[7:]))/calcLength)*100
                 else: percentOfTimeComfortable = ((sum(comfortableOrNot))/calcLength)*100
-            except:
+            else:
                 predictedMeanVote = []
                 percentPeopleDissatisfied = []
                 standardEffectiveTemperature = []
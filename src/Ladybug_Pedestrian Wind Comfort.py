@@ -154,6 +154,9 @@ import Grasshopper
 import System
 import Rhino
 import time
+import itertools
+import operator
+import heapq
 import math
 import re
 
@@ -389,6 +392,7 @@ def checkConditionalStatement(conditionalStatement, annualHourlyDataLists, annua
         return validConditionalStatement, weatherPerHourDataConditionalStatementSubLists, conditionalStatementForFinalPrint, printMsg
     elif conditionalStatement == None and len(annualHourlyDataLists) == 0:  # conditionalStatement_ not inputted, annualHourlyData_ not inputted
         conditionalStatement = "True"
+        statementToEvaluate = conditionalStatement
     else:  # conditionalStatement_ inputted, annualHourlyData_ not
         if annualHourlyDataLists == []:
             validConditionalStatement = False
@@ -397,6 +401,7 @@ def checkConditionalStatement(conditionalStatement, annualHourlyDataLists, annua
             return validConditionalStatement, weatherPerHourDataConditionalStatementSubLists, conditionalStatementForFinalPrint, printMsg
         else:  # both conditionalStatement_ and annualHourlyData_ inputted
             conditionalStatement = conditionalStatement.lower()
+            statementToEvaluate = conditionalStatement
             conditionalStatement = re.sub(r"\b([a-z])\b", r"\1[i]", conditionalStatement)
     
     annualHourlyDataListsNames = map(chr, range(97, 123))
@@ -423,15 +428,14 @@ def checkConditionalStatement(conditionalStatement, annualHourlyDataLists, annua
         printMsg = "The number of a,b,c... variables you supplied in \"conditionalStatement_\" is larger than the number of \"annualHourlyData_\" lists you inputted. Please make the numbers of these two equal or less."
         return validConditionalStatement, weatherPerHourDataConditionalStatementSubLists, conditionalStatementForFinalPrint, printMsg
     else:
-        for i in range(len(annualHourlyDataLists)):
-            exec("%s = %s" % (annualHourlyDataListsNames[i],annualHourlyDataLists[i]))
-        
         try:
+            # the statement is compiled once and evaluated for all the hours
+            conditionalStatementMask = sc.sticky["ladybug_ConditionalStatement"](statementToEvaluate).evaluate(annualHourlyDataLists, len(weatherPerHourDataSubLists[0]))
             weatherPerHourDataConditionalStatementSubLists = []
             for i in range(len(weatherPerHourDataSubLists)):
                 weatherPerHourDataConditionalStatementSubLists.append([])
             for i in range(len(weatherPerHourDataSubLists[0])):
-                exec("conditionalSt = %s" % conditionalStatement)
+                conditionalSt = conditionalStatementMask[i]
                 if addZero == True:  # add 0 if conditionalStatement == False
                     if conditionalSt:
                         for k in range(len(weatherPerHourDataConditionalStatementSubLists)):
@@ -477,17 +481,30 @@ def correctEpwWindDirection(cfdSimulationDirections, epwWindDirection):
     return closestEpwWindDirection
 
 
-def percentile(listOfValues, percent, key=lambda x:x):
-    # by Wai Yip Tung
+def highestWindSpeeds(descendingWindSpeedsPerCfdDirection, windFactorsPerPointL, count):
+    # merge the wind speeds of each cfd direction (sorted once for all points) multiplied by the point's windFactors
+    # only the "count" highest wind speeds are taken, in descending order
+    negatedWindSpeeds = []
+    for cfdDirIndex,descendingWindSpeeds in enumerate(descendingWindSpeedsPerCfdDirection):
+        windFactor = windFactorsPerPointL[cfdDirIndex]
+        if windFactor < 0: descendingWindSpeeds = descendingWindSpeeds[::-1]
+        negatedWindSpeeds.append(itertools.imap(operator.mul, descendingWindSpeeds, itertools.repeat(-windFactor)))
+    
+    return [-negatedWindSpeed for negatedWindSpeed in itertools.islice(heapq.merge(*negatedWindSpeeds), count)]
+
+
+def percentileOfHighest(highestValues, numberOfValues, percent):
+    # percentile of "numberOfValues" values of which only the highest ones are known (in descending order)
+    # based on percentile function by Wai Yip Tung
     # http://code.activestate.com/recipes/511478
     
-    k = (len(listOfValues)-1) * percent
+    k = (numberOfValues-1) * percent
     f = math.floor(k)
     c = math.ceil(k)
     if f == c:
-        return key(listOfValues[int(k)])
-    d0 = key(listOfValues[int(f)]) * (c-k)
-    d1 = key(listOfValues[int(c)]) * (k-f)
+        return highestValues[numberOfValues-1-int(k)]
+    d0 = highestValues[numberOfValues-1-int(f)] * (c-k)
+    d1 = highestValues[numberOfValues-1-int(c)] * (k-f)
     
     return d0+d1
 
@@ -540,67 +557,71 @@ def main(windSpeedData, windDirectionData, windFactorsPerPointLL, outputLocation
         cfdSimulationDirections_corrected_forWindDirectionData_corrected2.append(360+northCfdD)  # add 360, so that "windDirectionData" values closer to 360 will be corrected to 360, and then set to 0, if there are both 0 and 360 in "cfdSimulationDirections"
     
     
-    # correct the .epw windDirectionData for the inputted "north_"
-    windDirectionData_corrected = []
-    for epwWindDirection in windDirectionData:
-        correctedEpwWindDirection, northDegDummy, validNorthDummy, printMsgDummy = lb_photovoltaics.correctSrfAzimuthDforNorth(northD, epwWindDirection)
-        windDirectionData_corrected.append(correctedEpwWindDirection)
-    
-    
-    # correct (simplify) the .epw windDirectionData for the cfdSimulationDirections
-    windDirectionData_corrected2 = []  
-    for epwWindDirection2 in windDirectionData_corrected:
-        correctedEpwWindDirection2 = correctEpwWindDirection(cfdSimulationDirections_corrected_forWindDirectionData_corrected2, epwWindDirection2)
-        windDirectionData_corrected2.append(correctedEpwWindDirection2)
-    
-    
-    # correct epw windSpeed with windFactor for each point
-    windSpeedDataPerPointDataTree_corrected = Grasshopper.DataTree[object]()  # "locationWindSpeed" output
-    header = ["key:location/dataType/units/frequency/startsAt/endsAt", "%s" % locationName, "Location's wind speed", "m/s", "Hourly", analysisPeriod[0], analysisPeriod[1]]
-    
-    windSpeedDataPerPointLL_corrected = []
-    for pointIndex, windFactorsPerPointL in enumerate(windFactorsPerPointLL):  # iterrate through each point
-        windSpeedDataPerPoint_corrected = []
-        for hoy in HOYs:
-            hoyIndex = hoy - 1
+    # assign each hour to a cfd simulation direction. The .epw windDirectionData is corrected for the inputted "north_" and simplified for the cfdSimulationDirections only once per unique direction
+    cfdDirIndexPerEpwWindDirection = {}
+    hoyIndices = []
+    cfdDirIndices = []
+    for hoy in HOYs:
+        hoyIndex = hoy - 1
+        epwWindDirection = windDirectionData[hoyIndex]
+        if epwWindDirection not in cfdDirIndexPerEpwWindDirection:
+            correctedEpwWindDirection, northDegDummy, validNorthDummy, printMsgDummy = lb_photovoltaics.correctSrfAzimuthDforNorth(northD, epwWindDirection)
+            correctedEpwWindDirection2 = correctEpwWindDirection(cfdSimulationDirections_corrected_forWindDirectionData_corrected2, correctedEpwWindDirection)
+            cfdDirIndexPerEpwWindDirection[epwWindDirection] = -1  # hours without a matching cfd direction are skipped
             for cfdDirIndex,correctedCfdWindDirection in enumerate(cfdSimulationDirections_corrected):
-                correctedEpwWindDirection2 = windDirectionData_corrected2[hoyIndex]
                 if (correctedEpwWindDirection2 == correctedCfdWindDirection):
-                    correctedEpwWindSpeed = windSpeedData[hoyIndex] * windFactorsPerPointL[cfdDirIndex]  # "locationWindSpeed" output hourly value
-                    windSpeedDataPerPoint_corrected.append(correctedEpwWindSpeed)
+                    cfdDirIndexPerEpwWindDirection[epwWindDirection] = cfdDirIndex
                     break
-        windSpeedDataPerPointLL_corrected.append(windSpeedDataPerPoint_corrected)
-        if outputLocationWindSpeed:
-            path = Grasshopper.Kernel.Data.GH_Path(pointIndex)
-            windSpeedDataPerPointDataTree_corrected.AddRange(header + windSpeedDataPerPoint_corrected, path)
-    
+        cfdDirIndex = cfdDirIndexPerEpwWindDirection[epwWindDirection]
+        if cfdDirIndex != -1:
+            hoyIndices.append(hoyIndex)
+            cfdDirIndices.append(cfdDirIndex)
+    numberOfHours = len(hoyIndices)
+    
+    # epw wind speeds of each cfd direction sorted from the highest, shared by all points
+    descendingWindSpeedsPerCfdDirection = [[] for cfdWindDirection in cfdSimulationDirections_corrected]
+    for i in xrange(numberOfHours):
+        descendingWindSpeedsPerCfdDirection[cfdDirIndices[i]].append(windSpeedData[hoyIndices[i]])
+    for descendingWindSpeeds in descendingWindSpeedsPerCfdDirection:
+        descendingWindSpeeds.sort(reverse=True)
+    numberOfHighestWindSpeeds = numberOfHours - int(math.floor((numberOfHours-1) * 0.95))  # needed for the 95 percentile
+    
+    
+    # correct epw windSpeed with windFactor for each point and apply Lawson's comfort and safety assessment criteria (1990)
+    windSpeedDataPerPointDataTree_corrected = Grasshopper.DataTree[object]()  # "locationWindSpeed" output
+    header = ["key:location/dataType/units/frequency/startsAt/endsAt", "%s" % locationName, "Location's wind speed", "m/s", "Hourly", analysisPeriod[0], analysisPeriod[1]]
     
-    # Lawson's comfort and safety assessment criteria (1990)
     pedestrianComfortCategoryInt_forAllPoints = []
     pedestrianComfortCategoryFloat_forAllPoints = []
     pedestrianSafetyInt_forAllPoints = []
     pedestrianSafetyFloat_forAllPoints = []
     windSpeed95percentPerYear_forAllPoints = []
     strongestLocationWindSpeed_forAllPoints = []
-    for windSpeedDataPerPoint_corrected in windSpeedDataPerPointLL_corrected:
+    for pointIndex, windFactorsPerPointL in enumerate(windFactorsPerPointLL):  # iterrate through each point
+        if outputLocationWindSpeed:
+            windSpeedDataPerPoint_corrected = [windSpeedData[hoyIndices[i]] * windFactorsPerPointL[cfdDirIndices[i]] for i in xrange(numberOfHours)]  # "locationWindSpeed" output hourly values
+            path = Grasshopper.Kernel.Data.GH_Path(pointIndex)
+            windSpeedDataPerPointDataTree_corrected.AddRange(header + windSpeedDataPerPoint_corrected, path)
+        
         # pedestrian comfort
-        windSpeedDataPerPoint_corrected.sort()
-        windSpeed95percentPerYear = percentile(windSpeedDataPerPoint_corrected, 0.95)  # "windSpeed95percentPerYear" is threshold wind speed for particular point, in m/s
+        highestWindSpeedsPerPoint = highestWindSpeeds(descendingWindSpeedsPerCfdDirection, windFactorsPerPointL, numberOfHighestWindSpeeds)
+        windSpeed95percentPerYear = percentileOfHighest(highestWindSpeedsPerPoint, numberOfHours, 0.95)  # "windSpeed95percentPerYear" is threshold wind speed for particular point, in m/s
         pedestrianComfortCategoryInt_perPoint, pedestrianComfortCategoryFloat_perPoint = choosePedestrianComfortCategory(windSpeed95percentPerYear)
         windSpeed95percentPerYear_forAllPoints.append(windSpeed95percentPerYear)
         pedestrianComfortCategoryInt_forAllPoints.append(pedestrianComfortCategoryInt_perPoint)
         pedestrianComfortCategoryFloat_forAllPoints.append(pedestrianComfortCategoryFloat_perPoint)
         
         # pedestrian safety
-        if (windSpeedDataPerPoint_corrected[-1] > pedestrianSafetyThreshold):  # check if pedestrianSafetyThreshold wind speed appeared at least 0.011% during the chosen analysis period
+        strongestLocationWindSpeed = highestWindSpeedsPerPoint[0]
+        if (strongestLocationWindSpeed > pedestrianSafetyThreshold):  # check if pedestrianSafetyThreshold wind speed appeared at least 0.011% during the chosen analysis period
             pedestrianSafetyInt_perPoint = 0  # False
             pedestrianSafetyFloat_perPoint = 0.0  # False
         else:
             pedestrianSafetyInt_perPoint = 1  # True
-            pedestrianSafetyFloat_perPoint = 1-(windSpeedDataPerPoint_corrected[-1]/pedestrianSafetyThreshold)  # True
+            pedestrianSafetyFloat_perPoint = 1-(strongestLocationWindSpeed/pedestrianSafetyThreshold)  # True
         pedestrianSafetyInt_forAllPoints.append(pedestrianSafetyInt_perPoint)
         pedestrianSafetyFloat_forAllPoints.append(pedestrianSafetyFloat_perPoint)
-        strongestLocationWindSpeed_forAllPoints.append(windSpeedDataPerPoint_corrected[-1])
+        strongestLocationWindSpeed_forAllPoints.append(strongestLocationWindSpeed)
     
     if resultGradient == True:
         pedestrianComfortCategory_forAllPoints = pedestrianComfortCategoryFloat_forAllPoints
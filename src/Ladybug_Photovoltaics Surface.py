@@ -300,6 +300,7 @@ def checkConditionalStatement(conditionalStatement, annualHourlyDataLists, annua
         return validConditionalStatement, weatherPerHourDataConditionalStatementSubLists, conditionalStatementForFinalPrint, printMsg
     elif conditionalStatement == None and len(annualHourlyDataLists) == 0:  # conditionalStatement_ not inputted, annualHourlyData_ not inputted
         conditionalStatement = "True"
+        statementToEvaluate = conditionalStatement
     else:  # conditionalStatement_ inputted, annualHourlyData_ not
         if annualHourlyDataLists == []:
             validConditionalStatement = False
@@ -308,6 +309,7 @@ def checkConditionalStatement(conditionalStatement, annualHourlyDataLists, annua
             return validConditionalStatement, weatherPerHourDataConditionalStatementSubLists, conditionalStatementForFinalPrint, printMsg
         else:  # both conditionalStatement_ and annualHourlyData_ inputted
             conditionalStatement = conditionalStatement.lower()
+            statementToEvaluate = conditionalStatement
             conditionalStatement = re.sub(r"\b([a-z])\b", r"\1[i]", conditionalStatement)
     
     annualHourlyDataListsNames = map(chr, range(97, 123))
@@ -334,15 +336,14 @@ def checkConditionalStatement(conditionalStatement, annualHourlyDataLists, annua
         printMsg = "The number of a,b,c... variables you supplied in \"conditionalStatement_\" is larger than the number of \"annualHourlyData_\" lists you inputted. Please make the numbers of these two equal or less."
         return validConditionalStatement, weatherPerHourDataConditionalStatementSubLists, conditionalStatementForFinalPrint, printMsg
     else:
-        for i in range(len(annualHourlyDataLists)):
-            exec("%s = %s" % (annualHourlyDataListsNames[i],annualHourlyDataLists[i]))
-        
         try:
+            # the statement is compiled once and evaluated for all the hours
+            conditionalStatementMask = sc.sticky["ladybug_ConditionalStatement"](statementToEvaluate).evaluate(annualHourlyDataLists, len(weatherPerHourDataSubLists[0]))
             weatherPerHourDataConditionalStatementSubLists = []
             for i in range(len(weatherPerHourDataSubLists)):
                 weatherPerHourDataConditionalStatementSubLists.append([])
             for i in range(len(weatherPerHourDataSubLists[0])):
-                exec("conditionalSt = %s" % conditionalStatement)
+                conditionalSt = conditionalStatementMask[i]
                 if addZero == True:  # add 0 if conditionalStatement == False
                     if conditionalSt:
                         for k in range(len(weatherPerHourDataConditionalStatementSubLists)):
@@ -378,25 +379,18 @@ def main(latitude, longitude, timeZone, locationName, years, months, days, hours
     totalRadiationPerHour = ["key:location/dataType/units/frequency/startsAt/endsAt", locationName, "Total POA irradiance", "kWh/m2", "Hourly", (1, 1, 1), (12, 31, 24)]
     moduleTemperaturePerHour = ["key:location/dataType/units/frequency/startsAt/endsAt", locationName, "Module temperature", "C", "Hourly", (1, 1, 1), (12, 31, 24)]
     cellTemperaturePerHour = ["key:location/dataType/units/frequency/startsAt/endsAt", locationName, "Cell temperature", "C", "Hourly", (1, 1, 1), (12, 31, 24)]
-    beamRadiationPerHour = []
-    diffuseRadiationPerHour = []
-    groundRadiationPerHour = []
-    AOI_RL = []
     
-    for i,hoy in enumerate(HOYs):
-        sunZenithD, sunAzimuthD, sunAltitudeD = lb_photovoltaics.NRELsunPosition(latitude, longitude, timeZone, years[i], months[i], days[i], hours[i]-1)
-        Epoa, Eb, Ed_sky, Eground, AOI_R = lb_photovoltaics.POAirradiance(sunZenithD, sunAzimuthD, srfTiltD, srfAzimuthD, directNormalRadiation[i], diffuseHorizontalRadiation[i], albedoL[i])
-        Tm, Tcell, Pdc_, Pac = lb_photovoltaics.pvwatts(nameplateDCpowerRating, DCtoACderateFactor, AOI_R, Epoa, Eb, Ed_sky, Eground, moduleType, temperatureCoefficientFraction, dryBulbTemperature[i], windSpeed[i], directNormalRadiation[i], diffuseHorizontalRadiation[i])
-        Epoa = Epoa/1000 # to kWh/m2
-        ACenergyPerHour.append(Pac)
-        DCenergyPerHour.append(Pdc_)
-        totalRadiationPerHour.append(Epoa)
-        moduleTemperaturePerHour.append(Tm)
-        cellTemperaturePerHour.append(Tcell)
-        beamRadiationPerHour.append(Eb)
-        diffuseRadiationPerHour.append(Ed_sky)
-        groundRadiationPerHour.append(Eground)
-        AOI_RL.append(AOI_R)
+    # sun positions for all the hours
+    sunZenithDL, sunAzimuthDL, sunAltitudeDL = sc.sticky["ladybug_SolarEphemeris"](latitude, longitude, timeZone, "NREL").positions(years, months, days, [hour-1 for hour in hours])
+    irradianceSeries = lb_photovoltaics.POAirradianceSeries(sunZenithDL, sunAzimuthDL, [srfTiltD], [srfAzimuthD], directNormalRadiation, diffuseHorizontalRadiation, albedoL)
+    TmL, TcellL, Pdc_L, PacL = lb_photovoltaics.pvwattsSeries([nameplateDCpowerRating], DCtoACderateFactor, irradianceSeries, moduleType, temperatureCoefficientFraction, dryBulbTemperature, windSpeed, directNormalRadiation, diffuseHorizontalRadiation)[0]
+    EpoaL, beamRadiationPerHour, diffuseRadiationPerHour, groundRadiationPerHour, AOI_RL = [list(series) for series in irradianceSeries[0]]
+    
+    ACenergyPerHour.extend(PacL)
+    DCenergyPerHour.extend(Pdc_L)
+    totalRadiationPerHour.extend([Epoa/1000 for Epoa in EpoaL])  # to kWh/m2
+    moduleTemperaturePerHour.extend(TmL)
+    cellTemperaturePerHour.extend(TcellL)
     
     ACenergyPerYear = sum(ACenergyPerHour[7:])  # in kWh
     averageDailyACenergyPerYear = ACenergyPerYear/365  # in kWh/day
@@ -538,7 +538,6 @@ def checkConditionalStatement(annualHourlyData, conditionalStatement):
         
         # replace the right list in the conditional statement
         statement = conditionalStatement.split(' ')
-        finalStatement = 'pattern = '
         titleStatement = '...                         ...                         ...\n' +\
                          'Conditional Selection Applied:\n'
         
@@ -546,24 +545,18 @@ def checkConditionalStatement(annualHourlyData, conditionalStatement):
             statementCopy = str.Copy(statemntPart)
             if statemntPart!='and' and statemntPart!='or':
                 for num in listNum:
-                    toBeReplacedWith = 'selList[this][HOY]'.replace('this', `num`)
                     titleToBeReplacedWith = listInfo[num][2]
-                    statemntPart = statemntPart.replace(letters[num], toBeReplacedWith, 20000)
                     statementCopy = statementCopy.replace(letters[num], titleToBeReplacedWith, 20000)
                     if statementCopy.find(letters[num])!=-1: break
                     
                 titleStatement = titleStatement + ' ' + statementCopy
             else:
                 titleStatement = titleStatement + '\n' + statementCopy 
-            finalStatement = finalStatement + ' ' + statemntPart
         print titleStatement
         
         # check for the pattern
-        patternList = []
         try:
-            for HOY in range(8760):
-                exec(finalStatement)
-                patternList.append(pattern)
+            patternList = sc.sticky["ladybug_ConditionalStatement"](conditionalStatement).evaluate(selList, 8760)
         except Exception,e:
             warning = 'There is an error in the conditional statement:\n' + `e`
             print warning
@@ -900,27 +893,11 @@ def colorMesh(airTemp, relHumid, barPress, lb_preparation, lb_comfortModels, lb_
             HR[count] = num*scaleFactor
         humidRatioMesh.append(HR)
     
-    #Make the mesh faces.
-    chartMesh = rc.Geometry.Mesh()
-    meshFacePts = []
-    
-    for listCount, humilist in enumerate(humidRatioMesh[:-1]):
-        for tempCount, temp in enumerate(tempNumMesh[:-1]):
-            facePt1 = rc.Geometry.Point3d(temp, humilist[tempCount], 0)
-            facePt2 = rc.Geometry.Point3d(temp, humidRatioMesh[listCount+1][tempCount], 0)
-            facePt3 = rc.Geometry.Point3d(tempNumMesh[tempCount+1], humidRatioMesh[listCount+1][tempCount+1], 0)
-            facePt4 = rc.Geometry.Point3d(tempNumMesh[tempCount+1], humilist[tempCount+1], 0)
-            
-            meshFacePts.append([facePt1, facePt2, facePt3, facePt4])
-    
-    for ptlist in  meshFacePts:
-        mesh = rc.Geometry.Mesh()
-        for point in ptlist:
-            mesh.Vertices.Add(point)
-        
-        mesh.Faces.AddFace(0, 1, 2, 3)
-        chartMesh.Append(mesh)
-    uncoloredMesh = chartMesh
+    #Make the chart points at the corners of the mesh faces.
+    lb_chartHistogram = sc.sticky["ladybug_ChartHistogram"](tempNumMesh, relHumidNumMesh, False, True)
+    gridPoints = []
+    for listCount, humilist in enumerate(humidRatioMesh):
+        gridPoints.append([rc.Geometry.Point3d(temp, humilist[tempCount], 0) for tempCount, temp in enumerate(tempNumMesh)])
     
     #Calculate the humidity ratio for each of the hours of the year and use this to make points for the chart.
     HR, EN, vapPress, satPress = lb_comfortModels.calcHumidRatio(airTemp, relHumid, barPress)
@@ -929,80 +906,18 @@ def colorMesh(airTemp, relHumid, barPress, lb_preparation, lb_comfortModels, lb_
         if IPTrigger: hourPts.append(rc.Geometry.Point3d(farenheitVals[count], ratio*scaleFactor, 0))
         else: hourPts.append(rc.Geometry.Point3d(airTemp[count], ratio*scaleFactor, 0))
     
-    #Make a list to hold values for all of the mesh faces.
-    meshFrequency = []
-    for count, value in enumerate(range(0, 100, 5)):
-        meshFrequency.append([])
-        if IPTrigger:
-            for face in range(72): meshFrequency[count].append([])
-        else:
-            for face in range(-20, 50, 1): meshFrequency[count].append([])
-    
-    #Bin the input humidity and temperatures into categories that correspond to the mesh faces.
-    def getTempIndex(hour):
-        if airTemp[hour] > -20 and airTemp[hour] < 50:
-            index  = int(round(airTemp[hour] +19.5))
-        else: index = -1
-        return index
-    
-    def getTempIndexIP(hour):
-        if farenheitVals[hour] > -5 and farenheitVals[hour] < 115:
-            index  = int((farenheitVals[hour] +4.5)*(3/5))
-        else: index = -1
-        return index
-    
-    for hour, humid in enumerate(relHumid):
-        if IPTrigger: tempIndex = getTempIndexIP(hour)
-        else: tempIndex = getTempIndex(hour)
-        if tempIndex != -1:
-            if humid < 5: meshFrequency[0][tempIndex].append(1)
-            elif humid < 10: meshFrequency[1][tempIndex].append(1)
-            elif humid < 15:meshFrequency[2][tempIndex].append(1)
-            elif humid < 20:meshFrequency[3][tempIndex].append(1)
-            elif humid < 25:meshFrequency[4][tempIndex].append(1)
-            elif humid < 30:meshFrequency[5][tempIndex].append(1)
-            elif humid < 35:meshFrequency[6][tempIndex].append(1)
-            elif humid < 40:meshFrequency[7][tempIndex].append(1)
-            elif humid < 45:meshFrequency[8][tempIndex].append(1)
-            elif humid < 50:meshFrequency[9][tempIndex].append(1)
-            elif humid < 55:meshFrequency[10][tempIndex].append(1)
-            elif humid < 60:meshFrequency[11][tempIndex].append(1)
-            elif humid < 65:meshFrequency[12][tempIndex].append(1)
-            elif humid < 70:meshFrequency[13][tempIndex].append(1)
-            elif humid < 75:meshFrequency[14][tempIndex].append(1)
-            elif humid < 80:meshFrequency[15][tempIndex].append(1)
-            elif humid < 85:meshFrequency[16][tempIndex].append(1)
-            elif humid < 90:meshFrequency[17][tempIndex].append(1)
-            elif humid < 95:meshFrequency[18][tempIndex].append(1)
-            else: meshFrequency[19][tempIndex].append(1)
-    
-    #Sum all of the lists together to get the frequency.
-    finalMeshFrequency = []
-    for humidlist in meshFrequency:
-        for templist in humidlist:
-            finalMeshFrequency.append(sum(templist))
+    #Bin the input temperatures and humidity into the mesh faces and get the frequency.
+    #Hours outside the edges of the mesh are not counted in any face (in IP they used to be counted in an edge bin).
+    if IPTrigger: faceIndices = lb_chartHistogram.faceIndices(farenheitVals, relHumid)
+    else: faceIndices = lb_chartHistogram.faceIndices(airTemp, relHumid)
+    finalMeshFrequency = lb_chartHistogram.frequency(faceIndices)
     
     #Get a list of colors
     colors = lb_visualization.gradientColor(finalMeshFrequency, lowB, highB, customColors)
     
-    # color the mesh faces.
-    uncoloredMesh.VertexColors.CreateMonotoneMesh(System.Drawing.Color.Gray)
-    
-    for srfNum in range (uncoloredMesh.Faces.Count):
-        uncoloredMesh.VertexColors[4 * srfNum + 0] = colors[srfNum]
-        uncoloredMesh.VertexColors[4 * srfNum + 1] = colors[srfNum]
-        uncoloredMesh.VertexColors[4 * srfNum + 3] = colors[srfNum]
-        uncoloredMesh.VertexColors[4 * srfNum + 2] = colors[srfNum]
-    
-    # Remove the mesh faces that do not have any hour associated with them.
-    cullFaceIndices = []
-    for count, freq in enumerate(finalMeshFrequency):
-        if freq == 0:
-            cullFaceIndices.append(count)
-    uncoloredMesh.Faces.DeleteFaces(cullFaceIndices)
-    
-    #Flip the mesh to be sure that it always displays correctly.
-    uncoloredMesh.Flip(True, True, True)
+    # Make the colored mesh from the faces that have hours associated with them.
+    meshFaces = [count for count, freq in enumerate(finalMeshFrequency) if freq != 0]
+    uncoloredMesh = lb_chartHistogram.chartMesh(gridPoints, colors, meshFaces)
     
     #Return everything that's useful.
     return hourPts, uncoloredMesh, finalMeshFrequency
@@ -50,7 +50,7 @@ Provided by Ladybug 0.0.63
             0 (or False) - No geometry will be baked into the Rhino scene (this is the default).
             1 (or True) - The geometry will be baked into the Rhino scene as a colored hatch and Rhino text objects, which facilitates easy export to PDF or vector-editing programs. 
             2 - The geometry will be baked into the Rhino scene as colored meshes, which is useful for recording the results of paramteric runs as light Rhino geometry.
-        workingDir_: Use this input to change the working directory of the radiation analysis on your system. Input here must be a valid file path location on your computer.  The default is set to "C:\Ladybug" and it is from this file location that radiation results are loaded into grasshopper after the analysis is done.
+        workingDir_: Use this input to change the working directory of the radiation analysis on your system. Input here must be a valid file path location on your computer.  The default is set to "C:\Ladybug" and it is from this file location that radiation results are loaded into grasshopper after the analysis is done.  If connected, the BVH of the context geometry is also saved to this folder so that it can be re-used in the next runs.
         projectName_: Use this input to change the project name of the files generated in the working directory.  Input here must be a string without special characters.  If "bakeIt_" is set to "True", the result will be baked into a layer with this project name.
     Returns:
         readMe!: ...
@@ -111,6 +111,7 @@ def main(north, geometry, context, gridSize, disFromBase, orientationStudyP, cum
         lb_preparation = sc.sticky["ladybug_Preparation"]()
         lb_mesh = sc.sticky["ladybug_Mesh"]()
         lb_runStudy_GH = sc.sticky["ladybug_RunAnalysis"]()
+        lb_occlusion = sc.sticky["ladybug_OcclusionEngine"]
         #lb_runStudy_RAD = sc.sticky["ladybug_Export2Radiance"]()
         lb_visualization = sc.sticky["ladybug_ResultVisualization"]()
         
@@ -197,12 +198,17 @@ def main(north, geometry, context, gridSize, disFromBase, orientationStudyP, cum
             joinedAnalysisMesh = lb_mesh.joinMesh(analysisSrfs)
             if contextSrfs: joinedContext = lb_mesh.joinMesh(contextSrfs)
             else: joinedContext = None
+            
+            # cast all the rays against one BVH of the geometry and the context
+            # BVH of the context is cached since it usually doesn't change between the runs
+            contextBVH = sc.sticky["ladybug_BVHCache"].get(joinedContext, workingDir)
+            occlusionEngine = lb_occlusion([joinedAnalysisMesh, contextBVH])
             if len(cumSky_radiationStudy) == 145:
                 radResults, totalRadResults, intersectionMtx = lb_runStudy_GH.parallel_radCalculator(testPoints, ptsNormals, meshSrfAreas, joinedAnalysisMesh, joinedContext,
-                                        parallel, cumSky_radiationStudy, lb_preparation.TregenzaPatchesNormalVectors, conversionFac, 2200000000000000, northVector)
+                                        parallel, cumSky_radiationStudy, lb_preparation.TregenzaPatchesNormalVectors, conversionFac, 2200000000000000, northVector, occlusionEngine)
             elif len(cumSky_radiationStudy) == 577:
                 radResults, totalRadResults, intersectionMtx = lb_runStudy_GH.parallel_radCalculator(testPoints, ptsNormals, meshSrfAreas, joinedAnalysisMesh, joinedContext,
-                                        parallel, cumSky_radiationStudy, lb_preparation.getReinhartPatchesNormalVectors(), conversionFac, 2200000000000000, northVector)
+                                        parallel, cumSky_radiationStudy, lb_preparation.getReinhartPatchesNormalVectors(), conversionFac, 2200000000000000, northVector, occlusionEngine)
                                         
         else:
             print "selectedSkyMtx failed to collect data! Use selectSkyMtx component to generate the selectedSkyMtx."
@@ -76,6 +76,10 @@ def main(intDict, selSkyMatrix):
     
     skyMatrix = separatedLists[0]
     
+    # new intersection matrices carry the patch weights so the results are
+    # calculated with a single matrix-vector product
+    if hasattr(intDict, 'multiply'): return intDict.multiply(skyMatrix)
+    
     radiationResult = []
     for ptCount in  intDict.keys():
         radValue = 0
@@ -162,6 +162,8 @@ import rhinoscriptsyntax as rs
 import scriptcontext as sc
 import Rhino
 import math
+import System
+import System.Threading.Tasks as tasks
 
 
 def SWHinputData(SWHsurface, SWHsurfacePercent, SWHsystemSettings, collectorLifetime, tankLifetime, heatingLoadPerHour, heatFromTankPerHour, heatFromAuxiliaryHeaterPerHour, pumpEnergyPerHour, energyCostPerKWh, collectorEmbodiedEnergyPerMJ_M2, tankEmbodiedEnergyPerMJ_L, collectorEmbodiedCO2PerKg_M2, tankEmbodiedCO2PerKg_L):
@@ -353,47 +355,71 @@ def SWHinputData(SWHsurface, SWHsurfacePercent, SWHsystemSettings, collectorLife
 
 
 def optimizeCollectorTank(step, embodiedEnergyAnnualized_kWh_m2, srfTiltD, AOI_RL, heatingLoadPerHour, beamRadiationPerHour, diffuseRadiationPerHour, groundRadiationPerHour, dryBulbTemperature, coldWaterTemperaturePerHour, Fr, FrUL, dummycollectorActiveAreaPercent, Cp, mDot, bo, TmaxW, TdischargeW, TdeliveryW, TcoldJanuaryW, TmechRoomL, L, Di, insulT, pipeInsulationConductivity, pumpPower, pumpEfficiency, tankLoss, heightDiameterTankRatio, epsilon, activeArea=None, tankSizeM3=None):
-    
-    activeAreaL = [0]
-    tankSizeM3L = [0]
-    heatFromTankPerYearL = [0]
-    marginalEnergySavingCostsL = [0]
-    for k in range(1,1000,1):
-        heatFromTankPerHour2 = [0]
-        tankWaterTemperaturePerHour2 = [TcoldJanuaryW]
-        for i in range(1,8760):
-            if activeArea == None:
-                activeArea2 = k*step
-            else:
-                activeArea2 = activeArea
-            if tankSizeM3 == None:
-                tankSizeM3_2 = k*step
-            else:
-                tankSizeM3_2 = tankSizeM3
-            tankArea2 = 2 * (((tankSizeM3_2**2)*math.pi*2*heightDiameterTankRatio) ** (1/3)) * (1+1/(2*heightDiameterTankRatio))
-            collectorHeatLoss, collectorEfficiency, Qsolar, Qloss, Qsupply, Qaux, Qdis, Qpump, dQ, dt, Tw = lb_photovoltaics.swhdesign(activeArea2, srfTiltD, AOI_RL[i-1], bo, Fr, FrUL, beamRadiationPerHour[i], diffuseRadiationPerHour[i], groundRadiationPerHour[i], heatingLoadPerHour[i], Cp, mDot, dryBulbTemperature[i], coldWaterTemperaturePerHour[i], tankWaterTemperaturePerHour2[i-1], TdeliveryW, TmaxW, TdischargeW, TmechRoomL[i], L, Di, insulT, pipeInsulationConductivity, pumpPower, pumpEfficiency, tankSizeM3_2, tankArea2, tankLoss, epsilon)
-            heatFromTankPerHour2.append(Qsupply)
-            tankWaterTemperaturePerHour2.append(Tw)
-        activeAreaL.append(activeArea2)
-        tankSizeM3L.append(tankSizeM3_2)
-        heatFromTankPerYear = sum(heatFromTankPerHour2)
-        heatFromTankPerYearL.append(heatFromTankPerYear)
-        if activeArea == None:
-            marginalEnergySavingCosts = (heatFromTankPerYearL[k]-heatFromTankPerYearL[k-1])/(activeAreaL[k]-activeAreaL[k-1])
-        if tankSizeM3 == None: 
-            marginalEnergySavingCosts = (heatFromTankPerYearL[k]-heatFromTankPerYearL[k-1])/(tankSizeM3L[k]-tankSizeM3L[k-1])
-        marginalEnergySavingCostsL.append(marginalEnergySavingCosts)
-        if (marginalEnergySavingCosts < embodiedEnergyAnnualized_kWh_m2):
-            marginalEnergySavingCostsLplusIndices = [(mesc,i) for i,mesc in enumerate(marginalEnergySavingCostsL[1:])]
-            marginalEnergySavingCostsLplusIndices.sort()
-            lowestIndex = marginalEnergySavingCostsLplusIndices[0][1]
-            
-            if activeArea == None:
-                return activeAreaL[lowestIndex], "tankSizeM3Dummy"
-            if tankSizeM3 == None: 
-                return activeAreaL[lowestIndex], tankSizeM3L[lowestIndex]
-    else:
-        return None, None
+    # candidate k has the size of k*step (collector area if activeArea is None, otherwise tank volume).
+    # the marginal saving of each step decreases as the system grows, so instead of simulating the candidates one by one
+    # the first step with a marginal saving lower than the annualized embodied energy is bracketed
+    # with doubling candidate sizes and then narrowed down. each round simulates a batch of candidates together.
+    maxK = 999
+    probeCount = max(4, System.Environment.ProcessorCount)
+    doublingK = 1
+    heatFromTankPerYearD = {0: 0}
+    
+    def candidateSize(k):
+        if k == 0: return 0
+        return k*step
+    
+    def simulate(ks):
+        ks = [k for k in sorted(set(ks)) if k not in heatFromTankPerYearD]
+        if len(ks) == 0: return
+        activeAreas = []; tankSizes = []; tankAreas = []
+        for k in ks:
+            activeArea2 = candidateSize(k) if activeArea == None else activeArea
+            tankSizeM3_2 = candidateSize(k) if tankSizeM3 == None else tankSizeM3
+            activeAreas.append(activeArea2)
+            tankSizes.append(tankSizeM3_2)
+            tankAreas.append(2 * (((tankSizeM3_2**2)*math.pi*2*heightDiameterTankRatio) ** (1/3)) * (1+1/(2*heightDiameterTankRatio)))
+        
+        # split the candidates between the cores
+        chunkSize = int(math.ceil(len(ks) / float(System.Environment.ProcessorCount))) or 1
+        chunks = [range(i, min(i + chunkSize, len(ks))) for i in range(0, len(ks), chunkSize)]
+        results = [None] * len(chunks)
+        def chunkSimulation(chunkCount):
+            c = chunks[chunkCount]
+            results[chunkCount] = lb_photovoltaics.swhAnnualHeatFromTank([activeAreas[j] for j in c], [tankSizes[j] for j in c], [tankAreas[j] for j in c], srfTiltD, AOI_RL[:8759], bo, Fr, FrUL, beamRadiationPerHour[1:8760], diffuseRadiationPerHour[1:8760], groundRadiationPerHour[1:8760], heatingLoadPerHour[1:8760], Cp, mDot, dryBulbTemperature[1:8760], coldWaterTemperaturePerHour[1:8760], TcoldJanuaryW, TdeliveryW, TmaxW, TdischargeW, TmechRoomL[1:8760], L, Di, insulT, pipeInsulationConductivity, pumpPower, pumpEfficiency, tankLoss, epsilon)
+        tasks.Parallel.ForEach(range(len(chunks)), chunkSimulation)
+        for chunkCount, c in enumerate(chunks):
+            for j, heatFromTankPerYear in zip(c, results[chunkCount]):
+                heatFromTankPerYearD[ks[j]] = heatFromTankPerYear
+    
+    def marginalEnergySavingCosts(k):
+        return (heatFromTankPerYearD[k]-heatFromTankPerYearD[k-1])/(candidateSize(k)-candidateSize(k-1))
+    
+    # lowK is the last candidate known to save more than its embodied energy and highK the first one known to save less
+    lowK = 0
+    highK = None
+    while highK == None or highK - lowK > 1:
+        if highK == None:
+            if doublingK > maxK: return None, None
+            probes = []
+            while doublingK <= maxK and len(probes) < probeCount:
+                probes.append(doublingK)
+                doublingK *= 2
+            if doublingK > maxK: probes.append(maxK)
+        else: probes = range(lowK+1, highK, max(1, int(math.ceil((highK - lowK - 1) / float(probeCount)))))
+        probes = sorted(set(probes))
+        simulate(probes + [k-1 for k in probes])
+        for k in probes:
+            if marginalEnergySavingCosts(k) < embodiedEnergyAnnualized_kWh_m2:
+                highK = k
+                break
+            lowK = k
+    
+    # the last candidate before the marginal saving drops below the embodied energy
+    optimalK = highK - 1
+    if activeArea == None:
+        return candidateSize(optimalK), "tankSizeM3Dummy"
+    if tankSizeM3 == None:
+        return (activeArea if optimalK > 0 else 0), candidateSize(optimalK)
 
 
 def main(SWHsurfacePercent, collectorActiveAreaPercent, collectorLifetime, tankLifetime, heatingLoadPerHourData, heatFromTankPerHourData, heatFromAuxiliaryHeaterPerHourData, pumpEnergyPerHourData, energyCostPerKWh, collectorEmbodiedEnergyPerGJ_M2, tankEmbodiedEnergyPerGJ_M3, collectorEmbodiedCO2PerT_M2, tankEmbodiedCO2PerT_L, locationName):
@@ -508,7 +534,7 @@ def main(SWHsurfacePercent, collectorActiveAreaPercent, collectorLifetime, tankL
             optimalSystemSize = (optimalActiveArea * Fr) - (FrUL * 30/1000)
             optimalTankSizeLiter = int(optimalTankSizeM3 * 1000)  # from m3 to liters
         else:
-            print "Optimal collector area and storage volume are larger than component's security boundaries. Increase the step of \"1\" in line 380 of the component's code. Example: Line 380 changed to: \"(1,1000,10)\", means step \"1\" increased to \"10\"."
+            print "Optimal collector area and storage volume are larger than component's security boundaries. Increase the \"maxK\" number of candidates in the \"optimizeCollectorTank\" function of the component's code."
             optimalSystemSize = optimalTankSizeLiter = None
     else:
         optimalSystemSize = optimalTankSizeLiter = None
@@ -484,6 +484,7 @@ def checkConditionalStatement(conditionalStatement, annualHourlyDataLists, annua
         return validConditionalStatement, weatherPerHourDataConditionalStatementSubLists, conditionalStatementForFinalPrint, printMsg
     elif conditionalStatement == None and len(annualHourlyDataLists) == 0:  # conditionalStatement_ not inputted, annualHourlyData_ not inputted
         conditionalStatement = "True"
+        statementToEvaluate = conditionalStatement
     else:  # conditionalStatement_ inputted, annualHourlyData_ not
         if annualHourlyDataLists == []:
             validConditionalStatement = False
@@ -492,6 +493,7 @@ def checkConditionalStatement(conditionalStatement, annualHourlyDataLists, annua
             return validConditionalStatement, weatherPerHourDataConditionalStatementSubLists, conditionalStatementForFinalPrint, printMsg
         else:  # both conditionalStatement_ and annualHourlyData_ inputted
             conditionalStatement = conditionalStatement.lower()
+            statementToEvaluate = conditionalStatement
             conditionalStatement = re.sub(r"\b([a-z])\b", r"\1[i]", conditionalStatement)
     
     annualHourlyDataListsNames = map(chr, range(97, 123))
@@ -518,15 +520,14 @@ def checkConditionalStatement(conditionalStatement, annualHourlyDataLists, annua
         printMsg = "The number of a,b,c... variables you supplied in \"conditionalStatement_\" is larger than the number of \"annualHourlyData_\" lists you inputted. Please make the numbers of these two equal or less."
         return validConditionalStatement, weatherPerHourDataConditionalStatementSubLists, conditionalStatementForFinalPrint, printMsg
     else:
-        for i in range(len(annualHourlyDataLists)):
-            exec("%s = %s" % (annualHourlyDataListsNames[i],annualHourlyDataLists[i]))
-        
         try:
+            # the statement is compiled once and evaluated for all the hours
+            conditionalStatementMask = sc.sticky["ladybug_ConditionalStatement"](statementToEvaluate).evaluate(annualHourlyDataLists, len(weatherPerHourDataSubLists[0]))
             weatherPerHourDataConditionalStatementSubLists = []
             for i in range(len(weatherPerHourDataSubLists)):
                 weatherPerHourDataConditionalStatementSubLists.append([])
             for i in range(len(weatherPerHourDataSubLists[0])):
-                exec("conditionalSt = %s" % conditionalStatement)
+                conditionalSt = conditionalStatementMask[i]
                 if addZero == True:  # add 0 if conditionalStatement == False
                     if conditionalSt:
                         for k in range(len(weatherPerHourDataConditionalStatementSubLists)):
@@ -558,11 +559,6 @@ def checkConditionalStatement(conditionalStatement, annualHourlyDataLists, annua
 def main(latitude, longitude, timeZone, locationName, years, months, days, hours, heatingLoadPerHour, coldWaterTemperaturePerHour, activeArea, srfTiltD, correctedSrfAzimuthD, dryBulbTemperature, directNormalRadiation, diffuseHorizontalRadiation, albedoL, SWHsystemSettings, conditionalStatementForFinalPrint):
     
     Fr, FrUL, dummycollectorActiveAreaPercent, Cp, mDot, bo, SVF, beamIndexPerHourData, TmaxW, TdischargeW, TdeliveryW, TcoldJanuaryW, TmechRoomL, L, Di, insulT, pipeInsulationConductivity, pumpPower, pumpEfficiency, tankSizeM3, tankLoss, heightDiameterTankRatio, epsilon = SWHsystemSettings
-    heatFromTankPerHour = [0]
-    heatFromAuxiliaryHeaterPerHour = [0]
-    dischargedHeatPerHour = [0]
-    pumpEnergyPerHour = [0]
-    tankWaterTemperaturePerHour = [TcoldJanuaryW]
     beamRadiationPerHour = [0]
     diffuseRadiationPerHour = [0]
     groundRadiationPerHour = [0]
@@ -570,20 +566,25 @@ def main(latitude, longitude, timeZone, locationName, years, months, days, hours
     
     tankArea = 2 * (((tankSizeM3**2)*math.pi*2*heightDiameterTankRatio) ** (1/3)) * (1+1/(2*heightDiameterTankRatio))
     
+    # sun positions for all the hours
+    sunZenithDL, sunAzimuthDL, sunAltitudeDL = sc.sticky["ladybug_SolarEphemeris"](latitude, longitude, timeZone, "NREL").positions(years, months, days, [hour-1 for hour in hours])
     for i in range(1,8760):
-        sunZenithD, sunAzimuthD, sunAltitudeD = lb_photovoltaics.NRELsunPosition(latitude, longitude, timeZone, years[i], months[i], days[i], hours[i]-1)
+        sunZenithD, sunAzimuthD, sunAltitudeD = sunZenithDL[i], sunAzimuthDL[i], sunAltitudeDL[i]
         Epoa_shaded, Eb_shaded, Ed_sky, Eground, AOI_R = lb_photovoltaics.POAirradiance(sunZenithD, sunAzimuthD, srfTiltD, srfAzimuthD, directNormalRadiation[i], diffuseHorizontalRadiation[i], albedoL[i], beamIndexPerHourData[i], SVF)
-        collectorHeatLoss, collectorEfficiency, Qsolar, Qloss, Qsupply, Qaux, Qdis, Qpump, dQ, dt, Tw = lb_photovoltaics.swhdesign(activeArea, srfTiltD, AOI_R, bo, Fr, FrUL, Eb_shaded, Ed_sky, Eground, heatingLoadPerHour[i], Cp, mDot, dryBulbTemperature[i], coldWaterTemperaturePerHour[i], tankWaterTemperaturePerHour[i-1], TdeliveryW, TmaxW, TdischargeW, TmechRoomL[i], L, Di, insulT, pipeInsulationConductivity, pumpPower, pumpEfficiency, tankSizeM3, tankArea, tankLoss, epsilon)
-        heatFromTankPerHour.append(Qsupply)
-        heatFromAuxiliaryHeaterPerHour.append(Qaux)
-        dischargedHeatPerHour.append(Qdis)
-        pumpEnergyPerHour.append(Qpump)
-        tankWaterTemperaturePerHour.append(Tw)
         beamRadiationPerHour.append(Eb_shaded)
         diffuseRadiationPerHour.append(Ed_sky)
         groundRadiationPerHour.append(Eground)
         AOI_RL.append(AOI_R)
     
+    # simulate the tank for the whole year at once
+    SR_IAM = lb_photovoltaics.swhIncidentRadiation(srfTiltD, bo, AOI_RL, beamRadiationPerHour[1:], diffuseRadiationPerHour[1:], groundRadiationPerHour[1:])
+    collectorHeatLossL, collectorEfficiencyL, QsolarL, QlossL, QsupplyL, QauxL, QdisL, QpumpL, dQL, dtL, TwL = lb_photovoltaics.swhdesignSeries([activeArea], [tankSizeM3], [tankArea], [SR_IAM], Fr, FrUL, heatingLoadPerHour[1:8760], Cp, mDot, dryBulbTemperature[1:8760], coldWaterTemperaturePerHour[1:8760], TcoldJanuaryW, TdeliveryW, TmaxW, TdischargeW, TmechRoomL[1:8760], L, Di, insulT, pipeInsulationConductivity, pumpPower, pumpEfficiency, tankLoss, epsilon)[0]
+    heatFromTankPerHour = [0] + list(QsupplyL)
+    heatFromAuxiliaryHeaterPerHour = [0] + list(QauxL)
+    dischargedHeatPerHour = [0] + list(QdisL)
+    pumpEnergyPerHour = [0] + list(QpumpL)
+    tankWaterTemperaturePerHour = [TcoldJanuaryW] + list(TwL)
+    
     heatFromTankPerYear = sum(heatFromTankPerHour)
     avrDailyheatFromTankPerYear = sum(heatFromTankPerHour)/365
     
@@ -44,7 +44,7 @@ try: ghenv.Component.AdditionalHelpFromDocStrings = "3"
 except: pass
 
 
-import time, math, Rhino, copy
+import time, math, Rhino
 import System.Threading.Tasks as tasks
 import Grasshopper.Kernel as gh
 import scriptcontext as scriptc
@@ -145,7 +145,6 @@ class SolarEnvelope:
         self.suns = []
         self.gridPoints = []
         self.finalPointsList = []
-        self.chunks = []
         self.NumOfThreads = numOfCPUs_
         #this is the minimum angle under which we consider the sun - below that angle 
         #(between the sun vector and the obstacle curve) we act as if the sun vector isn't relevant
@@ -180,35 +179,23 @@ class SolarEnvelope:
             self.suns.Add(SingleSun(alltitudeAngles[i], _azimuthAngle))
 
     def parallelFindPointHeights(self):
+        segmentGrid = ObstacleSegmentGrid(self.obstacleCurves, scriptc.doc.ModelAbsoluteTolerance)
+        maxDistance = abs(self.lineExtention)
+        #sun rays go from the grid points away from the sun (rights) or back to the sun (collection)
+        direction = -1 if self.lineExtention > 0 else 1
+        sunRays = []
+        for sun in self.suns:
+            sunRays.append((direction * math.sin(math.radians(sun.azimuth)), direction * math.cos(math.radians(sun.azimuth)), math.tan(math.radians(sun.alltitude))))
         
         def _findPointsHeight(i):
-            chunk = self.chunks[i]
-            for x in range(len(chunk.points)):
-                g = chunk.points[x]
-                for y in range(len(chunk.obstacleCurves)):
-                    obCurve = chunk.obstacleCurves[y]
-                    #not using this for now
-                    #lineAngles = getLineEdgeAngles(obCurve,checkPoint,yVector)
-                    for j in range(len(chunk.suns)):
-                        tempHeight = g.getPointHeight(obCurve, chunk.suns[j])
-                        if self._solarEnvelope : 
-                            if  tempHeight < g.point.Z : 
-                                g.point.Z = tempHeight
-                        else :
-                            if  tempHeight > g.point.Z : 
-                                g.point.Z = tempHeight
-                            
+            for g in splittedPoints[i]:
+                g.point.Z = segmentGrid.limitingHeight(g.point.X, g.point.Y, sunRays, g.point.Z, maxDistance, self._solarEnvelope)
+        
         #split an array into equeal size chunks, the last item will contain the remaining elements
-        itemsInEveryChunk = int(math.ceil(len(self.gridPoints) / self.NumOfThreads))
+        #the chunks only share the read-only segmentGrid, so nothing needs to be copied
+        itemsInEveryChunk = int(math.ceil(len(self.gridPoints) / float(self.NumOfThreads)))
         splittedPoints = [self.gridPoints[i:i+itemsInEveryChunk] for i in range(0,len(self.gridPoints),itemsInEveryChunk)]
-        #divide to chunks and run every chunk as a thread
-        self.chunks = []    #do we really need this?
-        for i in range(self.NumOfThreads):
-            self.chunks.append(ParallelChunkObject(copy.deepcopy(splittedPoints[i]),copy.deepcopy(self.suns), copy.deepcopy(self.obstacleCurves)))
-        tasks.Parallel.ForEach(xrange(self.NumOfThreads),_findPointsHeight)
-        self.gridPoints = []
-        for pointChunk in self.chunks:
-            self.gridPoints.extend(pointChunk.points)    
+        tasks.Parallel.ForEach(xrange(len(splittedPoints)),_findPointsHeight)
     def getPtsFromClosedCrv(self,srf,gridSize):
         regionMeshPar = Rhino.Geometry.MeshingParameters.Default
         regionMeshPar.MinimumEdgeLength = regionMeshPar.MaximumEdgeLength = gridSize/2
@@ -225,14 +212,6 @@ class SolarEnvelope:
             finalPoints.Add(gridPt.point)
         finalEnvelopeBrep = Rhino.Geometry.Brep.CreateFromMesh(self.regionMesh,True)
         return finalEnvelopeBrep, finalPoints
-#divide our point array that we need to calculate to several subarrays and calculate every subarray in multithreading
-# seems like when we're doing multithreading, a race condition can occour even on just reading data so copy all the data
-#for every subarray and wrap it in an object
-class ParallelChunkObject:
-    def __init__(self,points,_suns, _obstacleCurves) :
-        self.points = points
-        self.suns = _suns
-        self.obstacleCurves = _obstacleCurves
 class GridPt:
     def __init__(self, point, defaultHeight,mainRef):
         self.point = point
@@ -240,28 +219,103 @@ class GridPt:
         self.defaultHeight = defaultHeight
         self.mainRef = mainRef
         self.isStart = False        
-    #handle all the logic and return the z (height) of the relevant point for one specified obstacle line
-    #if the z value is lower than what we had replace it (because the lowest one is the relevant one)
-    def getPointHeight(self, bLine, singleSun):
-        self.initialHeight = bLine.PointAtEnd.Z
-        _checkPoint = Rhino.Geometry.Point2d(self.point.X,self.point.Y)
-        xAdd = - self.mainRef.lineExtention * math.sin(math.radians(singleSun.azimuth));
-        yAdd = - self.mainRef.lineExtention * math.cos(math.radians(singleSun.azimuth)); 
-        point1 = Rhino.Geometry.Point3d( self.point.X,self.point.Y,self.initialHeight )
-        point2 = Rhino.Geometry.Point3d( self.point.X + xAdd,self.point.Y + yAdd,self.initialHeight)
-        _sunLine = Rhino.Geometry.LineCurve(point1,point2)       
-        _intersections = Rhino.Geometry.Intersect.Intersection.CurveCurve(_sunLine, bLine, 0.001, 0.0)
-        if _intersections : 
-            _intersectionPoint = Rhino.Geometry.Point2d(_intersections[0].PointA[0],_intersections[0].PointA[1])
-            dist = (_intersectionPoint - _checkPoint).Length
-            t = math.tan(math.radians(singleSun.alltitude))
-            if self.mainRef._solarEnvelope :
-                return dist * t + self.initialHeight
-            else :
-                return self.initialHeight - dist * t 
-        else :
-            #sun not relevant so no obstacles to look out for - return the heighest(rights)/lowest(collection) point defined
-            return self.defaultHeight
+#obstacle curves discretized to 2d segments and binned in a uniform grid, so that every sun ray
+#only tests the segments of the cells it passes through, nearest cells first
+class ObstacleSegmentGrid:
+    def __init__(self, obstacleCurves, tolerance):
+        self.segments = []   #(ax, ay, bx, by, height) - the height of every obstacle curve is the z of its end point
+        for bLine in obstacleCurves:
+            height = bLine.PointAtEnd.Z
+            success, polyline = bLine.TryGetPolyline()
+            if not success:
+                success, polyline = bLine.ToPolyline(0, 0, math.radians(5), 0, 0, tolerance, 0, 0, True).TryGetPolyline()
+            for k in range(polyline.Count - 1):
+                self.segments.append((polyline[k].X, polyline[k].Y, polyline[k+1].X, polyline[k+1].Y, height))
+        if len(self.segments) == 0: return
+        self.minHeight = min(seg[4] for seg in self.segments)
+        self.maxHeight = max(seg[4] for seg in self.segments)
+        
+        self.minX = min(min(seg[0], seg[2]) for seg in self.segments)
+        self.minY = min(min(seg[1], seg[3]) for seg in self.segments)
+        extentX = max(max(seg[0], seg[2]) for seg in self.segments) - self.minX
+        extentY = max(max(seg[1], seg[3]) for seg in self.segments) - self.minY
+        self.cellSize = max(extentX, extentY, tolerance) / max(1, int(math.sqrt(len(self.segments))))
+        self.nx = int(extentX / self.cellSize) + 1
+        self.ny = int(extentY / self.cellSize) + 1
+        self.cells = [[] for i in range(self.nx * self.ny)]
+        for seg in self.segments:
+            ix0, iy0 = self.cellIndex(min(seg[0], seg[2]), min(seg[1], seg[3]))
+            ix1, iy1 = self.cellIndex(max(seg[0], seg[2]), max(seg[1], seg[3]))
+            for ix in range(ix0, ix1 + 1):
+                for iy in range(iy0, iy1 + 1):
+                    self.cells[iy * self.nx + ix].append(seg)
+    
+    def cellIndex(self, x, y):
+        ix = min(max(int((x - self.minX) / self.cellSize), 0), self.nx - 1)
+        iy = min(max(int((y - self.minY) / self.cellSize), 0), self.ny - 1)
+        return ix, iy
+    
+    #lowest (rights) or highest (collection) height of the point for all the sun rays, starting from startHeight
+    def limitingHeight(self, px, py, sunRays, startHeight, maxDistance, solarEnvelope):
+        if len(self.segments) == 0: return startHeight
+        height = startHeight
+        gridMaxX = self.minX + self.nx * self.cellSize
+        gridMaxY = self.minY + self.ny * self.cellSize
+        for dx, dy, tanAlt in sunRays:
+            #farthest distance at which an obstacle can still change the height
+            if solarEnvelope: heightDifference = height - self.minHeight
+            else: heightDifference = self.maxHeight - height
+            if heightDifference < 0: continue
+            tMax = min(maxDistance, heightDifference / tanAlt) if tanAlt > 0 else maxDistance
+            
+            #clip the ray to the grid
+            tEnter = 0; tExit = tMax
+            for p, d, lo, hi in ((px, dx, self.minX, gridMaxX), (py, dy, self.minY, gridMaxY)):
+                if d == 0:
+                    if p < lo or p > hi: tEnter = tExit + 1
+                else:
+                    t0 = (lo - p) / d; t1 = (hi - p) / d
+                    if t0 > t1: t0, t1 = t1, t0
+                    tEnter = max(tEnter, t0); tExit = min(tExit, t1)
+            if tEnter > tExit: continue
+            
+            #walk the cells along the ray
+            ix, iy = self.cellIndex(px + dx * tEnter, py + dy * tEnter)
+            stepX = 1 if dx > 0 else -1
+            stepY = 1 if dy > 0 else -1
+            tDeltaX = self.cellSize / abs(dx) if dx != 0 else float("inf")
+            tDeltaY = self.cellSize / abs(dy) if dy != 0 else float("inf")
+            if dx > 0: tNextX = (self.minX + (ix + 1) * self.cellSize - px) / dx
+            elif dx < 0: tNextX = (self.minX + ix * self.cellSize - px) / dx
+            else: tNextX = float("inf")
+            if dy > 0: tNextY = (self.minY + (iy + 1) * self.cellSize - py) / dy
+            elif dy < 0: tNextY = (self.minY + iy * self.cellSize - py) / dy
+            else: tNextY = float("inf")
+            tCell = tEnter
+            while tCell <= tMax:
+                for ax, ay, bx, by, segHeight in self.cells[iy * self.nx + ix]:
+                    ex = bx - ax; ey = by - ay
+                    denom = dx * ey - dy * ex
+                    if denom == 0: continue
+                    wx = ax - px; wy = ay - py
+                    t = (wx * ey - wy * ex) / denom
+                    if t < 0 or t > tMax: continue
+                    u = (wx * dy - wy * dx) / denom
+                    if u < 0 or u > 1: continue
+                    if solarEnvelope: tempHeight = segHeight + t * tanAlt
+                    else: tempHeight = segHeight - t * tanAlt
+                    if (solarEnvelope and tempHeight < height) or (not solarEnvelope and tempHeight > height):
+                        height = tempHeight
+                        if tanAlt > 0:
+                            if solarEnvelope: tMax = min(tMax, (height - self.minHeight) / tanAlt)
+                            else: tMax = min(tMax, (self.maxHeight - height) / tanAlt)
+                if tNextX < tNextY:
+                    ix += stepX; tCell = tNextX; tNextX += tDeltaX
+                    if ix < 0 or ix >= self.nx: break
+                else:
+                    iy += stepY; tCell = tNextY; tNextY += tDeltaY
+                    if iy < 0 or iy >= self.ny: break
+        return height
 #class to organize all the data in a single sun object
 #properties for later use, when we'll get more comprehensive data from and epw file - hour, day, month, temperature, radiation
 class SingleSun:
@@ -133,7 +133,6 @@ def checkConditionalStatement(annualHourlyData, conditionalStatement):
         
         # replace the right list in the conditional statement
         statement = conditionalStatement.split(' ')
-        finalStatement = 'pattern = '
         titleStatement = '...                         ...                         ...\n' +\
                          'Conditional Selection Applied:\n'
         
@@ -142,10 +141,8 @@ def checkConditionalStatement(annualHourlyData, conditionalStatement):
             
             if statemntPart!='and' and statemntPart!='or':
                 for num in listNum:
-                    toBeReplacedWith = 'selList[this][HOY]'.replace('this', `num`)
                     titleToBeReplacedWith = listInfo[num][2]
                     
-                    statemntPart = statemntPart.replace(letters[num], toBeReplacedWith, 20000)
                     statementCopy = statementCopy.replace(letters[num], titleToBeReplacedWith, 20000)
                     if statementCopy.find(letters[num])!=-1: break
                     
@@ -153,15 +150,11 @@ def checkConditionalStatement(annualHourlyData, conditionalStatement):
             else:
                 
                 titleStatement = titleStatement + '\n' + statementCopy
-            finalStatement = finalStatement + ' ' + statemntPart
         print titleStatement
         
         # check for the pattern
-        patternList = []
         try:
-            for HOY in range(8760):
-                exec(finalStatement)
-                patternList.append(pattern)
+            patternList = sc.sticky["ladybug_ConditionalStatement"](conditionalStatement).evaluate(selList, 8760)
         except Exception,e:
             warning = 'There is an error in the conditional statement:\n' + `e`
             print warning
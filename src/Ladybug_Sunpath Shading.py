@@ -103,7 +103,7 @@ Provided by Ladybug 0.0.63
                               -
                               If not supplied, geometry for the first surface (index: 0) will be generated as a default.
         scale_: Scale of the overall geometry (sunPath curves, sunWindow mesh).
-                Use the scale number which enables encompassing all of your context_, coniferousTrees_, deciduousTrees_ objects.
+                It only affects the size of the output geometry. Shading is calculated against the whole context_, coniferousTrees_, deciduousTrees_ objects, regardless of the scale.
                 -
                 If not supplied, default value of 1 will be used.
         hoursPositionScale_: Scale factor for positioning of solar time hour points (that's "hoursPositions" output).
@@ -985,180 +985,48 @@ def shadingAndQuadrantPercentages(testPt, srfNormal, createSunWindowMesh, contex
             return sunWindowShadedAreaPer, quadrantCentroidsFiltered, quadrantShadingPercentRoundedFiltered, quadrantACPercentUnshadedRoundedFiltered, sunWindowMesh
 
 
-def calcQuadranglesMeshFaceArea(A,B,C,D):
-    # Heron's formula
-    # face vertices start at the left bottom counter-clockwise
-    a = A.DistanceTo(B)  # bottom
-    b = B.DistanceTo(C)  # right
-    diag = A.DistanceTo(C)  # diagonal
-    c = C.DistanceTo(D)  # left
-    d = D.DistanceTo(A)
-    
-    s1 = (a+b+diag)/2  # triangleSemiperimeter2
-    triangleMeshFaceArea1 = math.sqrt(s1 * (s1 - a) * (s1 - b) * (s1 - diag))
-    
-    s2 = (diag+c+d)/2  # triangleSemiperimeter2
-    triangleMeshFaceArea2 = math.sqrt(s2 * (s2 - diag) * (s2 - c) * (s2 - d))
-    
-    return triangleMeshFaceArea1 + triangleMeshFaceArea2
-
-
-def diffuseShading(testPt, srfNormal, contextMeshes, treesTransmissionIndices, leaflessStartHOY, leaflessEndHOY, scale, precision):
+def obstructionMaps(testPts, srfNormal, contextMeshes, treesTransmissionIndices, precision):
     
-    # lift the testPt so that it does not lie on the "contextMeshes[0]" and "outerBaseMesh", which would result in "intersectParam" returning: 0 value or very close to 0
+    # lift the testPts so that they do not lie on the "contextMeshes[0]", which would result in rays hitting it at the very start
     # testPt will always be lifted for the srfNormal identified at srfCentroid (if _analysisGeometry is a Brep), not at each srfCornerPtsLL (that is: testPt)
     tol = Rhino.RhinoDoc.ActiveDoc.ModelAbsoluteTolerance
-    testPtLifted = testPt + (srfNormal * tol)  # lift testPt due to "contextMeshes[0]"
-    testPtLifted.Z = testPtLifted.Z + tol  # lift testPt due "contextMeshes[0]" (in case "_analysisGeometry" is a horizontal surface)
-    
-    precisionU = precision*5
-    precisionV = int(precisionU/3.5)
-    
-    skyDomeHalfSphere = Rhino.Geometry.Sphere(Rhino.Geometry.Plane(Rhino.Geometry.Point3d(testPtLifted),Rhino.Geometry.Vector3d(0,0,1)),scale)
-    splittedSkyDomeDomainUmin, splittedSkyDomeDomainUmax = [0, 2*math.pi]  # sphere diameter
-    splittedSkyDomeDomainVmin, splittedSkyDomeDomainVmax = [0, 0.5*math.pi]  # sphere vertical arc
-    splittedSkyDomeDomainVmax = 0.995*splittedSkyDomeDomainVmax
-    
-    stepU = (splittedSkyDomeDomainUmax - splittedSkyDomeDomainUmin)/precisionU
-    stepV = (splittedSkyDomeDomainVmax - splittedSkyDomeDomainVmin)/precisionV
-    
-    skyDomePts = []
-    for i in xrange(0,precisionU):
-        for k in xrange(0,precisionV):
-            u = splittedSkyDomeDomainUmin + stepU*i
-            v = splittedSkyDomeDomainVmin + stepV*k
-            skyDomePt = skyDomeHalfSphere.PointAt(u,v)
-            skyDomePts.append(skyDomePt)
-    skyDomeMeshPts = skyDomePts + skyDomePts[:precisionV]  # increases precisionU for 1
-    skyDomeMesh = lb_meshpreparation.meshFromPoints(precisionU+1, precisionV, skyDomeMeshPts)
-    meshFacesCentroids = [skyDomeMesh.Faces.GetFaceCenter(i) for i in xrange(skyDomeMesh.Faces.Count)]
-    meshFaces = skyDomeMesh.Faces
-    meshVertices = skyDomeMesh.Vertices
-    
-    skyDomeMeshArea2 = 0
-    meshFacesAreas = []
-    for mFace in meshFaces:
-        quadrangleMeshFaceArea = calcQuadranglesMeshFaceArea(meshVertices[mFace.A], meshVertices[mFace.B], meshVertices[mFace.C], meshVertices[mFace.D])
-        meshFacesAreas.append(quadrangleMeshFaceArea)
-        skyDomeMeshArea2 += quadrangleMeshFaceArea
-    
-    skyDomeMeshArea = Rhino.Geometry.AreaMassProperties.Compute(skyDomeMesh).Area
-    
-    del skyDomeMeshPts
-    del meshVertices
-    del meshFaces
-    del skyDomeMesh
-    
-    skyExposureFactor = 0  # 0 equals to 100% shading, 1 equals to 0% shading
-    for i,centroid in enumerate(meshFacesCentroids):
-        raysIntensityWithoutTransmissionIndex = meshFacesAreas[i]/skyDomeMeshArea
-        vector = Rhino.Geometry.Vector3d(centroid)-Rhino.Geometry.Vector3d(testPtLifted)
-        ray = Rhino.Geometry.Ray3d(testPtLifted, vector)
-        for meshIndex,mesh in enumerate(contextMeshes):
-            intersectParam = Rhino.Geometry.Intersect.Intersection.MeshRay(mesh,ray)
-            # ray hitted something
-            if intersectParam >= 0:
-                seasonIndex = noLeavesPeriod("perHoy", latitude, i, leaflessStartHOY, leaflessEndHOY)
-                if meshIndex == 0:  # context mesh hitted
-                    treesTransmissionIndex = 0
-                elif meshIndex == 1:  # coniferousTrees mesh hitted
-                    treesTransmissionIndex = treesTransmissionIndices[0]
-                elif meshIndex == 2:  # deciduousTrees mesh hitted
-                    treesTransmissionIndex = treesTransmissionIndices[1][seasonIndex]
-                skyExposureFactor += raysIntensityWithoutTransmissionIndex*treesTransmissionIndex
-                break
-        # no hitting, the ray only hits the sky dome
-        else:
-            treesTransmissionIndex = 1
-            skyExposureFactor += raysIntensityWithoutTransmissionIndex * treesTransmissionIndex
+    testPtsLifted = []
+    for testPt in testPts:
+        testPtLifted = testPt + (srfNormal * tol)  # lift testPt due to "contextMeshes[0]"
+        testPtLifted.Z = testPtLifted.Z + tol  # lift testPt due "contextMeshes[0]" (in case "_analysisGeometry" is a horizontal surface)
+        testPtsLifted.append(testPtLifted)
     
-    del meshFacesCentroids
+    # the obstruction map of each testPt is built once. Sky view factors and hourly beam shading are lookups in it
+    azimuthCount = max(precision*5, 360)
+    obstructionMapL = sc.sticky["ladybug_ObstructionMap"].fromMeshes(testPtsLifted, contextMeshes, treesTransmissionIndices, azimuthCount, 0, True)
     
-    return skyExposureFactor
+    return obstructionMapL
 
 
-def noaaSolarCalculator(latitude, longitude, timeZone, month, day, hour):
-    # by NOAA Earth System Research Laboratory
-    # NOAA defines longitude and time zone as positive to the west:
-    timeZone = -timeZone
-    longitude = -longitude
-    DOY = int(lb_preparation.getJD(month, day))
-    minute = 0  # default
-    second = 0  # default
-    gamma = (2*math.pi)/365*(DOY-1+((hour-12)/24))
-    eqtime = 229.18*(0.000075 + 0.001868*math.cos(gamma) - 0.032077*math.sin(gamma) - 0.014615*math.cos(2*gamma) - 0.040849*math.sin(2*gamma))
-    declAngle = 0.006918 - 0.399912*math.cos(gamma) + 0.070257*math.sin(gamma) - 0.006758*math.cos(2*gamma) + 0.000907*math.sin(2*gamma) - 0.002697*math.cos(3*gamma) + 0.00148*math.sin(3*gamma)
-    time_offset = eqtime-4*longitude+60*timeZone
-    tst = hour *60 + minute + second / 60 + time_offset
-    solarHangle = (tst / 4) - 180
-    
-    # solar zenith angle
-    solarZenithR = math.acos(math.sin(math.radians(latitude)) * math.sin(declAngle) + math.cos(math.radians(latitude)) * math.cos(declAngle) * math.cos(math.radians(solarHangle)))
-    solarZenithD = math.degrees(solarZenithR)
-    if solarZenithD > 90:
-        solarZenithD = 90
-    elif solarZenithD < 0:
-        solarZenithD = 0
-    
-    # solar altitude angle
-    solarAltitudeD = 90 - solarZenithD
-    
-    # solar azimuth angle
-    solarAzimuthR = - (math.sin(math.radians(latitude)) * math.cos(solarZenithR) - math.sin(declAngle)) / (math.cos(math.radians(latitude)) * math.sin(solarZenithR))
-    solarAzimuthR = math.acos(solarAzimuthR)
-    solarAzimuthD = math.degrees(solarAzimuthR)
-    
-    return solarZenithD, solarAzimuthD, solarAltitudeD
+def diffuseShading(obstructionMap, seasonIndices):
+    
+    # 0 equals to 100% shading, 1 equals to 0% shading
+    skyExposureFactorPerSeason = [obstructionMap.skyViewFactor(0), obstructionMap.skyViewFactor(1)]  # leafless, inleaf period
+    skyExposureFactor = obstructionMap.annualSkyViewFactor(seasonIndices)
+    
+    return skyExposureFactor, skyExposureFactorPerSeason
 
 
-def beamShadingPerEachHour(testPt, srfNormal, srfTiltD, correctedSrfAzimuthD, SVF, contextMeshes, treesTransmissionIndices, leaflessStartHOY, leaflessEndHOY, albedoL, scale, latitude, longitude, timeZone, directNormalRadiationData, diffuseHorizontalRadiationData, yearsHOY, monthsHOY, daysHOY, hoursHOY):
+def beamShadingPerEachHour(obstructionMap, srfTiltD, correctedSrfAzimuthD, SVFperSeason, seasonIndices, albedoL, latitude, longitude, timeZone, directNormalRadiationData, diffuseHorizontalRadiationData, yearsHOY, monthsHOY, daysHOY, hoursHOY):
     
-    # lift the testPt so that it does not lie on the "contextMeshes[0]" and "outerBaseMesh", which would result in "intersectParam" returning: 0 value or very close to 0
-    # testPt will always be lifted for the srfNormal identified at srfCentroid (if _analysisGeometry is a Brep), not at each srfCornerPtsLL (that is: testPt)
-    tol = Rhino.RhinoDoc.ActiveDoc.ModelAbsoluteTolerance
-    testPtLifted = testPt + (srfNormal * tol)  # lift testPt due to "contextMeshes[0]"
-    testPtLifted.Z = testPtLifted.Z + tol  # lift testPt due "contextMeshes[0]" (in case "_analysisGeometry" is a horizontal surface)
+    # sun positions for all the hours (by NOAA Earth System Research Laboratory)
+    sunZenithDL, sunAzimuthDL, sunAltitudeDL = sc.sticky["ladybug_SolarEphemeris"](latitude, longitude, timeZone, "NOAA").positions(None, monthsHOY, daysHOY, hoursHOY)
     
-    beamIndexPerHourL = []
-    for i in range(8760):
-        sunZenithD, sunAzimuthD, sunAltitudeD = noaaSolarCalculator(latitude, longitude, timeZone, monthsHOY[i], daysHOY[i], hoursHOY[i])
-        if sunZenithD <= 90:  # above the horizon
-            sunAzimuthR = math.radians(sunAzimuthD)
-            rotationAxis = Rhino.Geometry.Vector3d(0, 0, 1)
-            YAxis = Rhino.Geometry.Vector3d(testPtLifted.X, testPtLifted.Y+scale, 0)
-            azimuthVector = Rhino.Geometry.Vector3d(YAxis)
-            azimuthVector.Rotate(-sunAzimuthR, rotationAxis)  # for clockwise
-            sunAltitudeR = math.radians(sunAltitudeD)
-            sunHeight = math.tan(sunAltitudeR)*scale
-            sunPt = Rhino.Geometry.Point3d(azimuthVector.X, azimuthVector.Y, azimuthVector.Z+sunHeight)
-            sunVector = Rhino.Geometry.Vector3d(sunPt)-Rhino.Geometry.Vector3d(testPtLifted)
-            ray = Rhino.Geometry.Ray3d(testPtLifted, sunVector)
-            for meshIndex,mesh in enumerate(contextMeshes):
-                intersectParam = Rhino.Geometry.Intersect.Intersection.MeshRay(mesh,ray)
-                # ray hitted something
-                if intersectParam >= 0:
-                    seasonIndex = noLeavesPeriod("perHoy", latitude, i, leaflessStartHOY, leaflessEndHOY)
-                    if meshIndex == 0:  # context mesh hitted
-                        treesTransmissionIndex = 0
-                    elif meshIndex == 1:  # coniferousTrees mesh hitted
-                        treesTransmissionIndex = treesTransmissionIndices[0]
-                    elif meshIndex == 2:  # deciduousTrees mesh hitted
-                        treesTransmissionIndex = treesTransmissionIndices[1][seasonIndex]
-                    beamIndexPerHourL.append(treesTransmissionIndex)
-                    break
-            # no hitting, the ray only hits the sky dome
-            else:
-                beamIndexPerHourL.append(1)
-        
-        elif sunZenithD > 90:  # bellow the horizon
-            beamIndexPerHourL.append(0)  # always shaded
+    # each sun position is looked up in the obstructionMap. Sun below the horizon is always shaded
+    sunAltitudesAboveHorizonD = [sunAltitudeDL[i] if sunZenithDL[i] <= 90 else 0 for i in range(8760)]
+    beamIndexPerHourL = obstructionMap.beamTransmissionIndices(sunAzimuthDL, sunAltitudesAboveHorizonD, seasonIndices)
     
     
     # totalRadiationPerHour
     totalRadiationPerHourL = []
     for i in range(8760):
-        sunZenithD, sunAzimuthD, sunAltitudeD = noaaSolarCalculator(latitude, longitude, timeZone, monthsHOY[i], daysHOY[i], hoursHOY[i])
-        Epoa_shaded, Eb_shaded, Ed_sky, Eground, AOI_R = lb_photovoltaics.POAirradiance(sunZenithD, sunAzimuthD, srfTiltD, correctedSrfAzimuthD, directNormalRadiationData[i], diffuseHorizontalRadiationData[i], albedoL[i], beamIndexPerHourL[i], SVF)
+        sunZenithD, sunAzimuthD, sunAltitudeD = sunZenithDL[i], sunAzimuthDL[i], sunAltitudeDL[i]
+        Epoa_shaded, Eb_shaded, Ed_sky, Eground, AOI_R = lb_photovoltaics.POAirradiance(sunZenithD, sunAzimuthD, srfTiltD, correctedSrfAzimuthD, directNormalRadiationData[i], diffuseHorizontalRadiationData[i], albedoL[i], beamIndexPerHourL[i], SVFperSeason[seasonIndices[i]])
         totalRadiationPerHourL.append(Epoa_shaded)
     
     return beamIndexPerHourL, totalRadiationPerHourL
@@ -1197,14 +1065,16 @@ def main(srfCornerPts, srfCentroid, srfNormal, contextMeshes, treesTransmissionI
     return annualShading, Sep21toMar21Shading, Mar21toSep21Shading, unweightedAnnualShading, sunWindowShadedAreaPer, sunWindowCrvs, sunWindowMesh, legend, legendBasePoint, quadrantCentroidsFiltered, quadrantShadingPercentRoundedFiltered, quadrantACPercentUnshadedRoundedFiltered, hoursPositions, hours
 
 
-def swhshading(srfCornerPts, srfNormal, srfTiltD, correctedSrfAzimuthD, contextMeshes, treesTransmissionIndices, leaflessStartHOY, leaflessEndHOY, albedoL, scale, latitude, longitude, timeZone, directNormalRadiationData, diffuseHorizontalRadiationData, yearsHOY, monthsHOY, daysHOY, hoursHOY):
+def swhshading(srfCornerPts, srfNormal, srfTiltD, correctedSrfAzimuthD, contextMeshes, treesTransmissionIndices, leaflessStartHOY, leaflessEndHOY, albedoL, latitude, longitude, timeZone, directNormalRadiationData, diffuseHorizontalRadiationData, yearsHOY, monthsHOY, daysHOY, hoursHOY):
     
     skyExposureFactorL = []
     beamIndexPerHourLL = []
     totalRadiationPerHourLL = []
-    for srfCornerPt in srfCornerPts:
-        skyExposureFactor = diffuseShading(srfCornerPt, srfNormal, contextMeshes, treesTransmissionIndices, leaflessStartHOY, leaflessEndHOY, scale, precision)
-        beamIndexPerHourL, totalRadiationPerHourL = beamShadingPerEachHour(srfCornerPt, srfNormal, srfTiltD, correctedSrfAzimuthD, skyExposureFactor, contextMeshes, treesTransmissionIndices, leaflessStartHOY, leaflessEndHOY, albedoL, scale, latitude, longitude, timeZone, directNormalRadiationData, diffuseHorizontalRadiationData, yearsHOY, monthsHOY, daysHOY, hoursHOY)
+    seasonIndices = [noLeavesPeriod("perHoy", latitude, i, leaflessStartHOY, leaflessEndHOY) for i in range(8760)]
+    obstructionMapL = obstructionMaps(srfCornerPts, srfNormal, contextMeshes, treesTransmissionIndices, precision)
+    for obstructionMap in obstructionMapL:
+        skyExposureFactor, skyExposureFactorPerSeason = diffuseShading(obstructionMap, seasonIndices)
+        beamIndexPerHourL, totalRadiationPerHourL = beamShadingPerEachHour(obstructionMap, srfTiltD, correctedSrfAzimuthD, skyExposureFactorPerSeason, seasonIndices, albedoL, latitude, longitude, timeZone, directNormalRadiationData, diffuseHorizontalRadiationData, yearsHOY, monthsHOY, daysHOY, hoursHOY)
         skyExposureFactorL.append(skyExposureFactor)
         beamIndexPerHourLL.append(beamIndexPerHourL)
         totalRadiationPerHourLL.append(totalRadiationPerHourL)
@@ -1368,7 +1238,7 @@ if sc.sticky.has_key("ladybug_release"):
                                 if (len(branchLists2) != 0) or (sum(branchLists2) != (len(list(ACenergyPerHour_.Paths)))):
                                     # valid "ACenergyPerHour_" inputted
                                     if len(srfCornerPts) > 0:
-                                        skyExposureFactor, beamIndexPerHour, shadedSolarRadiationPerHour, annualShadingDummy, Sep21toMar21ShadingDummy, Mar21toSep21ShadingDummy, unweightedAnnualShadingDummy, sunWindowShadedAreaPerDummy, sunWindowCrvsDummy, sunWindowMeshDummy, legendDummy, legendBasePtDummy, quadrantCentroidsDummy, quadrantShadingPercentsDummy, quadrantACenergyPercentsDummy, hoursPositionsDummy, hoursDummy = swhshading(srfCornerPtsLL[branchIndex], srfNormalL[branchIndex], srfTiltDL[branchIndex], correctedSrfAzimuthDL[branchIndex], contextMeshes, treesTransmissionIndices, leaflessStartHOY, leaflessEndHOY, albedoL, scale, latitude, longitude, timeZone, directNormalRadiationData, diffuseHorizontalRadiationData, yearsHOY, monthsHOY, daysHOY, hoursHOY)
+                                        skyExposureFactor, beamIndexPerHour, shadedSolarRadiationPerHour, annualShadingDummy, Sep21toMar21ShadingDummy, Mar21toSep21ShadingDummy, unweightedAnnualShadingDummy, sunWindowShadedAreaPerDummy, sunWindowCrvsDummy, sunWindowMeshDummy, legendDummy, legendBasePtDummy, quadrantCentroidsDummy, quadrantShadingPercentsDummy, quadrantACenergyPercentsDummy, hoursPositionsDummy, hoursDummy = swhshading(srfCornerPtsLL[branchIndex], srfNormalL[branchIndex], srfTiltDL[branchIndex], correctedSrfAzimuthDL[branchIndex], contextMeshes, treesTransmissionIndices, leaflessStartHOY, leaflessEndHOY, albedoL, latitude, longitude, timeZone, directNormalRadiationData, diffuseHorizontalRadiationData, yearsHOY, monthsHOY, daysHOY, hoursHOY)
                                         eachQuadrantACpercent = ACenergyQuadrantPercents(ACenergyPerHourDataLL[branchIndex])
                                         annualShading, Sep21toMar21Shading, Mar21toSep21Shading, unweightedAnnualShading, sunWindowShadedAreaPer, sunWindowCrvs, sunWindowMesh, legend, legendBasePt, quadrantCentroids, quadrantShadingPercents, quadrantACenergyPercents, hoursPositions, hours = main(srfCornerPtsLL[branchIndex], srfCentroidL[branchIndex], srfNormalL[branchIndex], contextMeshes, treesTransmissionIndices, eachQuadrantACpercent, latitude, northRad, northVec, scale, hoursPositionScale, precision, yearsHOY, monthsHOY, daysHOY, hoursHOY)
                                     else:
@@ -1377,7 +1247,7 @@ if sc.sticky.has_key("ladybug_release"):
                                 else:
                                     # nothing inputted into "ACenergyPerHour_", or data inputted, but data comming from "Photovoltaics surface" component's "ACenergyPerHour" output is "None" ("Photovoltaics surface" component not ran)
                                     if len(srfCornerPts) > 0:
-                                        skyExposureFactor, beamIndexPerHour, shadedSolarRadiationPerHour, annualShading, Sep21toMar21Shading, Mar21toSep21Shading, unweightedAnnualShading, sunWindowShadedAreaPer, sunWindowCrvs, sunWindowMesh, legend, legendBasePt, quadrantCentroids, quadrantShadingPercents, quadrantACenergyPercents, hoursPositions, hours = swhshading(srfCornerPtsLL[branchIndex], srfNormalL[branchIndex], srfTiltDL[branchIndex], correctedSrfAzimuthDL[branchIndex], contextMeshes, treesTransmissionIndices, leaflessStartHOY, leaflessEndHOY, albedoL, scale, latitude, longitude, timeZone, directNormalRadiationData, diffuseHorizontalRadiationData, yearsHOY, monthsHOY, daysHOY, hoursHOY)
+                                        skyExposureFactor, beamIndexPerHour, shadedSolarRadiationPerHour, annualShading, Sep21toMar21Shading, Mar21toSep21Shading, unweightedAnnualShading, sunWindowShadedAreaPer, sunWindowCrvs, sunWindowMesh, legend, legendBasePt, quadrantCentroids, quadrantShadingPercents, quadrantACenergyPercents, hoursPositions, hours = swhshading(srfCornerPtsLL[branchIndex], srfNormalL[branchIndex], srfTiltDL[branchIndex], correctedSrfAzimuthDL[branchIndex], contextMeshes, treesTransmissionIndices, leaflessStartHOY, leaflessEndHOY, albedoL, latitude, longitude, timeZone, directNormalRadiationData, diffuseHorizontalRadiationData, yearsHOY, monthsHOY, daysHOY, hoursHOY)
                                     else:
                                         skyExposureFactor = Sep21toMar21Shading = Mar21toSep21Shading = annualShading = None
                                         beamIndexPerHour = shadedSolarRadiationPerHour = []
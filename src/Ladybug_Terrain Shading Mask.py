@@ -1134,44 +1134,26 @@ def createTerrainShadingMask(GDAL_librariesFolderPath, objFilePath, rasterFilePa
     skyDomeSphere = Rhino.Geometry.Sphere(locationPt, skyDomeRadius)
     skyDomeSrf = skyDomeSphere.ToBrep().Faces[0]
     
-    # small number of rays (for example: precisionU = 30, precisionV = 10) can result in rays missing the terrainMesh, thererfor the shadingMaskSrf will not be created
-    precisionU = 3600  # rays shot per 0.1 degrees (10th of a degree)
-    precisionV = 1200  # rays shot per 0.075 degrees - more denser than precisionU
+    precisionU = 3600  # horizon angles per 0.1 degrees (10th of a degree)
     
     halvedSkyDomeSrf = skyDomeSrf.Trim(Rhino.Geometry.Interval(skyDomeSrf.Domain(0)[0], skyDomeSrf.Domain(0)[1]), Rhino.Geometry.Interval(0, skyDomeSrf.Domain(1)[1])) # split the skyDome sphere in half
     halvedSkyDomeSrf.SetDomain(1, Rhino.Geometry.Interval(0, halvedSkyDomeSrf.Domain(1)[1]))  # shrink the halvedSkyDomeSrf V start domain
     skyDomeDomainUmin, skyDomeDomainUmax = halvedSkyDomeSrf.Domain(0)
-    skyDomeDomainVmin, skyDomeDomainVmax = halvedSkyDomeSrf.Domain(1)
     stepU = (skyDomeDomainUmax - skyDomeDomainUmin)/precisionU
-    stepV = (skyDomeDomainVmax - skyDomeDomainVmin)/precisionV
     
-    # check for intersection between the terrainMesh and rays
+    # maximal terrain elevation angle for each azimuth, projected from the terrainMesh triangles edges
+    horizonProfileD = lb_horizonProfile([terrainMeshSplitted], precisionU).profile(locationPt)
+    
     lines = []
     lastRowPoints = []
-    
-    hitted = False  # initial switch
     for i in xrange(0,precisionU):
-        for k in xrange(0,precisionV):
-            u = skyDomeDomainUmin + stepU*i
-            v = skyDomeDomainVmin + stepV*k
-            skyDomePt = halvedSkyDomeSrf.PointAt(u,v)
-            rayVector = skyDomePt-locationPt
-            ray = Rhino.Geometry.Ray3d(locationPt, rayVector)
-            rayIntersectParam = Rhino.Geometry.Intersect.Intersection.MeshRay(terrainMeshSplitted,ray)
-            if rayIntersectParam >= 0:
-                # ray hitted something in that column
-                hitted = True
-                lastRowPt = skyDomePt
-                continue
-            else:
-                # ray did not hit anything in that column
-                pass
-        if hitted == False:
-            lastRowPt = halvedSkyDomeSrf.PointAt(u,0)
+        u = skyDomeDomainUmin + stepU*i
+        # halvedSkyDomeSrf U goes counter-clockwise from +X axis, horizonProfileD azimuths go clockwise from +Y axis
+        horizonAngleR = math.radians(horizonProfileD[(precisionU//4 - i) % precisionU])
+        lastRowPt = halvedSkyDomeSrf.PointAt(u,horizonAngleR)
         line = Rhino.Geometry.Line(locationPt, lastRowPt)
         lines.append(line.ToNurbsCurve())
         lastRowPoints.append(lastRowPt)
-        hitted = False  # reset the hitted switch
     
     del terrainMesh
     del terrainMeshSplitted
@@ -1285,7 +1267,6 @@ def scaleTerrainShadingMask(context, terrainShadingMaskUnscaledUnrotated, origin
         for meshMaskPart in shadingTerrainMaskMeshes:
             terrainShadingMaskMesh.Append(meshMaskPart)
         
-        skyDomeRadius = 200/unitConversionFactor2  # fixed to 200 meters always
         objFileRadius = 200  # in Rhino units
         precision = 100  # low "precision" values can result in low "terrainShadingMaskScaled_radius" values
         skyDomeMeshes = []
@@ -1301,7 +1282,7 @@ def scaleTerrainShadingMask(context, terrainShadingMaskUnscaledUnrotated, origin
             
             conditionSum = 0
             for i,cornerPt in enumerate(contextBBoxBottom4points):
-                skyExposureFactor = lb_photovoltaics.calculateSkyExposureFactor(cornerPt, [scaledTerrainShadingMaskMesh], latitude, skyDomeRadius, precision)
+                skyExposureFactor = lb_photovoltaics.calculateSkyExposureFactor(cornerPt, [scaledTerrainShadingMaskMesh], latitude, precision)
                 
                 if i == 0:
                     skyExposureFactor0 = skyExposureFactor  # for the first step, both skyExposureFactor0 and skyExposureFactor1 equal to skyExposureFactor
@@ -1481,6 +1462,7 @@ if sc.sticky.has_key("ladybug_release"):
     if sc.sticky["ladybug_release"].isCompatible(ghenv.Component):
         lb_preparation = sc.sticky["ladybug_Preparation"]()
         lb_meshpreparation = sc.sticky["ladybug_Mesh"]()
+        lb_horizonProfile = sc.sticky["ladybug_HorizonProfile"]
         lb_visualization = sc.sticky["ladybug_ResultVisualization"]()
         lb_photovoltaics = sc.sticky["ladybug_Photovoltaics"]()
         
@@ -187,17 +187,6 @@ def getLocationData(location):
     return locationName, latitude, longitude, timeZone, validLocationData, printMsg
 
 
-def averageWeatherData(hourlyData, activityDuration):
-    # average weather data for the last activityDuration hours
-    activityDurationHours = int(activityDuration/60)
-    activityDurationValues = activityDurationHours - 1
-    hourlyDataShifted = hourlyData[-activityDurationValues:] + hourlyData[:]
-    
-    lastActivityDurationHoursAverageL = [sum(hourlyDataShifted[i:activityDurationHours+i])/activityDurationHours for i in range(8760)]
-    
-    return lastActivityDurationHoursAverageL
-
-
 def getWeatherData(latitude, longitude, timeZone, Ta, mrt, Tdp, rh, ws, SR, N, bodyCharacteristics, HOY, analysisPeriod):
     
     # required input: Ta
@@ -250,7 +239,7 @@ def getWeatherData(latitude, longitude, timeZone, Ta, mrt, Tdp, rh, ws, SR, N, b
     
     
     if (len(Tdp) == 0) or (Tdp[0] is ""):
-        TdpL = [dewPointTemperature(TaL[i],rhL[i]) for i in range(8760)]  # calculate TdpL
+        TdpL = [lb_thermalComfortIndices.dewPointTemperature(TaL[i],rhL[i]) for i in range(8760)]  # calculate TdpL
     elif (len(Tdp) == 8767):
         TdpL = Tdp[7:]
     elif (len(Tdp) == 8760):
@@ -354,7 +343,7 @@ def getWeatherData(latitude, longitude, timeZone, Ta, mrt, Tdp, rh, ws, SR, N, b
         IclL = [Icl for i in range(8760)]
     else:
         # nothing inputted to "bodyCharacteristics_" or something inputted to "bodyCharacteristics_" but "clothingInsulation" is not defined (equals to: None)
-        IclL = [clothingInsulation(Ta) for Ta in TaL]
+        IclL = [lb_thermalComfortIndices.clothingInsulation(Ta) for Ta in TaL]
     
     if (Mmets == None) or (Mmets <= 0):
         Mmets = 2.32
@@ -363,40 +352,26 @@ def getWeatherData(latitude, longitude, timeZone, Ta, mrt, Tdp, rh, ws, SR, N, b
     
     if _comfortIndex == 18:
         # for PHS, replace weather data with average weather data for the last activityDuration hours
-        TaL = averageWeatherData(TaL, activityDuration)
+        TaL = lb_thermalComfortIndices.averageWeatherData(TaL, activityDuration)
         if mrtL[0] != "calculate_MRT":  # if meanRadiantTemperature_ inputted: average it
-            mrtL = averageWeatherData(mrtL, activityDuration)
+            mrtL = lb_thermalComfortIndices.averageWeatherData(mrtL, activityDuration)
         else:
             pass
             # it will be averaged by using averaged data (TaL, rhL, SRL, NL)
-        rhL = averageWeatherData(rhL, activityDuration)
-        TdpL = averageWeatherData(TdpL, activityDuration)
-        wsL = averageWeatherData(wsL, activityDuration)
-        SRL = averageWeatherData(SRL, activityDuration)
-        NL = averageWeatherData(NL, activityDuration)
-        IclL = averageWeatherData(IclL, activityDuration)
+        rhL = lb_thermalComfortIndices.averageWeatherData(rhL, activityDuration)
+        TdpL = lb_thermalComfortIndices.averageWeatherData(TdpL, activityDuration)
+        wsL = lb_thermalComfortIndices.averageWeatherData(wsL, activityDuration)
+        SRL = lb_thermalComfortIndices.averageWeatherData(SRL, activityDuration)
+        NL = lb_thermalComfortIndices.averageWeatherData(NL, activityDuration)
+        IclL = lb_thermalComfortIndices.averageWeatherData(IclL, activityDuration)
     
     
-    TgroundL = []; RprimL = []; vapourPressureL = []; EpotL = []; mrtL_calculated = []
     HOYs, daysDummy, monthsDummy, hoursDummy, date, newAnalysisPeriod = HOYsDaysMonthsHoursFromHOY_analysisPeriod(HOY, analysisPeriod)
     HOYsDummy, days, months, hours, dateDummy, newAnalysisPeriodDummy = HOYsDaysMonthsHoursFromHOY_analysisPeriod(None, [(1, 1, 1),(12, 31, 24)])
-    for i in range(8760):
-        Tground = groundTemperature(TaL[i], NL[i])  # in C
-        solarZenithD, solarAzimuthD, solarAltitudeD = noaaSolarCalculator(latitude, longitude, timeZone, months[i], days[i], hours[i])  # in degrees
-        Rprim = solarRadiationNudeMan(SRL[i], solarAltitudeD, ac)  # in W/m2
-        vapourPressure = VapourPressure(TaL[i], rhL[i])  # in hPa
-        if mrtL[0] == "calculate_MRT":
-            mrt = meanRadiantTemperature(TaL[i], Tground, Rprim, vapourPressure, NL[i])  # in C
-        else:
-            mrt = mrtL[i]  # in C
-        Ts = meanSkinTemperature(TaL[i], wsL[i], rhL[i], mrt, IclL[i], ML[i])  # in C
-        e_ = VapourPressure(TaL[i], 5)  # in hPa
-        Epot = turbulentExchangeOfLatentHeat(TaL[i], wsL[i], Ts, IclL[i], e_, ML[i])  # in W/m2
-        TgroundL.append(Tground)
-        RprimL.append(Rprim)
-        vapourPressureL.append(vapourPressure)
-        mrtL_calculated.append(mrt)
-        EpotL.append(Epot)
+    # sun positions for all the hours (by NOAA Earth System Research Laboratory)
+    solarZenithDL, solarAzimuthDL, solarAltitudeDL = sc.sticky["ladybug_SolarEphemeris"](latitude, longitude, timeZone, "NOAA").positions(None, months[:8760], days[:8760], hours[:8760])  # in degrees
+    if mrtL[0] == "calculate_MRT": mrtL = None
+    TgroundL, RprimL, vapourPressureL, mrtL_calculated, EpotL = lb_thermalComfortIndices.weatherTerms(TaL, rhL, wsL, SRL, NL, IclL, ML, solarAltitudeDL, ac, mrtL)
     
     printMsg = "ok"
     validWeatherData = True
@@ -404,1025 +379,6 @@ def getWeatherData(latitude, longitude, timeZone, Ta, mrt, Tdp, rh, ws, SR, N, b
     return TaL, mrtL_calculated, TdpL, rhL, wsL, SRL, NL, TgroundL, RprimL, vapourPressureL, EpotL, HOYs, date, newAnalysisPeriod, age, sex, heightCM, heightM, weight, bodyPosition, IclL, ac, acclimated, ML, activityDuration, validWeatherData, printMsg
 
 
-#angle units conversion
-def degreesToRadians(deg):
-    return deg*0.0174532925 
-
-def radiansToDegrees(R):
-    return R*57.2957795
-
-# temperature units conversion
-def celsiusToFahrenheit(Tc):
-    Tf = (Tc * (9/5)) + 32
-    return Tf
-
-def fahrenheitToCelsius(Tf):
-    Tc = (Tf-32)*(5/9)
-    return Tc
-    
-def celsiusToKelvin(Tc):
-    Tk = Tc + 273.15
-    return Tk
-
-
-# thermal comfort indices
-def heatIndex(Ta, rh):
-    # formula by (NWS) National Weather Service
-    Tf = celsiusToFahrenheit(Ta)
-    
-    if Tf < 80:
-        HI_f = 0.5 * (Tf + 61.0 + ((Tf-68.0)*1.2) + (rh*0.094))
-    else:
-        HI_f = -42.379 + 2.04901523*Tf + 10.14333127*rh - \
-             0.22475541*Tf*rh -6.83783*(10**(-3))*(Tf**(2)) - \
-             5.481717*(10**(-2))*(rh**(2)) + \
-             1.22874*(10**(-3))*(Tf**(2))*(rh) + 8.5282*(10**(-4))*(Tf)*(rh**(2)) - \
-             1.99*(10**(-6))*(Tf**(2))*(rh**(2))
-        if (Tf >= 80) and (Tf <= 112) and (rh < 13):
-            adjust = ((13-rh)/4) * math.sqrt((17-abs(Tf-95))/17)
-            HI_f = HI_f-adjust
-        elif (Tf >= 80) and (Tf <= 87) and (rh > 85):
-            adjust = ((rh-85)/10) * ((87-Tf)/5)
-            HI_f = HI_f+adjust
-    
-    if HI_f < 80:
-        effectHI = 0
-        comfortable = 1
-    elif HI_f >= 80 and HI_f < 90:
-        effectHI = 1
-        comfortable = 0
-    elif HI_f >= 90 and HI_f < 105:
-        effectHI = 2
-        comfortable = 0
-    elif HI_f >= 105 and HI_f < 130:
-        effectHI = 3
-        comfortable = 0
-    elif HI_f >= 130:
-        effectHI = 4
-        comfortable = 0
-    
-    HI_c = fahrenheitToCelsius(HI_f)
-    
-    return HI_c, effectHI, comfortable
-
-
-def dewPointTemperature(Ta, rh):
-    # MET4 and MET4A calculation of dew point temperature.
-    # limits:
-    # uncertainty in the calculated dew point temperature: +/- 0.4C
-    # for Tc in range:  0C < Tc < 60C  
-    # for Tdp in range:  0C < Tdp < 50C   
-    a = 17.27
-    b = 237.7
-    rh = rh/100  # 0.01 < rh < 1.00
-    Tdp = (b * ( ((a*Ta)/(b+Ta))+math.log(rh) ))/(a-( ((a*Ta)/(b+Ta))+math.log(rh) ))  # in Celius degrees
-    
-    return Tdp
-
-
-def Humidex(Ta, Tdp):
-    # formula by Environment Canada
-    dewpointK = celsiusToKelvin(Tdp)  # to Kelvin
-    e = 6.11 * math.exp(5417.7530 * ((1/273.16) - (1/dewpointK)))
-    h = (0.5555)*(e - 10.0)
-    humidex = Ta + h
-    
-    if humidex < 30:
-        effectHumidex = 0
-        comfortable = 1
-    elif humidex >=30 and humidex < 35:
-        effectHumidex = 1
-        comfortable = 0
-    elif humidex >=35 and humidex < 40:
-        effectHumidex = 2
-        comfortable = 0
-    elif humidex >=40 and humidex < 45:
-        effectHumidex = 3
-        comfortable = 0
-    elif humidex >=45 and humidex < 54:
-        effectHumidex = 4
-        comfortable = 0
-    elif humidex >= 54:
-        effectHumidex = 5
-        comfortable = 0
-    
-    return humidex, effectHumidex, comfortable
-
-
-def discomfortIndex(Ta, rh):
-    # also called "Thom's Index"
-    # formula from: Thom, E.C. (1959): The discomfort index. Weather wise, 12: 5760.
-    DI = Ta - (0.55 - 0.0055*rh)*(Ta - 14.5)
-    
-    # categories by Kyle, 1994 in Unger, 1999
-    if DI < -40:
-        effectDI = -6
-        comfortable = 0
-    elif DI >= -40 and DI < -20:
-        effectDI = -5
-        comfortable = 0
-    elif DI >= -20 and DI < -10:
-        effectDI = -4
-        comfortable = 0
-    elif DI >= -10 and DI < -1.8:
-        effectDI = -3
-        comfortable = 0
-    elif DI >= -1.8 and DI < 13:
-        effectDI = -2
-        comfortable = 0
-    elif DI >= 13 and DI < 15:
-        effectDI = -1
-        comfortable = 0
-    elif DI >= 15 and DI < 20:
-        effectDI = 0
-        comfortable = 1
-    elif DI >= 20 and DI < 26.5:
-        effectDI = 1
-        comfortable = 0
-    elif DI >= 26.5 and DI < 30:
-        effectDI = 2
-        comfortable = 0
-    elif DI >= 30:
-        effectDI = 3
-        comfortable = 0
-    
-    return DI, effectDI, comfortable
-
-
-def windChillIndex(Ta, ws):
-    # formula by Gregorczuk 1976
-    WCI = (10*math.sqrt(ws) + 10.45 - ws)*(33 - Ta)*1.163
-    
-    # Thermal sensations of man wearing clothing with insulation of 4 clo (heavy polar equipment):
-    if WCI >= 2326:
-        effectWCI = -4
-        comfortable = 0
-    elif WCI < 2326 and WCI >= 1628.2:
-        effectWCI = -3
-        comfortable = 0
-    elif WCI < 1628.2 and WCI >= 930.4:
-        effectWCI = -2
-        comfortable = 0
-    elif WCI < 930.4 and WCI >= 581.5:
-        effectWCI = -1
-        comfortable = 0
-    elif WCI < 581.5 and WCI >= 232.6:
-        effectWCI = 0
-        comfortable = 1
-    elif WCI < 232.6 and WCI >= 116.3:
-        effectWCI = 1
-        comfortable = 0
-    elif WCI < 116.3 and WCI >= 58.3:
-        effectWCI = 2
-        comfortable = 0
-    elif WCI < 58.3:
-        effectWCI = 3
-        comfortable = 0
-    
-    return WCI, effectWCI, comfortable
-
-
-def windChillTemperature(Ta, ws):
-    # formula by Environment Canada (corresponds to National Weather Service (NSW) Wind chill formula used in U.S.)
-    ws_km_h = ws * 3.6   # convert m/s to km/h wind speed
-    
-    Twc = 13.12 + 0.6215*Ta - 11.37*(ws_km_h**0.16) + 0.3965*Ta*(ws_km_h**0.16)   # in Celius degrees
-    
-    if Twc >= 0:
-        effectTwc = 0
-        comfortable = 1
-    elif Twc < 0 and Twc >= -9:
-        effectTwc = -1
-        comfortable = 0
-    elif Twc < -9 and Twc >= -27:
-        effectTwc = -2
-        comfortable = 0
-    elif Twc < -27 and Twc >= -39:
-        effectTwc = -3
-        comfortable = 0
-    elif Twc < -39 and Twc >= -47:
-        effectTwc = -4
-        comfortable = 0
-    elif Twc < -47 and Twc >= -54:
-        effectTwc = -5
-        comfortable = 0
-    elif Twc < -54:
-        effectTwc = -6
-        comfortable = 0
-    
-    return Twc, effectTwc, comfortable
-
-
-def effectiveTemperature(Ta, ws, rh, SR, ac):
-    if ws <= 0.2:
-        # formula by Missenard
-        TE = Ta - 0.4*(Ta - 10)*(1-rh/100)
-    elif ws > 0.2:
-        # modified formula by Gregorczuk (WMO, 1972; Hentschel, 1987)
-        TE = 37 - ( (37-Ta)/(0.68-(0.0014*rh)+(1/(1.76+1.4*(ws**0.75)))) ) - (0.29 * Ta * (1-0.01*rh))
-    
-    # Radiative-effective temperature
-    TRE = TE + ((1 - 0.01*ac)*SR) * ((0.0155 - 0.00025*TE) - (0.0043 - 0.00011*TE))
-    
-    if TRE < 1:
-        effectTE = -4
-        comfortable = 0
-    elif TRE >= 1 and TE < 9:
-        effectTE = -3
-        comfortable = 0
-    elif TRE >= 9 and TE < 17:
-        effectTE = -2
-        comfortable = 0
-    elif TRE >= 17 and TE < 21:
-        effectTE = -1
-        comfortable = 0
-    elif TRE >= 21 and TE < 23:
-        effectTE = 0
-        comfortable = 1
-    elif TRE >= 23 and TE < 27:
-        effectTE = 1
-        comfortable = 0
-    elif TRE >= 27:
-        effectTE = 2
-        comfortable = 0
-    
-    return TRE, effectTE, comfortable
-
-
-def apparentTemperature(Ta, ws, rh):
-    
-    e = (rh/100) * 6.105 * math.exp((17.27*Ta)/(237.7+Ta))
-    AT = Ta + (0.33*e) - (0.70*ws) - 4.00
-    
-    # Apparel effects by: Norms of apparent temperature in Australia, Aust. Met. Mag., 1994, Vol 43, 1-16:
-    if AT > 40:
-        effectAT = 4
-        comfortable = 0
-    elif AT > 35 and AT <= 40:
-        effectAT = 3
-        comfortable = 0
-    elif AT > 30 and AT <= 35:
-        effectAT = 2
-        comfortable = 0
-    elif AT > 25 and AT <= 30:
-        effectAT = 1
-        comfortable = 0
-    elif AT > 20 and AT <= 25:
-        effectAT = 0
-        comfortable = 1
-    elif AT > 15 and AT <= 20:
-        effectAT = -1
-        comfortable = 0
-    elif AT > 10 and AT <= 15:
-        effectAT = -2
-        comfortable = 0
-    elif AT > 5 and AT <= 10:
-        effectAT = -3
-        comfortable = 0
-    elif AT > 0 and AT <= 5:
-        effectAT = -4
-        comfortable = 0
-    elif AT > -5 and AT <= 0:
-        effectAT = -5
-        comfortable = 0
-    elif AT <= -5:
-        effectAT = -6
-        comfortable = 0
-    
-    return AT, effectAT, comfortable
-
-
-def thermalSensation(Ta, ws, rh, SR, Tground):
-    # formula from: Givoni, Noguchi, Issues and problems in outdoor comfort research, in: Proceedings of the PLEA2000 Conference, Cambridge, UK, July 2000
-    TS=1.7+0.1118*Ta+0.0019*SR-0.322*ws-0.0073*rh+0.0054*Tground
-    
-    if TS < 2:
-        effectTS = -3
-        comfortable = 0
-    elif TS >= 2 and TS < 3:
-        effectTS = -2
-        comfortable = 0
-    elif TS >= 3 and TS < 4:
-        effectTS = -1
-        comfortable = 0
-    elif TS >= 4 and TS < 5:
-        effectTS = 0
-        comfortable = 1
-    elif TS >= 5 and TS < 6:
-        effectTS = 1
-        comfortable = 0
-    elif TS >= 6 and TS < 7:
-        effectTS = 2
-        comfortable = 0
-    elif TS >= 7:
-        effectTS = 3
-        comfortable = 0
-    
-    return TS, effectTS, comfortable
-
-
-def actualSensationModel(Ta, ws, rh, SR):
-    # Actual Sensation Model for whole Europe 
-    # formula by RUROS project.
-    ASV = 0.049*Ta + 0.001*SR - 0.051*ws + 0.014*rh - 2.079
-    
-    # Classification of human thermal sensation according to TS levels and ASV scale
-    # Givoni and Noguchi, 2000; Nikolopoulou et al., 2004
-    if ASV < -2:
-        effectASV = -2
-        comfortable = 0
-    elif ASV >= -2 and ASV < -1:
-        effectASV = -1
-        comfortable = 0
-    elif ASV >= -1 and ASV <= 1:
-        effectASV = 0
-        comfortable = 1
-    elif ASV > 1 and ASV <= 2:
-        effectASV = 1
-        comfortable = 0
-    elif ASV > 2:
-        effectASV = 2
-        comfortable = 0
-    
-    return ASV, effectASV, comfortable
-
-
-def noaaSolarCalculator(latitude, longitude, timeZone, month, day, hour):
-    # by NOAA Earth System Research Laboratory
-    # NOAA defines longitude and time zone as positive to the west:
-    timeZone = -timeZone
-    longitude = -longitude
-    DOY = int(lb_preparation.getJD(month, day))
-    minute = 0  # default
-    second = 0  # default
-    gamma = (2*math.pi)/365*(DOY-1+((hour-12)/24))
-    eqtime = 229.18*(0.000075 + 0.001868*math.cos(gamma) - 0.032077*math.sin(gamma) - 0.014615*math.cos(2*gamma) - 0.040849*math.sin(2*gamma))
-    declAngle = 0.006918 - 0.399912*math.cos(gamma) + 0.070257*math.sin(gamma) - 0.006758*math.cos(2*gamma) + 0.000907*math.sin(2*gamma) - 0.002697*math.cos(3*gamma) + 0.00148*math.sin(3*gamma)
-    time_offset = eqtime-4*longitude+60*timeZone
-    tst = hour *60 + minute + second / 60 + time_offset
-    solarHangle = (tst / 4) - 180
-    
-    # solar zenith angle
-    solarZenithR = math.acos(math.sin(math.radians(latitude)) * math.sin(declAngle) + math.cos(math.radians(latitude)) * math.cos(declAngle) * math.cos(math.radians(solarHangle)))
-    solarZenithD = math.degrees(solarZenithR)
-    if solarZenithD > 90:
-        solarZenithD = 90
-    elif solarZenithD < 0:
-        solarZenithD = 0
-    
-    # solar altitude angle
-    solarAltitudeD = 90 - solarZenithD
-    
-    # solar azimuth angle
-    solarAzimuthR = - (math.sin(math.radians(latitude)) * math.cos(solarZenithR) - math.sin(declAngle)) / (math.cos(math.radians(latitude)) * math.sin(solarZenithR))
-    solarAzimuthR = math.acos(solarAzimuthR)
-    solarAzimuthD = math.degrees(solarAzimuthR)
-    
-    return solarZenithD, solarAzimuthD, solarAltitudeD
-
-
-def solarRadiationNudeMan(Kglob, hSl, ac):
-    # formula from: Bioclimatic principles of recreation and tourism in Poland, 2nd edition, Blazejczyk, Kunert, 2011 (MENEX_2005 model)
-    Kt = Kglob / (-0.0015*(hSl**3) + 0.1796*(hSl**2) + 9.6375*hSl - 11.9)
-    
-    ac_ = 1 - 0.01*ac
-    
-    # Rprim - solar radiation absorbed by nude man (W/m2)
-    if hSl <= 12:
-        Rprim = ac_*(0.0014*(Kglob**2) + 0.476*Kglob - 3.8)
-    elif hSl > 12 and Kt <= 0.8:
-        Rprim = 0.2467*ac_*(Kglob**0.9763)
-    elif hSl > 12 and Kt >0.8 and Kt <=1.05:
-        Rprim = 3.6922*ac_*(Kglob**0.5842)
-    elif hSl > 12 and Kt > 1.05 and Kt <=1.2:
-        Rprim = 43.426*ac_*(Kglob**0.2326)
-    elif hSl > 12 and Kt >1.2:
-        Rprim = 8.9281*ac_*(Kglob**0.4861)
-        
-    if Rprim < 0:
-        Rprim = 0
-    
-    return Rprim
-
-
-def groundTemperature(Ta, N):
-    # formula from: Assessment of bioclimatic differentiation of Poland. Based on the human heat balance, Geographia Polonica, Matzarakis, Blazejczyk, 2007
-    N100 = N *10 #converting weather data totalSkyCover from 0 to 10% to 0 to 100%
-    
-    if (N100 == None) or (N100 >= 80):
-        Tground = Ta
-    elif (N100 < 80) and (Ta >= 0):
-        Tground = 1.25*Ta
-    elif (N100 < 80) and (Ta < 0):
-        Tground = 0.9*Ta
-    
-    return Tground
-
-
-def VapourPressure(Ta, rh):
-    # formula by ITS-90 formulations for vapor pressure, frostpoint temperature, dewpoint temperature, and enhancement factors in the range 100 to +100 c, Thunder Scientific Corporation, Albuquerque, NM, Bob Hardy
-    TaK = Ta + 273.15   # convert to Kelvins
-    
-    TS90coefficients = [-2.8365744*(10**(3)), -6.028076559*(10**(3)), 1.954263612*(10**(1)), -2.737830188*(10**(-2)), 1.6261698*(10**(-5)), 7.0229056*(10**(-10)), -1.8680009*(10**(-13)), 2.7150305]
-    e_s = TS90coefficients[7]*math.log(TaK)
-    
-    for i in range(7):
-        e_s += TS90coefficients[i]*(TaK**(i-2))
-    
-    es = math.exp(e_s)  # in Pa
-    
-    es = (es*0.01*rh)/100  # convert to hPa
-    
-    return es
-
-
-def meanRadiantTemperature(Ta, Tground, Rprim, e, N):
-    # formula by Man-ENvironment heat EXchange model (MENEX_2005)
-    
-    La = 5.5*(10**(-8)) *((273 + Ta)**(4)) *(0.82 - 0.25*(10**(-0.094*0.75*e))) * (1 + 0.22*((N/10)**2.75))  # incoming long-wave radiation emitted from the sky hemisphere, in W/m2
-    Lg = 5.5 *(10**(-8)) * ((273 + Tground)**(4))  # outgoing long-wave radiation emitted by the ground, in W/m2
-    
-    MRT = (((Rprim + 0.5*Lg + 0.5*La) / (0.95*5.667*(10**(-8))))**(0.25)) - 273  # in C
-    
-    return MRT
-
-
-def wbgt_indoors(Ta, ws, rh, e, MRT, Tdp):
-    # WBGT indoor formula by Bernard
-    # formula from: "Calculating Workplace WBGT from Meteorological Data: A Tool for Climate Change Assessment", Lemke, Kjellstrom, 2012
-    # natural wet bulb temperature based on code written by Nick Burns: https://github.com/nickb-/Calculating-WBGT/blob/master/relaxation_Tw/working_code/wbgt.R
-    
-    ed = 0.6106 * math.exp(17.27 * Tdp / (237.7 + Tdp))
-    step = 0.02  # lowering the step value increases precision
-    Tpwb = Tdp + step
-    McPherson_1 = 1
-    McPherson_2 = 1
-    while Tpwb <= Ta and ((McPherson_1 > 0 and McPherson_2 > 0) or (McPherson_1 < 0 and McPherson_2 <0)):
-        ew = 0.6106 * math.exp(17.27 * Tpwb / (237.7 + Tpwb))
-        McPherson_1 = McPherson_2
-        McPherson_2 = 1556*ed - 1.484*ed*Tpwb - 1556*ew + 1.484*ew*Tpwb + 101*(Ta - Tpwb)
-        Tpwb = Tpwb + step
-    
-    if (ws > 3):
-        WBGTid = 0.7*Tpwb + 0.3*Ta
-    elif (ws >= 0.3) and (ws <= 3):
-        WBGTid = 0.67 * Tpwb + 0.33 * Ta - 0.048*math.log10(ws) * (Ta - Tpwb)
-    elif (ws < 0.3):
-        ws = 0.3
-        WBGTid = 0.67 * Tpwb + 0.33 * Ta - 0.048*math.log10(ws) * (Ta - Tpwb)
-    WBGT_f = celsiusToFahrenheit(WBGTid)
-    
-    # Suggested actions and Impact Prevention by Environmental Health Section, Dwight D. Eisenhower Medical Center:
-    if WBGT_f < 80:
-        effectWBGT = 0
-        comfortable = 1
-    elif WBGT_f >= 80 and WBGT_f < 82:
-        effectWBGT = 1
-        comfortable = 0
-    elif WBGT_f >= 82 and WBGT_f < 85:
-        effectWBGT = 2
-        comfortable = 0
-    elif WBGT_f >=85 and WBGT_f < 88:
-        effectWBGT = 3
-        comfortable = 0
-    elif WBGT_f >=88 and WBGT_f < 90:
-        effectWBGT = 4
-        comfortable = 0
-    elif WBGT_f >= 90:
-        effectWBGT = 5
-        comfortable = 0
-    
-    return WBGTid, effectWBGT, comfortable
-
-
-def wbgt_outdoors(Ta, ws, rh, e, MRT):
-    # WBGT outdoor formula from Heat stress and occupational health and safety  spatial and temporal differentiation, K. Blazejczyk, J.Baranowski, A. Blazejczyk, Miscellanea geographica  regional studies on development, Vol. 18, No. 1, 2014, 
-    Tw = 1.885 + 0.3704*Ta + 0.4492*e
-    Tg = 2.098 - 2.561*ws + 0.5957*Ta + 0.4017*MRT
-    WBGTout = 0.7*Tw + 0.2*Tg + 0.1*Ta
-    WBGT_f = celsiusToFahrenheit(WBGTout)
-    
-    # Suggested actions and Impact Prevention by Environmental Health Section, Dwight D. Eisenhower Medical Center:
-    if WBGT_f < 80:
-        effectWBGT = 0
-        comfortable = 1
-    elif WBGT_f >= 80 and WBGT_f < 82:
-        effectWBGT = 1
-        comfortable = 0
-    elif WBGT_f >= 82 and WBGT_f < 85:
-        effectWBGT = 2
-        comfortable = 0
-    elif WBGT_f >=85 and WBGT_f < 88:
-        effectWBGT = 3
-        comfortable = 0
-    elif WBGT_f >=88 and WBGT_f < 90:
-        effectWBGT = 4
-        comfortable = 0
-    elif WBGT_f >= 90:
-        effectWBGT = 5
-        comfortable = 0
-    
-    return WBGTout, effectWBGT, comfortable
-
-
-def predictedInsulationIndexOfClothing(Ta, ws, M):
-    # total insulation of clothing and the surrounding air layer by Burton and Edholm (1955)
-    It = (0.082*(91.4 - (1.8*Ta + 32)) / (0.01724*M))
-    # insulation of the surrounded air layer by Fourt and Hollies (1970)
-    Ia = 1/(0.61+1.9*(ws**0.5))
-    
-    Iclp = It - Ia  # in clo
-    
-    if Iclp > 4.0:
-        effectIclp = -4
-        comfortable = 1
-    elif Iclp > 3.0 and Iclp <= 4.0:
-        effectIclp = -3
-        comfortable = 0
-    elif Iclp > 2.0 and Iclp <= 3.0:
-        effectIclp = -2
-        comfortable = 0
-    elif Iclp > 1.20 and Iclp <= 2.0:
-        effectIclp = -1
-        comfortable = 0
-    elif Iclp > 0.80 and Iclp <= 1.20:
-        effectIclp = 0
-        comfortable = 1
-    elif Iclp > 0.30 and Iclp <= 0.80:
-        effectIclp = 1
-        comfortable = 0
-    elif Iclp <= 0.30:
-        effectIclp = 2
-        comfortable = 0
-    
-    if Iclp < 0.5: Iclp = 0.5  # summer clothes (light trousers, short sleeves or blouse)
-    if Iclp > 4.1: Iclp = 4.1  # heavy polar outfit (fur pants, coat, hood, gloves...)
-    
-    return Iclp, effectIclp, comfortable
-
-
-def heartRates(age, sex):
-    #Resting Heart Rates for Man taken from: http://www.topendsports.com/testing/heart-rate-resting-chart.htm
-    if sex == "male":
-        if age <= 25:
-            HRrates = [73,82,90]
-        elif age > 25 and age <= 35:
-            HRrates = [74,82,90]
-        elif age > 35 and age <= 45:
-            HRrates = [75,83,90]
-        elif age > 45 and age <= 55:
-            HRrates = [76,84,90]
-        elif age > 55 and age <= 65:
-            HRrates = [75,82,90]
-        elif age > 65:
-            HRrates = [73,80,90]
-    elif sex == "female":
-        if age <= 25:
-            HRrates = [78,85,90]
-        elif age > 25 and age <= 35:
-            HRrates = [76,83,90]
-        elif age > 35 and age <= 45:
-            HRrates = [78,85,90]
-        elif age > 45 and age <= 55:
-            HRrates = [77,84,90]
-        elif age > 55 and age <= 65:
-            HRrates = [77,84,90]
-        elif age > 65:
-            HRrates = [76,84,90]
-    
-    return HRrates
-
-
-def heartRate(Ta, e, M, HRrates):
-    #formula by Fuller, Brouha 1966
-    HR = 22.4 + 0.18*M + 0.25*(5*Ta + 2.66*e)
-    HR = int(round(HR))
-    
-    if HR < HRrates[0]:
-        effectHR = 0
-        comfortable = 1
-    elif HR >= HRrates[0] and HR < HRrates[1]:
-        effectHR = 1
-        comfortable = 0
-    elif HR >= HRrates[1] and HR < HRrates[2]:
-        effectHR = 2
-        comfortable = 0
-    elif HR >= HRrates[2]:
-        effectHR = 3
-        comfortable = 0
-    
-    return HR, effectHR, comfortable
-
-
-def clothingInsulation(Ta):
-    # by MENEX_2005 model
-    if Ta > 25:
-        Icl = 0.5  # summer clothes
-    else:
-        Icl = 1.691 - 0.0436*Ta
-    
-    if Icl > 4:
-        Icl = 4.1  # Heavy polar outfit
-    
-    return Icl
-
-
-def meanSkinTemperature(Ta, ws, rh, MRT, Icl, M):
-    
-    Ts = (26.4 + 0.02138*MRT + 0.2095*Ta - 0.0185*rh - 0.009*ws) + 0.6*(Icl - 1) + 0.00128*M
-    return Ts  # in C
-
-
-def turbulentExchangeOfLatentHeat(Ta, ws, Ts, Icl, e_, M):
-    # Turbulent exchange of latent heat (evaporation - mE) in W/m2
-    
-    p = 1000  # barometricpressure in hPa, default value
-    he = Ta*(6*(10**(-5))*Ta - 2*(10**(-5))*p + 0.011) + 0.02*p - 0.773
-    
-    hc = 0.013*p - 0.04*Ta - 0.503
-    
-    vprim = 1.1 #m/s default value (for man movement 4km/h)
-    d = math.sqrt(ws+vprim)
-    
-    if Ts < 22:
-        w = 0.002
-    elif Ts >= 22 and Ts <= 36.5:
-        w = 1.031/(37.5-Ts)- 0.065
-    elif Ts > 36.5:
-        w = 1.0
-    
-    if ws >= 0.2:
-        vcor = ws
-    elif ws < 0.2:
-        vcor = 0.2
-    d_ = 0.53/ (Icl *(1-0.27*math.exp(0.4*math.log(vcor+vprim))))
-    Ie = hc*d_ / (hc*(d + d_))
-    
-    esk = math.exp(0.058*Ts + 2.003)
-    
-    mE = he*d*w*Ie*(e_-esk) - 0.42*(M - 58.0) + 5.04
-    
-    return mE
-
-
-def DehydrationRiskRates(acclimated):
-    if acclimated == "acclimated":
-        dehydrationRiskRates = [780,1040]
-    elif acclimated == "unacclimated":
-        dehydrationRiskRates = [520,650]
-    
-    return dehydrationRiskRates
-
-
-def dehydrationRisk(Epot, dehydrationRiskRates):
-    # formula from MENEX_2005 model
-    # water loss
-    SW = -2.6*Epot  # in g/hour
-    
-    if SW < dehydrationRiskRates[0]:
-        effectSW = 0
-        comfortable = 1
-    elif SW >= dehydrationRiskRates[0] and SW <= dehydrationRiskRates[1]:
-        effectSW = 1
-        comfortable = 0
-    elif SW > dehydrationRiskRates[1]:
-        effectSW = 2
-        comfortable = 0
-    
-    return SW, effectSW, comfortable
-
-
-def physiologicalEquivalentTemperature(climate, Ta, ws, rh, MRT, age, sex, heightM, weight, bodyPosition, M, Icl):
-    # based on: Peter Hoeppe PET fortran code, from:
-    # "Urban climatic map and standards for wind environment - Feasibility study, Technical Input Report No.1",
-    # The Chinese University of Hong Kong, Planning Department, Nov 2008
-    
-    petObj = lb_comfortModels.physiologicalEquivalentTemperature(Ta, MRT, rh, ws, age, sex, heightM, weight, bodyPosition, M, Icl)
-    respiration = petObj.inkoerp()
-    coreTemperature, radiationBalance, convection, waterVaporDiffusion = petObj.berech()
-    petObj.pet()
-    skinTemperature, totalHeatLoss, skinSweating, internalHeat, sweatEvaporation, PET = petObj.tsk, petObj.wsum, petObj.wetsk, petObj.h, petObj.esw, petObj.tx
-    effectPET, comfortablePET = petObj.thermalCategories(climate)
-    
-    PETresults = [coreTemperature, skinTemperature, totalHeatLoss, skinSweating, internalHeat, radiationBalance, convection, waterVaporDiffusion, sweatEvaporation, respiration]
-    
-    return PET, effectPET, comfortablePET, PETresults
-
-
-def temperatureHumidityIndex(Ta, Tdp):
-    # formula and categories based on: Taiwan's Central Weather Bureau
-    THI = Ta - 0.55 * (1-math.exp((17.269*Tdp)/(Tdp+237.3)-(17.269*Ta)/(Ta+237.3))) * (Ta-14)  # Taiwan's Central Weather Bureau Comfort Index
-    
-    if THI < 11:
-        effectTHI = -3
-        comfortable = 0
-    elif THI >= 11 and THI < 16:
-        effectTHI = -2
-        comfortable = 0
-    elif THI >= 16 and THI < 20:
-        effectTHI = -1
-        comfortable = 0
-    elif THI >= 20 and THI < 27:
-        effectTHI = 0
-        comfortable = 1
-    elif THI >= 27 and THI < 31:
-        effectTHI = 1
-        comfortable = 0
-    elif THI >= 31:
-        effectTHI = 2
-        comfortable = 0
-    
-    return THI, effectTHI, comfortable
-
-
-def predictedHeatStrain(Ta, mrt, ws, vapourPressure, heightM, weight, bodyPosition, Icl, acclimated, Met, activityDuration):
-    # based on: Dr. Jacques Malchaire Quick Basic code from:
-    # "Ergonomics of the thermal environment - Analytical determination and interpretation of heat stress using calculation of predicted heat strain", ISO 7933, 2004
-    
-    drink = 1  # if drink = 1: water replacement is sufficient, and workers can drink freely; otherwise: drink = 0
-    if acclimated == "acclimated":  # 100 if acclimatised person, 0 if unacclimatised person
-        accl = 100
-    elif acclimated == "unacclimated":
-        accl = 0
-    
-    # Effective radiating area of the body (1 = sitting, 2 = standing, 3 = crouching)
-    if bodyPosition == "sitting":
-        Ardu = 0.7  # dimensionless
-    elif bodyPosition == "standing":
-        Ardu = 0.77  # dimensionless
-    elif bodyPosition == "crouching":
-        Ardu = 0.67  # dimensionless
-    
-    Pa = vapourPressure * 0.1  # partial water vapour pressure, converted from hectopascals to kilopascals
-    Work = 0  # effective mechanical power, in W/m2
-    imst = 0.38  # static moisture permeability index, dimensionless
-    Ap = 0.54  # fraction of the body surface covered by the reflective clothing, dimensionless
-    Fr = 0.97  # emissivity of the reflective clothing, dimensionless
-    # walking
-    defspeed = 1  # 1 if walking speed entered, 0 otherwise
-    Walksp = 0  # walking speed, in m/s
-    defdir = 1  # 1 if walking direction entered, 0 otherwise
-    THETA = 0  # angle between walking direction and wind direction degrees
-    
-    Adu = 0.202 * weight ** 0.425 * heightM ** 0.725  # body surface area in m2
-    spHeat = 57.83 * weight / Adu
-    
-    SWp = 0
-    SWtot = 0; Tre = 36.8; Tcr = 36.8; Tsk = 34.1; Tcreq = 36.8; TskTcrwg = 0.3
-    Dlimtre = 0; Dlimloss50 = 0; Dlimloss95 = 0
-    Dmax50 = 0.075 * weight * 1000
-    Dmax95 = 0.05 * weight * 1000
-    
-    # EXPONENTIAL AVERAGING CONSTANTS
-    # Core temperature as a function of the metabolic rate: time constant: 10 minutes
-    ConstTeq = math.exp(-1 / 10)
-    # Skin Temperature: time constant: 3 minutes
-    ConstTsk = math.exp(-1 / 3)
-    # Sweat rate: time constant: 10 minutes
-    ConstSW = math.exp(-1 / 10)
-    
-    for time in range(1, activityDuration+1):  # activityDuration - the duration of the work sequence in minutes
-        # INITIALISATION MIN PER MIN
-        Tsk0 = Tsk; Tre0 = Tre; Tcr0 = Tcr; Tcreq0 = Tcreq; TskTcrwg0 = TskTcrwg
-        
-        # EVALUATION OF THE MAXIMUM SWEAT RATE AS A FUNCTION OF THE METABOLIC RATE
-        SWmax = (Met - 32) * Adu
-        if SWmax > 400: SWmax = 400
-        if SWmax < 250: SWmax = 250
-        # For acclimatised subjects (accl=100), the maximum Sweat Rate is greater by 25%
-        if accl >= 50: SWmax = SWmax * 1.25
-        if accl < 50: Wmax = 0.85
-        else: Wmax = 1
-        
-        # EQUILIBRIUM CORE TEMPERATURE ASSOCIATED TO THE METABOLIC RATE
-        Tcreqm = 0.0036 * Met + 36.6
-        # Core temperature at this minute, by exponential averaging
-        Tcreq = Tcreq0 * ConstTeq + Tcreqm * (1 - ConstTeq)
-        # Heat storage associated with this core temperature increase during the last minute
-        dStoreq = spHeat * (Tcreq - Tcreq0) * (1 - TskTcrwg0)
-        
-        # SKIN TEMPERATURE PREDICTION
-        # Skin Temperature in equilibrium
-        # Clothed model
-        Tskeqcl = 12.165 + 0.02017 * Ta + 0.04361 * mrt + 0.19354 * Pa - 0.25315 * ws
-        Tskeqcl = Tskeqcl + 0.005346 * Met + 0.51274 * Tre
-        # Nude model
-        Tskeqnu = 7.191 + 0.064 * Ta + 0.061 * mrt + 0.198 * Pa - 0.348 * ws
-        Tskeqnu = Tskeqnu + 0.616 * Tre
-        # Value at this minute, as a function of the clothing insulation
-        if Icl >= 0.6: Tskeq = Tskeqcl
-        else: Tskeq = Tskeqnu + 2.5 * (Tskeqcl - Tskeqnu) * (Icl - 0.2)  # Interpolation between the values for clothed and nude subjects, if  0.2 < clo < 0.6
-        
-        if Icl <= 0.2: Tskeq = Tskeqnu
-        else: Tskeq = Tskeqnu + 2.5 * (Tskeqcl - Tskeqnu) * (Icl - 0.2)  # Interpolation between the values for clothed and nude subjects, if  0.2 < clo < 0.6
-        
-        # Skin Temperature at this minute, by exponential averaging
-        Tsk = Tsk0 * ConstTsk + Tskeq * (1 - ConstTsk)
-        # Saturated water vapour pressure at the surface of the skin
-        Psk = 0.6105 * math.exp(17.27 * Tsk / (Tsk + 237.3))
-        
-        # CLOTHING INFLUENCE ON EXCHANGE COEFFICIENTS
-        # Static clothing insulation
-        Iclst = Icl * 0.155
-        # Clothing area factor
-        fcl = 1 + 0.3 * Icl
-        # Static boundary layer thermal insulation in quiet air
-        Iast = 0.111
-        # Total static insulation
-        Itotst = Iclst + Iast / fcl
-        
-        # Relative velocities due to air velocity and movements
-        if defspeed > 0:
-            if defdir == 1:
-                # Unidirectional walking
-                Var = abs(ws - Walksp * math.cos(3.14159 * THETA / 180))
-            else:
-                # Omni-directional walking
-                if ws < Walksp:
-                    Var = Walksp
-                else: Var = ws
-        else:
-            # Stationary or undefined speed
-            Walksp = 0.0052 * (Met - 58)
-            if Walksp > 0.7:
-                Walksp = 0.7
-            Var = ws
-        
-        # Dynamic clothing insulation
-        # Clothing insulation correction for wind (Var) and walking (Walksp) 
-        Vaux = Var
-        if Var > 3:
-            Vaux = 3
-        Waux = Walksp
-        if Walksp > 1.5:
-            Waux = 1.5
-        CORcl = 1.044 * math.exp((.066 * Vaux - 0.398) * Vaux + (.094 * Waux - 0.378) * Waux)
-        if CORcl > 1:
-            CORcl = 1
-        CORia = math.exp((.047 * Var - 0.472) * Var + (.117 * Waux - 0.342) * Waux)
-        if CORia > 1:
-            CORia = 1
-         
-        CORtot = CORcl
-        if Icl <= 0.6:
-            CORtot = ((.6 - Icl) * CORia + Icl * CORcl) / .6
-        
-        Itotdyn = Itotst * CORtot
-        IAdyn = CORia * Iast
-        Icldyn = Itotdyn - IAdyn / fcl
-        
-        # Permeability index
-        # Correction for wind and walking
-        CORe = (2.6 * CORtot - 6.5) * CORtot + 4.9
-        imdyn = imst * CORe
-        if imdyn > 0.9:
-            imdyn = 0.9
-        # Dynamic evaporative resistance
-        Rtdyn = Itotdyn / imdyn / 16.7
-        
-        # HEAT EXCHANGES
-        # Heat exchanges through respiratory convection and evaporation
-        # temperature of the expired air
-        Texp = 28.56 + 0.115 * Ta + 0.641 * Pa
-        Cres = 0.001516 * Met * (Texp - Ta)
-        Eres = 0.00127 * Met * (59.34 + 0.53 * Ta - 11.63 * Pa)
-        
-        # Mean temperature of the clothing: Tcl
-        # Dynamic convection coefficient
-        Z = 3.5 + 5.2 * Var
-        if Var > 1:
-            Z = 8.7 * Var ** 0.6
-        Hcdyn = 2.38 * abs(Tsk - Ta) ** 0.25
-        if Z > Hcdyn:
-            Hcdyn = Z
-        
-        auxR = 5.67E-08 * Ardu
-        FclR = (1 - Ap) * 0.97 + Ap * Fr
-        Tcl = mrt + 0.1
-        
-        for k in range(100):
-            # Radiation coefficient
-            Hr = FclR * auxR * ((Tcl + 273) ** 4 - (mrt + 273) ** 4) / (Tcl - mrt)
-            Tcl1 = ((fcl * (Hcdyn * Ta + Hr * mrt) + Tsk / Icldyn)) / (fcl * (Hcdyn + Hr) + 1 / Icldyn)
-            
-            if abs(Tcl - Tcl1) > 0.001:
-                Tcl = (Tcl + Tcl1) / 2
-                continue
-            else:
-                break
-        
-        # Convection and Radiation heat exchanges
-        Conv = fcl * Hcdyn * (Tcl - Ta)
-        Rad = fcl * Hr * (Tcl - mrt)
-        # Maximum Evaporation Rate
-        Emax = (Psk - Pa) / Rtdyn
-        # Required Evaporation Rate
-        Ereq = Met - dStoreq - Work - Cres - Eres - Conv - Rad
-         
-        # INTERPRETATION
-        # Required wettedness
-        wreq = Ereq / Emax
-        
-        # Required Sweat Rate
-        #    If no evaporation required: no sweat rate
-        if Ereq <= 0:
-            Ereq = 0; SWreq = 0;
-        else:
-            #    If evaporation is not possible, sweat rate is maximum
-            if Emax <= 0:
-                Emax = 0; SWreq = SWmax;
-            else:
-                #    If required wettedness greater than 1.7: sweat rate is maximum
-                if wreq >= 1.7:
-                    wreq = 1.7; SWreq = SWmax;
-                else:
-                    #    Required evaporation efficiency
-                    Eveff = (1 - wreq ** 2 / 2)
-                    if wreq > 1:
-                        Eveff = (2 - wreq) ** 2 / 2
-                    SWreq = Ereq / Eveff
-                    if SWreq > SWmax:
-                        SWreq = SWmax
-        
-        # Predicted Sweat Rate, by exponential averaging
-        SWp = SWp * ConstSW + SWreq * (1 - ConstSW)
-        if SWp <= 0:
-            Ep = 0; SWp = 0;
-        else:
-            # Predicted Evaporation Rate
-            k = Emax / SWp
-            wp = 1
-            if k >= 0.5:
-                wp = -k + math.sqrt(k * k + 2)
-            if wp > Wmax:
-                wp = Wmax
-            Ep = wp * Emax
-        
-        # Heat Storage
-        dStorage = Ereq - Ep + dStoreq
-        
-        # PREDICTION OF THE CORE TEMPERATURE
-        Tcr1 = Tcr0
-        for g in range(50):
-            # Skin - Core weighting
-            TskTcrwg = 0.3 - 0.09 * (Tcr1 - 36.8)
-            if TskTcrwg > 0.3:
-                TskTcrwg = 0.3
-            if TskTcrwg < 0.1:
-                TskTcrwg = 0.1
-            
-            Tcr = dStorage / spHeat + Tsk0 * TskTcrwg0 / 2 - Tsk * TskTcrwg / 2
-            Tcr = (Tcr + Tcr0 * (1 - TskTcrwg0 / 2)) / (1 - TskTcrwg / 2)
-            if abs(Tcr - Tcr1) > 0.001:
-                Tcr1 = (Tcr1 + Tcr) / 2;
-                continue
-            else:
-                break
-        
-        # PREDICTION OF THE CENTRAL (RECTAL) TEMPERATURE
-        Tre = Tre0 + (2 * Tcr - 1.962 * Tre0 - 1.31) / 9  # in Celsius degrees
-        
-        if Dlimtre == 0 and Tre >= 38: Dlimtre = time
-        # Total water loss rate during the minute (in W/m2)
-        SWtot = SWtot + SWp + Eres
-        SWtotg = SWtot * 2.67 * Adu / 1.8 / 60
-        
-        if Dlimloss50 == 0 and SWtotg >= Dmax50: Dlimloss50 = time
-        if Dlimloss95 == 0 and SWtotg >= Dmax95: Dlimloss95 = time
-        if drink == 0:
-            Dlimloss95 = Dlimloss95 * 0.6;
-            Dlimloss50 = Dlimloss95
-        continue
-    
-    if Dlimloss50 == 0:
-        Dlimloss50 = activityDuration
-    if Dlimloss95 == 0:
-        Dlimloss95 = activityDuration
-    if Dlimtre == 0:
-        Dlimtre = activityDuration
-    
-    PHSresults = [SWtotg, Dlimloss95, Dlimtre]
-    
-    
-    if (Dlimloss95 >= activityDuration) and (Dlimtre >= activityDuration):
-        effectPHS = 0
-        comfortable = 1
-    elif (Dlimtre <= 30) or (Dlimloss95 <= 30):
-        effectPHS = 4
-        comfortable = 0
-    elif ((Dlimtre > 30) and (Dlimtre <= 120)) or ((Dlimloss95 > 30) and (Dlimloss95 <= 120)):
-        effectPHS = 3
-        comfortable = 0
-    elif ((Dlimtre > 120) and (Dlimtre < (activityDuration - activityDuration*0.015))) or ((Dlimloss95 > 120) and (Dlimloss95 < (activityDuration - activityDuration*0.015))):
-        effectPHS = 2
-        comfortable = 0
-    elif ((Dlimtre >= (activityDuration - activityDuration*0.015)) and (Dlimtre < activityDuration)) or ((Dlimloss95 >= (activityDuration - activityDuration*0.015)) and (Dlimloss95 < activityDuration)):
-        effectPHS = 1
-        comfortable = 0
-    
-    return Tre, effectPHS, comfortable
-
-
 def HOYsDaysMonthsHoursFromHOY_analysisPeriod(HOY, analysisPeriod):
     if (HOY):
         HOYs = HOY
@@ -1991,7 +947,9 @@ level = gh.GH_RuntimeMessageLevel.Warning
 if sc.sticky.has_key("ladybug_release"):
     if sc.sticky["ladybug_release"].isCompatible(ghenv.Component):
         lb_preparation = sc.sticky["ladybug_Preparation"]()
-        lb_comfortModels = sc.sticky["ladybug_ComfortModels"]
+        lb_thermalComfortIndices = sc.sticky["ladybug_ThermalComfortIndices"]()
+        # hot and cold extreme categories of each index (percentHotExtreme, percentColdExtreme)
+        extremeCategories = {0: (4, None), 1: (5, None), 2: (3, -6), 3: (3, -4), 4: (None, -4), 5: (5, None), 6: (5, None), 7: (2, -4), 8: (4, -6), 9: (3, -3), 10: (2, -2), 12: (2, -4), 13: (3, None), 14: (2, None), 15: (4, -4), 16: (4, -4), 17: (2, -3), 18: (4, None)}
         
         if (_comfortIndex != None) and _comfortIndex in range(19):
             locationName, latitude, longitude, timeZone, validLocationData, printMsgLocation = getLocationData(_location)
@@ -1999,78 +957,21 @@ if sc.sticky.has_key("ladybug_release"):
                 TaL, mrtL, TdpL, rhL, wsL, SRL, NL, TgroundL, RprimL, vapourPressureL, EpotL, HOYs, date, newAnalysisPeriod, age, sex, heightCM, heightM, weight, bodyPosition, IclL, ac, acclimated, ML, activityDuration, validWeatherData, printMsgWeather = getWeatherData(latitude, longitude, timeZone, _dryBulbTemperature, meanRadiantTemperature_, dewPointTemperature_, relativeHumidity_, windSpeed_, solarRadiationPerHour_, totalSkyCover_, bodyCharacteristics_, HOY_, analysisPeriod_)
                 if validWeatherData:
                     if _runIt:
-                        HRrates = heartRates(age, sex)
-                        dehydrationRiskRates = DehydrationRiskRates(acclimated)
+                        HRrates = lb_thermalComfortIndices.heartRates(age, sex)
+                        dehydrationRiskRates = lb_thermalComfortIndices.DehydrationRiskRates(acclimated)
                         comfortIndexValue, comfortIndexCategory, comfortableOrNot, outputNickNames, outputDescriptions = createHeaders(_comfortIndex, locationName, newAnalysisPeriod, _dryBulbTemperature, dewPointTemperature_, relativeHumidity_, windSpeed_, solarRadiationPerHour_, totalSkyCover_, HRrates, dehydrationRiskRates, activityDuration)
-                        PETresults = None
-                        for i,hoy in enumerate(HOYs):
-                            listIndex = hoy - 1
-                            if _comfortIndex == 0:
-                                hi,cat,cnc = heatIndex(TaL[listIndex], rhL[listIndex]);  comfortIndexValue.append(hi);  comfortIndexCategory.append(cat);  comfortableOrNot.append(cnc)
-                                HotExtremeCategory = 4
-                            elif _comfortIndex == 1:
-                                humi,cat,cnc = Humidex(TaL[listIndex], TdpL[listIndex]);  comfortIndexValue.append(humi);  comfortIndexCategory.append(cat);  comfortableOrNot.append(cnc)
-                                HotExtremeCategory = 5
-                            elif _comfortIndex == 2:
-                                di,cat,cnc = discomfortIndex(TaL[listIndex], rhL[listIndex]);  comfortIndexValue.append(di);  comfortIndexCategory.append(cat);  comfortableOrNot.append(cnc)
-                                HotExtremeCategory = 3
-                                ColdExtremeCategory = -6
-                            elif _comfortIndex == 3:
-                                wci,cat,cnc = windChillIndex(TaL[listIndex], wsL[listIndex]);  comfortIndexValue.append(wci);  comfortIndexCategory.append(cat);  comfortableOrNot.append(cnc)
-                                HotExtremeCategory = 3
-                                ColdExtremeCategory = -4
-                            elif _comfortIndex == 4:
-                                wct,cat,cnc = windChillTemperature(TaL[listIndex], wsL[listIndex]);  comfortIndexValue.append(wct);  comfortIndexCategory.append(cat);  comfortableOrNot.append(cnc)
-                                ColdExtremeCategory = -4
-                            elif _comfortIndex == 5:
-                                wbgt,cat,cnc = wbgt_indoors(TaL[listIndex], wsL[listIndex], rhL[listIndex], vapourPressureL[listIndex], mrtL[listIndex], TdpL[listIndex]);  comfortIndexValue.append(wbgt);  comfortIndexCategory.append(cat);  comfortableOrNot.append(cnc)
-                                HotExtremeCategory = 5
-                            elif _comfortIndex == 6:
-                                wbgt,cat,cnc = wbgt_outdoors(TaL[listIndex], wsL[listIndex], rhL[listIndex], vapourPressureL[listIndex], mrtL[listIndex]);  comfortIndexValue.append(wbgt);  comfortIndexCategory.append(cat);  comfortableOrNot.append(cnc)
-                                HotExtremeCategory = 5
-                            elif _comfortIndex == 7:
-                                et,cat,cnc = effectiveTemperature(TaL[listIndex], wsL[listIndex], rhL[listIndex], SRL[listIndex], ac);  comfortIndexValue.append(et);  comfortIndexCategory.append(cat);  comfortableOrNot.append(cnc)
-                                HotExtremeCategory = 2
-                                ColdExtremeCategory = -4
-                            elif _comfortIndex == 8:
-                                at,cat,cnc = apparentTemperature(TaL[listIndex], wsL[listIndex], rhL[listIndex]);  comfortIndexValue.append(at);  comfortIndexCategory.append(cat); comfortableOrNot.append(cnc)
-                                HotExtremeCategory = 4
-                                ColdExtremeCategory = -6
-                            elif _comfortIndex == 9:
-                                ts,cat,cnc = thermalSensation(TaL[listIndex], wsL[listIndex], rhL[listIndex], SRL[listIndex], TgroundL[listIndex]);  comfortIndexValue.append(ts);  comfortIndexCategory.append(cat);  comfortableOrNot.append(cnc)
-                                HotExtremeCategory = 3
-                                ColdExtremeCategory = -3
-                            elif _comfortIndex == 10:
-                                asv,cat,cnc = actualSensationModel(TaL[listIndex], wsL[listIndex], rhL[listIndex], SRL[listIndex]);  comfortIndexValue.append(asv);  comfortIndexCategory.append(cat);  comfortableOrNot.append(cnc)
-                                HotExtremeCategory = 2
-                                ColdExtremeCategory = -2
-                            elif _comfortIndex == 11:
-                                mrt = meanRadiantTemperature(TaL[listIndex], TgroundL[listIndex], RprimL[listIndex], vapourPressureL[listIndex], NL[listIndex]);  comfortIndexValue.append(mrt)
-                            elif _comfortIndex == 12:
-                                iclp,cat,cnc = predictedInsulationIndexOfClothing(TaL[listIndex], wsL[listIndex], ML[listIndex]);  comfortIndexValue.append(iclp);  comfortIndexCategory.append(cat);  comfortableOrNot.append(cnc)
-                                HotExtremeCategory = 2
-                                ColdExtremeCategory = -4
-                            elif _comfortIndex == 13:
-                                hr,cat,cnc = heartRate(TaL[listIndex], vapourPressureL[listIndex], ML[listIndex], HRrates);  comfortIndexValue.append(hr);  comfortIndexCategory.append(cat);  comfortableOrNot.append(cnc)
-                                HotExtremeCategory = 3
-                            elif _comfortIndex == 14:
-                                sw,cat,cnc = dehydrationRisk(EpotL[i], dehydrationRiskRates);  comfortIndexValue.append(sw);  comfortIndexCategory.append(cat);  comfortableOrNot.append(cnc)
-                                HotExtremeCategory = 2
-                            elif _comfortIndex == 15:
-                                pet,cat,cnc,PETresults = physiologicalEquivalentTemperature("temperate", TaL[listIndex], wsL[listIndex], rhL[listIndex], mrtL[listIndex], age, sex, heightM, weight, bodyPosition, ML[listIndex], IclL[listIndex]);  comfortIndexValue.append(pet);  comfortIndexCategory.append(cat);  comfortableOrNot.append(cnc)
-                                HotExtremeCategory = 4
-                                ColdExtremeCategory = -4
-                            elif _comfortIndex == 16:
-                                pet,cat,cnc,PETresults = physiologicalEquivalentTemperature("humid", TaL[listIndex], wsL[listIndex], rhL[listIndex], mrtL[listIndex], age, sex, heightM, weight, bodyPosition, ML[listIndex], IclL[listIndex]);  comfortIndexValue.append(pet);  comfortIndexCategory.append(cat);  comfortableOrNot.append(cnc)
-                                HotExtremeCategory = 4
-                                ColdExtremeCategory = -4
-                            elif _comfortIndex == 17:
-                                thi,cat,cnc = temperatureHumidityIndex(TaL[listIndex], TdpL[listIndex]);  comfortIndexValue.append(thi);  comfortIndexCategory.append(cat);  comfortableOrNot.append(cnc)
-                                HotExtremeCategory = 2
-                                ColdExtremeCategory = -3
-                            elif _comfortIndex == 18:
-                                phs,cat,cnc = predictedHeatStrain(TaL[listIndex], mrtL[listIndex], wsL[listIndex], vapourPressureL[listIndex], heightM, weight, bodyPosition, IclL[listIndex], acclimated, ML[listIndex], activityDuration);  comfortIndexValue.append(phs);  comfortIndexCategory.append(cat);  comfortableOrNot.append(cnc)
-                                HotExtremeCategory = 4
+                        # calculate the index for all HOYs at once
+                        listIndices = [hoy - 1 for hoy in HOYs]
+                        Ta, mrt, Tdp, rh, ws, SR, N, Tground, Rprim, vapourPressure, Epot, Icl, M = [[data[listIndex] for listIndex in listIndices] for data in [TaL, mrtL, TdpL, rhL, wsL, SRL, NL, TgroundL, RprimL, vapourPressureL, EpotL, IclL, ML]]
+                        bodyCharacteristicsL = [age, sex, heightM, weight, bodyPosition, ac, acclimated, activityDuration]
+                        values, categories, comfortableOrNotL, details = lb_thermalComfortIndices.calculate([_comfortIndex], Ta, mrt, Tdp, rh, ws, SR, N, Tground, Rprim, vapourPressure, Epot, Icl, M, bodyCharacteristicsL)[_comfortIndex]
+                        comfortIndexValue.extend(values)
+                        if _comfortIndex != 11:  # MRT has no categories
+                            comfortIndexCategory.extend(categories)
+                            comfortableOrNot.extend(comfortableOrNotL)
+                        if details: PETresults = details[-1]
+                        else: PETresults = None
+                        HotExtremeCategory, ColdExtremeCategory = extremeCategories.get(_comfortIndex, (None, None))
                         
                         if _comfortIndex != 11:  # not for MRT
                             percentComfortable = (comfortableOrNot[7:].count(1))/(len(comfortIndexValue[7:]))*100
@@ -267,16 +267,24 @@ def main(latitude, longitude, timeZone, locationName, years, months, days, hours
     # TOF mesh generation (mesh width = 80, mesh height = 45)
     meshPtStepU = 80/(len(srfAzimuthTOFList)-1)
     meshPtStepV = 45/(len(srfTiltTOFList)-1)
+    # sun positions and the sky terms are calculated once for all the hours and then used for all the tilt and azimuth angles
+    HOYsCount = len(HOYs)
+    sunZenithDL, sunAzimuthDL, sunAltitudeDL = sc.sticky["ladybug_SolarEphemeris"](latitude, longitude, timeZone, "NREL").positions(years[:HOYsCount], months[:HOYsCount], days[:HOYsCount], [hour-1 for hour in hours[:HOYsCount]])
+    hourlyTerms = lb_photovoltaics.POAirradianceHourlyTerms(sunZenithDL, sunAzimuthDL, directNormalRadiation[:HOYsCount], diffuseHorizontalRadiation[:HOYsCount], albedoL[:HOYsCount])
+    
+    srfTilts = []; srfAzimuths = []
+    for srfTiltTOF in srfTiltTOFList:
+        for srfAzimuthTOF in srfAzimuthTOFList:
+            srfTilts.append(srfTiltTOF)
+            srfAzimuths.append(srfAzimuthTOF)
+    totalRadiationPerYearSweep = lb_photovoltaics.POAirradianceTotals(hourlyTerms, srfTilts, srfAzimuths, parallel = True)  # in Wh/m2
+    
     meshPts = []
     meshLiftedPts = []
     totalRadiationPerYearL = []
     for i,srfTiltTOF in enumerate(srfTiltTOFList):
         for k,srfAzimuthTOF in enumerate(srfAzimuthTOFList):
-            totalRadiationPerYear = 0
-            for g,hoy in enumerate(HOYs):
-                sunZenithD, sunAzimuthD, sunAltitudeD = lb_photovoltaics.NRELsunPosition(latitude, longitude, timeZone, years[g], months[g], days[g], hours[g]-1)
-                Epoa, Eb, Ed_sky, Eground, AOI_R = lb_photovoltaics.POAirradiance(sunZenithD, sunAzimuthD, srfTiltTOF, srfAzimuthTOF, directNormalRadiation[g], diffuseHorizontalRadiation[g], albedoL[g])
-                totalRadiationPerYear += Epoa  # in Wh/m2
+            totalRadiationPerYear = totalRadiationPerYearSweep[i*len(srfAzimuthTOFList) + k]
             totalRadiationPerYearL.append(totalRadiationPerYear)
             if anglesClockwise == True:  # angles clockwise
                 meshPt = Rhino.Geometry.Point3d(originOffset.X + meshPtStepU*k, originOffset.Y + meshPtStepV*i, originOffset.Z)
@@ -392,11 +400,7 @@ def main(latitude, longitude, timeZone, locationName, years, months, days, hours
             analysisPt = Rhino.Geometry.Point3d( (oppositeOriginOffset.X-15-15) -((srfAzimuthD-azimuthMeshStartValue)*80/180), originOffset.Y+srfTiltD*45/90, originOffset.Z+tol)
     
     # totalRadiationPerYear of the inputted (analysed) surface
-    totalRadiationPerYear = 0
-    for i,hoy in enumerate(HOYs):
-        sunZenithD, sunAzimuthD, sunAltitudeD = lb_photovoltaics.NRELsunPosition(latitude, longitude, timeZone, years[i], months[i], days[i], hours[i]-1)
-        Epoa, Eb, Ed_sky, Eground, AOI_R = lb_photovoltaics.POAirradiance(sunZenithD, sunAzimuthD, srfTiltD, srfAzimuthD, directNormalRadiation[i], diffuseHorizontalRadiation[i], albedoL[i])
-        totalRadiationPerYear += Epoa  # in Wh/m2
+    totalRadiationPerYear = lb_photovoltaics.POAirradianceTotals(hourlyTerms, [srfTiltD], [srfAzimuthD])[0]  # in Wh/m2
     
     # TOF, TSRF of the inputted (analysed) surface
     TOF = round((totalRadiationPerYear/maximalTotalRadiationPerYear)*100 ,1)  # in percent
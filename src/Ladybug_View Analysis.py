@@ -230,7 +230,14 @@ def runAnalyses(testPoints, ptsNormals, meshSrfAreas, analysisSrfs, contextSrfs,
     if contextSrfs: joinedContext = lb_mesh.joinMesh(contextSrfs)
     else: joinedContext = None
     
-    viewResults, averageViewResults, ptVisibility = lb_runStudy_GH.parallel_viewCalculator(testPoints, ptsNormals, meshSrfAreas, joinedAnalysisMesh, joinedContext, parallel, viewPoints_viewStudy, viewPtsWeights, conversionFac, viewType, patchAreas, geoBlockView)
+    # cast all the rays against one BVH of the geometry and the context
+    lb_occlusion = sc.sticky["ladybug_OcclusionEngine"]
+    # BVH of the context is cached since it usually doesn't change between the runs
+    contextBVH = sc.sticky["ladybug_BVHCache"].get(joinedContext)
+    if geoBlockView: occlusionEngine = lb_occlusion([joinedAnalysisMesh, contextBVH])
+    else: occlusionEngine = lb_occlusion([contextBVH])
+    
+    viewResults, averageViewResults, ptVisibility = lb_runStudy_GH.parallel_viewCalculator(testPoints, ptsNormals, meshSrfAreas, joinedAnalysisMesh, joinedContext, parallel, viewPoints_viewStudy, viewPtsWeights, conversionFac, viewType, patchAreas, geoBlockView, occlusionEngine)
     
     return [viewResults], [averageViewResults], listInfo, ptVisibility
 
@@ -370,7 +370,6 @@ def checkConditionalStatement(annualHourlyData, conditionalStatement, analysisPe
         
         # replace the right list in the conditional statement
         statement = conditionalStatement.split(' ')
-        finalStatement = 'pattern = '
         titleStatement = '...                         ...                         ...\n' +\
                          'Conditional Selection Applied:\n'
         
@@ -378,16 +377,13 @@ def checkConditionalStatement(annualHourlyData, conditionalStatement, analysisPe
             statementCopy = str.Copy(statemntPart)
             if statemntPart!='and' and statemntPart!='or':
                 for num in listNum:
-                    toBeReplacedWith = 'selList[this][HOY]'.replace('this', `num`)
                     titleToBeReplacedWith = listInfo[num][2]
-                    statemntPart = statemntPart.replace(letters[num], toBeReplacedWith, 20000)
                     statementCopy = statementCopy.replace(letters[num], titleToBeReplacedWith, 20000)
                     if statementCopy.find(letters[num])!=-1: break
                     
                 titleStatement = titleStatement + ' ' + statementCopy
             else:
                 titleStatement = titleStatement + '\n' + statementCopy 
-            finalStatement = finalStatement + ' ' + statemntPart
         print titleStatement
         
         #If there is an analysis period connected, change the sel list to only be for that period.
@@ -400,11 +396,8 @@ def checkConditionalStatement(annualHourlyData, conditionalStatement, analysisPe
             selList = newSelList
         
         # check for the pattern
-        patternList = []
         try:
-            for HOY in range(len(HOYS)):
-                exec(finalStatement)
-                patternList.append(pattern)
+            patternList = sc.sticky["ladybug_ConditionalStatement"](conditionalStatement).evaluate(selList, len(HOYS))
         except Exception,e:
             warning = 'There is an error in the conditional statement:\n' + `e`
             print warning
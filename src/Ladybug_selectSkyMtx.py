@@ -56,7 +56,7 @@ from Grasshopper import DataTree
 from Grasshopper.Kernel.Data import GH_Path
 
 
-def getHourlySky(daylightMtxDict, HOY):
+def getHourlySky(skyMtx, HOY):
     # for presentation
     lb_preparation = sc.sticky["ladybug_Preparation"]()
     HOY.sort()
@@ -67,26 +67,20 @@ def getHourlySky(daylightMtxDict, HOY):
         endDate = lb_preparation.hour2Date(HOY[-1], 1)
         analysisP = ((stDate[1]+1, stDate[0], stDate[2]-1),(endDate[1]+1, endDate[0], endDate[2]-1))
     
-    hourlyMtx = []
-    for patchNumber in daylightMtxDict.keys():
-        cumulativeDifValue = 0
-        cumulativeDirValue = 0
-        # adding upp the values
-        try:
-            for hoy in HOY:
-                difValue, dirValue = daylightMtxDict[patchNumber][hoy]
-                cumulativeDifValue += difValue
-                cumulativeDirValue += dirValue 
-        except Exception, e:
-            warning = 'One of the HOYs is less than 1 or greater than 8760.'
-            print warning
-            ghenv.Component.AddRuntimeMessage(gh.GH_RuntimeMessageLevel.Warning, warning)
-        
-        hourlyMtx.append([cumulativeDifValue/1000, cumulativeDirValue/1000])
+    # adding up the values
+    try:
+        selectedValues = skyMtx.select(HOYs = HOY)
+    except ValueError, e:
+        warning = 'One of the HOYs is less than 1 or greater than 8760.'
+        print warning
+        ghenv.Component.AddRuntimeMessage(gh.GH_RuntimeMessageLevel.Warning, warning)
+        selectedValues = skyMtx.select(HOYs = [hoy for hoy in HOY if 1 <= hoy <= 8760 and int(hoy) == hoy])
+    
+    hourlyMtx = [[difValue/1000, dirValue/1000] for difValue, dirValue in selectedValues]
     
     return hourlyMtx, analysisP
 
-def getCumulativeSky(daylightMtxDict, runningPeriod):
+def getCumulativeSky(skyMtx, runningPeriod):
     
     lb_preparation = sc.sticky["ladybug_Preparation"]()
     
@@ -116,20 +110,15 @@ def getCumulativeSky(daylightMtxDict, runningPeriod):
     
     HOYS = selectHourlyData(range(8760), runningPeriod)
     
-    hourlyMtx = []
-    for patchNumber in daylightMtxDict.keys():
-        cumulativeDifValue = 0
-        cumulativeDirValue = 0
-        # adding upp the values
-        try:
-            for HOY in HOYS:
-                difValue, dirValue = daylightMtxDict[patchNumber][HOY + 1]
-                cumulativeDifValue += difValue
-                cumulativeDirValue += dirValue 
-        except Exception, e:
-            print `e`
-            
-        hourlyMtx.append([cumulativeDifValue/1000, cumulativeDirValue/1000])
+    # adding up the values
+    # consecutive hours are summed up from the prefix sums of the sky matrix
+    try:
+        selectedValues = skyMtx.select(HOYs = [HOY + 1 for HOY in HOYS])
+    except Exception, e:
+        print `e`
+        selectedValues = [[0, 0]] * skyMtx.numOfPatches
+    
+    hourlyMtx = [[difValue/1000, dirValue/1000] for difValue, dirValue in selectedValues]
     
     return hourlyMtx
 
@@ -186,10 +175,10 @@ def isLadybugFlying():
 
 skyMtxLists = []
 if _cumulativeSkyMtx and HOY_ and isLadybugFlying:
-    skyMtxLists, _analysisPeriod_ = getHourlySky(_cumulativeSkyMtx.d, HOY_)
+    skyMtxLists, _analysisPeriod_ = getHourlySky(_cumulativeSkyMtx, HOY_)
     unit = 'kWh/m2'
 elif _cumulativeSkyMtx and isLadybugFlying:
-    skyMtxLists = getCumulativeSky(_cumulativeSkyMtx.d, _analysisPeriod_)
+    skyMtxLists = getCumulativeSky(_cumulativeSkyMtx, _analysisPeriod_)
     unit = 'kWh/m2'
 
 selectedSkyMtx = []
@@ -63,6 +63,11 @@ import System
 import time
 from itertools import chain
 import datetime
+import array
+import hashlib
+import heapq
+import bisect
+import ast
 
 PI = math.pi
 rc.Runtime.HostUtils.DisplayOleAlerts(False)
@@ -970,29 +975,44 @@ class Preparation(object):
         cloudCov = [self.strToBeFound, location, 'Total Cloud Cover', 'tenth', 'Hourly', (1, 1, 1), (12, 31, 24)];
         visibility = [self.strToBeFound, location, 'Visibility', 'km', 'Hourly', (1, 1, 1), (12, 31, 24)];
         barPress = [self.strToBeFound, location, 'Barometric Pressure', 'Pa', 'Hourly', (1, 1, 1), (12, 31, 24)];
-        epwfile = open(epw_file,"r")
-        lnum = 1 # line number
-        for line in epwfile:
-            if lnum > 8:
-                modelYear.append(float(line.split(',')[0]))
-                dbTemp.append(float(line.split(',')[6]))
-                dewPoint.append(float(line.split(',')[7]))
-                RH.append(float(line.split(',')[8]))
-                barPress.append(float(line.split(',')[9]))
-                windSpeed.append(float(line.split(',')[21]))
-                windDir.append(float(line.split(',')[20]))
-                dirRad.append(float(line.split(',')[14]))
-                difRad.append(float(line.split(',')[15]))
-                glbRad.append(float(line.split(',')[13]))
-                infRad.append(float(line.split(',')[12]))
-                dirIll.append(float(line.split(',')[17]))
-                difIll.append(float(line.split(',')[18]))
-                glbIll.append(float(line.split(',')[16]))
-                cloudCov.append(float(line.split(',')[22]))
-            lnum += 1
-        epwfile.close()
+        
+        # the parsed columns are cached so reading the same file again is free
+        epwData = self.readEpwColumns(epw_file)
+        modelYear.extend(float(v) for v in epwData.columns[0])
+        dbTemp.extend(epwData.columns[6])
+        dewPoint.extend(epwData.columns[7])
+        RH.extend(epwData.columns[8])
+        barPress.extend(epwData.columns[9])
+        windSpeed.extend(epwData.columns[21])
+        windDir.extend(epwData.columns[20])
+        dirRad.extend(epwData.columns[14])
+        difRad.extend(epwData.columns[15])
+        glbRad.extend(epwData.columns[13])
+        infRad.extend(epwData.columns[12])
+        dirIll.extend(epwData.columns[17])
+        difIll.extend(epwData.columns[18])
+        glbIll.extend(epwData.columns[16])
+        cloudCov.extend(epwData.columns[22])
         return dbTemp, dewPoint, RH, windSpeed, windDir, dirRad, difRad, glbRad, dirIll, difIll, glbIll, cloudCov, infRad, barPress, modelYear
     
+    def readEpwColumns(self, epw_file, maxCachedFiles = 8):
+        # read all the fields of an epw file as columns
+        # results are cached by path, modified time and size of the file
+        epwStat = os.stat(epw_file)
+        key = (os.path.abspath(epw_file), epwStat.st_mtime, epwStat.st_size)
+        
+        if not sc.sticky.has_key("ladybug_EPWCache"): sc.sticky["ladybug_EPWCache"] = [] # least recently used first
+        epwCache = sc.sticky["ladybug_EPWCache"]
+        for count, (cachedKey, cachedData) in enumerate(epwCache):
+            if cachedKey == key:
+                epwCache.append(epwCache.pop(count))
+                return cachedData
+        
+        epwData = EPWData(epw_file)
+        epwCache.append((key, epwData))
+        while len(epwCache) > maxCachedFiles: epwCache.pop(0)
+        return epwData
+    
     ##### Start of Gencumulative Sky
     def removeBlank(self, str):
         newStr = ''
@@ -1474,39 +1494,248 @@ class Preparation(object):
         return (5/9)*(F-32)
 
 
-class Sunpath(object):
+class EPWData(object):
+    """ Hourly data of an epw file with a typed column for each of the 35 fields """
+    
+    fieldNames = ('Year', 'Month', 'Day', 'Hour', 'Minute', 'Data Source and Uncertainty Flags',
+                  'Dry Bulb Temperature', 'Dew Point Temperature', 'Relative Humidity',
+                  'Atmospheric Station Pressure', 'Extraterrestrial Horizontal Radiation',
+                  'Extraterrestrial Direct Normal Radiation', 'Horizontal Infrared Radiation Intensity',
+                  'Global Horizontal Radiation', 'Direct Normal Radiation', 'Diffuse Horizontal Radiation',
+                  'Global Horizontal Illuminance', 'Direct Normal Illuminance', 'Diffuse Horizontal Illuminance',
+                  'Zenith Luminance', 'Wind Direction', 'Wind Speed', 'Total Sky Cover', 'Opaque Sky Cover',
+                  'Visibility', 'Ceiling Height', 'Present Weather Observation', 'Present Weather Codes',
+                  'Precipitable Water', 'Aerosol Optical Depth', 'Snow Depth', 'Days Since Last Snowfall',
+                  'Albedo', 'Liquid Precipitation Depth', 'Liquid Precipitation Quantity')
+    intFields = (0, 1, 2, 3, 4)
+    strFields = (5, 27)
+    # numeric fields that epwDataReader returns. A malformed value in any other field is read as nan
+    usedFields = (6, 7, 8, 9, 12, 13, 14, 15, 16, 17, 18, 20, 21, 22)
+    
+    def __init__(self, epw_file):
+        self.filePath = epw_file
+        self.columns = []
+        for field in range(len(self.fieldNames)):
+            if field in self.intFields: self.columns.append(array.array('i'))
+            elif field in self.strFields: self.columns.append([])
+            else: self.columns.append(array.array('d'))
+        
+        # each line is split once and the values are appended to the columns
+        columns = self.columns
+        unusedFields = [field for field in range(len(self.fieldNames)) if field not in self.intFields + self.strFields + self.usedFields]
+        nan = float("nan")
+        epwfile = open(epw_file, "r")
+        try:
+            for lnum, line in enumerate(epwfile):
+                if lnum < 8 or not line.strip(): continue
+                values = line.strip().split(',')
+                values.extend([''] * (len(self.fieldNames) - len(values)))
+                for field in self.intFields: columns[field].append(int(float(values[field])))
+                for field in self.strFields: columns[field].append(values[field])
+                for field in self.usedFields:
+                    try: columns[field].append(float(values[field]))
+                    except ValueError:
+                        raise ValueError("Invalid %s value '%s' in line %d of %s" % (self.fieldNames[field], values[field], lnum + 1, epw_file))
+                for field in unusedFields:
+                    # missing or malformed values in the fields that are not used are stored as nan
+                    try: columns[field].append(float(values[field]))
+                    except ValueError: columns[field].append(nan)
+        finally:
+            epwfile.close()
+    
+    def __len__(self):
+        return len(self.columns[0])
+    
+    def column(self, field):
+        # field can be the index or the name of the field
+        if not isinstance(field, int): field = self.fieldNames.index(field)
+        return self.columns[field]
+
+
+class ConditionalStatement(object):
     """
-    The sun-path Class is a Python version of RADIANCE sun-path script by Greg Ward. RADIANCE source code can be accessed at:
-    http://www.radiance-online.org/download-install/CVS%20source%20code
-    The difference of the results with NREL version is less than 1 degree
+    A conditional statement such as "a>25 and b<80" that is compiled once.
+    Letters a to z refer to the data lists in order. The statement is parsed into an
+    AST, checked to only use the letters, numbers, comparisons, arithmetic and the
+    abs, min, max and round functions and evaluated over all the hours in a single pass.
+    Masks are cached in the sticky for the statement and the data lists (by identity) that
+    they were calculated for.
     """
-    def __init__(self):
-        pass
     
-    def initTheClass(self, latitude, northAngle = 0, cenPt = rc.Geometry.Point3d.Origin, scale = 100, longtitude = 0, timeZone = 0):
-        self.solLat = math.radians(float(latitude));
-        self.s_longtitude =  math.radians(longtitude) #2.13; # site longtitude (radians)
-        self.s_meridian = math.radians(timeZone * 15) #2.13 #.0944; # standard meridian (radians)
-        self. angle2North = northAngle
-        self.basePlane = rc.Geometry.Plane(cenPt, rc.Geometry.Vector3d.ZAxis)
-        self.cenPt = cenPt
-        self.scale = scale
+    allowedNodes = (ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.USub, ast.UAdd,
+                    ast.Compare, ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.In, ast.NotIn,
+                    ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow,
+                    ast.Num, ast.Name, ast.Load, ast.Tuple, ast.List, ast.Call)
+    allowedFunctions = {"abs": abs, "min": min, "max": max, "round": round}
+    
+    def __init__(self, statement):
+        self.statement = statement.strip()
+        tree = ast.parse(self.statement, mode = 'eval')
+        names = set()
+        functionNames = set() # id of the Name nodes that are called as a function
+        for node in ast.walk(tree):
+            if not isinstance(node, self.allowedNodes):
+                raise ValueError(node.__class__.__name__ + " is not supported in a conditional statement.")
+            if isinstance(node, ast.Call):
+                if not isinstance(node.func, ast.Name) or node.func.id not in self.allowedFunctions:
+                    raise ValueError("Only " + ", ".join(sorted(self.allowedFunctions)) + " functions can be used in a conditional statement.")
+                if node.keywords or getattr(node, 'starargs', None) or getattr(node, 'kwargs', None):
+                    raise ValueError("Keyword and star arguments are not supported in a conditional statement.")
+                functionNames.add(id(node.func))
+            elif isinstance(node, ast.Name) and id(node) not in functionNames and node.id not in ('True', 'False'):
+                if len(node.id) != 1 or not 'a' <= node.id <= 'z':
+                    raise ValueError("Only the letters a to z can be used in a conditional statement. Found: " + node.id)
+                names.add(node.id)
+        
+        self.names = sorted(names)
+        # index of the data list for each letter
+        self.listIndices = [ord(name) - ord('a') for name in self.names]
+        
+        builtins = {"True": True, "False": False}
+        builtins.update(self.allowedFunctions)
+        if self.names:
+            source = "lambda lists: [bool(%s) for %s, in zip(*lists)]" % (self.statement, ", ".join(self.names))
+            builtins.update({"zip": zip, "bool": bool})
+            self.function = eval(compile(source, "<conditional statement>", "eval"), {"__builtins__": builtins})
+        else:
+            self.value = bool(eval(compile(tree, "<conditional statement>", "eval"), {"__builtins__": builtins}))
+    
+    def evaluate(self, dataLists, count = None, maxCachedMasks = 16):
+        """
+        Return a list of True and False values for each hour.
+        dataLists: data lists in the order of the letters. Only the lists that are used in the statement are evaluated.
+        count: number of hours. Default is the length of the shortest data list that is used.
+        """
+        lists = []
+        for index in self.listIndices:
+            if index > len(dataLists) - 1:
+                raise ValueError("A conditional statement is assigned for list number " + `index + 1` + " which doesn't exist!")
+            lists.append(dataLists[index])
+        
+        if not lists:
+            if count == None: raise ValueError("Number of hours should be provided for a statement without any data lists.")
+            return [self.value] * count
+        
+        if count == None: count = min(len(dataList) for dataList in lists)
+        for dataList in lists:
+            if len(dataList) < count: raise IndexError("Length of the data lists is shorter than the number of hours.")
+        
+        # masks are kept for the last statements and data lists so re-running with the same inputs is free
+        # the cache keeps a reference to the lists so their ids can't be re-used by other lists
+        key = (self.statement, count, tuple(id(dataList) for dataList in lists))
+        if not sc.sticky.has_key("ladybug_ConditionalMasks"): sc.sticky["ladybug_ConditionalMasks"] = [] # least recently used first
+        maskCache = sc.sticky["ladybug_ConditionalMasks"]
+        for i, (cachedKey, cachedLists, mask) in enumerate(maskCache):
+            if cachedKey == key:
+                maskCache.append(maskCache.pop(i))
+                return list(mask)
+        
+        mask = self.function([dataList[:count] if len(dataList) > count else dataList for dataList in lists])
+        maskCache.append((key, lists, mask))
+        while len(maskCache) > maxCachedMasks: maskCache.pop(0)
+        return list(mask)
+
+
+class SolarEphemeris(object):
+    """
+    Sun positions for lists of dates and hours with the solar position algorithms that are used in Ladybug:
+        "SUNPATH": NOAA equations (written by Trygve Wastvedt) that are used by the Sunpath class.
+        "NREL": Michalsky (1988) which is used by the Photovoltaics class.
+        "NOAA": NOAA Earth System Research Laboratory fractional year equations.
+    Positions are kept in the sticky for each location and algorithm so the annual
+    positions are only calculated once and are re-used by all the components.
+    """
+    
+    def __init__(self, latitude, longitude, timeZone, algorithm = "SUNPATH", maxCachedLocations = 8):
+        algorithm = algorithm.upper()
+        if algorithm not in ("SUNPATH", "NREL", "NOAA"):
+            raise ValueError("Solar position algorithm should be SUNPATH, NREL or NOAA. Found: " + algorithm)
+        self.algorithm = algorithm
+        self.latitude = float(latitude)
+        self.longitude = float(longitude)
         self.timeZone = timeZone
+        
+        # values that don't change between the hours
+        self.solLat = math.radians(self.latitude)
+        self.longitudeD = math.degrees(math.radians(longitude))
+        self.sinLat = math.sin(self.solLat)
+        self.cosLat = math.cos(self.solLat)
+        
+        key = (algorithm, self.latitude, self.longitude, timeZone)
+        if not sc.sticky.has_key("ladybug_SunPositionCache"): sc.sticky["ladybug_SunPositionCache"] = [] # least recently used first
+        locations = sc.sticky["ladybug_SunPositionCache"]
+        for i, (cachedKey, sunPositions) in enumerate(locations):
+            if cachedKey == key:
+                locations.append(locations.pop(i))
+                break
+        else:
+            sunPositions = {}
+            locations.append((key, sunPositions))
+            while len(locations) > maxCachedLocations: locations.pop(0)
+        self.sunPositions = sunPositions
+    
+    def position(self, year, month, day, hour, solarTime = False):
+        """ return zenith, azimuth and altitude in degrees """
+        if self.algorithm == "SUNPATH":
+            julianDay, solDec, solTime, zenith, solAlt, solAz = self.sunpathPosition(month, day, hour, solarTime)
+            return math.degrees(zenith), math.degrees(solAz), math.degrees(solAlt)
+        elif self.algorithm == "NREL":
+            key = (year, month, day, hour)
+            if key not in self.sunPositions: self.sunPositions[key] = self.nrelPosition(year, month, day, hour)
+        else:
+            key = (month, day, hour)
+            if key not in self.sunPositions: self.sunPositions[key] = self.noaaPosition(month, day, hour)
+        return self.sunPositions[key]
+    
+    def positions(self, years, months, days, hours, solarTime = False):
+        """
+        Sun positions for a list of hours in one pass.
+        years: a list of years or a single year. Only the NREL algorithm uses the year.
+        return lists of zenith, azimuth and altitude in degrees
+        """
+        try: len(years)
+        except TypeError: years = [years] * len(months)
+        
+        zeniths = []; azimuths = []; altitudes = []
+        position = self.position
+        for year, month, day, hour in zip(years, months, days, hours):
+            zenith, azimuth, altitude = position(year, month, day, hour, solarTime)
+            zeniths.append(zenith)
+            azimuths.append(azimuth)
+            altitudes.append(altitude)
+        return zeniths, azimuths, altitudes
+    
+    def sunVectors(self, years, months, days, hours, northAngle = 0, solarTime = False):
+        """
+        Unit vectors from the ground to the sun as (x, y, z) for a list of hours.
+        Y axis is north. northAngle is in radians and counter clockwise, same as Sunpath.
+        """
+        zeniths, azimuths, altitudes = self.positions(years, months, days, hours, solarTime)
+        vectors = []
+        for azimuth, altitude in zip(azimuths, altitudes):
+            azimuth = math.radians(azimuth) - northAngle
+            altitude = math.radians(altitude)
+            vectors.append((math.cos(altitude) * math.sin(azimuth), math.cos(altitude) * math.cos(azimuth), math.sin(altitude)))
+        return vectors
     
     #This part is written by Trygve Wastvedt (Trygve.Wastvedt@gmail.com).
-    def solInitOutput(self, month, day, hour, solarTime = False):
+    def sunpathPosition(self, month, day, hour, solarTime = False):
+        """ return julianDay, solDec, solTime, zenith, solAlt and solAz. Angles are in radians. """
+        key = (month, day, hour, solarTime)
+        if key in self.sunPositions: return self.sunPositions[key]
+        
         year = 2016
-        self.time = hour
+        time = hour
         
         a = 1 if (month < 3) else 0
         y = year + 4800 - a
         m = month + 12*a - 3
-        self.julianDay = day + math.floor((153*m + 2)/5) + 59
+        julianDay = day + math.floor((153*m + 2)/5) + 59
         
-        self.julianDay += (self.time - self.timeZone)/24.0  + 365*y + math.floor(y/4) \
+        julianDay += (time - self.timeZone)/24.0  + 365*y + math.floor(y/4) \
             - math.floor(y/100) + math.floor(y/400) - 32045.5 - 59
         
-        julianCentury = (self.julianDay - 2451545) / 36525
+        julianCentury = (julianDay - 2451545) / 36525
         #degrees
         geomMeanLongSun = (280.46646 + julianCentury * (36000.76983 + julianCentury*0.0003032)) % 360
         #degrees
@@ -1517,11 +1746,6 @@ class Sunpath(object):
             math.sin(math.radians(3*geomMeanAnomSun))*0.000289
         #degrees
         sunTrueLong = geomMeanLongSun + sunEqOfCtr
-        #AUs
-        sunTrueAnom = geomMeanAnomSun + sunEqOfCtr
-        #AUs
-        sunRadVector = (1.000001018*(1 - eccentOrbit**2))/ \
-            (1 + eccentOrbit*math.cos(math.radians(sunTrueLong)))
         #degrees
         sunAppLong = sunTrueLong - 0.00569 - 0.00478*math.sin(math.radians(125.04-1934.136*julianCentury))
         #degrees
@@ -1529,11 +1753,8 @@ class Sunpath(object):
             julianCentury*(0.00059 - julianCentury*0.001813))))/60)/60
         #degrees
         obliqueCorr = meanObliqEcliptic + 0.00256*math.cos(math.radians(125.04 - 1934.136*julianCentury))
-        #degrees
-        sunRightAscen = math.degrees(math.atan2(math.cos(math.radians(obliqueCorr))* \
-            math.sin(math.radians(sunAppLong)), math.cos(math.radians(sunAppLong))))
         #RADIANS
-        self.solDec = math.asin(math.sin(math.radians(obliqueCorr))*math.sin(math.radians(sunAppLong)))
+        solDec = math.asin(math.sin(math.radians(obliqueCorr))*math.sin(math.radians(sunAppLong)))
         
         varY = math.tan(math.radians(obliqueCorr/2))*math.tan(math.radians(obliqueCorr/2))
         #minutes
@@ -1544,25 +1765,230 @@ class Sunpath(object):
             - 1.25*(eccentOrbit**2)*math.sin(2*math.radians(geomMeanAnomSun)))
         #hours
         if solarTime == False:
-            self.solTime = ((self.time*60 + eqOfTime + 4*math.degrees(self.s_longtitude) - 60*self.timeZone) % 1440)/60
-        else: self.solTime = self.time
+            solTime = ((time*60 + eqOfTime + 4*self.longitudeD - 60*self.timeZone) % 1440)/60
+        else: solTime = time
         
         #degrees
-        hourAngle = (self.solTime*15 + 180) if (self.solTime*15 < 0) else (self.solTime*15 - 180)
+        hourAngle = (solTime*15 + 180) if (solTime*15 < 0) else (solTime*15 - 180)
         #RADIANS
-        self.zenith = math.acos(math.sin(self.solLat)*math.sin(self.solDec) \
-            + math.cos(self.solLat)*math.cos(self.solDec)*math.cos(math.radians(hourAngle)))
-        self.solAlt = (math.pi/2) - self.zenith
+        solLat = self.solLat
+        zenith = math.acos(self.sinLat*math.sin(solDec) \
+            + self.cosLat*math.cos(solDec)*math.cos(math.radians(hourAngle)))
+        solAlt = (math.pi/2) - zenith
         
         if hourAngle == 0.0 or hourAngle == -180.0 or hourAngle == 180.0:
-            if self.solDec < self.solLat: self.solAz = math.pi
-            else: self.solAz = 0.0
+            if solDec < solLat: solAz = math.pi
+            else: solAz = 0.0
         else:
-            self.solAz = ((math.acos(((math.sin(self.solLat)*math.cos(self.zenith)) \
-                - math.sin(self.solDec))/(math.cos(self.solLat)*math.sin(self.zenith))) + math.pi) % (2*math.pi)) \
+            solAz = ((math.acos(((self.sinLat*math.cos(zenith)) \
+                - math.sin(solDec))/(self.cosLat*math.sin(zenith))) + math.pi) % (2*math.pi)) \
                 if (hourAngle > 0) else \
-                    ((3*math.pi - math.acos(((math.sin(self.solLat)*math.cos(self.zenith)) \
-                    - math.sin(self.solDec))/(math.cos(self.solLat)*math.sin(self.zenith)))) % (2*math.pi))
+                    ((3*math.pi - math.acos(((self.sinLat*math.cos(zenith)) \
+                    - math.sin(solDec))/(self.cosLat*math.sin(zenith)))) % (2*math.pi))
+        
+        result = (julianDay, solDec, solTime, zenith, solAlt, solAz)
+        self.sunPositions[key] = result
+        return result
+    
+    def nrelPosition(self, year, month, day, hour):
+        latitude = self.latitude
+        longitude = self.longitude
+        timeZone = self.timeZone
+        
+        # sunZenith, sunAzimuth, sunAltitude angles
+        # based on Michalsky (1988), modified to calculate sun azimuth angles for locations south of the equator using the approach described in (Iqbal, 1983)
+        min = 30
+        
+        # leap year
+        if year%4 == 0:
+            k = 1
+        else:
+            k = 0
+        
+        numOfDays = [0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334]
+        jdoy = int(numOfDays[int(month)-1] + int(day))
+        
+        # julian day of year
+        if month > 2:
+            jdoy = jdoy + k
+        
+        # current decimal time of day in UTC
+        tutc = hour + min/60.0 - timeZone
+        
+        if tutc < 0:
+            tutc = tutc + 24
+            jdoy = jdoy - 1
+        elif tutc > 24:
+            tutc = tutc - 24
+            jdoy = jdoy + 1
+        
+        julian = 32916.5 + 365*(year-1949) + int((year-1949)/4) + jdoy + (tutc/24) - 51545
+        
+        mnlong = 280.46 + 0.9856474*julian   # in degrees
+        mnlong = mnlong - 360*int(mnlong/360)
+        
+        if (mnlong < 0):
+            mnlong = (mnlong+360)
+        
+        mnanom = (357.528 + 0.9856003*julian)
+        mnanom = mnanom - 360*int(mnanom/360)
+        
+        if (mnanom < 0):
+            mnanom = (mnanom+360)
+        mnanom = mnanom*(math.pi/180)   # in radians
+        
+        eclong = (mnlong + 1.915*math.sin(mnanom) + 0.02 * math.sin(2*mnanom))
+        eclong = eclong - 360*int(eclong/360)
+        
+        if (eclong < 0):
+            eclong = (eclong+360)
+        eclong = eclong*(math.pi/180)
+        
+        obleq = (math.pi/180)*(23.439 - 0.0000004*julian)
+        
+        if (math.cos(eclong) < 0):
+            ra = math.atan(((math.cos(obleq)*math.sin(eclong))/math.cos(eclong))) + math.pi
+        elif (math.cos(obleq)*math.sin(eclong) < 0):
+            ra = math.atan(((math.cos(obleq)*math.sin(eclong))/math.cos(eclong))) + 2*math.pi
+        else:
+            ra = math.atan(((math.cos(obleq)*math.sin(eclong))/math.cos(eclong)))
+        
+        beta = math.asin(math.sin(obleq)*math.sin(eclong))   # in radians
+        
+        gmst = 6.697375 + 0.0657098242*julian + tutc
+        gmst = gmst - 24*int(gmst/24)
+        
+        if (gmst < 0):
+            gmst = gmst + 24
+        
+        lmst = gmst + longitude/15
+        lmst = lmst - 24*int(lmst/24)
+        
+        if (lmst < 0):
+            lmst = lmst + 24
+       
+        b = 15*(math.pi/180) * lmst - ra
+        
+        if (b < -math.pi):
+            HA = b + 2*math.pi   # in radians
+        elif (b > math.pi):
+            HA = b - 2*math.pi   # in radians
+        else:
+            HA = b
+        
+        # sun altitude, not corrected for radiation (in radians):
+        a = math.sin(beta) * math.sin((math.pi/180)*latitude ) + math.cos(beta) * math.cos((math.pi/180)*latitude ) * math.cos(HA)
+        
+        if (a >= -1) and (a <= 1):
+            alpha0 = math.asin(a)
+        elif (a > 1):
+            alpha0 = math.pi/2
+        elif (a < -1):
+            alpha0 = -math.pi/2
+        
+        # sun altitude, corrected for refraction (in radians):
+        alpha0d = 180/math.pi * alpha0
+        
+        if (alpha0d > -0.56):
+            r = 3.51561*((0.1594+0.0196*alpha0d+0.00002*(alpha0d**2))/(1+0.505*alpha0d+0.0845*(alpha0d**2)))
+        elif (alpha0d <= -0.56):
+            r = 0.56
+        
+        if (alpha0d+r > 90):
+            sunAltitudeR = math.pi/2
+        elif (alpha0d+r <= 90):
+            sunAltitudeR = (math.pi/180) * (alpha0d+r)
+        
+        # sun azimuth angle (in radians):
+        a = (math.sin(alpha0)*math.sin(math.pi/180*latitude ) - math.sin(beta))/(math.cos(alpha0)*math.cos(math.pi/180*latitude ))
+        
+        if (a >= -1) and (a <= 1):
+            b = math.acos(a)
+        elif (math.cos(alpha0) == 0) or (a < -1):
+            b = math.pi
+        elif (a > 1):
+            b = 0
+        
+        if (HA < -math.pi):
+            sunAzimuthR = b
+        elif ((HA >= -math.pi) and (HA <= 0)) or (HA >= math.pi):
+            sunAzimuthR = math.pi - b
+        elif (HA > 0) and (HA < math.pi):
+            sunAzimuthR = math.pi + b
+        
+        # sun zenith angle (in radians)
+        sunZenithR = (math.pi/2) - sunAltitudeR
+        
+        sunZenithD = math.degrees(sunZenithR)
+        sunAzimuthD = math.degrees(sunAzimuthR)
+        sunAltitudeD = math.degrees(sunAltitudeR)
+        
+        return sunZenithD, sunAzimuthD, sunAltitudeD
+    
+    def noaaPosition(self, month, day, hour):
+        latitude = self.latitude
+        longitude = self.longitude
+        timeZone = self.timeZone
+        
+        # by NOAA Earth System Research Laboratory
+        # NOAA defines longitude and time zone as positive to the west:
+        timeZone = -timeZone
+        longitude = -longitude
+        numOfDays = [0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334]
+        DOY = int(numOfDays[int(month)-1] + int(day))
+        minute = 0  # default
+        second = 0  # default
+        gamma = (2*math.pi)/365*(DOY-1+((hour-12)/24))
+        eqtime = 229.18*(0.000075 + 0.001868*math.cos(gamma) - 0.032077*math.sin(gamma) - 0.014615*math.cos(2*gamma) - 0.040849*math.sin(2*gamma))
+        declAngle = 0.006918 - 0.399912*math.cos(gamma) + 0.070257*math.sin(gamma) - 0.006758*math.cos(2*gamma) + 0.000907*math.sin(2*gamma) - 0.002697*math.cos(3*gamma) + 0.00148*math.sin(3*gamma)
+        time_offset = eqtime-4*longitude+60*timeZone
+        tst = hour *60 + minute + second / 60 + time_offset
+        solarHangle = (tst / 4) - 180
+        
+        # solar zenith angle
+        solarZenithR = math.acos(math.sin(math.radians(latitude)) * math.sin(declAngle) + math.cos(math.radians(latitude)) * math.cos(declAngle) * math.cos(math.radians(solarHangle)))
+        solarZenithD = math.degrees(solarZenithR)
+        if solarZenithD > 90:
+            solarZenithD = 90
+        elif solarZenithD < 0:
+            solarZenithD = 0
+        
+        # solar altitude angle
+        solarAltitudeD = 90 - solarZenithD
+        
+        # solar azimuth angle
+        solarAzimuthR = - (math.sin(math.radians(latitude)) * math.cos(solarZenithR) - math.sin(declAngle)) / (math.cos(math.radians(latitude)) * math.sin(solarZenithR))
+        solarAzimuthR = math.acos(solarAzimuthR)
+        solarAzimuthD = math.degrees(solarAzimuthR)
+        
+        return solarZenithD, solarAzimuthD, solarAltitudeD
+
+
+class Sunpath(object):
+    """
+    The sun-path Class is a Python version of RADIANCE sun-path script by Greg Ward. RADIANCE source code can be accessed at:
+    http://www.radiance-online.org/download-install/CVS%20source%20code
+    The difference of the results with NREL version is less than 1 degree
+    """
+    def __init__(self):
+        pass
+    
+    def initTheClass(self, latitude, northAngle = 0, cenPt = rc.Geometry.Point3d.Origin, scale = 100, longtitude = 0, timeZone = 0):
+        self.solLat = math.radians(float(latitude));
+        self.s_longtitude =  math.radians(longtitude) #2.13; # site longtitude (radians)
+        self.s_meridian = math.radians(timeZone * 15) #2.13 #.0944; # standard meridian (radians)
+        self. angle2North = northAngle
+        self.basePlane = rc.Geometry.Plane(cenPt, rc.Geometry.Vector3d.ZAxis)
+        self.cenPt = cenPt
+        self.scale = scale
+        self.timeZone = timeZone
+        self.ephemeris = SolarEphemeris(latitude, longtitude, timeZone, "SUNPATH")
+    
+    #This part is written by Trygve Wastvedt (Trygve.Wastvedt@gmail.com).
+    def solInitOutput(self, month, day, hour, solarTime = False):
+        self.time = hour
+        self.julianDay, self.solDec, self.solTime, self.zenith, self.solAlt, self.solAz = \
+            self.ephemeris.sunpathPosition(month, day, hour, solarTime)
     
     def sunReverseVectorCalc(self):
         basePoint = rc.Geometry.Point3d.Add(rc.Geometry.Point3d.Origin,rc.Geometry.Vector3f(0,1,0))
@@ -2010,50 +2436,421 @@ class Sky:
         return self.colorAvg
 
 
-class MeshPreparation(object):
-    
-    def joinMesh(self, meshList):
-        joinedMesh = rc.Geometry.Mesh()
-        for m in meshList: joinedMesh.Append(m)
-        return joinedMesh
-    
-    def parallel_makeSurfaceMesh(self, brep, gridSize):
-        ## mesh breps
-        def makeMeshFromSrf(i, inputBrep):
-            try:
-                mesh[i] = rc.Geometry.Mesh.CreateFromBrep(inputBrep, meshParam)
-                inputBrep.Dispose()
-            except:
-                print 'Error in converting Brep to Mesh...'
-                pass
+class SkyResultsCollection(object):
+    """
+    Annual sky matrix stored as a dense (patches x hours x 2) float32 array.
+    values[(patch * numOfHours + hour - 1) * 2] is the diffuse and the next item
+    is the direct radiation. Hours start from 1 to match the HOYs.
+    Range sums come from prefix sums that are built on the first select. Code that
+    writes into values directly should call invalidate() once it is done.
+    """
 
-        # prepare bulk list for each surface
-        mesh = [None] * len(brep)
+    def __init__(self, values, numOfPatches, locationName, lat, lngt, timeZone, numOfHours = 8760):
+        self._prefix = None
+        self.values = values
+        self.numOfPatches = numOfPatches
+        self.numOfHours = numOfHours
+        self.location = locationName
+        self.lat = lat
+        self.lngt = lngt
+        self.timeZone = timeZone
 
-        # set-up mesh parameters for each surface based on surface size
-        aspectRatio = 1
-        meshParam = rc.Geometry.MeshingParameters.Default
-        rc.Geometry.MeshingParameters.MaximumEdgeLength.__set__(meshParam, (gridSize))
-        rc.Geometry.MeshingParameters.MinimumEdgeLength.__set__(meshParam, (gridSize))
-        rc.Geometry.MeshingParameters.GridAspectRatio.__set__(meshParam, aspectRatio)
-    
-        ## Call the mesh function
-        if 1 < 0: #parallel: # for some reason parallel meshing gives error
-            tasks.Parallel.ForEach(xrange(len(brep)),makeMeshFromSrf)
-        else:
-            for i in range(len(mesh)):
-                makeMeshFromSrf(i, brep[i])
+    @classmethod
+    def empty(cls, numOfPatches, locationName, lat, lngt, timeZone, numOfHours = 8760):
+        values = array.array('f', [0]) * (numOfPatches * numOfHours * 2)
+        return cls(values, numOfPatches, locationName, lat, lngt, timeZone, numOfHours)
 
-        meshGeometries = mesh
-        
-        return meshGeometries
-    
-    def parallel_makeContextMesh(self, brep):
-        ## mesh breps
-        def makeMeshFromSrf(i, inputBrep):
-            try:
-                mesh[i] = rc.Geometry.Mesh.CreateFromBrep(inputBrep, meshParam)
-                inputBrep.Dispose()
+    @property
+    def values(self):
+        return self._values
+
+    @values.setter
+    def values(self, values):
+        self._values = values
+        self.invalidate()
+
+    def invalidate(self):
+        # drop the prefix sums after the values are changed. they are re-built on the next select
+        self._prefix = None
+
+    @property
+    def d(self):
+        # dictionary-like access for components that use radValuesDict[patch][hour]
+        return SkyPatchesView(self)
+
+    def index(self, patch, hour):
+        if not 0 <= patch < self.numOfPatches or not 1 <= hour <= self.numOfHours:
+            raise KeyError((patch, hour))
+        return (patch * self.numOfHours + hour - 1) * 2
+
+    def getValue(self, patch, hour):
+        i = self.index(patch, hour)
+        return [self.values[i], self.values[i + 1]]
+
+    def setValue(self, patch, hour, difValue, dirValue):
+        i = self.index(patch, hour)
+        self.values[i] = difValue
+        self.values[i + 1] = dirValue
+        self.invalidate()
+
+    def prefixSums(self):
+        # cumulative [dif, dir] for each patch from hour 1 to hour h at ((patch * (numOfHours + 1)) + h) * 2
+        if self._prefix == None:
+            values = self.values
+            numOfHours = self.numOfHours
+            prefix = array.array('d', [0]) * (self.numOfPatches * (numOfHours + 1) * 2)
+            for patch in xrange(self.numOfPatches):
+                src = patch * numOfHours * 2
+                dst = patch * (numOfHours + 1) * 2
+                cumDif = cumDir = 0
+                for h in xrange(numOfHours):
+                    cumDif += values[src + 2 * h]
+                    cumDir += values[src + 2 * h + 1]
+                    prefix[dst + 2 * h + 2] = cumDif
+                    prefix[dst + 2 * h + 3] = cumDir
+            self._prefix = prefix
+        return self._prefix
+
+    def hourRuns(self, HOYs):
+        # collapse a list of hours into (firstHour, lastHour) runs of consecutive hours
+        runs = []
+        for HOY in HOYs:
+            if int(HOY) != HOY or not 1 <= HOY <= self.numOfHours:
+                raise ValueError("%s is not a valid hour of the year." % str(HOY))
+            HOY = int(HOY)
+            if runs and runs[-1][1] + 1 == HOY: runs[-1][1] = HOY
+            else: runs.append([HOY, HOY])
+        return runs
+
+    def select(self, HOYs):
+        # sum of [dif, dir] for each patch over a list of hours
+        # each run of consecutive hours is calculated from the prefix sums
+        runs = self.hourRuns(HOYs)
+
+        prefix = self.prefixSums()
+        stride = (self.numOfHours + 1) * 2
+        selected = []
+        for patch in xrange(self.numOfPatches):
+            base = patch * stride
+            dif = dir = 0
+            for st, end in runs:
+                dif += prefix[base + 2 * end] - prefix[base + 2 * (st - 1)]
+                dir += prefix[base + 2 * end + 1] - prefix[base + 2 * (st - 1) + 1]
+            selected.append([dif, dir])
+        return selected
+
+    def hourlyProducts(self, weightVectors, HOYs, parallel = False):
+        # total (dif + dir) sky of each hour multiplied by each vector of patch weights
+        # returns a list of hourly values for each weight vector
+        values = self.values
+        numOfHours = self.numOfHours
+        hourIndices = [2 * (HOY - 1) for HOY in HOYs]
+        results = [[0] * len(HOYs) for weights in weightVectors]
+
+        def vectorCalculator(k):
+            weights = weightVectors[k]; result = results[k]
+            for patch in xrange(min(len(weights), self.numOfPatches)):
+                weight = weights[patch]
+                if weight == 0: continue
+                base = patch * numOfHours * 2
+                for j, hourIndex in enumerate(hourIndices):
+                    result[j] += weight * (values[base + hourIndex] + values[base + hourIndex + 1])
+
+        if parallel:
+            tasks.Parallel.ForEach(xrange(len(weightVectors)), vectorCalculator)
+        else:
+            for k in xrange(len(weightVectors)): vectorCalculator(k)
+        return results
+
+    def save(self, filePath):
+        # write the values as a .npy file (version 1.0) so it can be loaded with a single read
+        header = "{'descr': '<f4', 'fortran_order': False, 'shape': (%d, %d, 2), }" % (self.numOfPatches, self.numOfHours)
+        header += " " * (63 - (len(header) + 10) % 64) + "\n"
+        values = self.values
+        if sys.byteorder != 'little':
+            values = array.array('f', values)
+            values.byteswap()
+        npyFile = open(filePath, 'wb')
+        npyFile.write("\x93NUMPY\x01\x00")
+        npyFile.write(array.array('B', [len(header) % 256, len(header) // 256]).tostring())
+        npyFile.write(header)
+        values.tofile(npyFile)
+        npyFile.close()
+
+    @classmethod
+    def load(cls, filePath, locationName, lat, lngt, timeZone):
+        npyFile = open(filePath, 'rb')
+        try:
+            if npyFile.read(8) != "\x93NUMPY\x01\x00": raise ValueError("%s is not a valid sky matrix file." % filePath)
+            headerLength = array.array('B', npyFile.read(2))
+            header = npyFile.read(headerLength[0] + 256 * headerLength[1])
+            shape = header.split("'shape':")[1].split("(")[1].split(")")[0]
+            numOfPatches, numOfHours = [int(v) for v in shape.split(",")[:2]]
+            values = array.array('f')
+            values.fromfile(npyFile, numOfPatches * numOfHours * 2)
+        finally:
+            npyFile.close()
+        if sys.byteorder != 'little': values.byteswap()
+        return cls(values, numOfPatches, locationName, lat, lngt, timeZone, numOfHours)
+
+    def ToString(self):
+        return 'AnnualDaylightMatrix::%s' % self.location
+
+
+class PerezSkyMatrix(object):
+    """
+    In-process equivalent of gendaymtx -O1 for Tregenza (skyDensity = 1) and Reinhart (skyDensity = 2) skies.
+    The diffuse sky is distributed with the Perez all-weather sky model and the direct sun is divided
+    between the four closest patches. Values are the radiation of each patch (radiance * solid angle)
+    the same as the ones readMTXFile writes to a SkyResultsCollection.
+    Longitude is east positive and timeZone is in hours, same as the epw file.
+    """
+
+    # Perez, Seals and Michalsky, 1993. a, b, c, d and e for each sky clearness bin (Table 1)
+    perezCoefficients = [
+        [1.3525, -0.2576, -0.2690, -1.4366, -0.7670, 0.0007, 1.2734, -0.1233, 2.8000, 0.6004,
+         1.2375, 1.0000, 1.8734, 0.6297, 0.9738, 0.2809, 0.0356, -0.1246, -0.5718, 0.9938],
+        [-1.2219, -0.7730, 1.4148, 1.1016, -0.2054, 0.0367, -3.9128, 0.9156, 6.9750, 0.1774,
+         6.4477, -0.1239, -1.5798, -0.5081, -1.7812, 0.1080, 0.2624, 0.0672, -0.2190, -0.4285],
+        [-1.1000, -0.2515, 0.8952, 0.0156, 0.2782, -0.1812, -4.5000, 1.1766, 24.7219, -13.0812,
+         -37.7000, 34.8438, -5.0000, 1.5218, 3.9229, -2.6204, -0.0156, 0.1597, 0.4199, -0.5562],
+        [-0.5484, -0.6654, -0.2672, 0.7117, 0.7234, -0.6219, -5.6812, 2.6297, 33.3389, -18.3000,
+         -62.2500, 52.0781, -3.5000, 0.0016, 1.1477, 0.1062, 0.4659, -0.3296, -0.0876, -0.0329],
+        [-0.6000, -0.3566, -2.5000, 2.3250, 0.2937, 0.0496, -5.6812, 1.8415, 21.0000, -4.7656,
+         -21.5906, 7.2492, -3.5000, -0.1554, 1.4062, 0.3988, 0.0032, 0.0766, -0.0656, -0.1294],
+        [-1.0156, -0.3670, 1.0078, 1.4051, 0.2875, -0.5328, -3.8500, 3.3750, 14.0000, -0.9999,
+         -7.1406, 7.5469, -3.4000, -0.1073, -1.0750, 1.5702, -0.0672, 0.4016, 0.3017, -0.4844],
+        [-1.0000, 0.0211, 0.5025, -0.5119, -0.3000, 0.1922, 0.7023, -1.6317, 19.0000, -5.0000,
+         1.2438, -1.9094, -4.0000, 0.0250, 0.3844, 0.2656, 1.0468, -0.3788, -2.4517, 1.4656],
+        [-1.0500, 0.0289, 0.4260, 0.3590, -0.3250, 0.1156, 0.7781, 0.0025, 31.0625, -14.5000,
+         -46.1148, 55.3750, -7.2312, 0.4050, 13.3500, 0.6234, 1.5000, -0.6426, 1.8564, 0.5636]]
+
+    # upper limit of the sky clearness bins
+    clearnessBins = [1.065, 1.230, 1.500, 1.950, 2.800, 4.500, 6.200]
+
+    def __init__(self, skyDensity, latitude, longitude, timeZone):
+        # sky patches in the same order as gendaymtx without the ground patch
+        rowPatchCount = [30, 30, 24, 24, 18, 12, 6]
+        alpha = (math.pi / 2) / (7 * skyDensity + .5)
+        self.patchAltitudes = array.array('d'); self.patchAzimuths = array.array('d')
+        self.solidAngles = array.array('d')
+        for row in xrange(7 * skyDensity):
+            patchCount = rowPatchCount[row // skyDensity] * skyDensity
+            solidAngle = 2 * math.pi * (math.sin(alpha * (row + 1)) - math.sin(alpha * row)) / patchCount
+            for patch in xrange(patchCount):
+                self.patchAltitudes.append(alpha * (row + .5))
+                self.patchAzimuths.append(2 * math.pi * patch / patchCount)
+                self.solidAngles.append(solidAngle)
+        self.patchAltitudes.append(math.pi / 2); self.patchAzimuths.append(0)
+        self.solidAngles.append(2 * math.pi * (1 - math.cos(alpha * .5)))
+        self.numOfPatches = len(self.solidAngles)
+
+        # patch unit vectors. azimuths are clockwise from north
+        self.patchX = array.array('d'); self.patchY = array.array('d'); self.patchZ = array.array('d')
+        for alt, azi in zip(self.patchAltitudes, self.patchAzimuths):
+            self.patchX.append(math.sin(azi) * math.cos(alt))
+            self.patchY.append(math.cos(azi) * math.cos(alt))
+            self.patchZ.append(math.sin(alt))
+
+        # radiance uses west positive longitudes
+        self.latitude = math.radians(float(latitude))
+        self.longitude = math.radians(-float(longitude))
+        self.meridian = math.radians(-float(timeZone) * 15)
+
+    def sunPosition(self, HOY):
+        # radiance solar position in the middle of the hour
+        # returns the altitude and the azimuth (clockwise from north) in radians
+        dayOfYear = (HOY - 1) // 24 + 1
+        hour = (HOY - 1) % 24 + .5
+        lat = self.latitude
+        sd = 0.4093 * math.sin((2 * math.pi / 368) * (dayOfYear - 81))
+        st = hour + 0.170 * math.sin((4 * math.pi / 373) * (dayOfYear - 80)) - \
+             0.129 * math.sin((2 * math.pi / 355) * (dayOfYear - 8)) + \
+             12 * (self.meridian - self.longitude) / math.pi
+        hourAngle = st * (math.pi / 12)
+        altitude = math.asin(math.sin(lat) * math.sin(sd) - math.cos(lat) * math.cos(sd) * math.cos(hourAngle))
+        azimuth = math.pi - math.atan2(math.cos(sd) * math.sin(hourAngle),
+                                       -math.cos(lat) * math.sin(sd) - math.sin(lat) * math.cos(sd) * math.cos(hourAngle))
+        return altitude, azimuth
+
+    def perezParameters(self, sunZenith, clearness, brightness):
+        # a, b, c, d and e of the Perez sky
+        category = 0
+        while category < 7 and clearness >= self.clearnessBins[category]: category += 1
+        if 1.065 < clearness < 2.8 and brightness < 0.2: brightness = 0.2
+        x = self.perezCoefficients[category]
+        params = [x[4 * i] + x[4 * i + 1] * sunZenith + brightness * (x[4 * i + 2] + x[4 * i + 3] * sunZenith) for i in range(5)]
+        if category == 0:
+            params[2] = math.exp((brightness * (x[8] + x[9] * sunZenith)) ** x[10]) - x[11]
+            params[3] = -math.exp(brightness * (x[12] + x[13] * sunZenith)) + x[14] + brightness * x[15]
+        return params
+
+    def diffuseValues(self, HOY, directNormal, diffuseHorizontal):
+        # diffuse radiation of each sky patch for one hour
+        values = [0] * self.numOfPatches
+        if diffuseHorizontal <= 0: return values
+        altitude, azimuth = self.sunPosition(HOY)
+
+        # keep the sun above the horizon and the circumsolar region off the zenith
+        if altitude <= 0: sunZenith = math.pi / 2
+        elif altitude >= math.radians(87): sunZenith = math.radians(3)
+        else: sunZenith = math.pi / 2 - altitude
+
+        dayAngle = 2 * math.pi * ((HOY - 1) // 24) / 365
+        eccentricity = 1.00011 + 0.034221 * math.cos(dayAngle) + 0.00128 * math.sin(dayAngle) + \
+                       0.000719 * math.cos(2 * dayAngle) + 0.000077 * math.sin(2 * dayAngle)
+        airMass = 1 / (math.cos(sunZenith) + 0.15 * math.exp(math.log(93.885 - math.degrees(sunZenith)) * -1.253))
+        brightness = max(diffuseHorizontal * airMass / (1367 * eccentricity), 0.01)
+        zenithCubed = sunZenith ** 3
+        clearness = min(((diffuseHorizontal + directNormal) / diffuseHorizontal + 1.041 * zenithCubed) / (1 + 1.041 * zenithCubed), 11.9)
+        a, b, c, d, e = self.perezParameters(sunZenith, clearness, brightness)
+
+        cosSunZenith = math.cos(sunZenith); sinSunZenith = math.sin(sunZenith)
+        cosAzimuth = math.cos(azimuth); sinAzimuth = math.sin(azimuth)
+        patchX = self.patchX; patchY = self.patchY; patchZ = self.patchZ; solidAngles = self.solidAngles
+        horizontal = 0
+        for i in xrange(self.numOfPatches):
+            # sin of the patch zenith times cos of the azimuth difference is the horizontal dot product
+            cosGamma = patchZ[i] * cosSunZenith + sinSunZenith * (patchX[i] * sinAzimuth + patchY[i] * cosAzimuth)
+            gamma = math.acos(max(-1, min(1, cosGamma)))
+            luminance = (1 + a * math.exp(b / patchZ[i])) * (1 + c * math.exp(d * gamma) + e * cosGamma * cosGamma)
+            if luminance < 0: luminance = 0
+            values[i] = luminance
+            horizontal += luminance * patchZ[i] * solidAngles[i]
+
+        # uniform sky if the distribution has no horizontal illuminance
+        # normalized by the discrete sum of the patches (instead of pi) so the patches add up to diffuseHorizontal
+        if horizontal <= 1e-6:
+            values = [1] * self.numOfPatches
+            horizontal = sum(patchZ[i] * solidAngles[i] for i in xrange(self.numOfPatches))
+        for i in xrange(self.numOfPatches):
+            values[i] *= diffuseHorizontal * solidAngles[i] / horizontal
+        return values
+
+    def directValues(self, HOY, directNormal, sunCount = 4):
+        # direct radiation of each sky patch for one hour
+        # the sun is divided between the closest patches and weighted by their proximity
+        # a sun just below the horizon at the middle of the hour goes to the lowest patches
+        values = [0] * self.numOfPatches
+        if directNormal <= 0: return values
+        altitude, azimuth = self.sunPosition(HOY)
+
+        sunX = math.sin(azimuth) * math.cos(altitude); sunY = math.cos(azimuth) * math.cos(altitude)
+        sunZ = math.sin(altitude)
+        patchX = self.patchX; patchY = self.patchY; patchZ = self.patchZ
+        dotProducts = [patchX[i] * sunX + patchY[i] * sunY + patchZ[i] * sunZ for i in xrange(self.numOfPatches)]
+        closest = heapq.nlargest(sunCount, xrange(self.numOfPatches), key = dotProducts.__getitem__)
+        weights = [1 / (1.002 - dotProducts[i]) for i in closest]
+        totalWeight = sum(weights)
+        for i, weight in zip(closest, weights):
+            values[i] += weight * directNormal / totalWeight
+        return values
+
+    def fill(self, skyMtx, directNormalRadiation, diffuseHorizontalRadiation, HOYs = None, parallel = False):
+        # write the diffuse and direct values of the hours to a SkyResultsCollection
+        # radiation lists are for all the hours of the year. HOYs can limit the calculation to a sub-period
+        if skyMtx.numOfPatches != self.numOfPatches:
+            raise ValueError("Sky matrix has %d patches instead of %d." % (skyMtx.numOfPatches, self.numOfPatches))
+        if HOYs == None: HOYs = range(1, skyMtx.numOfHours + 1)
+        values = skyMtx.values
+        stride = skyMtx.numOfHours * 2
+        # each day is calculated as a separate chunk
+        chunks = [HOYs[i: i + 24] for i in xrange(0, len(HOYs), 24)]
+
+        def chunkCalculator(chunkCount):
+            for HOY in chunks[chunkCount]:
+                directNormal = float(directNormalRadiation[HOY - 1])
+                diffuseHorizontal = float(diffuseHorizontalRadiation[HOY - 1])
+                diffuseValues = self.diffuseValues(HOY, directNormal, diffuseHorizontal)
+                directValues = self.directValues(HOY, directNormal)
+                index = skyMtx.index(0, HOY)
+                for patch in xrange(self.numOfPatches):
+                    values[index] = diffuseValues[patch]
+                    values[index + 1] = directValues[patch]
+                    index += stride
+
+        if parallel:
+            tasks.Parallel.ForEach(xrange(len(chunks)), chunkCalculator)
+        else:
+            for chunkCount in xrange(len(chunks)): chunkCalculator(chunkCount)
+
+        # the prefix sums are out of date
+        skyMtx.invalidate()
+        return skyMtx
+
+
+class SkyPatchesView(object):
+    # read-only view that mimics the old radValuesDict[patch][hour] = [dif, dir]
+    def __init__(self, skyMtx, patch = None):
+        self.skyMtx = skyMtx
+        self.patch = patch
+
+    def keys(self):
+        if self.patch == None: return range(self.skyMtx.numOfPatches)
+        return range(1, self.skyMtx.numOfHours + 1)
+
+    def has_key(self, key):
+        return key in self.keys()
+
+    __contains__ = has_key
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __getitem__(self, key):
+        if self.patch == None:
+            if not 0 <= key < self.skyMtx.numOfPatches: raise KeyError(key)
+            return SkyPatchesView(self.skyMtx, key)
+        return self.skyMtx.getValue(self.patch, key)
+
+
+class MeshPreparation(object):
+    
+    def joinMesh(self, meshList):
+        joinedMesh = rc.Geometry.Mesh()
+        for m in meshList: joinedMesh.Append(m)
+        return joinedMesh
+    
+    def parallel_makeSurfaceMesh(self, brep, gridSize):
+        ## mesh breps
+        def makeMeshFromSrf(i, inputBrep):
+            try:
+                mesh[i] = rc.Geometry.Mesh.CreateFromBrep(inputBrep, meshParam)
+                inputBrep.Dispose()
+            except:
+                print 'Error in converting Brep to Mesh...'
+                pass
+
+        # prepare bulk list for each surface
+        mesh = [None] * len(brep)
+
+        # set-up mesh parameters for each surface based on surface size
+        aspectRatio = 1
+        meshParam = rc.Geometry.MeshingParameters.Default
+        rc.Geometry.MeshingParameters.MaximumEdgeLength.__set__(meshParam, (gridSize))
+        rc.Geometry.MeshingParameters.MinimumEdgeLength.__set__(meshParam, (gridSize))
+        rc.Geometry.MeshingParameters.GridAspectRatio.__set__(meshParam, aspectRatio)
+    
+        ## Call the mesh function
+        if 1 < 0: #parallel: # for some reason parallel meshing gives error
+            tasks.Parallel.ForEach(xrange(len(brep)),makeMeshFromSrf)
+        else:
+            for i in range(len(mesh)):
+                makeMeshFromSrf(i, brep[i])
+
+        meshGeometries = mesh
+        
+        return meshGeometries
+    
+    def parallel_makeContextMesh(self, brep):
+        ## mesh breps
+        def makeMeshFromSrf(i, inputBrep):
+            try:
+                mesh[i] = rc.Geometry.Mesh.CreateFromBrep(inputBrep, meshParam)
+                inputBrep.Dispose()
             except:
                 print 'Error in converting Brep to Mesh...'
                 pass
@@ -2183,6 +2980,803 @@ class MeshPreparation(object):
         return mesh
 
 
+class MeshBVH(object):
+    """
+    Bounding volume hierarchy over the triangles of a Rhino mesh.
+    Triangles and nodes are stored in flat arrays. Rays are traversed through the
+    tree in Python and only the leaves they reach are tested with the native
+    Intersection.MeshRay.
+    """
+
+    def __init__(self, mesh = None, leafSize = 16):
+        self.leafSize = leafSize
+        self.tris = array.array('d')        # 9 values for each triangle
+        self.nodeBounds = array.array('d')  # minX, minY, minZ, maxX, maxY, maxZ for each node
+        self.nodeData = array.array('i')    # left, right, first triangle, triangle count for each node
+        self.triFaces = array.array('i')    # index of the mesh face of each triangle (faces of later meshes are numbered after the earlier ones)
+        self.faceCount = 0
+        self.leafMeshes = []                # Rhino mesh of the triangles of each leaf node (None for the other nodes)
+        if mesh != None:
+            self.addMesh(mesh)
+            self.build()
+
+    @property
+    def triangleCount(self):
+        return len(self.tris) // 9
+
+    def addMesh(self, mesh):
+        # quads are split into two triangles
+        vertices = mesh.Vertices
+        tris = self.tris; triFaces = self.triFaces
+        for faceIndex, face in enumerate(mesh.Faces):
+            A = vertices[face.A]; B = vertices[face.B]; C = vertices[face.C]
+            tris.extend((A.X, A.Y, A.Z, B.X, B.Y, B.Z, C.X, C.Y, C.Z))
+            triFaces.append(self.faceCount + faceIndex)
+            if face.IsQuad:
+                D = vertices[face.D]
+                tris.extend((A.X, A.Y, A.Z, C.X, C.Y, C.Z, D.X, D.Y, D.Z))
+                triFaces.append(self.faceCount + faceIndex)
+        self.faceCount += mesh.Faces.Count
+
+    def build(self):
+        tris = self.tris
+        triCount = len(tris) // 9
+        self.nodeBounds = nodeBounds = array.array('d')
+        self.nodeData = nodeData = array.array('i')
+        if triCount == 0: return
+
+        # bounding box and centroid of each triangle
+        triBounds = array.array('d', [0]) * (6 * triCount)
+        centroids = array.array('d', [0]) * (3 * triCount)
+        for t in xrange(triCount):
+            b = 9 * t
+            for axis in range(3):
+                v0 = tris[b + axis]; v1 = tris[b + 3 + axis]; v2 = tris[b + 6 + axis]
+                triBounds[6 * t + axis] = min(v0, v1, v2)
+                triBounds[6 * t + 3 + axis] = max(v0, v1, v2)
+                centroids[3 * t + axis] = (v0 + v1 + v2) / 3
+
+        def addNode():
+            nodeBounds.extend((0, 0, 0, 0, 0, 0))
+            nodeData.extend((-1, -1, 0, 0))
+            return len(nodeData) // 4 - 1
+
+        order = range(triCount)
+        stack = [(addNode(), 0, triCount)]
+        while stack:
+            node, start, end = stack.pop()
+
+            # bounds of the node and of the centroids inside it
+            bMin = [float("inf")] * 3; bMax = [-float("inf")] * 3
+            cMin = [float("inf")] * 3; cMax = [-float("inf")] * 3
+            for t in order[start:end]:
+                for axis in range(3):
+                    if triBounds[6 * t + axis] < bMin[axis]: bMin[axis] = triBounds[6 * t + axis]
+                    if triBounds[6 * t + 3 + axis] > bMax[axis]: bMax[axis] = triBounds[6 * t + 3 + axis]
+                    c = centroids[3 * t + axis]
+                    if c < cMin[axis]: cMin[axis] = c
+                    if c > cMax[axis]: cMax[axis] = c
+            nodeBounds[6 * node: 6 * node + 6] = array.array('d', bMin + bMax)
+
+            extents = [cMax[axis] - cMin[axis] for axis in range(3)]
+            splitAxis = extents.index(max(extents))
+            if end - start <= self.leafSize or extents[splitAxis] == 0:
+                nodeData[4 * node + 2] = start
+                nodeData[4 * node + 3] = end - start
+                continue
+
+            # median split along the longest axis of the centroids
+            order[start:end] = sorted(order[start:end], key = lambda t: centroids[3 * t + splitAxis])
+            mid = (start + end) // 2
+            left = addNode(); right = addNode()
+            nodeData[4 * node] = left
+            nodeData[4 * node + 1] = right
+            stack.append((left, start, mid))
+            stack.append((right, mid, end))
+
+        # re-order the triangles so each leaf is a contiguous block
+        sortedTris = array.array('d')
+        for t in order: sortedTris.extend(tris[9 * t: 9 * t + 9])
+        self.tris = sortedTris
+        if len(self.triFaces) == triCount:
+            self.triFaces = array.array('i', [self.triFaces[t] for t in order])
+        self.buildLeafMeshes()
+
+    def buildLeafMeshes(self):
+        # each leaf gets a small Rhino mesh so the triangles are tested by the native Intersection.MeshRay
+        # mesh face i of a leaf mesh is triangle (first triangle of the leaf + i)
+        tris = self.tris; nodeData = self.nodeData
+        self.leafMeshes = leafMeshes = [None] * (len(nodeData) // 4)
+        for n in xrange(len(leafMeshes)):
+            count = nodeData[4 * n + 3]
+            if count == 0: continue
+            leafMesh = rc.Geometry.Mesh()
+            first = nodeData[4 * n + 2]
+            for t in xrange(first, first + count):
+                v = 9 * t
+                leafMesh.Vertices.Add(tris[v], tris[v + 1], tris[v + 2])
+                leafMesh.Vertices.Add(tris[v + 3], tris[v + 4], tris[v + 5])
+                leafMesh.Vertices.Add(tris[v + 6], tris[v + 7], tris[v + 8])
+                leafMesh.Faces.AddFace(3 * (t - first), 3 * (t - first) + 1, 3 * (t - first) + 2)
+            leafMeshes[n] = leafMesh
+
+    def leaves(self, ox, oy, oz, dx, dy, dz, tMax = float("inf")):
+        # yields the index of every leaf whose bounding box is hit by the ray between 0 and tMax
+        # the caller can lower tMax for the rest of the traversal by sending it to the generator
+        nodeBounds = self.nodeBounds; nodeData = self.nodeData
+        if len(nodeData) == 0: return
+
+        invX = 1.0 / dx if dx != 0 else float("inf")
+        invY = 1.0 / dy if dy != 0 else float("inf")
+        invZ = 1.0 / dz if dz != 0 else float("inf")
+
+        stack = [0]
+        while stack:
+            n = stack.pop()
+            b = 6 * n
+            # slab test
+            t1 = (nodeBounds[b] - ox) * invX; t2 = (nodeBounds[b + 3] - ox) * invX
+            if t1 > t2: t1, t2 = t2, t1
+            tNear = t1; tFar = t2
+            t1 = (nodeBounds[b + 1] - oy) * invY; t2 = (nodeBounds[b + 4] - oy) * invY
+            if t1 > t2: t1, t2 = t2, t1
+            if t1 > tNear: tNear = t1
+            if t2 < tFar: tFar = t2
+            t1 = (nodeBounds[b + 2] - oz) * invZ; t2 = (nodeBounds[b + 5] - oz) * invZ
+            if t1 > t2: t1, t2 = t2, t1
+            if t1 > tNear: tNear = t1
+            if t2 < tFar: tFar = t2
+            # nan happens when the origin is on a slab and the direction is parallel to it
+            if tNear != tNear: tNear = -float("inf")
+            if tFar != tFar: tFar = float("inf")
+            if tNear > tFar or tFar < 0 or tNear > tMax: continue
+
+            d = 4 * n
+            if nodeData[d + 3] == 0:
+                stack.append(nodeData[d])
+                stack.append(nodeData[d + 1])
+                continue
+            newTMax = yield n
+            if newTMax != None: tMax = newTMax
+
+    def isOccluded(self, ox, oy, oz, dx, dy, dz, tMax = float("inf")):
+        # returns True if the ray hits any triangle between 0 and tMax
+        # direction does not need to be unitized; tMax is in the units of the direction
+        if len(self.nodeData) == 0: return False
+        ray = rc.Geometry.Ray3d(rc.Geometry.Point3d(ox, oy, oz), rc.Geometry.Vector3d(dx, dy, dz))
+        leafMeshes = self.leafMeshes
+        for n in self.leaves(ox, oy, oz, dx, dy, dz, tMax):
+            hit = rc.Geometry.Intersect.Intersection.MeshRay(leafMeshes[n], ray)
+            if 0 <= hit <= tMax: return True
+        return False
+
+    def closestHit(self, ox, oy, oz, dx, dy, dz, tMax = float("inf")):
+        # returns (ray parameter, mesh face index) of the closest hit between 0 and tMax or None
+        if len(self.nodeData) == 0: return None
+        ray = rc.Geometry.Ray3d(rc.Geometry.Point3d(ox, oy, oz), rc.Geometry.Vector3d(dx, dy, dz))
+        leafMeshes = self.leafMeshes
+        closestT = tMax; closestLeaf = -1
+        leaves = self.leaves(ox, oy, oz, dx, dy, dz, tMax)
+        try:
+            n = leaves.next()
+            while True:
+                hit = rc.Geometry.Intersect.Intersection.MeshRay(leafMeshes[n], ray)
+                if 0 <= hit <= closestT:
+                    closestT = hit; closestLeaf = n
+                    n = leaves.send(closestT)
+                else: n = leaves.next()
+        except StopIteration:
+            pass
+
+        if closestLeaf == -1: return None
+        # find the triangle of the leaf that was hit
+        meshPoint = leafMeshes[closestLeaf].ClosestMeshPoint(ray.PointAt(closestT), 0.0)
+        closestTri = self.nodeData[4 * closestLeaf + 2] + meshPoint.FaceIndex
+        return closestT, self.triFaces[closestTri]
+
+    fileHeader = "LBBVH2\n" # files without the header (or with an older one) are re-built
+
+    def save(self, filePath):
+        bvhFile = open(filePath, 'wb')
+        bvhFile.write(self.fileHeader)
+        counts = array.array('i', [self.leafSize, len(self.tris), len(self.nodeBounds), len(self.nodeData), len(self.triFaces), self.faceCount])
+        counts.tofile(bvhFile)
+        self.tris.tofile(bvhFile)
+        self.nodeBounds.tofile(bvhFile)
+        self.nodeData.tofile(bvhFile)
+        self.triFaces.tofile(bvhFile)
+        bvhFile.close()
+
+    @classmethod
+    def load(cls, filePath):
+        bvh = cls()
+        bvhFile = open(filePath, 'rb')
+        try:
+            if bvhFile.read(len(cls.fileHeader)) != cls.fileHeader:
+                raise ValueError("Unknown BVH file format: " + filePath)
+            counts = array.array('i')
+            counts.fromfile(bvhFile, 6)
+            bvh.leafSize = counts[0]
+            bvh.tris.fromfile(bvhFile, counts[1])
+            bvh.nodeBounds.fromfile(bvhFile, counts[2])
+            bvh.nodeData.fromfile(bvhFile, counts[3])
+            bvh.triFaces.fromfile(bvhFile, counts[4])
+            bvh.faceCount = counts[5]
+        finally:
+            bvhFile.close()
+        bvh.buildLeafMeshes()
+        return bvh
+
+
+class BVHCache(object):
+    """
+    Keeps the BVH of the meshes that don't change between runs (e.g. context).
+    BVHs are keyed by a hash of every vertex coordinate and face index of the mesh,
+    kept in memory with LRU eviction and optionally saved to a bvh folder inside
+    the working directory. Triangles are only extracted when the BVH is not cached.
+    """
+
+    def __init__(self, maxSize = 8):
+        self.maxSize = maxSize
+        self.keys = [] # least recently used first
+        self.bvhs = {}
+
+    def meshKey(self, mesh, leafSize):
+        coordinates = array.array('d')
+        for vertex in mesh.Vertices: coordinates.extend((vertex.X, vertex.Y, vertex.Z))
+        faceIndices = array.array('i')
+        for face in mesh.Faces: faceIndices.extend((face.A, face.B, face.C, face.D))
+        meshHash = hashlib.md5(coordinates.tostring())
+        meshHash.update(faceIndices.tostring())
+        return meshHash.hexdigest() + "_" + str(leafSize)
+
+    def _touch(self, key, bvh):
+        if key in self.bvhs: self.keys.remove(key)
+        self.keys.append(key)
+        self.bvhs[key] = bvh
+        while len(self.keys) > self.maxSize:
+            del self.bvhs[self.keys.pop(0)]
+
+    def get(self, mesh, workingDir = None, leafSize = 16):
+        if mesh == None: return None
+        key = self.meshKey(mesh, leafSize)
+
+        if key in self.bvhs:
+            self._touch(key, self.bvhs[key])
+            return self.bvhs[key]
+
+        bvhFile = None
+        if workingDir:
+            bvhFolder = os.path.join(workingDir, "bvh")
+            bvhFile = os.path.join(bvhFolder, key + ".bvh")
+            if os.path.isfile(bvhFile):
+                try:
+                    cachedBvh = MeshBVH.load(bvhFile)
+                    self._touch(key, cachedBvh)
+                    return cachedBvh
+                except:
+                    print "Failed to load the cached BVH from " + bvhFile + ". It will be re-built."
+
+        bvh = MeshBVH(mesh, leafSize)
+        self._touch(key, bvh)
+
+        if bvhFile:
+            try:
+                if not os.path.isdir(bvhFolder): os.makedirs(bvhFolder)
+                bvh.save(bvhFile)
+            except:
+                print "Failed to write the BVH to " + bvhFile
+
+        return bvh
+
+    def clear(self):
+        self.keys = []
+        self.bvhs = {}
+
+
+class OcclusionEngine(object):
+    """
+    Batched ray occlusion against one or more meshes.
+    Test points, normals and vectors are packed into flat arrays and the whole
+    visibility matrix is calculated in a single call.
+    """
+
+    def __init__(self, meshes, leafSize = 16):
+        self.bvhs = []
+        for mesh in meshes:
+            if mesh == None: continue
+            if isinstance(mesh, MeshBVH): self.bvhs.append(mesh)
+            elif mesh.Faces.Count != 0: self.bvhs.append(MeshBVH(mesh, leafSize))
+
+    def packVectors(self, items):
+        # flatten points or vectors to [x0, y0, z0, x1, y1, z1, ...]
+        if isinstance(items, array.array): return items
+        packed = array.array('d')
+        for item in items:
+            try: packed.extend((item.X, item.Y, item.Z))
+            except: packed.extend((item[0], item[1], item[2]))
+        return packed
+
+    def isOccluded(self, ox, oy, oz, dx, dy, dz, tMax = float("inf")):
+        for bvh in self.bvhs:
+            if bvh.isOccluded(ox, oy, oz, dx, dy, dz, tMax): return True
+        return False
+
+    def visibilityMatrix(self, points, vectors, normals = None, parallel = False):
+        # returns a list with an array of 0 and 1 for each point (1 means the vector is visible)
+        # vectors facing away from the normal of the point are marked as not visible without casting the ray
+        pts = self.packVectors(points)
+        vecs = self.packVectors(vectors)
+        if normals != None: nrms = self.packVectors(normals)
+        ptCount = len(pts) // 3
+        vecCount = len(vecs) // 3
+        visibility = [None] * ptCount
+        bvhs = self.bvhs
+
+        def rowCalculator(i):
+            # let the user cancel the process
+            if gh.GH_Document.IsEscapeKeyDown(): assert False
+            ox = pts[3 * i]; oy = pts[3 * i + 1]; oz = pts[3 * i + 2]
+            row = array.array('b', [0]) * vecCount
+            for v in xrange(vecCount):
+                dx = vecs[3 * v]; dy = vecs[3 * v + 1]; dz = vecs[3 * v + 2]
+                if normals != None and nrms[3 * i] * dx + nrms[3 * i + 1] * dy + nrms[3 * i + 2] * dz <= 0:
+                    continue
+                check = 1
+                for bvh in bvhs:
+                    if bvh.isOccluded(ox, oy, oz, dx, dy, dz): check = 0; break
+                row[v] = check
+            visibility[i] = row
+
+        if parallel:
+            tasks.Parallel.ForEach(xrange(ptCount), rowCalculator)
+        else:
+            for i in xrange(ptCount): rowCalculator(i)
+
+        return visibility
+
+    def segmentVisibility(self, points, targets, parallel = False):
+        # returns a list with an array of 0 and 1 for each point (1 means the target point is visible)
+        pts = self.packVectors(points)
+        tgts = self.packVectors(targets)
+        ptCount = len(pts) // 3
+        tgtCount = len(tgts) // 3
+        visibility = [None] * ptCount
+        bvhs = self.bvhs
+
+        def rowCalculator(i):
+            # let the user cancel the process
+            if gh.GH_Document.IsEscapeKeyDown(): assert False
+            ox = pts[3 * i]; oy = pts[3 * i + 1]; oz = pts[3 * i + 2]
+            row = array.array('b', [1]) * tgtCount
+            for v in xrange(tgtCount):
+                dx = tgts[3 * v] - ox; dy = tgts[3 * v + 1] - oy; dz = tgts[3 * v + 2] - oz
+                for bvh in bvhs:
+                    if bvh.isOccluded(ox, oy, oz, dx, dy, dz, 1): row[v] = 0; break
+            visibility[i] = row
+
+        if parallel:
+            tasks.Parallel.ForEach(xrange(ptCount), rowCalculator)
+        else:
+            for i in xrange(ptCount): rowCalculator(i)
+
+        return visibility
+
+    def faceHits(self, points, vectors, masks = None, tMax = float("inf"), parallel = False):
+        # returns a list with (vector indices, face indices) arrays for each point
+        # only the rays that hit a face are stored and the face is the closest one along the ray
+        # faces of the later meshes are numbered after the faces of the earlier ones
+        # masks is an optional list of arrays from visibilityMatrix. rays with 0 in the mask are not cast
+        pts = self.packVectors(points)
+        vecs = self.packVectors(vectors)
+        ptCount = len(pts) // 3
+        vecCount = len(vecs) // 3
+        hits = [None] * ptCount
+        bvhs = self.bvhs
+        faceOffsets = []
+        offset = 0
+        for bvh in bvhs:
+            if len(bvh.triFaces) != bvh.triangleCount:
+                raise ValueError("The BVH doesn't keep the mesh face of its triangles so the hits can't be assigned to the faces.")
+            faceOffsets.append(offset)
+            offset += bvh.faceCount
+
+        def rowCalculator(i):
+            # let the user cancel the process
+            if gh.GH_Document.IsEscapeKeyDown(): assert False
+            ox = pts[3 * i]; oy = pts[3 * i + 1]; oz = pts[3 * i + 2]
+            mask = masks[i] if masks != None else None
+            vecIndices = array.array('i'); faceIndices = array.array('i')
+            for v in xrange(vecCount):
+                if mask != None and not mask[v]: continue
+                dx = vecs[3 * v]; dy = vecs[3 * v + 1]; dz = vecs[3 * v + 2]
+                closestT = tMax; closestFace = None
+                for bvhCount, bvh in enumerate(bvhs):
+                    hit = bvh.closestHit(ox, oy, oz, dx, dy, dz, closestT)
+                    if hit != None and (closestFace == None or hit[0] < closestT):
+                        closestT = hit[0]
+                        closestFace = faceOffsets[bvhCount] + hit[1]
+                if closestFace != None:
+                    vecIndices.append(v); faceIndices.append(closestFace)
+            hits[i] = vecIndices, faceIndices
+
+        if parallel:
+            tasks.Parallel.ForEach(xrange(ptCount), rowCalculator)
+        else:
+            for i in xrange(ptCount): rowCalculator(i)
+
+        return hits
+
+
+class HorizonProfile(object):
+    """
+    Horizon profile (maximum obstruction elevation per azimuth) of meshes seen from viewpoints.
+    Instead of shooting rays, the edges of the mesh triangles are projected to
+    (azimuth, elevation) around the viewpoint and the maximum elevation of every azimuth
+    sample they cross is kept. The highest point of a planar face in any vertical
+    half-plane is on one of its edges, unless the face covers the viewpoint from above.
+    Azimuths are clockwise from north. northAngle is in radians and counter clockwise, same as Sunpath.
+    """
+
+    def __init__(self, meshes, azimuthCount = 360, northAngle = 0):
+        self.azimuthCount = azimuthCount
+        self.northAngle = northAngle
+        self.tris = array.array('d')
+        for mesh in meshes:
+            if mesh == None: continue
+            if isinstance(mesh, MeshBVH): self.tris.extend(mesh.tris)
+            else:
+                bvh = MeshBVH()
+                bvh.addMesh(mesh)
+                self.tris.extend(bvh.tris)
+
+        # horizontal direction of each azimuth sample
+        self.dirX = array.array('d'); self.dirY = array.array('d')
+        for i in xrange(azimuthCount):
+            azimuth = 2 * math.pi * i / azimuthCount - northAngle
+            self.dirX.append(math.sin(azimuth))
+            self.dirY.append(math.cos(azimuth))
+
+    def azimuths(self):
+        # azimuth of each sample in degrees
+        return [360. * i / self.azimuthCount for i in xrange(self.azimuthCount)]
+
+    def profile(self, viewpoint):
+        # returns the horizon elevation in degrees for each azimuth sample. 0 if there is no obstruction
+        try: ox = viewpoint.X; oy = viewpoint.Y; oz = viewpoint.Z
+        except: ox, oy, oz = viewpoint[0], viewpoint[1], viewpoint[2]
+        n = self.azimuthCount
+        binsPerRadian = n / (2 * math.pi)
+        dirX = self.dirX; dirY = self.dirY
+        tris = self.tris
+        tangents = [0] * n
+        atan2 = math.atan2; floor = math.floor; ceil = math.ceil
+        northAngle = self.northAngle
+
+        for t in xrange(0, len(tris), 9):
+            z0 = tris[t + 2] - oz; z1 = tris[t + 5] - oz; z2 = tris[t + 8] - oz
+            if z0 <= 0 and z1 <= 0 and z2 <= 0: continue  # the triangle is below the viewpoint
+            x0 = tris[t] - ox; y0 = tris[t + 1] - oy
+            x1 = tris[t + 3] - ox; y1 = tris[t + 4] - oy
+            x2 = tris[t + 6] - ox; y2 = tris[t + 7] - oy
+
+            # triangle covers the viewpoint from above
+            d0 = x1 * y2 - x2 * y1; d1 = x2 * y0 - x0 * y2; d2 = x0 * y1 - x1 * y0
+            if (d0 >= 0 and d1 >= 0 and d2 >= 0) or (d0 <= 0 and d1 <= 0 and d2 <= 0):
+                area = d0 + d1 + d2
+                if area != 0 and (d0 * z0 + d1 * z1 + d2 * z2) / area > 0:
+                    tangents = [float("inf")] * n
+                    break
+
+            for xa, ya, za, xb, yb, zb in ((x0, y0, z0, x1, y1, z1), (x1, y1, z1, x2, y2, z2), (x2, y2, z2, x0, y0, z0)):
+                if za <= 0 and zb <= 0: continue
+                if (xa == 0 and ya == 0) or (xb == 0 and yb == 0): continue
+                # position of the end points in azimuth samples
+                pa = (atan2(xa, ya) + northAngle) * binsPerRadian
+                pb = (atan2(xb, yb) + northAngle) * binsPerRadian
+                delta = (pb - pa) % n
+                if delta > n / 2.: delta -= n
+                if delta < 0: lo = pa + delta; hi = pa
+                else: lo = pa; hi = pa + delta
+                for k in xrange(int(ceil(lo)), int(floor(hi)) + 1):
+                    i = k % n
+                    dx = dirX[i]; dy = dirY[i]
+                    ca = dx * ya - dy * xa; cb = dx * yb - dy * xb
+                    if ca == cb: continue
+                    s = ca / (ca - cb)
+                    z = za + s * (zb - za)
+                    if z <= 0: continue
+                    r = dx * (xa + s * (xb - xa)) + dy * (ya + s * (yb - ya))
+                    if r <= 0: continue
+                    if z > tangents[i] * r: tangents[i] = z / r
+
+        return [math.degrees(math.atan(tangent)) for tangent in tangents]
+
+    def profiles(self, viewpoints, parallel = False):
+        # horizon profile of each viewpoint
+        profiles = [None] * len(viewpoints)
+
+        def profileCalculator(i):
+            # let the user cancel the process
+            if gh.GH_Document.IsEscapeKeyDown(): assert False
+            profiles[i] = self.profile(viewpoints[i])
+
+        if parallel:
+            tasks.Parallel.ForEach(xrange(len(viewpoints)), profileCalculator)
+        else:
+            for i in xrange(len(viewpoints)): profileCalculator(i)
+        return profiles
+
+
+class ObstructionMap(object):
+    """
+    Obstruction map of the context, coniferous and deciduous tree meshes around one point.
+    The triangles of the meshes are projected once to a grid of azimuths and altitudes.
+    In each vertical half-plane of an azimuth a triangle is a segment, and it is ranked against the
+    other segments by its distance along each altitude it covers, so only the nearest mesh is kept.
+    Each azimuth then stores its elevation intervals and the mesh that is seen in them, so overhangs
+    and canopies let the sky and the sun through underneath. The sky view factor and the beam
+    transmission index of any sun position are lookups in these intervals instead of ray casting.
+    Azimuths are clockwise from north. northAngle is in radians and counter clockwise, same as Sunpath.
+    """
+
+    def __init__(self, viewpoint, meshTris, treesTransmissionIndices = [0,[0,0]], azimuthCount = 360, northAngle = 0):
+        try: self.origin = (viewpoint.X, viewpoint.Y, viewpoint.Z)
+        except: self.origin = (viewpoint[0], viewpoint[1], viewpoint[2])
+        self.treesTransmissionIndices = treesTransmissionIndices
+        self.northAngle = northAngle
+        self.azimuthCount = azimuthCount
+        self.altitudeCount = max(azimuthCount // 4, 1)
+        self.altitudeStepD = 90. / self.altitudeCount
+        self.runStarts = []  # first altitude sample of each elevation interval, for each azimuth
+        self.runMeshes = []  # mesh seen in each elevation interval (-1 for the sky), for each azimuth
+        self.skyShares = []  # share of the hemisphere area in which each mesh is seen. Index 0 is the sky
+        self.build(meshTris)
+
+    @staticmethod
+    def fromMeshes(viewpoints, meshes, treesTransmissionIndices = [0,[0,0]], azimuthCount = 360, northAngle = 0, parallel = False):
+        # one map for each viewpoint. meshes are the context, coniferous and deciduous meshes (or their BVHs), in that order
+        meshTris = []
+        for mesh in meshes:
+            if mesh == None: meshTris.append(None)
+            elif isinstance(mesh, MeshBVH): meshTris.append(mesh.tris)
+            else:
+                bvh = MeshBVH()
+                bvh.addMesh(mesh)
+                meshTris.append(bvh.tris)
+        obstructionMaps = [None] * len(viewpoints)
+
+        def mapCalculator(i):
+            # let the user cancel the process
+            if gh.GH_Document.IsEscapeKeyDown(): assert False
+            obstructionMaps[i] = ObstructionMap(viewpoints[i], meshTris, treesTransmissionIndices, azimuthCount, northAngle)
+
+        if parallel:
+            tasks.Parallel.ForEach(xrange(len(viewpoints)), mapCalculator)
+        else:
+            for i in xrange(len(viewpoints)): mapCalculator(i)
+        return obstructionMaps
+
+    def build(self, meshTris):
+        ox, oy, oz = self.origin
+        n = self.azimuthCount; m = self.altitudeCount
+        altitudeStepR = 0.5 * math.pi / m
+        binsPerRadian = n / (2 * math.pi)
+        northAngle = self.northAngle
+        atan2 = math.atan2; floor = math.floor; ceil = math.ceil; hypot = math.hypot
+        dirX = [math.sin(2 * math.pi * i / n - northAngle) for i in xrange(n)]
+        dirY = [math.cos(2 * math.pi * i / n - northAngle) for i in xrange(n)]
+        cosAlts = [math.cos((j + 0.5) * altitudeStepR) for j in xrange(m)]
+        sinAlts = [math.sin((j + 0.5) * altitudeStepR) for j in xrange(m)]
+
+        # nearest mesh and its distance for each (azimuth, altitude) sample
+        depths = array.array('d', [float("inf")]) * (n * m)
+        nearest = array.array('b', [-1]) * (n * m)
+
+        for meshIndex, tris in enumerate(meshTris):
+            if tris == None: continue
+            for t in xrange(0, len(tris), 9):
+                z0 = tris[t + 2] - oz; z1 = tris[t + 5] - oz; z2 = tris[t + 8] - oz
+                if z0 <= 0 and z1 <= 0 and z2 <= 0: continue  # the triangle is below the viewpoint
+                x0 = tris[t] - ox; y0 = tris[t + 1] - oy
+                x1 = tris[t + 3] - ox; y1 = tris[t + 4] - oy
+                x2 = tris[t + 6] - ox; y2 = tris[t + 7] - oy
+                edges = ((x0, y0, z0, x1, y1, z1), (x1, y1, z1, x2, y2, z2), (x2, y2, z2, x0, y0, z0))
+
+                # azimuth samples covered by the triangle. All of them if it is around the vertical of the viewpoint
+                d0 = x1 * y2 - x2 * y1; d1 = x2 * y0 - x0 * y2; d2 = x0 * y1 - x1 * y0
+                if d0 + d1 + d2 != 0 and ((d0 >= 0 and d1 >= 0 and d2 >= 0) or (d0 <= 0 and d1 <= 0 and d2 <= 0)):
+                    azimuthSamples = xrange(n)
+                else:
+                    azimuthSamples = set()
+                    for xa, ya, za, xb, yb, zb in edges:
+                        if (xa == 0 and ya == 0) or (xb == 0 and yb == 0): continue
+                        pa = (atan2(xa, ya) + northAngle) * binsPerRadian
+                        pb = (atan2(xb, yb) + northAngle) * binsPerRadian
+                        delta = (pb - pa) % n
+                        if delta > n / 2.: delta -= n
+                        if delta < 0: lo = pa + delta; hi = pa
+                        else: lo = pa; hi = pa + delta
+                        for k in xrange(int(ceil(lo)), int(floor(hi)) + 1): azimuthSamples.add(k % n)
+
+                for i in azimuthSamples:
+                    dx = dirX[i]; dy = dirY[i]
+                    # the triangle in the vertical plane of the azimuth is the segment between its edge crossings
+                    # r is the horizontal distance in the direction of the azimuth
+                    points = []
+                    for xa, ya, za, xb, yb, zb in edges:
+                        ca = dx * ya - dy * xa; cb = dx * yb - dy * xb
+                        if ca == cb or (ca > 0 and cb > 0) or (ca < 0 and cb < 0): continue
+                        s = ca / (ca - cb)
+                        points.append((dx * (xa + s * (xb - xa)) + dy * (ya + s * (yb - ya)), za + s * (zb - za)))
+                    if len(points) < 2: continue
+                    ra, za = min(points); rb, zb = max(points)
+                    if rb <= 0: continue  # the segment is in the opposite half-plane
+                    if ra < 0:  # clip the segment at the vertical of the viewpoint
+                        za = za + (zb - za) * (-ra / (rb - ra)); ra = 0
+                    ea = atan2(za, ra); eb = atan2(zb, rb)
+                    if ea > eb: ea, eb = eb, ea
+                    if eb <= 0: continue
+                    jLo = max(int(ceil(ea / altitudeStepR - 0.5)), 0)
+                    jHi = min(int(floor(eb / altitudeStepR - 0.5)), m - 1)
+
+                    # distance to the segment along each altitude it covers
+                    segR = rb - ra; segZ = zb - za
+                    crossA = ra * segZ - za * segR
+                    for j in xrange(jLo, jHi + 1):
+                        denominator = cosAlts[j] * segZ - sinAlts[j] * segR
+                        if denominator != 0: depth = crossA / denominator
+                        else: depth = min(hypot(ra, za), hypot(rb, zb))  # the segment is along the altitude
+                        c = i * m + j
+                        if depth < depths[c]:
+                            depths[c] = depth
+                            nearest[c] = meshIndex
+
+        # elevation intervals of each azimuth and the share of the hemisphere of each mesh
+        # band of the hemisphere between two altitudes has an area proportional to the difference of their sines
+        sinBounds = [math.sin(j * altitudeStepR) for j in xrange(m + 1)]
+        skyShares = [0] * (len(meshTris) + 1)
+        for i in xrange(n):
+            starts = array.array('h'); meshes = array.array('b')
+            for j in xrange(m):
+                meshIndex = nearest[i * m + j]
+                if len(meshes) == 0 or meshes[-1] != meshIndex:
+                    starts.append(j); meshes.append(meshIndex)
+            for k in xrange(len(starts)):
+                end = starts[k + 1] if k + 1 < len(starts) else m
+                skyShares[meshes[k] + 1] += (sinBounds[end] - sinBounds[starts[k]]) / n
+            self.runStarts.append(starts)
+            self.runMeshes.append(meshes)
+        self.skyShares = skyShares
+
+    def meshTransmissionIndex(self, meshIndex, seasonIndex = 1):
+        if meshIndex == -1:  # no mesh, the direction only sees the sky dome
+            return 1
+        elif meshIndex == 0:  # context mesh
+            return 0
+        elif meshIndex == 1:  # coniferousTrees mesh
+            return self.treesTransmissionIndices[0]
+        elif meshIndex == 2:  # deciduousTrees mesh
+            return self.treesTransmissionIndices[1][seasonIndex]
+
+    def transmissionIndex(self, azimuthD, altitudeD, seasonIndex = 1):
+        # 0 when the direction is blocked by the context, 1 when it sees the sky
+        if altitudeD <= 0: return 0
+        i = int(round(azimuthD * self.azimuthCount / 360.)) % self.azimuthCount
+        j = min(int(altitudeD / self.altitudeStepD), self.altitudeCount - 1)
+        meshIndex = self.runMeshes[i][bisect.bisect_right(self.runStarts[i], j) - 1]
+        return self.meshTransmissionIndex(meshIndex, seasonIndex)
+
+    def beamTransmissionIndices(self, azimuthsD, altitudesD, seasonIndices = None):
+        if seasonIndices == None: seasonIndices = [1] * len(azimuthsD)
+        transmissionIndex = self.transmissionIndex
+        return [transmissionIndex(azimuthsD[i], altitudesD[i], seasonIndices[i]) for i in xrange(len(azimuthsD))]
+
+    def skyViewFactor(self, seasonIndex = 1):
+        # share of the hemisphere area (not cosine weighted) seen through the meshes
+        # seasonIndex is 0 for the leafless period and 1 for the inleaf period
+        return sum(share * self.meshTransmissionIndex(meshIndex - 1, seasonIndex) for meshIndex, share in enumerate(self.skyShares))
+
+    def annualSkyViewFactor(self, seasonIndices):
+        # sky view factor averaged over the hours with the season index of each hour
+        if len(seasonIndices) == 0: return self.skyViewFactor()
+        leaflessCount = list(seasonIndices).count(0)
+        inleafCount = len(seasonIndices) - leaflessCount
+        return (leaflessCount * self.skyViewFactor(0) + inleafCount * self.skyViewFactor(1)) / float(len(seasonIndices))
+
+
+class IntersectionMatrix(object):
+    """
+    Relation between test points and sky patches from parallel_radCalculator.
+    Each point keeps a row of visibility, angles and the patch weights
+    (cos(vecAngle) for visible patches) so the results for any new sky can be
+    calculated with a single matrix-vector product.
+    """
+
+    def __init__(self, numOfPoints, numOfPatches):
+        self.numOfPoints = numOfPoints
+        self.numOfPatches = numOfPatches
+        self.isIntersect = [None] * numOfPoints  # array('b') for each point
+        self.vecAngles = [None] * numOfPoints    # array('f') for each point
+        self.weights = [None] * numOfPoints      # (patch indices, weights) of visible patches for each point
+
+    @property
+    def d(self):
+        return self
+
+    def setRow(self, ptCount, isIntersect, vecAngles):
+        self.isIntersect[ptCount] = isIntersect
+        self.vecAngles[ptCount] = vecAngles
+        indices = array.array('i'); weights = array.array('f')
+        for patchCount in xrange(self.numOfPatches):
+            if isIntersect[patchCount]:
+                indices.append(patchCount)
+                weights.append(math.cos(vecAngles[patchCount]))
+        self.weights[ptCount] = indices, weights
+
+    def multiply(self, skyVector, parallel = False):
+        # radiation for each point for a sky with one value per patch
+        results = [0] * self.numOfPoints
+        rows = self.weights
+
+        def rowCalculator(i):
+            indices, weights = rows[i]
+            value = 0
+            for j in xrange(len(indices)): value += weights[j] * skyVector[indices[j]]
+            results[i] = value
+
+        if parallel:
+            tasks.Parallel.ForEach(xrange(self.numOfPoints), rowCalculator)
+        else:
+            for i in xrange(self.numOfPoints): rowCalculator(i)
+        return results
+
+    def combinedWeights(self, pointWeights):
+        # one dense row of patch weights for a weighted sum of points (e.g. face areas)
+        # points with a weight of 0 or None are left out
+        combined = [0] * self.numOfPatches
+        for ptCount, pointWeight in enumerate(pointWeights):
+            if not pointWeight: continue
+            isIntersect = self.isIntersect[ptCount]; vecAngles = self.vecAngles[ptCount]
+            for patchCount in xrange(self.numOfPatches):
+                if isIntersect[patchCount]: combined[patchCount] += pointWeight * math.cos(vecAngles[patchCount])
+        return combined
+
+    # dictionary-like access for components that use intersectionMtx[pt][patch]['isIntersect']
+    def keys(self):
+        return range(self.numOfPoints)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return self.numOfPoints
+
+    def __getitem__(self, ptCount):
+        if not 0 <= ptCount < self.numOfPoints: raise KeyError(ptCount)
+        return IntersectionRowView(self, ptCount)
+
+
+class IntersectionRowView(object):
+    def __init__(self, intMtx, ptCount):
+        self.intMtx = intMtx
+        self.ptCount = ptCount
+
+    def keys(self):
+        return range(self.intMtx.numOfPatches)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return self.intMtx.numOfPatches
+
+    def __getitem__(self, patchCount):
+        if not 0 <= patchCount < self.intMtx.numOfPatches: raise KeyError(patchCount)
+        return {'isIntersect' : self.intMtx.isIntersect[self.ptCount][patchCount],
+                'vecAngle' : self.intMtx.vecAngles[self.ptCount][patchCount]}
+
+
 class RunAnalysisInsideGH(object):
     #
     def calRadRoseRes(self, tiltedRoseVectors, TregenzaPatchesNormalVectors, genCumSkyResult, testPoint = rc.Geometry.Point3d.Origin, bldgMesh = [], groundRef = 0):
@@ -2212,11 +3806,10 @@ class RunAnalysisInsideGH(object):
     def parallel_radCalculator(self, testPts, testVec, meshSrfArea, bldgMesh,
                                 contextMesh, parallel, cumSkyResult, TregenzaPatches,
                                 conversionFac, contextHeight = 2200000000000000,
-                                northVector = rc.Geometry.Vector3d.YAxis):
+                                northVector = rc.Geometry.Vector3d.YAxis, occlusionEngine = None):
         # preparing bulk lists
-        # create an empty dictionary for each point
-        intersectionMtx = {}
-        for pp in range(len(testPts)): intersectionMtx[pp] = {}
+        # intersection matrix keeps the visibility and the angle between each point and patch
+        intersectionMtx = IntersectionMatrix(len(testPts), len(TregenzaPatches))
             
         radiation = [0] * len(testPts)
         groundRadiation = [0] * len(testPts)
@@ -2236,38 +3829,51 @@ class RunAnalysisInsideGH(object):
         if angle != 0: [vec.Rotate(angle, ZAxis) for vec in TregenzaVectors]
         PI = math.pi
         
+        # cast all the rays in one batch if an occlusion engine is provided
+        visibility = None
+        if occlusionEngine != None:
+            try: visibility = occlusionEngine.visibilityMatrix(testPts, TregenzaVectors, testVec, parallel)
+            except:
+                print "The calculation is terminated by user!"
+                return None, None, None
+        
         try:
             def srfRadCalculator(i):
                 patchNum = 0
+                isIntersect = array.array('b', [0]) * len(TregenzaVectors)
+                vecAngles = array.array('f', [0]) * len(TregenzaVectors)
                 for patchVec in TregenzaVectors:
                     
                     # let the user cancel the process
                     if gh.GH_Document.IsEscapeKeyDown(): assert False
                     
                     vecAngle = rc.Geometry.Vector3d.VectorAngle(patchVec, testVec[i]) # calculate the angle between the surface and sky patch
-                    
-                    intersectionMtx[i][patchNum] = {'isIntersect' : 0,
-                                                    'vecAngle' : vecAngle}
+                    vecAngles[patchNum] = vecAngle
                     
                     if vecAngle < (PI/2):
                         check = 1; # this is simply here becuse I can't trust the break!! Isn't it stupid?
-                        ray = rc.Geometry.Ray3d(testPts[i], patchVec) # generate the ray
-                        
-                        if bldgMesh!=None:
-                            #for bldg in bldgMesh: # bldgMesh is all joined as one mesh
-                            if rc.Geometry.Intersect.Intersection.MeshRay(bldgMesh, ray) >= 0.0: check = 0;
-                        
-                        if check != 0 and contextMesh!=None: #and testPts[i].Z < contextHeight:
-                            #for bldg in contextMesh:
-                            if rc.Geometry.Intersect.Intersection.MeshRay(contextMesh,ray) >= 0.0: check = 0;
+                        if visibility != None:
+                            check = visibility[i][patchNum]
+                        else:
+                            ray = rc.Geometry.Ray3d(testPts[i], patchVec) # generate the ray
+                            
+                            if bldgMesh!=None:
+                                #for bldg in bldgMesh: # bldgMesh is all joined as one mesh
+                                if rc.Geometry.Intersect.Intersection.MeshRay(bldgMesh, ray) >= 0.0: check = 0;
+                            
+                            if check != 0 and contextMesh!=None: #and testPts[i].Z < contextHeight:
+                                #for bldg in contextMesh:
+                                if rc.Geometry.Intersect.Intersection.MeshRay(contextMesh,ray) >= 0.0: check = 0;
                         
                         if check != 0:
                             radiation[i] = radiation[i] + (cumSkyResult[patchNum] * math.cos(vecAngle))
-                            intersectionMtx[i][patchNum] =  {'isIntersect' : 1, 'vecAngle' : vecAngle}
+                            isIntersect[patchNum] = 1
                             # print groundRadiation
                             groundRadiation[i] = 0 #groundRadiation[i] + cumSkyResult[patchNum] * math.cos(vecAngle) * (groundRef/100) * 0.5
                     patchNum += 1
                 
+                intersectionMtx.setRow(i, isIntersect, vecAngles)
+                
                 radResult[i] = (groundRadiation[i] + radiation[i]) #/sunUpHours
         
         except:
@@ -2296,7 +3902,7 @@ class RunAnalysisInsideGH(object):
         return radResult, totalRadiation, intersectionMtx
     
     
-    def parallel_sunlightHoursCalculator(self, testPts, testVec, meshSrfArea, bldgMesh, contextMesh, parallel, sunVectors, conversionFac, northVector, timeStep = 1):
+    def parallel_sunlightHoursCalculator(self, testPts, testVec, meshSrfArea, bldgMesh, contextMesh, parallel, sunVectors, conversionFac, northVector, timeStep = 1, occlusionEngine = None):
         # preparing bulk lists
         sunlightHours = [0] * len(testPts)
         sunlightHoursResult = [0] * len(testPts)
@@ -2322,6 +3928,14 @@ class RunAnalysisInsideGH(object):
         sunVisibility = []
         for pt in testPts: sunVisibility.append(range(len(sunV)))
         
+        # cast all the rays in one batch if an occlusion engine is provided
+        visibility = None
+        if occlusionEngine != None:
+            try: visibility = occlusionEngine.visibilityMatrix(testPts, sunV, testVec, parallel)
+            except:
+                print "The calculation is terminated by user!"
+                return None, None, None
+        
         try:
             def sunlightHoursCalculator(i):
                 for vectorCount, vector in enumerate(sunV):
@@ -2333,12 +3947,15 @@ class RunAnalysisInsideGH(object):
                     check = 0
                     if vecAngle < (PI/2):
                         check = 1; # this is simply here becuse I can't trust the break! Isn't it stupid?
-                        ray = rc.Geometry.Ray3d(testPts[i], vector) # generate the ray
-                        
-                        if bldgMesh!=None:
-                            if rc.Geometry.Intersect.Intersection.MeshRay(bldgMesh, ray) >= 0.0: check = 0
-                        if check != 0 and contextMesh!=None:
-                            if rc.Geometry.Intersect.Intersection.MeshRay(contextMesh,ray) >= 0.0: check = 0
+                        if visibility != None:
+                            check = visibility[i][vectorCount]
+                        else:
+                            ray = rc.Geometry.Ray3d(testPts[i], vector) # generate the ray
+                            
+                            if bldgMesh!=None:
+                                if rc.Geometry.Intersect.Intersection.MeshRay(bldgMesh, ray) >= 0.0: check = 0
+                            if check != 0 and contextMesh!=None:
+                                if rc.Geometry.Intersect.Intersection.MeshRay(contextMesh,ray) >= 0.0: check = 0
                         
                         if check != 0:
                             sunlightHours[i] += 1/timeStep
@@ -2374,7 +3991,7 @@ class RunAnalysisInsideGH(object):
         return sunlightHoursResult, totalSLH, sunVisibility
     
     
-    def parallel_viewCalculator(self, testPts, testVec, meshSrfArea, bldgMesh, contextMesh, parallel, viewPoints, viewPtsWeights, conversionFac, viewType, patchAreas, geoBlockView):
+    def parallel_viewCalculator(self, testPts, testVec, meshSrfArea, bldgMesh, contextMesh, parallel, viewPoints, viewPtsWeights, conversionFac, viewType, patchAreas, geoBlockView, occlusionEngine = None):
         # preparing bulk lists for parallel process.
         view = [0] * len(testPts)
         viewResult = [0] * len(testPts)
@@ -2409,6 +4026,17 @@ class RunAnalysisInsideGH(object):
         #If the view type is spherical or connical, neglect it from the view analysis.
         if geoBlockView == False: bldgMesh = None
         
+        # cast all the rays in one batch if an occlusion engine is provided
+        # the engine should only include bldgMesh if geoBlockView is True
+        visibility = None
+        if occlusionEngine != None:
+            try:
+                if viewType == -1: visibility = occlusionEngine.segmentVisibility(testPts, viewPoints, parallel)
+                else: visibility = occlusionEngine.visibilityMatrix(testPts, viewPoints, None, parallel)
+            except:
+                print "The calculation is terminated by user!"
+                return None, None, None
+        
         #Function for view by test points.
         try:
             def viewCalculatorPoint(i):
@@ -2421,12 +4049,15 @@ class RunAnalysisInsideGH(object):
                     vecAngle = rc.Geometry.Vector3d.VectorAngle(vector, testVec[i]) # calculate the angle between the surface and the vector
                     
                     check = 1; # this is simply here becuse I can't trust the break! Isn't it stupid?
-                    line = rc.Geometry.Line(testPts[i], viewPt)
-                    
-                    if bldgMesh!=None:
-                        if rc.Geometry.Intersect.Intersection.MeshLine(bldgMesh, line)[1] != None: check = 0
-                    if check != 0 and contextMesh!=None:
-                        if rc.Geometry.Intersect.Intersection.MeshLine(contextMesh, line)[1] != None: check = 0
+                    if visibility != None:
+                        check = visibility[i][ptCount]
+                    else:
+                        line = rc.Geometry.Line(testPts[i], viewPt)
+                        
+                        if bldgMesh!=None:
+                            if rc.Geometry.Intersect.Intersection.MeshLine(bldgMesh, line)[1] != None: check = 0
+                        if check != 0 and contextMesh!=None:
+                            if rc.Geometry.Intersect.Intersection.MeshLine(contextMesh, line)[1] != None: check = 0
                     
                     if check != 0:
                         view[i] += ptImportance[ptCount]
@@ -2450,12 +4081,15 @@ class RunAnalysisInsideGH(object):
                     vecAngle = rc.Geometry.Vector3d.VectorAngle(viewVec, testVec[i]) # calculate the angle between the surface and the vector
                     
                     check = 1
-                    ray = rc.Geometry.Ray3d(testPts[i], viewVec)
-                    
-                    if bldgMesh!=None:
-                        if rc.Geometry.Intersect.Intersection.MeshRay(bldgMesh, ray) != -1: check = 0
-                    if check != 0 and contextMesh!=None:
-                        if rc.Geometry.Intersect.Intersection.MeshRay(contextMesh, ray) != -1: check = 0
+                    if visibility != None:
+                        check = visibility[i][vecCount]
+                    else:
+                        ray = rc.Geometry.Ray3d(testPts[i], viewVec)
+                        
+                        if bldgMesh!=None:
+                            if rc.Geometry.Intersect.Intersection.MeshRay(bldgMesh, ray) != -1: check = 0
+                        if check != 0 and contextMesh!=None:
+                            if rc.Geometry.Intersect.Intersection.MeshRay(contextMesh, ray) != -1: check = 0
                     
                     if check != 0:
                         if viewType < 4: view[i] += vecImportance[vecCount]
@@ -2590,47 +4224,52 @@ class ResultVisualization(object):
             joinedMesh.VertexColors[joinedMesh.Faces[srfCount].D] = colors[srfCount]
         return joinedMesh
     
-    def gradientColor(self, values, lowB, highB, colors,lowBoundColor = None,highBoundColor = None):
-    
-        # make a deep copy of colors so colors isn't popped twice once for legend colors and once for mesh colors
-        
-        copyColors = list(colors)
+    def gradientColor(self, values, lowB, highB, colors,lowBoundColor = None,highBoundColor = None, lookupTableSize = 1024):
         
         if highB == 'max': highB = max(values)
             
         if lowB == 'min': lowB = min(values)
         
-        # this function inputs values, and custom colors and outputs gradient colors
-        def parNum(num, lowB, highB):
-            """This function normalizes all the values"""
+        # colors are taken from a lookup table of the normalized values which is kept between the runs
+        # so re-coloring for new bounds doesn't need to re-calculate any of the colors.
+        # With 1024 entries the colors are within 2 RGB units of the exact gradient.
+        colorTable = self.colorLookupTable(colors, lookupTableSize)
+        lastIndex = len(colorTable) - 1
+        
+        colorTemp = []
+        for num in values:
+            # normalize the value
             if num > highB: numP = 1
             elif num < lowB: numP = 0
             elif highB == lowB: numP = 0
             else: numP = (num - lowB)/(highB - lowB)
-            return numP
+            
+            if numP != numP: continue # nan values don't get a color
+            elif (numP == 1) and (highBoundColor != None): colorTemp.append(highBoundColor)
+            elif (numP == 0) and (lowBoundColor != None): colorTemp.append(lowBoundColor)
+            else: colorTemp.append(colorTable[int(numP * lastIndex + 0.5)])
+        
+        return colorTemp
     
+    
+    def colorLookupTable(self, colors, lookupTableSize = 1024, maxCachedTables = 16):
+        # colors of lookupTableSize normalized values between 0 and 1 for a gradient of colors
+        # equal colors share the same System.Drawing.Color
+        key = (tuple((color.A, color.R, color.G, color.B) for color in colors), lookupTableSize)
+        if not sc.sticky.has_key("ladybug_ColorLookupTables"): sc.sticky["ladybug_ColorLookupTables"] = [] # least recently used first
+        tables = sc.sticky["ladybug_ColorLookupTables"]
+        for i, (cachedKey, colorTable) in enumerate(tables):
+            if cachedKey == key:
+                tables.append(tables.pop(i))
+                return colorTable
+        
         def calColor(valueP, rangeMinP, rangeMaxP, minColor, maxColor):
             # range is between 0 and 1
             rangeP = rangeMaxP - rangeMinP
             red = round(((valueP - rangeMinP)/rangeP) * (maxColor.R - minColor.R) + minColor.R)
             blue = round(((valueP - rangeMinP)/rangeP) * (maxColor.B - minColor.B) + minColor.B)
-            green = round(((valueP - rangeMinP)/rangeP) * (maxColor.G - minColor.G) + minColor.G) 
-            color = System.Drawing.Color.FromArgb(red, green, blue)
-            return color
-        
-        # Calculate num of colors
-        
-        if (highBoundColor != None):
-            
-            # Subtract a color to make room for the highBoundColor
-            
-            copyColors.pop()
-    
-        if (lowBoundColor != None):
-            
-            # Subtract a color to make room for the lowBoundColor
-            
-            copyColors.pop()
+            green = round(((valueP - rangeMinP)/rangeP) * (maxColor.G - minColor.G) + minColor.G)
+            return int(red), int(green), int(blue)
         
         numofColors = len(colors)
         
@@ -2638,34 +4277,20 @@ class ResultVisualization(object):
         if len(colorBounds) != numofColors: colorBounds.append(1)
         colorBounds = [round(x,3) for x in colorBounds]
         
-        numP = []
-        for num in values: numP.append(parNum(num, lowB, highB))
-            
-        colorTemp = []
-        
-        for num in numP:
-            for i in range(numofColors):
-                
+        internedColors = {}
+        colorTable = []
+        for count in range(lookupTableSize):
+            num = count / float(lookupTableSize - 1)
+            for i in range(numofColors - 1):
                 if  colorBounds[i] <= num <= colorBounds[i + 1]:
-    
-                    if (num == 1) and (highBoundColor != None) :
-                        
-                        colorTemp.append(highBoundColor)
-                        break
-                        
-                    elif (num == 0) and (lowBoundColor != None):
-                        
-                        colorTemp.append(lowBoundColor)
-                        break
-                        
-                    else:
-                        
-                        colorTemp.append(calColor(num, colorBounds[i], colorBounds[i+1], colors[i], colors[i+1]))
-                        break
-                            
-        color = colorTemp
+                    rgb = calColor(num, colorBounds[i], colorBounds[i+1], colors[i], colors[i+1])
+                    if rgb not in internedColors: internedColors[rgb] = System.Drawing.Color.FromArgb(*rgb)
+                    colorTable.append(internedColors[rgb])
+                    break
         
-        return color
+        tables.append((key, colorTable))
+        while len(tables) > maxCachedTables: tables.pop(0)
+        return colorTable
         
     def calculateBB(self, geometries, restricted = False):
         bbox = None
@@ -3164,6 +4789,78 @@ class ResultVisualization(object):
             rc.DocObjects.Tables.GroupTable.Add(groupT, guids)
 
 
+class ChartHistogram(object):
+    # frequency of hourly values over the faces of a chart mesh (Psychrometric Chart, Bioclimatic Chart)
+    # xEdges and yEdges are the ascending bin edges along the two chart axes (IP or SI values or any custom edges)
+    # faces are numbered row by row: yIndex * xBinCount + xIndex
+    # values outside the edges are ignored, or put in the first/last bin if clampX/clampY is True
+    def __init__(self, xEdges, yEdges, clampX = False, clampY = False):
+        self.xEdges = list(xEdges)
+        self.yEdges = list(yEdges)
+        self.clampX = clampX
+        self.clampY = clampY
+        self.xBinCount = len(self.xEdges) - 1
+        self.yBinCount = len(self.yEdges) - 1
+        self.faceCount = self.xBinCount * self.yBinCount
+    
+    def binIndices(self, values, edges, clamp = False):
+        # bin index of each value (bins include their lower edge). -1 for the values out of the edges
+        binCount = len(edges) - 1
+        low = edges[0]; high = edges[-1]
+        bisectRight = bisect.bisect_right
+        indices = array.array('i', [-1]) * len(values)
+        for count, value in enumerate(values):
+            if value >= low and value < high: indices[count] = bisectRight(edges, value) - 1
+            elif clamp:
+                if value < low: indices[count] = 0
+                elif value >= high: indices[count] = binCount - 1
+        return indices
+    
+    def faceIndices(self, xValues, yValues):
+        # chart mesh face of each hour. -1 for the hours that are out of the chart
+        xIndices = self.binIndices(xValues, self.xEdges, self.clampX)
+        yIndices = self.binIndices(yValues, self.yEdges, self.clampY)
+        xBinCount = self.xBinCount
+        indices = array.array('i', [-1]) * len(xIndices)
+        for count in xrange(len(xIndices)):
+            x = xIndices[count]; y = yIndices[count]
+            if x != -1 and y != -1: indices[count] = y * xBinCount + x
+        return indices
+    
+    def frequency(self, faceIndices, hours = None):
+        # number of hours in each face. hours is an optional list of positions in faceIndices (e.g. an analysis period)
+        # faceIndices are calculated once and can be counted for any number of periods
+        counts = [0] * self.faceCount
+        if hours == None:
+            for face in faceIndices:
+                if face != -1: counts[face] += 1
+        else:
+            for hour in hours:
+                face = faceIndices[hour]
+                if face != -1: counts[face] += 1
+        return counts
+    
+    def chartMesh(self, gridPoints, colors = None, faces = None):
+        # a single mesh with 4 unwelded vertices per face, so that each face can have its own color
+        # gridPoints[yIndex][xIndex] is the chart point of each pair of edges. faces: the face numbers to include (all of them by default)
+        # colors has one color per face number
+        if faces == None: faces = range(self.faceCount)
+        xBinCount = self.xBinCount
+        mesh = rc.Geometry.Mesh()
+        mesh.Vertices.Capacity = 4 * len(faces)
+        mesh.Faces.Capacity = len(faces)
+        for count, face in enumerate(faces):
+            y, x = divmod(face, xBinCount)
+            mesh.Vertices.Add(gridPoints[y][x])
+            mesh.Vertices.Add(gridPoints[y][x+1])
+            mesh.Vertices.Add(gridPoints[y+1][x+1])
+            mesh.Vertices.Add(gridPoints[y+1][x])
+            mesh.Faces.AddFace(4*count, 4*count+1, 4*count+2, 4*count+3)
+            if colors != None:
+                for vertex in range(4): mesh.VertexColors.Add(colors[face])
+        return mesh
+
+
 class ComfortModels(object):
     
     def comfPMVElevatedAirspeed(self, ta, tr, vel, rh, met, clo, wme):
@@ -3175,77 +4872,146 @@ class ComfortModels(object):
         #cooling_effect : The difference between the air temperature and adjusted air temperature [C]
         #set: The Standard Effective Temperature [C] (see below)
         
-        r = []
-        set = self.comfPierceSET(ta, tr, vel, rh, met , clo, wme)
+        pmv, ppd, set, ta_adj, ce = self.comfPMVElevatedAirspeedArray([ta], [tr], [vel], [rh], [met], [clo], [wme])
+        
+        return [pmv[0], ppd[0], set[0], ta_adj[0], ce[0]]
+    
+    
+    def broadcastInputs(self, *inputs):
+        # make a list for each input. Single values are repeated to the length of the longest list.
+        count = None
+        for input in inputs:
+            try: count = max(count, len(input))
+            except TypeError: pass
+        if count is None: count = 1
+        lists = []
+        for input in inputs:
+            try:
+                if len(input) != count: raise ValueError("Length of the inputs should be the same or 1.")
+                lists.append(list(input))
+            except TypeError:
+                lists.append([input] * count)
+        return lists
+    
+    
+    def uniqueInputsCalculator(self, func, inputs, parallel = False):
+        # run func once for each unique combination of inputs and map the results back to all the items
+        # inputs is a list of lists with the same length
+        keys = zip(*inputs)
+        uniqueIndex = {}
+        uniqueKeys = []
+        for key in keys:
+            if key not in uniqueIndex:
+                uniqueIndex[key] = len(uniqueKeys)
+                uniqueKeys.append(key)
+        
+        uniqueResults = [None] * len(uniqueKeys)
+        def calculate(i):
+            uniqueResults[i] = func(*uniqueKeys[i])
+        
+        if parallel:
+            tasks.Parallel.ForEach(xrange(len(uniqueKeys)), calculate)
+        else:
+            for i in xrange(len(uniqueKeys)): calculate(i)
+        
+        return [uniqueResults[uniqueIndex[key]] for key in keys]
+    
+    
+    def comfPMVArray(self, ta, tr, vel, rh, met, clo, wme, parallel = False):
+        # array version of comfPMV. Inputs can be lists (e.g. 8760 values or points x hours flattened) or single values.
+        # returns a list of pmv and a list of ppd. Both are None for the items that don't converge.
+        inputs = self.broadcastInputs(ta, tr, vel, rh, met, clo, wme)
+        results = self.uniqueInputsCalculator(self.comfPMV, inputs, parallel)
+        pmv = []; ppd = []
+        for r in results:
+            if r == 1: pmv.append(None); ppd.append(None)
+            else: pmv.append(r[0]); ppd.append(r[1])
+        return pmv, ppd
+    
+    
+    def comfPierceSETArray(self, ta, tr, vel, rh, met, clo, wme, parallel = False):
+        # array version of comfPierceSET. Inputs can be lists or single values.
+        inputs = self.broadcastInputs(ta, tr, vel, rh, met, clo, wme)
+        return self.uniqueInputsCalculator(self.comfPierceSET, inputs, parallel)
+    
+    
+    def comfPMVElevatedAirspeedArray(self, ta, tr, vel, rh, met, clo, wme, parallel = False):
+        # array version of comfPMVElevatedAirspeed. Inputs can be lists or single values.
+        # The cooling effect of all the items is found together with the secant method and the items
+        # that are already converged are masked out of the next iterations.
+        # returns lists of pmv, ppd, set, ta_adj and cooling effect
+        ta, tr, vel, rh, met, clo, wme = self.broadcastInputs(ta, tr, vel, rh, met, clo, wme)
+        count = len(ta)
+        set = self.comfPierceSETArray(ta, tr, vel, rh, met, clo, wme, parallel)
         stillAirThreshold = 0.1
-        
-        #This function is taken from the util.js script of the CBE comfort tool page and has been modified to include the fn inside the utilSecant function 
-        def utilSecant(a, b, epsilon):
-            # root-finding only
-            res = []
-            def fn(t):
-                return (set - self.comfPierceSET(ta-t, tr-t, stillAirThreshold, rh, met, clo, wme));
-            f1 = fn(a)
-            if abs(f1) <= epsilon: res.append(a)
-            else:
-                f2 = fn(b)
-                if abs(f2) <= epsilon: res.append(b)
-                else:
-                    count = range(100)
-                    for i in count:
-                        if (b - a) != 0 and (f2 - f1) != 0:
-                            slope = (f2 - f1) / (b - a)
-                            c = b - f2/slope
-                            f3 = fn(c)
-                            if abs(f3) < epsilon:
-                                res.append(c)
-                            a = b
-                            b = c
-                            f1 = f2
-                            f2 = f3
-                res.append('NaN')
-            
-            return res[0]
+        eps = 0.001  # precision of ce
+        
+        def fn(items, t):
+            # difference between SET of the items and SET in still air after the cooling effect t
+            stillSET = self.comfPierceSETArray([ta[i] - t[c] for c, i in enumerate(items)], [tr[i] - t[c] for c, i in enumerate(items)],
+                                               stillAirThreshold, [rh[i] for i in items], [met[i] for i in items],
+                                               [clo[i] for i in items], [wme[i] for i in items], parallel)
+            return [set[i] - stillSET[c] for c, i in enumerate(items)]
+        
+        #This is the utilSecant function from the util.js script of the CBE comfort tool page that runs for all the items at once.
+        ce = [0] * count
+        active = [i for i in range(count) if vel[i] > stillAirThreshold]
+        converged = dict((i, True) for i in range(count) if vel[i] <= stillAirThreshold)
+        a = dict((i, 0) for i in active)
+        b = dict((i, 40) for i in active)
+        f1 = dict(zip(active, fn(active, [a[i] for i in active])))
+        for i in active[:]:
+            if abs(f1[i]) <= eps: ce[i] = a[i]; converged[i] = True; active.remove(i)
+        f2 = dict(zip(active, fn(active, [b[i] for i in active])))
+        for i in active[:]:
+            if abs(f2[i]) <= eps: ce[i] = b[i]; converged[i] = True; active.remove(i)
+        
+        for iteration in range(100):
+            # items that can't move anymore are left for the bisection
+            active = [i for i in active if (b[i] - a[i]) != 0 and (f2[i] - f1[i]) != 0]
+            if not active: break
+            c = {}
+            for i in active:
+                slope = (f2[i] - f1[i]) / (b[i] - a[i])
+                c[i] = b[i] - f2[i]/slope
+            f3 = dict(zip(active, fn(active, [c[i] for i in active])))
+            for i in active[:]:
+                if abs(f3[i]) < eps:
+                    ce[i] = c[i]
+                    converged[i] = True
+                    active.remove(i)
+                    continue
+                a[i] = b[i]; b[i] = c[i]; f1[i] = f2[i]; f2[i] = f3[i]
         
         #This function is taken from the util.js script of the CBE comfort tool page and has been modified to include the fn inside the utilSecant function definition.
-        def utilBisect(a, b, epsilon, target):
-            def fn(t):
-                return (set - self.comfPierceSET(ta-t, tr-t, stillAirThreshold, rh, met, clo, wme))
+        def utilBisect(i, a, b, epsilon, target):
+            def fnBisect(t): return fn([i], [t])[0]
             while abs(b - a) > (2 * epsilon):
                 midpoint = (b + a) / 2
-                a_T = fn(a)
-                b_T = fn(b)
-                midpoint_T = fn(midpoint)
+                a_T = fnBisect(a)
+                b_T = fnBisect(b)
+                midpoint_T = fnBisect(midpoint)
                 if (a_T - target) * (midpoint_T - target) < 0: b = midpoint
                 elif (b_T - target) * (midpoint_T - target) < 0: a = midpoint
                 else: return -999
             return midpoint
         
+        # items that didn't converge with the secant method
+        for i in range(count):
+            if i not in converged: ce[i] = utilBisect(i, 0, 40, eps, 0)
         
-        if vel <= stillAirThreshold:
-            pmv, ppd = self.comfPMV(ta, tr, vel, rh, met, clo, wme)
-            ta_adj = ta
-            ce = 0
-        else:
-            ce_l = 0
-            ce_r = 40
-            eps = 0.001  # precision of ce
-            
-            ce = utilSecant(ce_l, ce_r, eps)
-            if ce == 'NaN':
-                ce = utilBisect(ce_l, ce_r, eps, 0)
-            
-            pmv, ppd = self.comfPMV(ta - ce, tr - ce, stillAirThreshold, rh, met, clo, wme)
-            ta_adj = ta - ce
-            tr_adj = tr - ce
-        
-        r.append(pmv)
-        r.append(ppd)
-        r.append(set)
-        r.append(ta_adj)
-        r.append(ce)
+        # pmv for the adjusted temperatures
+        pmvVel = []; ta_adj = []
+        for i in range(count):
+            if vel[i] <= stillAirThreshold:
+                pmvVel.append(vel[i])
+                ta_adj.append(ta[i])
+            else:
+                pmvVel.append(stillAirThreshold)
+                ta_adj.append(ta[i] - ce[i])
+        pmv, ppd = self.comfPMVArray(ta_adj, [tr[i] - ce[i] for i in range(count)], pmvVel, rh, met, clo, wme, parallel)
         
-        return r
+        return pmv, ppd, set, ta_adj, ce
     
     
     def comfPMV(self, ta, tr, vel, rh, met, clo, wme):
@@ -3769,15 +5535,7 @@ class ComfortModels(object):
     
     
     def comfUTCI(self, Ta, Tmrt, va, RH):
-        # Define a function to change the RH to water saturation vapor pressure in hPa
-        def es(ta):
-            g = [-2836.5744, -6028.076559, 19.54263612, -0.02737830188, 0.000016261698, (7.0229056*(10**(-10))), (-1.8680009*(10**(-13)))]      
-            tk = ta + 273.15 # air temp in K
-            es = 2.7150305 * math.log(tk)
-            for count, i in enumerate(g):
-                es = es + (i * (tk**(count-2)))
-            es = math.exp(es)*0.01  # convert Pa to hPa
-            return es
+        es = self.saturationVapPressUTCI
         
         #Do a series of checks to be sure that the input values are within the bounds accepted by the model.
         check = True
@@ -4014,30 +5772,7 @@ class ComfortModels(object):
             ( 2.47090539*(10**(-4)) ) * D_Tmrt*Pa*Pa*Pa*Pa*Pa + \
             ( 0.00148348065 ) * Pa*Pa*Pa*Pa*Pa*Pa
             
-            if UTCI_approx > 9 and UTCI_approx < 26: comfortable = 1
-            else: comfortable = 0
-            
-            if UTCI_approx <= -13.0:
-                stressRange = -3
-                stressVal = -1
-            elif UTCI_approx > -13.0 and UTCI_approx <= 0.0:
-                stressRange = -2
-                stressVal = -1
-            elif UTCI_approx > 0.0 and UTCI_approx <= 9.0:
-                stressRange = -1
-                stressVal = -1
-            elif UTCI_approx > 9.0 and UTCI_approx <= 26.0:
-                stressRange = 0
-                stressVal = 0
-            elif UTCI_approx > 26.0 and UTCI_approx <= 28.0:
-                stressRange = 1
-                stressVal = 1
-            elif UTCI_approx > 28.0 and UTCI_approx <= 32.0:
-                stressRange = 2
-                stressVal = 1
-            else:
-                stressRange = 3
-                stressVal = 1
+            comfortable, stressRange, stressVal = self.utciStressCategory(UTCI_approx)
             
         else:
             UTCI_approx = None
@@ -4048,6 +5783,205 @@ class ComfortModels(object):
         return UTCI_approx, comfortable, stressRange, stressVal
     
     
+    def saturationVapPressUTCI(self, ta):
+        # change the air temperature to water saturation vapor pressure in hPa
+        g = [-2836.5744, -6028.076559, 19.54263612, -0.02737830188, 0.000016261698, (7.0229056*(10**(-10))), (-1.8680009*(10**(-13)))]      
+        tk = ta + 273.15 # air temp in K
+        es = 2.7150305 * math.log(tk)
+        for count, i in enumerate(g):
+            es = es + (i * (tk**(count-2)))
+        es = math.exp(es)*0.01  # convert Pa to hPa
+        return es
+    
+    
+    def utciStressCategory(self, UTCI_approx):
+        if UTCI_approx > 9 and UTCI_approx < 26: comfortable = 1
+        else: comfortable = 0
+        
+        if UTCI_approx <= -13.0:
+            stressRange = -3
+            stressVal = -1
+        elif UTCI_approx > -13.0 and UTCI_approx <= 0.0:
+            stressRange = -2
+            stressVal = -1
+        elif UTCI_approx > 0.0 and UTCI_approx <= 9.0:
+            stressRange = -1
+            stressVal = -1
+        elif UTCI_approx > 9.0 and UTCI_approx <= 26.0:
+            stressRange = 0
+            stressVal = 0
+        elif UTCI_approx > 26.0 and UTCI_approx <= 28.0:
+            stressRange = 1
+            stressVal = 1
+        elif UTCI_approx > 28.0 and UTCI_approx <= 32.0:
+            stressRange = 2
+            stressVal = 1
+        else:
+            stressRange = 3
+            stressVal = 1
+        
+        return comfortable, stressRange, stressVal
+    
+    
+    # terms of the UTCI_approx polynomial in comfUTCI as (coefficient, power of Ta, power of va, power of D_Tmrt, power of Pa)
+    utciPolynomial = (
+        (0.607562052, 0, 0, 0, 0), (-0.0227712343, 1, 0, 0, 0), (8.06470249e-4, 2, 0, 0, 0), (-1.54271372e-4, 3, 0, 0, 0),
+        (-3.24651735e-6, 4, 0, 0, 0), (7.32602852e-8, 5, 0, 0, 0), (1.35959073e-9, 6, 0, 0, 0), (-2.25836520, 0, 1, 0, 0),
+        (0.0880326035, 1, 1, 0, 0), (0.00216844454, 2, 1, 0, 0), (-1.53347087e-5, 3, 1, 0, 0), (-5.72983704e-7, 4, 1, 0, 0),
+        (-2.55090145e-9, 5, 1, 0, 0), (-0.751269505, 0, 2, 0, 0), (-0.00408350271, 1, 2, 0, 0), (-5.21670675e-5, 2, 2, 0, 0),
+        (1.94544667e-6, 3, 2, 0, 0), (1.14099531e-8, 4, 2, 0, 0), (0.158137256, 0, 3, 0, 0), (-6.57263143e-5, 1, 3, 0, 0),
+        (2.22697524e-7, 2, 3, 0, 0), (-4.16117031e-8, 3, 3, 0, 0), (-0.0127762753, 0, 4, 0, 0), (9.66891875e-6, 1, 4, 0, 0),
+        (2.52785852e-9, 2, 4, 0, 0), (4.56306672e-4, 0, 5, 0, 0), (-1.74202546e-7, 1, 5, 0, 0), (-5.91491269e-6, 0, 6, 0, 0),
+        (0.398374029, 0, 0, 1, 0), (1.83945314e-4, 1, 0, 1, 0), (-1.73754510e-4, 2, 0, 1, 0), (-7.60781159e-7, 3, 0, 1, 0),
+        (3.77830287e-8, 4, 0, 1, 0), (5.43079673e-10, 5, 0, 1, 0), (-0.0200518269, 0, 1, 1, 0), (8.92859837e-4, 1, 1, 1, 0),
+        (3.45433048e-6, 2, 1, 1, 0), (-3.77925774e-7, 3, 1, 1, 0), (-1.69699377e-9, 4, 1, 1, 0), (1.69992415e-4, 0, 2, 1, 0),
+        (-4.99204314e-5, 1, 2, 1, 0), (2.47417178e-7, 2, 2, 1, 0), (1.07596466e-8, 3, 2, 1, 0), (8.49242932e-5, 0, 3, 1, 0),
+        (1.35191328e-6, 1, 3, 1, 0), (-6.21531254e-9, 2, 3, 1, 0), (-4.99410301e-6, 0, 4, 1, 0), (-1.89489258e-8, 1, 4, 1, 0),
+        (8.15300114e-8, 0, 5, 1, 0), (7.55043090e-4, 0, 0, 2, 0), (-5.65095215e-5, 1, 0, 2, 0), (-4.52166564e-7, 2, 0, 2, 0),
+        (2.46688878e-8, 3, 0, 2, 0), (2.42674348e-10, 4, 0, 2, 0), (1.54547250e-4, 0, 1, 2, 0), (5.24110970e-6, 1, 1, 2, 0),
+        (-8.75874982e-8, 2, 1, 2, 0), (-1.50743064e-9, 3, 1, 2, 0), (-1.56236307e-5, 0, 2, 2, 0), (-1.33895614e-7, 1, 2, 2, 0),
+        (2.49709824e-9, 2, 2, 2, 0), (6.51711721e-7, 0, 3, 2, 0), (1.94960053e-9, 1, 3, 2, 0), (-1.00361113e-8, 0, 4, 2, 0),
+        (-1.21206673e-5, 0, 0, 3, 0), (-2.18203660e-7, 1, 0, 3, 0), (7.51269482e-9, 2, 0, 3, 0), (9.79063848e-11, 3, 0, 3, 0),
+        (1.25006734e-6, 0, 1, 3, 0), (-1.81584736e-9, 1, 1, 3, 0), (-3.52197671e-10, 2, 1, 3, 0), (-3.36514630e-8, 0, 2, 3, 0),
+        (1.35908359e-10, 1, 2, 3, 0), (4.17032620e-10, 0, 3, 3, 0), (-1.30369025e-9, 0, 0, 4, 0), (4.13908461e-10, 1, 0, 4, 0),
+        (9.22652254e-12, 2, 0, 4, 0), (-5.08220384e-9, 0, 1, 4, 0), (-2.24730961e-11, 1, 1, 4, 0), (1.17139133e-10, 0, 2, 4, 0),
+        (6.62154879e-10, 0, 0, 5, 0), (4.03863260e-13, 1, 0, 5, 0), (1.95087203e-12, 0, 1, 5, 0), (-4.73602469e-12, 0, 0, 6, 0),
+        (5.12733497, 0, 0, 0, 1), (-0.312788561, 1, 0, 0, 1), (-0.0196701861, 2, 0, 0, 1), (9.99690870e-4, 3, 0, 0, 1),
+        (9.51738512e-6, 4, 0, 0, 1), (-4.66426341e-7, 5, 0, 0, 1), (0.548050612, 0, 1, 0, 1), (-0.00330552823, 1, 1, 0, 1),
+        (-0.00164119440, 2, 1, 0, 1), (-5.16670694e-6, 3, 1, 0, 1), (9.52692432e-7, 4, 1, 0, 1), (-0.0429223622, 0, 2, 0, 1),
+        (0.00500845667, 1, 2, 0, 1), (1.00601257e-6, 2, 2, 0, 1), (-1.81748644e-6, 3, 2, 0, 1), (-1.25813502e-3, 0, 3, 0, 1),
+        (-1.79330391e-4, 1, 3, 0, 1), (2.34994441e-6, 2, 3, 0, 1), (1.29735808e-4, 0, 4, 0, 1), (1.29064870e-6, 1, 4, 0, 1),
+        (-2.28558686e-6, 0, 5, 0, 1), (-0.0369476348, 0, 0, 1, 1), (0.00162325322, 1, 0, 1, 1), (-3.14279680e-5, 2, 0, 1, 1),
+        (2.59835559e-6, 3, 0, 1, 1), (-4.77136523e-8, 4, 0, 1, 1), (8.64203390e-3, 0, 1, 1, 1), (-6.87405181e-4, 1, 1, 1, 1),
+        (-9.13863872e-6, 2, 1, 1, 1), (5.15916806e-7, 3, 1, 1, 1), (-3.59217476e-5, 0, 2, 1, 1), (3.28696511e-5, 1, 2, 1, 1),
+        (-7.10542454e-7, 2, 2, 1, 1), (-1.24382300e-5, 0, 3, 1, 1), (-7.38584400e-9, 1, 3, 1, 1), (2.20609296e-7, 0, 4, 1, 1),
+        (-7.32469180e-4, 0, 0, 2, 1), (-1.87381964e-5, 1, 0, 2, 1), (4.80925239e-6, 2, 0, 2, 1), (-8.75492040e-8, 3, 0, 2, 1),
+        (2.77862930e-5, 0, 1, 2, 1), (-5.06004592e-6, 1, 1, 2, 1), (1.14325367e-7, 2, 1, 2, 1), (2.53016723e-6, 0, 2, 2, 1),
+        (-1.72857035e-8, 1, 2, 2, 1), (-3.95079398e-8, 0, 3, 2, 1), (-3.59413173e-7, 0, 0, 3, 1), (7.04388046e-7, 1, 0, 3, 1),
+        (-1.89309167e-8, 2, 0, 3, 1), (-4.79768731e-7, 0, 1, 3, 1), (7.96079978e-9, 1, 1, 3, 1), (1.62897058e-9, 0, 2, 3, 1),
+        (3.94367674e-8, 0, 0, 4, 1), (-1.18566247e-9, 1, 0, 4, 1), (3.34678041e-10, 0, 1, 4, 1), (-1.15606447e-10, 0, 0, 5, 1),
+        (-2.80626406, 0, 0, 0, 2), (0.548712484, 1, 0, 0, 2), (-0.00399428410, 2, 0, 0, 2), (-9.54009191e-4, 3, 0, 0, 2),
+        (1.93090978e-5, 4, 0, 0, 2), (-0.308806365, 0, 1, 0, 2), (0.0116952364, 1, 1, 0, 2), (4.95271903e-4, 2, 1, 0, 2),
+        (-1.90710882e-5, 3, 1, 0, 2), (0.00210787756, 0, 2, 0, 2), (-6.98445738e-4, 1, 2, 0, 2), (2.30109073e-5, 2, 2, 0, 2),
+        (4.17856590e-4, 0, 3, 0, 2), (-1.27043871e-5, 1, 3, 0, 2), (-3.04620472e-6, 0, 4, 0, 2), (0.0514507424, 0, 0, 1, 2),
+        (-0.00432510997, 1, 0, 1, 2), (8.99281156e-5, 2, 0, 1, 2), (-7.14663943e-7, 3, 0, 1, 2), (-2.66016305e-4, 0, 1, 1, 2),
+        (2.63789586e-4, 1, 1, 1, 2), (-7.01199003e-6, 2, 1, 1, 2), (-1.06823306e-4, 0, 2, 1, 2), (3.61341136e-6, 1, 2, 1, 2),
+        (2.29748967e-7, 0, 3, 1, 2), (3.04788893e-4, 0, 0, 2, 2), (-6.42070836e-5, 1, 0, 2, 2), (1.16257971e-6, 2, 0, 2, 2),
+        (7.68023384e-6, 0, 1, 2, 2), (-5.47446896e-7, 1, 1, 2, 2), (-3.59937910e-8, 0, 2, 2, 2), (-4.36497725e-6, 0, 0, 3, 2),
+        (1.68737969e-7, 1, 0, 3, 2), (2.67489271e-8, 0, 1, 3, 2), (3.23926897e-9, 0, 0, 4, 2), (-0.0353874123, 0, 0, 0, 3),
+        (-0.221201190, 1, 0, 0, 3), (0.0155126038, 2, 0, 0, 3), (-2.63917279e-4, 3, 0, 0, 3), (0.0453433455, 0, 1, 0, 3),
+        (-0.00432943862, 1, 1, 0, 3), (1.45389826e-4, 2, 1, 0, 3), (2.17508610e-4, 0, 2, 0, 3), (-6.66724702e-5, 1, 2, 0, 3),
+        (3.33217140e-5, 0, 3, 0, 3), (-0.00226921615, 0, 0, 1, 3), (3.80261982e-4, 1, 0, 1, 3), (-5.45314314e-9, 2, 0, 1, 3),
+        (-7.96355448e-4, 0, 1, 1, 3), (2.53458034e-5, 1, 1, 1, 3), (-6.31223658e-6, 0, 2, 1, 3), (3.02122035e-4, 0, 0, 2, 3),
+        (-4.77403547e-6, 1, 0, 2, 3), (1.73825715e-6, 0, 1, 2, 3), (-4.09087898e-7, 0, 0, 3, 3), (0.614155345, 0, 0, 0, 4),
+        (-0.0616755931, 1, 0, 0, 4), (0.00133374846, 2, 0, 0, 4), (0.00355375387, 0, 1, 0, 4), (-5.13027851e-4, 1, 1, 0, 4),
+        (1.02449757e-4, 0, 2, 0, 4), (-0.00148526421, 0, 0, 1, 4), (-4.11469183e-5, 1, 0, 1, 4), (-6.80434415e-6, 0, 1, 1, 4),
+        (-9.77675906e-6, 0, 0, 2, 4), (0.0882773108, 0, 0, 0, 5), (-0.00301859306, 1, 0, 0, 5), (0.00104452989, 0, 1, 0, 5),
+        (2.47090539e-4, 0, 0, 1, 5), (0.00148348065, 0, 0, 0, 6),
+    )
+    
+    
+    def utciCoefficients(self, Ta, va, Pa):
+        # collapse the UTCI polynomial into the 7 coefficients of a polynomial of D_Tmrt (Tmrt - Ta) for the given Ta, va and Pa
+        TaPow = [1.0]; vaPow = [1.0]; PaPow = [1.0]
+        for i in range(6):
+            TaPow.append(TaPow[-1] * Ta)
+            vaPow.append(vaPow[-1] * va)
+            PaPow.append(PaPow[-1] * Pa)
+        
+        coefficients = [Ta, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0]
+        for c, t, v, d, p in self.utciPolynomial:
+            coefficients[d] += c * TaPow[t] * vaPow[v] * PaPow[p]
+        return coefficients
+    
+    
+    def utciLookupTable(self, TaStep = 1.0, vaStep = 1.0, PaStep = 0.05):
+        # table of the D_Tmrt coefficients over Ta (-50 to 50C), va (0.5 to 17 m/s) and Pa (0 to 6 kPa)
+        # The table is built once for each set of steps and is kept in the sticky.
+        # With the default steps the interpolated UTCI is within 0.15C of the full polynomial (Pa is the axis that matters most).
+        # Inputs outside of the table are evaluated with the full polynomial.
+        key = (TaStep, vaStep, PaStep)
+        if not sc.sticky.has_key("ladybug_UTCILookupTables"): sc.sticky["ladybug_UTCILookupTables"] = {}
+        tables = sc.sticky["ladybug_UTCILookupTables"]
+        if key in tables: return tables[key]
+        
+        minValues = (-50.0, 0.5, 0.0)
+        maxValues = (50.0, 17.0, 6.0)
+        size = [int(math.ceil((maxValues[i] - minValues[i]) / key[i] - 1e-9)) + 1 for i in range(3)]
+        
+        coefficients = array.array('d')
+        for i in range(size[0]):
+            Ta = minValues[0] + i * TaStep
+            for j in range(size[1]):
+                va = minValues[1] + j * vaStep
+                for k in range(size[2]):
+                    coefficients.extend(self.utciCoefficients(Ta, va, minValues[2] + k * PaStep))
+        
+        table = {'min': minValues, 'step': key, 'size': size, 'coefficients': coefficients}
+        tables[key] = table
+        return table
+    
+    
+    def utciInterpolatedCoefficients(self, table, Ta, va, Pa):
+        # trilinear interpolation of the D_Tmrt coefficients. Returns None if the inputs are outside of the table.
+        size = table['size']
+        index = []; fraction = []
+        for value, minValue, step, count in zip((Ta, va, Pa), table['min'], table['step'], size):
+            position = (value - minValue) / step
+            if position < 0 or position > count - 1: return None
+            i = min(int(position), count - 2)
+            index.append(i)
+            fraction.append(position - i)
+        
+        values = table['coefficients']
+        coefficients = [0.0] * 7
+        for di, wi in ((0, 1 - fraction[0]), (1, fraction[0])):
+            for dj, wj in ((0, 1 - fraction[1]), (1, fraction[1])):
+                for dk, wk in ((0, 1 - fraction[2]), (1, fraction[2])):
+                    w = wi * wj * wk
+                    if w == 0: continue
+                    start = (((index[0] + di) * size[1] + index[1] + dj) * size[2] + index[2] + dk) * 7
+                    for c in range(7): coefficients[c] += w * values[start + c]
+        return coefficients
+    
+    
+    def comfUTCIArray(self, Ta, Tmrt, va, RH, lookupTable = None):
+        # array version of comfUTCI. Inputs can be lists (e.g. points x hours flattened) or single values.
+        # The polynomial is evaluated once for each unique Ta, va and RH and only the D_Tmrt polynomial is evaluated for each item.
+        # lookupTable: an optional table from utciLookupTable to interpolate the polynomial instead of evaluating it.
+        # returns lists of UTCI, comfortable, stressRange and stressVal
+        Ta, Tmrt, va, RH = self.broadcastInputs(Ta, Tmrt, va, RH)
+        utci = []; comfortable = []; stressRange = []; stressVal = []
+        coefficientsCache = {}
+        
+        for i in xrange(len(Ta)):
+            ta = Ta[i]
+            v = va[i]
+            if v < 0.5: v = 0.5
+            elif v > 17: v = 17
+            
+            key = (ta, v, RH[i])
+            try: c0, c1, c2, c3, c4, c5, c6 = coefficientsCache[key]
+            except KeyError:
+                Pa = self.saturationVapPressUTCI(ta) * (RH[i]/100.0) / 10.0
+                coefficients = None
+                if lookupTable != None: coefficients = self.utciInterpolatedCoefficients(lookupTable, ta, v, Pa)
+                if coefficients == None: coefficients = self.utciCoefficients(ta, v, Pa)
+                coefficientsCache[key] = coefficients
+                c0, c1, c2, c3, c4, c5, c6 = coefficients
+            
+            D_Tmrt = Tmrt[i] - ta
+            UTCI_approx = c0 + D_Tmrt * (c1 + D_Tmrt * (c2 + D_Tmrt * (c3 + D_Tmrt * (c4 + D_Tmrt * (c5 + D_Tmrt * c6)))))
+            comf, stressR, stressV = self.utciStressCategory(UTCI_approx)
+            
+            utci.append(UTCI_approx)
+            comfortable.append(comf)
+            stressRange.append(stressR)
+            stressVal.append(stressV)
+        
+        return utci, comfortable, stressRange, stressVal
+    
+    
     def calcVapPressHighAccuracy(self, TKelvin):
         #Calculate saturation vapor pressure above freezing
         Sigma = []
@@ -5299,6 +7233,1120 @@ class ComfortModels(object):
             return effectPET, comfortablePET
 
 
+class ThermalComfortIndices(object):
+    # thermal comfort indices of the Thermal Comfort Indices component, by Djordje Spasic with assistance of Dr. Krzysztof Blazejczyk
+    # the numbers of the indices are the ones of the component's _comfortIndex input:
+    # 0 HI, 1 humidex, 2 DI, 3 WCI, 4 WCT, 5 WBGT indoors, 6 WBGT outdoors, 7 TE, 8 AT, 9 TS, 10 ASV, 11 MRT, 12 Iclp, 13 HR, 14 DhRa,
+    # 15 PET temperate, 16 PET humid, 17 THI, 18 PHS
+    
+    def __init__(self):
+        self.comfortModels = ComfortModels()
+    
+    def weatherTerms(self, Ta, rh, ws, SR, N, Icl, M, solarAltitudeD, ac, mrt = None):
+        # the intermediate values that are shared by the indices, for lists of items (hours, or points x hours flattened)
+        # solarAltitudeD can be shorter than the other lists (e.g. 8760 values for points x hours). it is then repeated for each point
+        # mrt is calculated for outdoor conditions if it is None
+        # returns lists of Tground, Rprim, vapourPressure, mrt and Epot
+        TgroundL = []; RprimL = []; vapourPressureL = []; EpotL = []; mrtL = []
+        sunCount = len(solarAltitudeD)
+        for i in xrange(len(Ta)):
+            Tground = self.groundTemperature(Ta[i], N[i])  # in C
+            Rprim = self.solarRadiationNudeMan(SR[i], solarAltitudeD[i % sunCount], ac)  # in W/m2
+            vapourPressure = self.VapourPressure(Ta[i], rh[i])  # in hPa
+            if mrt == None:
+                mrt_ = self.meanRadiantTemperature(Ta[i], Tground, Rprim, vapourPressure, N[i])  # in C
+            else:
+                mrt_ = mrt[i]  # in C
+            Ts = self.meanSkinTemperature(Ta[i], ws[i], rh[i], mrt_, Icl[i], M[i])  # in C
+            e_ = self.VapourPressure(Ta[i], 5)  # in hPa
+            Epot = self.turbulentExchangeOfLatentHeat(Ta[i], ws[i], Ts, Icl[i], e_, M[i])  # in W/m2
+            TgroundL.append(Tground)
+            RprimL.append(Rprim)
+            vapourPressureL.append(vapourPressure)
+            mrtL.append(mrt_)
+            EpotL.append(Epot)
+        
+        return TgroundL, RprimL, vapourPressureL, mrtL, EpotL
+    
+    def calculate(self, comfortIndices, Ta, mrt, Tdp, rh, ws, SR, N, Tground, Rprim, vapourPressure, Epot, Icl, M, bodyCharacteristics, PHSinputs = None, parallel = False):
+        # a set of indices for lists of items (hours, or points x hours flattened). the intermediate values come from weatherTerms
+        # bodyCharacteristics: age, sex, heightM, weight, bodyPosition, ac, acclimated, activityDuration
+        # PHSinputs: Ta, mrt, ws, vapourPressure, Icl and M lists averaged for the last activityDuration hours (averageWeatherData)
+        # the iterative models (WBGT indoors wet bulb temperature, PET, PHS) are calculated once for each unique combination of their inputs
+        # returns a dictionary with a list of values, categories, comfortableOrNot and details (PETresults) for each index
+        age, sex, heightM, weight, bodyPosition, ac, acclimated, activityDuration = bodyCharacteristics
+        items = xrange(len(Ta))
+        uniqueInputsCalculator = self.comfortModels.uniqueInputsCalculator
+        results = {}
+        
+        for comfortIndex in comfortIndices:
+            if comfortIndex == 0: indexResults = [self.heatIndex(Ta[i], rh[i]) for i in items]
+            elif comfortIndex == 1: indexResults = [self.Humidex(Ta[i], Tdp[i]) for i in items]
+            elif comfortIndex == 2: indexResults = [self.discomfortIndex(Ta[i], rh[i]) for i in items]
+            elif comfortIndex == 3: indexResults = [self.windChillIndex(Ta[i], ws[i]) for i in items]
+            elif comfortIndex == 4: indexResults = [self.windChillTemperature(Ta[i], ws[i]) for i in items]
+            elif comfortIndex == 5:
+                Tpwb = uniqueInputsCalculator(self.naturalWetBulbTemperature, [Ta, Tdp], parallel)
+                indexResults = [self.wbgt_indoors(Ta[i], ws[i], rh[i], vapourPressure[i], mrt[i], Tdp[i], Tpwb[i]) for i in items]
+            elif comfortIndex == 6: indexResults = [self.wbgt_outdoors(Ta[i], ws[i], rh[i], vapourPressure[i], mrt[i]) for i in items]
+            elif comfortIndex == 7: indexResults = [self.effectiveTemperature(Ta[i], ws[i], rh[i], SR[i], ac) for i in items]
+            elif comfortIndex == 8: indexResults = [self.apparentTemperature(Ta[i], ws[i], rh[i]) for i in items]
+            elif comfortIndex == 9: indexResults = [self.thermalSensation(Ta[i], ws[i], rh[i], SR[i], Tground[i]) for i in items]
+            elif comfortIndex == 10: indexResults = [self.actualSensationModel(Ta[i], ws[i], rh[i], SR[i]) for i in items]
+            elif comfortIndex == 11:
+                results[comfortIndex] = [[self.meanRadiantTemperature(Ta[i], Tground[i], Rprim[i], vapourPressure[i], N[i]) for i in items], None, None, None]
+                continue
+            elif comfortIndex == 12: indexResults = [self.predictedInsulationIndexOfClothing(Ta[i], ws[i], M[i]) for i in items]
+            elif comfortIndex == 13:
+                HRrates = self.heartRates(age, sex)
+                indexResults = [self.heartRate(Ta[i], vapourPressure[i], M[i], HRrates) for i in items]
+            elif comfortIndex == 14:
+                dehydrationRiskRates = self.DehydrationRiskRates(acclimated)
+                indexResults = [self.dehydrationRisk(Epot[i], dehydrationRiskRates) for i in items]
+            elif comfortIndex == 15 or comfortIndex == 16:
+                if comfortIndex == 15: climate = "temperate"
+                else: climate = "humid"
+                def PET(Ta, ws, rh, MRT, M, Icl):
+                    return self.physiologicalEquivalentTemperature(climate, Ta, ws, rh, MRT, age, sex, heightM, weight, bodyPosition, M, Icl)
+                indexResults = uniqueInputsCalculator(PET, [Ta, ws, rh, mrt, M, Icl], parallel)
+            elif comfortIndex == 17: indexResults = [self.temperatureHumidityIndex(Ta[i], Tdp[i]) for i in items]
+            elif comfortIndex == 18:
+                if PHSinputs == None: PHSinputs = [Ta, mrt, ws, vapourPressure, Icl, M]
+                def PHS(Ta, mrt, ws, vapourPressure, Icl, M):
+                    return self.predictedHeatStrain(Ta, mrt, ws, vapourPressure, heightM, weight, bodyPosition, Icl, acclimated, M, activityDuration)
+                indexResults = uniqueInputsCalculator(PHS, PHSinputs, parallel)
+            
+            values = []; categories = []; comfortableOrNot = []
+            for result in indexResults:
+                values.append(result[0]); categories.append(result[1]); comfortableOrNot.append(result[2])
+            if comfortIndex == 15 or comfortIndex == 16: details = [result[3] for result in indexResults]
+            else: details = None
+            results[comfortIndex] = [values, categories, comfortableOrNot, details]
+        
+        return results
+    
+    
+    def averageWeatherData(self, hourlyData, activityDuration):
+        # average weather data for the last activityDuration hours
+        activityDurationHours = int(activityDuration/60)
+        activityDurationValues = activityDurationHours - 1
+        hourlyDataShifted = hourlyData[-activityDurationValues:] + hourlyData[:]
+        
+        lastActivityDurationHoursAverageL = [sum(hourlyDataShifted[i:activityDurationHours+i])/activityDurationHours for i in range(8760)]
+        
+        return lastActivityDurationHoursAverageL
+    
+    
+    # temperature units conversion
+    def celsiusToFahrenheit(self, Tc):
+        Tf = (Tc * (9/5)) + 32
+        return Tf
+    
+    def fahrenheitToCelsius(self, Tf):
+        Tc = (Tf-32)*(5/9)
+        return Tc
+    
+    def celsiusToKelvin(self, Tc):
+        Tk = Tc + 273.15
+        return Tk
+    
+    
+    # thermal comfort indices
+    def heatIndex(self, Ta, rh):
+        # formula by (NWS) National Weather Service
+        Tf = self.celsiusToFahrenheit(Ta)
+        
+        if Tf < 80:
+            HI_f = 0.5 * (Tf + 61.0 + ((Tf-68.0)*1.2) + (rh*0.094))
+        else:
+            HI_f = -42.379 + 2.04901523*Tf + 10.14333127*rh - \
+                 0.22475541*Tf*rh -6.83783*(10**(-3))*(Tf**(2)) - \
+                 5.481717*(10**(-2))*(rh**(2)) + \
+                 1.22874*(10**(-3))*(Tf**(2))*(rh) + 8.5282*(10**(-4))*(Tf)*(rh**(2)) - \
+                 1.99*(10**(-6))*(Tf**(2))*(rh**(2))
+            if (Tf >= 80) and (Tf <= 112) and (rh < 13):
+                adjust = ((13-rh)/4) * math.sqrt((17-abs(Tf-95))/17)
+                HI_f = HI_f-adjust
+            elif (Tf >= 80) and (Tf <= 87) and (rh > 85):
+                adjust = ((rh-85)/10) * ((87-Tf)/5)
+                HI_f = HI_f+adjust
+        
+        if HI_f < 80:
+            effectHI = 0
+            comfortable = 1
+        elif HI_f >= 80 and HI_f < 90:
+            effectHI = 1
+            comfortable = 0
+        elif HI_f >= 90 and HI_f < 105:
+            effectHI = 2
+            comfortable = 0
+        elif HI_f >= 105 and HI_f < 130:
+            effectHI = 3
+            comfortable = 0
+        elif HI_f >= 130:
+            effectHI = 4
+            comfortable = 0
+        
+        HI_c = self.fahrenheitToCelsius(HI_f)
+        
+        return HI_c, effectHI, comfortable
+    
+    
+    def dewPointTemperature(self, Ta, rh):
+        # MET4 and MET4A calculation of dew point temperature.
+        # limits:
+        # uncertainty in the calculated dew point temperature: +/- 0.4C
+        # for Tc in range:  0C < Tc < 60C  
+        # for Tdp in range:  0C < Tdp < 50C   
+        a = 17.27
+        b = 237.7
+        rh = rh/100  # 0.01 < rh < 1.00
+        Tdp = (b * ( ((a*Ta)/(b+Ta))+math.log(rh) ))/(a-( ((a*Ta)/(b+Ta))+math.log(rh) ))  # in Celius degrees
+        
+        return Tdp
+    
+    
+    def Humidex(self, Ta, Tdp):
+        # formula by Environment Canada
+        dewpointK = self.celsiusToKelvin(Tdp)  # to Kelvin
+        e = 6.11 * math.exp(5417.7530 * ((1/273.16) - (1/dewpointK)))
+        h = (0.5555)*(e - 10.0)
+        humidex = Ta + h
+        
+        if humidex < 30:
+            effectHumidex = 0
+            comfortable = 1
+        elif humidex >=30 and humidex < 35:
+            effectHumidex = 1
+            comfortable = 0
+        elif humidex >=35 and humidex < 40:
+            effectHumidex = 2
+            comfortable = 0
+        elif humidex >=40 and humidex < 45:
+            effectHumidex = 3
+            comfortable = 0
+        elif humidex >=45 and humidex < 54:
+            effectHumidex = 4
+            comfortable = 0
+        elif humidex >= 54:
+            effectHumidex = 5
+            comfortable = 0
+        
+        return humidex, effectHumidex, comfortable
+    
+    
+    def discomfortIndex(self, Ta, rh):
+        # also called "Thom's Index"
+        # formula from: Thom, E.C. (1959): The discomfort index. Weather wise, 12: 5760.
+        DI = Ta - (0.55 - 0.0055*rh)*(Ta - 14.5)
+        
+        # categories by Kyle, 1994 in Unger, 1999
+        if DI < -40:
+            effectDI = -6
+            comfortable = 0
+        elif DI >= -40 and DI < -20:
+            effectDI = -5
+            comfortable = 0
+        elif DI >= -20 and DI < -10:
+            effectDI = -4
+            comfortable = 0
+        elif DI >= -10 and DI < -1.8:
+            effectDI = -3
+            comfortable = 0
+        elif DI >= -1.8 and DI < 13:
+            effectDI = -2
+            comfortable = 0
+        elif DI >= 13 and DI < 15:
+            effectDI = -1
+            comfortable = 0
+        elif DI >= 15 and DI < 20:
+            effectDI = 0
+            comfortable = 1
+        elif DI >= 20 and DI < 26.5:
+            effectDI = 1
+            comfortable = 0
+        elif DI >= 26.5 and DI < 30:
+            effectDI = 2
+            comfortable = 0
+        elif DI >= 30:
+            effectDI = 3
+            comfortable = 0
+        
+        return DI, effectDI, comfortable
+    
+    
+    def windChillIndex(self, Ta, ws):
+        # formula by Gregorczuk 1976
+        WCI = (10*math.sqrt(ws) + 10.45 - ws)*(33 - Ta)*1.163
+        
+        # Thermal sensations of man wearing clothing with insulation of 4 clo (heavy polar equipment):
+        if WCI >= 2326:
+            effectWCI = -4
+            comfortable = 0
+        elif WCI < 2326 and WCI >= 1628.2:
+            effectWCI = -3
+            comfortable = 0
+        elif WCI < 1628.2 and WCI >= 930.4:
+            effectWCI = -2
+            comfortable = 0
+        elif WCI < 930.4 and WCI >= 581.5:
+            effectWCI = -1
+            comfortable = 0
+        elif WCI < 581.5 and WCI >= 232.6:
+            effectWCI = 0
+            comfortable = 1
+        elif WCI < 232.6 and WCI >= 116.3:
+            effectWCI = 1
+            comfortable = 0
+        elif WCI < 116.3 and WCI >= 58.3:
+            effectWCI = 2
+            comfortable = 0
+        elif WCI < 58.3:
+            effectWCI = 3
+            comfortable = 0
+        
+        return WCI, effectWCI, comfortable
+    
+    
+    def windChillTemperature(self, Ta, ws):
+        # formula by Environment Canada (corresponds to National Weather Service (NSW) Wind chill formula used in U.S.)
+        ws_km_h = ws * 3.6   # convert m/s to km/h wind speed
+        
+        Twc = 13.12 + 0.6215*Ta - 11.37*(ws_km_h**0.16) + 0.3965*Ta*(ws_km_h**0.16)   # in Celius degrees
+        
+        if Twc >= 0:
+            effectTwc = 0
+            comfortable = 1
+        elif Twc < 0 and Twc >= -9:
+            effectTwc = -1
+            comfortable = 0
+        elif Twc < -9 and Twc >= -27:
+            effectTwc = -2
+            comfortable = 0
+        elif Twc < -27 and Twc >= -39:
+            effectTwc = -3
+            comfortable = 0
+        elif Twc < -39 and Twc >= -47:
+            effectTwc = -4
+            comfortable = 0
+        elif Twc < -47 and Twc >= -54:
+            effectTwc = -5
+            comfortable = 0
+        elif Twc < -54:
+            effectTwc = -6
+            comfortable = 0
+        
+        return Twc, effectTwc, comfortable
+    
+    
+    def effectiveTemperature(self, Ta, ws, rh, SR, ac):
+        if ws <= 0.2:
+            # formula by Missenard
+            TE = Ta - 0.4*(Ta - 10)*(1-rh/100)
+        elif ws > 0.2:
+            # modified formula by Gregorczuk (WMO, 1972; Hentschel, 1987)
+            TE = 37 - ( (37-Ta)/(0.68-(0.0014*rh)+(1/(1.76+1.4*(ws**0.75)))) ) - (0.29 * Ta * (1-0.01*rh))
+        
+        # Radiative-effective temperature
+        TRE = TE + ((1 - 0.01*ac)*SR) * ((0.0155 - 0.00025*TE) - (0.0043 - 0.00011*TE))
+        
+        if TRE < 1:
+            effectTE = -4
+            comfortable = 0
+        elif TRE >= 1 and TE < 9:
+            effectTE = -3
+            comfortable = 0
+        elif TRE >= 9 and TE < 17:
+            effectTE = -2
+            comfortable = 0
+        elif TRE >= 17 and TE < 21:
+            effectTE = -1
+            comfortable = 0
+        elif TRE >= 21 and TE < 23:
+            effectTE = 0
+            comfortable = 1
+        elif TRE >= 23 and TE < 27:
+            effectTE = 1
+            comfortable = 0
+        elif TRE >= 27:
+            effectTE = 2
+            comfortable = 0
+        
+        return TRE, effectTE, comfortable
+    
+    
+    def apparentTemperature(self, Ta, ws, rh):
+        
+        e = (rh/100) * 6.105 * math.exp((17.27*Ta)/(237.7+Ta))
+        AT = Ta + (0.33*e) - (0.70*ws) - 4.00
+        
+        # Apparel effects by: Norms of apparent temperature in Australia, Aust. Met. Mag., 1994, Vol 43, 1-16:
+        if AT > 40:
+            effectAT = 4
+            comfortable = 0
+        elif AT > 35 and AT <= 40:
+            effectAT = 3
+            comfortable = 0
+        elif AT > 30 and AT <= 35:
+            effectAT = 2
+            comfortable = 0
+        elif AT > 25 and AT <= 30:
+            effectAT = 1
+            comfortable = 0
+        elif AT > 20 and AT <= 25:
+            effectAT = 0
+            comfortable = 1
+        elif AT > 15 and AT <= 20:
+            effectAT = -1
+            comfortable = 0
+        elif AT > 10 and AT <= 15:
+            effectAT = -2
+            comfortable = 0
+        elif AT > 5 and AT <= 10:
+            effectAT = -3
+            comfortable = 0
+        elif AT > 0 and AT <= 5:
+            effectAT = -4
+            comfortable = 0
+        elif AT > -5 and AT <= 0:
+            effectAT = -5
+            comfortable = 0
+        elif AT <= -5:
+            effectAT = -6
+            comfortable = 0
+        
+        return AT, effectAT, comfortable
+    
+    
+    def thermalSensation(self, Ta, ws, rh, SR, Tground):
+        # formula from: Givoni, Noguchi, Issues and problems in outdoor comfort research, in: Proceedings of the PLEA2000 Conference, Cambridge, UK, July 2000
+        TS=1.7+0.1118*Ta+0.0019*SR-0.322*ws-0.0073*rh+0.0054*Tground
+        
+        if TS < 2:
+            effectTS = -3
+            comfortable = 0
+        elif TS >= 2 and TS < 3:
+            effectTS = -2
+            comfortable = 0
+        elif TS >= 3 and TS < 4:
+            effectTS = -1
+            comfortable = 0
+        elif TS >= 4 and TS < 5:
+            effectTS = 0
+            comfortable = 1
+        elif TS >= 5 and TS < 6:
+            effectTS = 1
+            comfortable = 0
+        elif TS >= 6 and TS < 7:
+            effectTS = 2
+            comfortable = 0
+        elif TS >= 7:
+            effectTS = 3
+            comfortable = 0
+        
+        return TS, effectTS, comfortable
+    
+    
+    def actualSensationModel(self, Ta, ws, rh, SR):
+        # Actual Sensation Model for whole Europe 
+        # formula by RUROS project.
+        ASV = 0.049*Ta + 0.001*SR - 0.051*ws + 0.014*rh - 2.079
+        
+        # Classification of human thermal sensation according to TS levels and ASV scale
+        # Givoni and Noguchi, 2000; Nikolopoulou et al., 2004
+        if ASV < -2:
+            effectASV = -2
+            comfortable = 0
+        elif ASV >= -2 and ASV < -1:
+            effectASV = -1
+            comfortable = 0
+        elif ASV >= -1 and ASV <= 1:
+            effectASV = 0
+            comfortable = 1
+        elif ASV > 1 and ASV <= 2:
+            effectASV = 1
+            comfortable = 0
+        elif ASV > 2:
+            effectASV = 2
+            comfortable = 0
+        
+        return ASV, effectASV, comfortable
+    
+    
+    def solarRadiationNudeMan(self, Kglob, hSl, ac):
+        # formula from: Bioclimatic principles of recreation and tourism in Poland, 2nd edition, Blazejczyk, Kunert, 2011 (MENEX_2005 model)
+        Kt = Kglob / (-0.0015*(hSl**3) + 0.1796*(hSl**2) + 9.6375*hSl - 11.9)
+        
+        ac_ = 1 - 0.01*ac
+        
+        # Rprim - solar radiation absorbed by nude man (W/m2)
+        if hSl <= 12:
+            Rprim = ac_*(0.0014*(Kglob**2) + 0.476*Kglob - 3.8)
+        elif hSl > 12 and Kt <= 0.8:
+            Rprim = 0.2467*ac_*(Kglob**0.9763)
+        elif hSl > 12 and Kt >0.8 and Kt <=1.05:
+            Rprim = 3.6922*ac_*(Kglob**0.5842)
+        elif hSl > 12 and Kt > 1.05 and Kt <=1.2:
+            Rprim = 43.426*ac_*(Kglob**0.2326)
+        elif hSl > 12 and Kt >1.2:
+            Rprim = 8.9281*ac_*(Kglob**0.4861)
+        
+        if Rprim < 0:
+            Rprim = 0
+        
+        return Rprim
+    
+    
+    def groundTemperature(self, Ta, N):
+        # formula from: Assessment of bioclimatic differentiation of Poland. Based on the human heat balance, Geographia Polonica, Matzarakis, Blazejczyk, 2007
+        N100 = N *10 #converting weather data totalSkyCover from 0 to 10% to 0 to 100%
+        
+        if (N100 == None) or (N100 >= 80):
+            Tground = Ta
+        elif (N100 < 80) and (Ta >= 0):
+            Tground = 1.25*Ta
+        elif (N100 < 80) and (Ta < 0):
+            Tground = 0.9*Ta
+        
+        return Tground
+    
+    
+    def VapourPressure(self, Ta, rh):
+        # formula by ITS-90 formulations for vapor pressure, frostpoint temperature, dewpoint temperature, and enhancement factors in the range 100 to +100 c, Thunder Scientific Corporation, Albuquerque, NM, Bob Hardy
+        TaK = Ta + 273.15   # convert to Kelvins
+        
+        TS90coefficients = [-2.8365744*(10**(3)), -6.028076559*(10**(3)), 1.954263612*(10**(1)), -2.737830188*(10**(-2)), 1.6261698*(10**(-5)), 7.0229056*(10**(-10)), -1.8680009*(10**(-13)), 2.7150305]
+        e_s = TS90coefficients[7]*math.log(TaK)
+        
+        for i in range(7):
+            e_s += TS90coefficients[i]*(TaK**(i-2))
+        
+        es = math.exp(e_s)  # in Pa
+        
+        es = (es*0.01*rh)/100  # convert to hPa
+        
+        return es
+    
+    
+    def meanRadiantTemperature(self, Ta, Tground, Rprim, e, N):
+        # formula by Man-ENvironment heat EXchange model (MENEX_2005)
+        
+        La = 5.5*(10**(-8)) *((273 + Ta)**(4)) *(0.82 - 0.25*(10**(-0.094*0.75*e))) * (1 + 0.22*((N/10)**2.75))  # incoming long-wave radiation emitted from the sky hemisphere, in W/m2
+        Lg = 5.5 *(10**(-8)) * ((273 + Tground)**(4))  # outgoing long-wave radiation emitted by the ground, in W/m2
+        
+        MRT = (((Rprim + 0.5*Lg + 0.5*La) / (0.95*5.667*(10**(-8))))**(0.25)) - 273  # in C
+        
+        return MRT
+    
+    
+    def naturalWetBulbTemperature(self, Ta, Tdp):
+        # natural wet bulb temperature based on code written by Nick Burns: https://github.com/nickb-/Calculating-WBGT/blob/master/relaxation_Tw/working_code/wbgt.R
+        ed = 0.6106 * math.exp(17.27 * Tdp / (237.7 + Tdp))
+        edTerm1 = 1556*ed; edTerm2 = 1.484*ed
+        def McPherson(Tpwb):
+            ew = 0.6106 * math.exp(17.27 * Tpwb / (237.7 + Tpwb))
+            return edTerm1 - edTerm2*Tpwb - 1556*ew + 1.484*ew*Tpwb + 101*(Ta - Tpwb)
+        
+        step = 0.02  # lowering the step value increases precision
+        Tpwb = Tdp + step
+        
+        # McPherson is positive at Tdp and decreases to a negative value at Ta. its root is bracketed by bisection and the
+        # steps that are well below the root are only added up, so Tpwb is the same as when McPherson is calculated at each step
+        if Ta - Tdp > 1:
+            low = Tdp; high = Ta
+            for i in range(30):
+                mid = (low + high) / 2
+                if McPherson(mid) > 0: low = mid
+                else: high = mid
+            while Tpwb < low - 0.1:
+                Tpwb = Tpwb + step
+        
+        McPherson_1 = 1
+        McPherson_2 = 1
+        while Tpwb <= Ta and ((McPherson_1 > 0 and McPherson_2 > 0) or (McPherson_1 < 0 and McPherson_2 <0)):
+            McPherson_1 = McPherson_2
+            McPherson_2 = McPherson(Tpwb)
+            Tpwb = Tpwb + step
+        
+        return Tpwb
+    
+    
+    def wbgt_indoors(self, Ta, ws, rh, e, MRT, Tdp, Tpwb = None):
+        # WBGT indoor formula by Bernard
+        # formula from: "Calculating Workplace WBGT from Meteorological Data: A Tool for Climate Change Assessment", Lemke, Kjellstrom, 2012
+        if Tpwb == None: Tpwb = self.naturalWetBulbTemperature(Ta, Tdp)
+        
+        if (ws > 3):
+            WBGTid = 0.7*Tpwb + 0.3*Ta
+        elif (ws >= 0.3) and (ws <= 3):
+            WBGTid = 0.67 * Tpwb + 0.33 * Ta - 0.048*math.log10(ws) * (Ta - Tpwb)
+        elif (ws < 0.3):
+            ws = 0.3
+            WBGTid = 0.67 * Tpwb + 0.33 * Ta - 0.048*math.log10(ws) * (Ta - Tpwb)
+        WBGT_f = self.celsiusToFahrenheit(WBGTid)
+        
+        # Suggested actions and Impact Prevention by Environmental Health Section, Dwight D. Eisenhower Medical Center:
+        if WBGT_f < 80:
+            effectWBGT = 0
+            comfortable = 1
+        elif WBGT_f >= 80 and WBGT_f < 82:
+            effectWBGT = 1
+            comfortable = 0
+        elif WBGT_f >= 82 and WBGT_f < 85:
+            effectWBGT = 2
+            comfortable = 0
+        elif WBGT_f >=85 and WBGT_f < 88:
+            effectWBGT = 3
+            comfortable = 0
+        elif WBGT_f >=88 and WBGT_f < 90:
+            effectWBGT = 4
+            comfortable = 0
+        elif WBGT_f >= 90:
+            effectWBGT = 5
+            comfortable = 0
+        
+        return WBGTid, effectWBGT, comfortable
+    
+    
+    def wbgt_outdoors(self, Ta, ws, rh, e, MRT):
+        # WBGT outdoor formula from Heat stress and occupational health and safety  spatial and temporal differentiation, K. Blazejczyk, J.Baranowski, A. Blazejczyk, Miscellanea geographica  regional studies on development, Vol. 18, No. 1, 2014, 
+        Tw = 1.885 + 0.3704*Ta + 0.4492*e
+        Tg = 2.098 - 2.561*ws + 0.5957*Ta + 0.4017*MRT
+        WBGTout = 0.7*Tw + 0.2*Tg + 0.1*Ta
+        WBGT_f = self.celsiusToFahrenheit(WBGTout)
+        
+        # Suggested actions and Impact Prevention by Environmental Health Section, Dwight D. Eisenhower Medical Center:
+        if WBGT_f < 80:
+            effectWBGT = 0
+            comfortable = 1
+        elif WBGT_f >= 80 and WBGT_f < 82:
+            effectWBGT = 1
+            comfortable = 0
+        elif WBGT_f >= 82 and WBGT_f < 85:
+            effectWBGT = 2
+            comfortable = 0
+        elif WBGT_f >=85 and WBGT_f < 88:
+            effectWBGT = 3
+            comfortable = 0
+        elif WBGT_f >=88 and WBGT_f < 90:
+            effectWBGT = 4
+            comfortable = 0
+        elif WBGT_f >= 90:
+            effectWBGT = 5
+            comfortable = 0
+        
+        return WBGTout, effectWBGT, comfortable
+    
+    
+    def predictedInsulationIndexOfClothing(self, Ta, ws, M):
+        # total insulation of clothing and the surrounding air layer by Burton and Edholm (1955)
+        It = (0.082*(91.4 - (1.8*Ta + 32)) / (0.01724*M))
+        # insulation of the surrounded air layer by Fourt and Hollies (1970)
+        Ia = 1/(0.61+1.9*(ws**0.5))
+        
+        Iclp = It - Ia  # in clo
+        
+        if Iclp > 4.0:
+            effectIclp = -4
+            comfortable = 1
+        elif Iclp > 3.0 and Iclp <= 4.0:
+            effectIclp = -3
+            comfortable = 0
+        elif Iclp > 2.0 and Iclp <= 3.0:
+            effectIclp = -2
+            comfortable = 0
+        elif Iclp > 1.20 and Iclp <= 2.0:
+            effectIclp = -1
+            comfortable = 0
+        elif Iclp > 0.80 and Iclp <= 1.20:
+            effectIclp = 0
+            comfortable = 1
+        elif Iclp > 0.30 and Iclp <= 0.80:
+            effectIclp = 1
+            comfortable = 0
+        elif Iclp <= 0.30:
+            effectIclp = 2
+            comfortable = 0
+        
+        if Iclp < 0.5: Iclp = 0.5  # summer clothes (light trousers, short sleeves or blouse)
+        if Iclp > 4.1: Iclp = 4.1  # heavy polar outfit (fur pants, coat, hood, gloves...)
+        
+        return Iclp, effectIclp, comfortable
+    
+    
+    def heartRates(self, age, sex):
+        #Resting Heart Rates for Man taken from: http://www.topendsports.com/testing/heart-rate-resting-chart.htm
+        if sex == "male":
+            if age <= 25:
+                HRrates = [73,82,90]
+            elif age > 25 and age <= 35:
+                HRrates = [74,82,90]
+            elif age > 35 and age <= 45:
+                HRrates = [75,83,90]
+            elif age > 45 and age <= 55:
+                HRrates = [76,84,90]
+            elif age > 55 and age <= 65:
+                HRrates = [75,82,90]
+            elif age > 65:
+                HRrates = [73,80,90]
+        elif sex == "female":
+            if age <= 25:
+                HRrates = [78,85,90]
+            elif age > 25 and age <= 35:
+                HRrates = [76,83,90]
+            elif age > 35 and age <= 45:
+                HRrates = [78,85,90]
+            elif age > 45 and age <= 55:
+                HRrates = [77,84,90]
+            elif age > 55 and age <= 65:
+                HRrates = [77,84,90]
+            elif age > 65:
+                HRrates = [76,84,90]
+        
+        return HRrates
+    
+    
+    def heartRate(self, Ta, e, M, HRrates):
+        #formula by Fuller, Brouha 1966
+        HR = 22.4 + 0.18*M + 0.25*(5*Ta + 2.66*e)
+        HR = int(round(HR))
+        
+        if HR < HRrates[0]:
+            effectHR = 0
+            comfortable = 1
+        elif HR >= HRrates[0] and HR < HRrates[1]:
+            effectHR = 1
+            comfortable = 0
+        elif HR >= HRrates[1] and HR < HRrates[2]:
+            effectHR = 2
+            comfortable = 0
+        elif HR >= HRrates[2]:
+            effectHR = 3
+            comfortable = 0
+        
+        return HR, effectHR, comfortable
+    
+    
+    def clothingInsulation(self, Ta):
+        # by MENEX_2005 model
+        if Ta > 25:
+            Icl = 0.5  # summer clothes
+        else:
+            Icl = 1.691 - 0.0436*Ta
+        
+        if Icl > 4:
+            Icl = 4.1  # Heavy polar outfit
+        
+        return Icl
+    
+    
+    def meanSkinTemperature(self, Ta, ws, rh, MRT, Icl, M):
+        
+        Ts = (26.4 + 0.02138*MRT + 0.2095*Ta - 0.0185*rh - 0.009*ws) + 0.6*(Icl - 1) + 0.00128*M
+        return Ts  # in C
+    
+    
+    def turbulentExchangeOfLatentHeat(self, Ta, ws, Ts, Icl, e_, M):
+        # Turbulent exchange of latent heat (evaporation - mE) in W/m2
+        
+        p = 1000  # barometricpressure in hPa, default value
+        he = Ta*(6*(10**(-5))*Ta - 2*(10**(-5))*p + 0.011) + 0.02*p - 0.773
+        
+        hc = 0.013*p - 0.04*Ta - 0.503
+        
+        vprim = 1.1 #m/s default value (for man movement 4km/h)
+        d = math.sqrt(ws+vprim)
+        
+        if Ts < 22:
+            w = 0.002
+        elif Ts >= 22 and Ts <= 36.5:
+            w = 1.031/(37.5-Ts)- 0.065
+        elif Ts > 36.5:
+            w = 1.0
+        
+        if ws >= 0.2:
+            vcor = ws
+        elif ws < 0.2:
+            vcor = 0.2
+        d_ = 0.53/ (Icl *(1-0.27*math.exp(0.4*math.log(vcor+vprim))))
+        Ie = hc*d_ / (hc*(d + d_))
+        
+        esk = math.exp(0.058*Ts + 2.003)
+        
+        mE = he*d*w*Ie*(e_-esk) - 0.42*(M - 58.0) + 5.04
+        
+        return mE
+    
+    
+    def DehydrationRiskRates(self, acclimated):
+        if acclimated == "acclimated":
+            dehydrationRiskRates = [780,1040]
+        elif acclimated == "unacclimated":
+            dehydrationRiskRates = [520,650]
+        
+        return dehydrationRiskRates
+    
+    
+    def dehydrationRisk(self, Epot, dehydrationRiskRates):
+        # formula from MENEX_2005 model
+        # water loss
+        SW = -2.6*Epot  # in g/hour
+        
+        if SW < dehydrationRiskRates[0]:
+            effectSW = 0
+            comfortable = 1
+        elif SW >= dehydrationRiskRates[0] and SW <= dehydrationRiskRates[1]:
+            effectSW = 1
+            comfortable = 0
+        elif SW > dehydrationRiskRates[1]:
+            effectSW = 2
+            comfortable = 0
+        
+        return SW, effectSW, comfortable
+    
+    
+    def physiologicalEquivalentTemperature(self, climate, Ta, ws, rh, MRT, age, sex, heightM, weight, bodyPosition, M, Icl):
+        # based on: Peter Hoeppe PET fortran code, from:
+        # "Urban climatic map and standards for wind environment - Feasibility study, Technical Input Report No.1",
+        # The Chinese University of Hong Kong, Planning Department, Nov 2008
+        
+        petObj = ComfortModels.physiologicalEquivalentTemperature(Ta, MRT, rh, ws, age, sex, heightM, weight, bodyPosition, M, Icl)
+        respiration = petObj.inkoerp()
+        coreTemperature, radiationBalance, convection, waterVaporDiffusion = petObj.berech()
+        petObj.pet()
+        skinTemperature, totalHeatLoss, skinSweating, internalHeat, sweatEvaporation, PET = petObj.tsk, petObj.wsum, petObj.wetsk, petObj.h, petObj.esw, petObj.tx
+        effectPET, comfortablePET = petObj.thermalCategories(climate)
+        
+        PETresults = [coreTemperature, skinTemperature, totalHeatLoss, skinSweating, internalHeat, radiationBalance, convection, waterVaporDiffusion, sweatEvaporation, respiration]
+        
+        return PET, effectPET, comfortablePET, PETresults
+    
+    
+    def temperatureHumidityIndex(self, Ta, Tdp):
+        # formula and categories based on: Taiwan's Central Weather Bureau
+        THI = Ta - 0.55 * (1-math.exp((17.269*Tdp)/(Tdp+237.3)-(17.269*Ta)/(Ta+237.3))) * (Ta-14)  # Taiwan's Central Weather Bureau Comfort Index
+        
+        if THI < 11:
+            effectTHI = -3
+            comfortable = 0
+        elif THI >= 11 and THI < 16:
+            effectTHI = -2
+            comfortable = 0
+        elif THI >= 16 and THI < 20:
+            effectTHI = -1
+            comfortable = 0
+        elif THI >= 20 and THI < 27:
+            effectTHI = 0
+            comfortable = 1
+        elif THI >= 27 and THI < 31:
+            effectTHI = 1
+            comfortable = 0
+        elif THI >= 31:
+            effectTHI = 2
+            comfortable = 0
+        
+        return THI, effectTHI, comfortable
+    
+    
+    def predictedHeatStrain(self, Ta, mrt, ws, vapourPressure, heightM, weight, bodyPosition, Icl, acclimated, Met, activityDuration):
+        # based on: Dr. Jacques Malchaire Quick Basic code from:
+        # "Ergonomics of the thermal environment - Analytical determination and interpretation of heat stress using calculation of predicted heat strain", ISO 7933, 2004
+        # the terms that only depend on the inputs are calculated before the minute by minute loop. once the body temperatures
+        # and the sweat rate stop changing, the rest of the minutes only add up the water loss
+        
+        drink = 1  # if drink = 1: water replacement is sufficient, and workers can drink freely; otherwise: drink = 0
+        if acclimated == "acclimated":  # 100 if acclimatised person, 0 if unacclimatised person
+            accl = 100
+        elif acclimated == "unacclimated":
+            accl = 0
+        
+        # Effective radiating area of the body (1 = sitting, 2 = standing, 3 = crouching)
+        if bodyPosition == "sitting":
+            Ardu = 0.7  # dimensionless
+        elif bodyPosition == "standing":
+            Ardu = 0.77  # dimensionless
+        elif bodyPosition == "crouching":
+            Ardu = 0.67  # dimensionless
+        
+        Pa = vapourPressure * 0.1  # partial water vapour pressure, converted from hectopascals to kilopascals
+        Work = 0  # effective mechanical power, in W/m2
+        imst = 0.38  # static moisture permeability index, dimensionless
+        Ap = 0.54  # fraction of the body surface covered by the reflective clothing, dimensionless
+        Fr = 0.97  # emissivity of the reflective clothing, dimensionless
+        # walking
+        defspeed = 1  # 1 if walking speed entered, 0 otherwise
+        Walksp = 0  # walking speed, in m/s
+        defdir = 1  # 1 if walking direction entered, 0 otherwise
+        THETA = 0  # angle between walking direction and wind direction degrees
+        
+        Adu = 0.202 * weight ** 0.425 * heightM ** 0.725  # body surface area in m2
+        spHeat = 57.83 * weight / Adu
+        
+        SWp = 0
+        SWtot = 0; Tre = 36.8; Tcr = 36.8; Tsk = 34.1; Tcreq = 36.8; TskTcrwg = 0.3
+        Dlimtre = 0; Dlimloss50 = 0; Dlimloss95 = 0
+        Dmax50 = 0.075 * weight * 1000
+        Dmax95 = 0.05 * weight * 1000
+        
+        # EXPONENTIAL AVERAGING CONSTANTS
+        # Core temperature as a function of the metabolic rate: time constant: 10 minutes
+        ConstTeq = math.exp(-1 / 10)
+        # Skin Temperature: time constant: 3 minutes
+        ConstTsk = math.exp(-1 / 3)
+        # Sweat rate: time constant: 10 minutes
+        ConstSW = math.exp(-1 / 10)
+        
+        # EVALUATION OF THE MAXIMUM SWEAT RATE AS A FUNCTION OF THE METABOLIC RATE
+        SWmax = (Met - 32) * Adu
+        if SWmax > 400: SWmax = 400
+        if SWmax < 250: SWmax = 250
+        # For acclimatised subjects (accl=100), the maximum Sweat Rate is greater by 25%
+        if accl >= 50: SWmax = SWmax * 1.25
+        if accl < 50: Wmax = 0.85
+        else: Wmax = 1
+        
+        # EQUILIBRIUM CORE TEMPERATURE ASSOCIATED TO THE METABOLIC RATE
+        Tcreqm = 0.0036 * Met + 36.6
+        
+        # SKIN TEMPERATURE IN EQUILIBRIUM, without the rectal temperature terms
+        # Clothed model
+        Tskeqcl0 = 12.165 + 0.02017 * Ta + 0.04361 * mrt + 0.19354 * Pa - 0.25315 * ws
+        Tskeqcl0 = Tskeqcl0 + 0.005346 * Met
+        # Nude model
+        Tskeqnu0 = 7.191 + 0.064 * Ta + 0.061 * mrt + 0.198 * Pa - 0.348 * ws
+        
+        # CLOTHING INFLUENCE ON EXCHANGE COEFFICIENTS
+        # Static clothing insulation
+        Iclst = Icl * 0.155
+        # Clothing area factor
+        fcl = 1 + 0.3 * Icl
+        # Static boundary layer thermal insulation in quiet air
+        Iast = 0.111
+        # Total static insulation
+        Itotst = Iclst + Iast / fcl
+        
+        # Relative velocities due to air velocity and movements
+        if defspeed > 0:
+            if defdir == 1:
+                # Unidirectional walking
+                Var = abs(ws - Walksp * math.cos(3.14159 * THETA / 180))
+            else:
+                # Omni-directional walking
+                if ws < Walksp:
+                    Var = Walksp
+                else: Var = ws
+        else:
+            # Stationary or undefined speed
+            Walksp = 0.0052 * (Met - 58)
+            if Walksp > 0.7:
+                Walksp = 0.7
+            Var = ws
+        
+        # Dynamic clothing insulation
+        # Clothing insulation correction for wind (Var) and walking (Walksp) 
+        Vaux = Var
+        if Var > 3:
+            Vaux = 3
+        Waux = Walksp
+        if Walksp > 1.5:
+            Waux = 1.5
+        CORcl = 1.044 * math.exp((.066 * Vaux - 0.398) * Vaux + (.094 * Waux - 0.378) * Waux)
+        if CORcl > 1:
+            CORcl = 1
+        CORia = math.exp((.047 * Var - 0.472) * Var + (.117 * Waux - 0.342) * Waux)
+        if CORia > 1:
+            CORia = 1
+        
+        CORtot = CORcl
+        if Icl <= 0.6:
+            CORtot = ((.6 - Icl) * CORia + Icl * CORcl) / .6
+        
+        Itotdyn = Itotst * CORtot
+        IAdyn = CORia * Iast
+        Icldyn = Itotdyn - IAdyn / fcl
+        
+        # Permeability index
+        # Correction for wind and walking
+        CORe = (2.6 * CORtot - 6.5) * CORtot + 4.9
+        imdyn = imst * CORe
+        if imdyn > 0.9:
+            imdyn = 0.9
+        # Dynamic evaporative resistance
+        Rtdyn = Itotdyn / imdyn / 16.7
+        
+        # HEAT EXCHANGES
+        # Heat exchanges through respiratory convection and evaporation
+        # temperature of the expired air
+        Texp = 28.56 + 0.115 * Ta + 0.641 * Pa
+        Cres = 0.001516 * Met * (Texp - Ta)
+        Eres = 0.00127 * Met * (59.34 + 0.53 * Ta - 11.63 * Pa)
+        
+        # Dynamic convection coefficient
+        Z = 3.5 + 5.2 * Var
+        if Var > 1:
+            Z = 8.7 * Var ** 0.6
+        
+        auxR = 5.67E-08 * Ardu
+        FclR = (1 - Ap) * 0.97 + Ap * Fr
+        FclRauxR = FclR * auxR
+        mrtK4 = (mrt + 273) ** 4
+        invIcldyn = 1 / Icldyn
+        
+        steady = False
+        for minute in range(1, activityDuration+1):  # activityDuration - the duration of the work sequence in minutes
+            if not steady:
+                # INITIALISATION MIN PER MIN
+                Tsk0 = Tsk; Tre0 = Tre; Tcr0 = Tcr; Tcreq0 = Tcreq; TskTcrwg0 = TskTcrwg; SWp0 = SWp
+                
+                # Core temperature at this minute, by exponential averaging
+                Tcreq = Tcreq0 * ConstTeq + Tcreqm * (1 - ConstTeq)
+                # Heat storage associated with this core temperature increase during the last minute
+                dStoreq = spHeat * (Tcreq - Tcreq0) * (1 - TskTcrwg0)
+                
+                # SKIN TEMPERATURE PREDICTION
+                Tskeqcl = Tskeqcl0 + 0.51274 * Tre
+                Tskeqnu = Tskeqnu0 + 0.616 * Tre
+                # Value at this minute, as a function of the clothing insulation
+                if Icl <= 0.2: Tskeq = Tskeqnu
+                else: Tskeq = Tskeqnu + 2.5 * (Tskeqcl - Tskeqnu) * (Icl - 0.2)  # Interpolation between the values for clothed and nude subjects, if  0.2 < clo < 0.6
+                
+                # Skin Temperature at this minute, by exponential averaging
+                Tsk = Tsk0 * ConstTsk + Tskeq * (1 - ConstTsk)
+                # Saturated water vapour pressure at the surface of the skin
+                Psk = 0.6105 * math.exp(17.27 * Tsk / (Tsk + 237.3))
+                
+                # Mean temperature of the clothing: Tcl
+                Hcdyn = 2.38 * abs(Tsk - Ta) ** 0.25
+                if Z > Hcdyn:
+                    Hcdyn = Z
+                Tcl = mrt + 0.1
+                HcdynTa = Hcdyn * Ta; TskIcldyn = Tsk / Icldyn
+                
+                for k in range(100):
+                    # Radiation coefficient
+                    Hr = FclRauxR * ((Tcl + 273) ** 4 - mrtK4) / (Tcl - mrt)
+                    Tcl1 = ((fcl * (HcdynTa + Hr * mrt) + TskIcldyn)) / (fcl * (Hcdyn + Hr) + invIcldyn)
+                    
+                    if abs(Tcl - Tcl1) > 0.001:
+                        Tcl = (Tcl + Tcl1) / 2
+                        continue
+                    else:
+                        break
+                
+                # Convection and Radiation heat exchanges
+                Conv = fcl * Hcdyn * (Tcl - Ta)
+                Rad = fcl * Hr * (Tcl - mrt)
+                # Maximum Evaporation Rate
+                Emax = (Psk - Pa) / Rtdyn
+                # Required Evaporation Rate
+                Ereq = Met - dStoreq - Work - Cres - Eres - Conv - Rad
+                
+                # INTERPRETATION
+                # Required wettedness
+                wreq = Ereq / Emax
+                
+                # Required Sweat Rate
+                #    If no evaporation required: no sweat rate
+                if Ereq <= 0:
+                    Ereq = 0; SWreq = 0;
+                else:
+                    #    If evaporation is not possible, sweat rate is maximum
+                    if Emax <= 0:
+                        Emax = 0; SWreq = SWmax;
+                    else:
+                        #    If required wettedness greater than 1.7: sweat rate is maximum
+                        if wreq >= 1.7:
+                            wreq = 1.7; SWreq = SWmax;
+                        else:
+                            #    Required evaporation efficiency
+                            Eveff = (1 - wreq ** 2 / 2)
+                            if wreq > 1:
+                                Eveff = (2 - wreq) ** 2 / 2
+                            SWreq = Ereq / Eveff
+                            if SWreq > SWmax:
+                                SWreq = SWmax
+                
+                # Predicted Sweat Rate, by exponential averaging
+                SWp = SWp * ConstSW + SWreq * (1 - ConstSW)
+                if SWp <= 0:
+                    Ep = 0; SWp = 0;
+                else:
+                    # Predicted Evaporation Rate
+                    k = Emax / SWp
+                    wp = 1
+                    if k >= 0.5:
+                        wp = -k + math.sqrt(k * k + 2)
+                    if wp > Wmax:
+                        wp = Wmax
+                    Ep = wp * Emax
+                
+                # Heat Storage
+                dStorage = Ereq - Ep + dStoreq
+                
+                # PREDICTION OF THE CORE TEMPERATURE
+                Tcr1 = Tcr0
+                for g in range(50):
+                    # Skin - Core weighting
+                    TskTcrwg = 0.3 - 0.09 * (Tcr1 - 36.8)
+                    if TskTcrwg > 0.3:
+                        TskTcrwg = 0.3
+                    if TskTcrwg < 0.1:
+                        TskTcrwg = 0.1
+                    
+                    Tcr = dStorage / spHeat + Tsk0 * TskTcrwg0 / 2 - Tsk * TskTcrwg / 2
+                    Tcr = (Tcr + Tcr0 * (1 - TskTcrwg0 / 2)) / (1 - TskTcrwg / 2)
+                    if abs(Tcr - Tcr1) > 0.001:
+                        Tcr1 = (Tcr1 + Tcr) / 2;
+                        continue
+                    else:
+                        break
+                
+                # PREDICTION OF THE CENTRAL (RECTAL) TEMPERATURE
+                Tre = Tre0 + (2 * Tcr - 1.962 * Tre0 - 1.31) / 9  # in Celsius degrees
+                
+                # the next minutes will be the same as this one
+                steady = (Tsk == Tsk0 and Tre == Tre0 and Tcr == Tcr0 and Tcreq == Tcreq0 and TskTcrwg == TskTcrwg0 and SWp == SWp0)
+            
+            if Dlimtre == 0 and Tre >= 38: Dlimtre = minute
+            # Total water loss rate during the minute (in W/m2)
+            SWtot = SWtot + SWp + Eres
+            SWtotg = SWtot * 2.67 * Adu / 1.8 / 60
+            
+            if Dlimloss50 == 0 and SWtotg >= Dmax50: Dlimloss50 = minute
+            if Dlimloss95 == 0 and SWtotg >= Dmax95: Dlimloss95 = minute
+            if drink == 0:
+                Dlimloss95 = Dlimloss95 * 0.6;
+                Dlimloss50 = Dlimloss95
+        
+        if Dlimloss50 == 0:
+            Dlimloss50 = activityDuration
+        if Dlimloss95 == 0:
+            Dlimloss95 = activityDuration
+        if Dlimtre == 0:
+            Dlimtre = activityDuration
+        
+        PHSresults = [SWtotg, Dlimloss95, Dlimtre]
+        
+        
+        if (Dlimloss95 >= activityDuration) and (Dlimtre >= activityDuration):
+            effectPHS = 0
+            comfortable = 1
+        elif (Dlimtre <= 30) or (Dlimloss95 <= 30):
+            effectPHS = 4
+            comfortable = 0
+        elif ((Dlimtre > 30) and (Dlimtre <= 120)) or ((Dlimloss95 > 30) and (Dlimloss95 <= 120)):
+            effectPHS = 3
+            comfortable = 0
+        elif ((Dlimtre > 120) and (Dlimtre < (activityDuration - activityDuration*0.015))) or ((Dlimloss95 > 120) and (Dlimloss95 < (activityDuration - activityDuration*0.015))):
+            effectPHS = 2
+            comfortable = 0
+        elif ((Dlimtre >= (activityDuration - activityDuration*0.015)) and (Dlimtre < activityDuration)) or ((Dlimloss95 >= (activityDuration - activityDuration*0.015)) and (Dlimloss95 < activityDuration)):
+            effectPHS = 1
+            comfortable = 0
+        
+        return Tre, effectPHS, comfortable
+
+
 class WindSpeed(object):
     def readTerrainType(self, terrainType, powerOrLog = 0):
         # Function that reads terrain type and returns the following paremeters used to calculate wind speed above the ground:
@@ -5390,72 +8438,19 @@ class Photovoltaics(object):
         
         return seasonIndex
     
-    def calculateSkyExposureFactor(self, testPt, contextMeshes, latitude, radius, precision, treesTransmissionIndices=[0,[0,0]], leaflessStartHOY=None, leaflessEndHOY=None):
+    def calculateSkyExposureFactor(self, testPt, contextMeshes, latitude, precision, treesTransmissionIndices=[0,[0,0]], leaflessStartHOY=None, leaflessEndHOY=None):
         
-        # lifting up the testPt due to MeshRay intersection
+        # lifting up the testPt so that it does not lie on the context mesh
         tol = rc.RhinoDoc.ActiveDoc.ModelAbsoluteTolerance
         testPtLifted = rc.Geometry.Point3d(testPt.X, testPt.Y, testPt.Z+tol)
-        lb_meshpreparation = MeshPreparation()
-        
-        precisionU = precision*5
-        precisionV = int(precisionU/3.5)
-        
-        skyDomeHalfSphere = rc.Geometry.Sphere(rc.Geometry.Plane(rc.Geometry.Point3d(testPtLifted),rc.Geometry.Vector3d(0,0,1)), radius)
-        splittedSkyDomeDomainUmin, splittedSkyDomeDomainUmax = [0, 2*math.pi]  # sphere diameter
-        splittedSkyDomeDomainVmin, splittedSkyDomeDomainVmax = [0, 0.5*math.pi]  # sphere vertical arc
-        splittedSkyDomeDomainVmax = 0.995*splittedSkyDomeDomainVmax
-        
-        stepU = (splittedSkyDomeDomainUmax - splittedSkyDomeDomainUmin)/precisionU
-        stepV = (splittedSkyDomeDomainVmax - splittedSkyDomeDomainVmin)/precisionV
-        
-        skyDomePts = []
-        for i in xrange(0,precisionU):
-            for k in xrange(0,precisionV):
-                u = splittedSkyDomeDomainUmin + stepU*i
-                v = splittedSkyDomeDomainVmin + stepV*k
-                skyDomePt = skyDomeHalfSphere.PointAt(u,v)
-                skyDomePts.append(skyDomePt)
-        skyDomeMeshPts = skyDomePts + skyDomePts[:precisionV]  # increases precisionU for 1
-        skyDomeMesh = lb_meshpreparation.meshFromPoints(precisionU+1, precisionV, skyDomeMeshPts)
-        meshFacesCentroids = [skyDomeMesh.Faces.GetFaceCenter(i) for i in xrange(skyDomeMesh.Faces.Count)]
-        meshFaces = skyDomeMesh.Faces
-        meshVertices = skyDomeMesh.Vertices
-        
-        meshFaceAreas = lb_meshpreparation.calculateMeshFaceAreas(skyDomeMesh)
-        skyDomeMeshArea = sum(meshFaceAreas)
-        skyDomeMeshArea2 = rc.Geometry.AreaMassProperties.Compute(skyDomeMesh).Area
-        #print "skyDomeMeshArea: ", skyDomeMeshArea
-        #print "skyDomeMeshArea2: ", skyDomeMeshArea2
-        
-        del skyDomeMeshPts
-        del meshVertices
-        del meshFaces
-        del skyDomeMesh
-        leaflessStartHOYdummy = 0; leaflessEndHOYdummy = 1
-        skyExposureFactor = 0  # 0 equals to 100% shading, 1 equals to 0% shading
-        for i,centroid in enumerate(meshFacesCentroids):
-            raysIntensityWithoutTransmissionIndex = meshFaceAreas[i]/skyDomeMeshArea
-            vector = rc.Geometry.Vector3d(centroid)-rc.Geometry.Vector3d(testPtLifted)
-            ray = rc.Geometry.Ray3d(testPtLifted, vector)
-            for meshIndex,mesh in enumerate(contextMeshes):
-                intersectParam = rc.Geometry.Intersect.Intersection.MeshRay(mesh,ray)
-                # ray hitted something
-                if intersectParam >= 0:
-                    seasonIndexDummy = self.noLeavesPeriod("perHoy", latitude, i, leaflessStartHOYdummy, leaflessEndHOYdummy)
-                    if meshIndex == 0:  # context mesh hitted
-                        treesTransmissionIndex = 0
-                    elif meshIndex == 1:  # coniferousTrees mesh hitted
-                        treesTransmissionIndex = treesTransmissionIndices[0]
-                    elif meshIndex == 2:  # deciduousTrees mesh hitted
-                        treesTransmissionIndex = treesTransmissionIndices[1][seasonIndexDummy]
-                    skyExposureFactor += raysIntensityWithoutTransmissionIndex*treesTransmissionIndex
-                    break
-            # no hitting, the ray only hits the sky dome
-            else:
-                treesTransmissionIndex = 1
-                skyExposureFactor += raysIntensityWithoutTransmissionIndex * treesTransmissionIndex
         
-        del meshFacesCentroids
+        obstructionMap = ObstructionMap.fromMeshes([testPtLifted], contextMeshes, treesTransmissionIndices, precision*5)[0]
+        # 0 equals to 100% shading, 1 equals to 0% shading
+        if (leaflessStartHOY == None) or (leaflessEndHOY == None):
+            skyExposureFactor = obstructionMap.skyViewFactor()
+        else:
+            seasonIndices = [self.noLeavesPeriod("perHoy", latitude, HOY, leaflessStartHOY, leaflessEndHOY) for HOY in xrange(8760)]
+            skyExposureFactor = obstructionMap.annualSkyViewFactor(seasonIndices)
         
         return skyExposureFactor
     
@@ -5611,162 +8606,37 @@ class Photovoltaics(object):
     
     def correctSrfAzimuthDforNorth(self, north, srfAzimuthD):
         # nothing inputted in "north_" - use default value: 0
-        if north == None:
-            northDeg = 0  # default
-            correctedSrfAzimuthD = srfAzimuthD
-            validNorth = True
-            printMsg = "ok"
-        else:
-            try:  # check if it's a number
-                north = float(north)
-                if north < 0 or north > 360:
-                    correctedSrfAzimuthD = northDeg = None
-                    validNorth = False
-                    printMsg = "Please input north angle value from 0 to 360."
-                    return correctedSrfAzimuthD, validNorth, printMsg
-            except Exception, e:  # check if it's a vector
-                north.Unitize()
-            
-            northRad, northVec = self.angle2northClockwise(north)
-            northDeg = 360-math.degrees(northRad)
-            correctedSrfAzimuthD = northDeg + srfAzimuthD
-            if correctedSrfAzimuthD > 360:
-                correctedSrfAzimuthD = correctedSrfAzimuthD - 360
-            validNorth = True
-            printMsg = "ok"
-        
-        return correctedSrfAzimuthD, northDeg, validNorth, printMsg
-    
-    def NRELsunPosition(self, latitude , longitude, timeZone, year, month, day, hour):
-        # sunZenith, sunAzimuth, sunAltitude angles
-        # based on Michalsky (1988), modified to calculate sun azimuth angles for locations south of the equator using the approach described in (Iqbal, 1983)
-        min = 30
-        
-        # leap year
-        if year%4 == 0:
-            k = 1
-        else:
-            k = 0
-        
-        numOfDays = [0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334]
-        jdoy = int(numOfDays[int(month)-1] + int(day))
-        
-        # julian day of year
-        if month > 2:
-            jdoy = jdoy + k
-        
-        # current decimal time of day in UTC
-        tutc = hour + min/60.0 - timeZone
-        
-        if tutc < 0:
-            tutc = tutc + 24
-            jdoy = jdoy - 1
-        elif tutc > 24:
-            tutc = tutc - 24
-            jdoy = jdoy + 1
-        
-        julian = 32916.5 + 365*(year-1949) + int((year-1949)/4) + jdoy + (tutc/24) - 51545
-        
-        mnlong = 280.46 + 0.9856474*julian   # in degrees
-        mnlong = mnlong - 360*int(mnlong/360)
-        
-        if (mnlong < 0):
-            mnlong = (mnlong+360)
-        
-        mnanom = (357.528 + 0.9856003*julian)
-        mnanom = mnanom - 360*int(mnanom/360)
-        
-        if (mnanom < 0):
-            mnanom = (mnanom+360)
-        mnanom = mnanom*(math.pi/180)   # in radians
-        
-        eclong = (mnlong + 1.915*math.sin(mnanom) + 0.02 * math.sin(2*mnanom))
-        eclong = eclong - 360*int(eclong/360)
-        
-        if (eclong < 0):
-            eclong = (eclong+360)
-        eclong = eclong*(math.pi/180)
-        
-        obleq = (math.pi/180)*(23.439 - 0.0000004*julian)
-        
-        if (math.cos(eclong) < 0):
-            ra = math.atan(((math.cos(obleq)*math.sin(eclong))/math.cos(eclong))) + math.pi
-        elif (math.cos(obleq)*math.sin(eclong) < 0):
-            ra = math.atan(((math.cos(obleq)*math.sin(eclong))/math.cos(eclong))) + 2*math.pi
-        else:
-            ra = math.atan(((math.cos(obleq)*math.sin(eclong))/math.cos(eclong)))
-        
-        beta = math.asin(math.sin(obleq)*math.sin(eclong))   # in radians
-        
-        gmst = 6.697375 + 0.0657098242*julian + tutc
-        gmst = gmst - 24*int(gmst/24)
-        
-        if (gmst < 0):
-            gmst = gmst + 24
-        
-        lmst = gmst + longitude/15
-        lmst = lmst - 24*int(lmst/24)
-        
-        if (lmst < 0):
-            lmst = lmst + 24
-       
-        b = 15*(math.pi/180) * lmst - ra
-        
-        if (b < -math.pi):
-            HA = b + 2*math.pi   # in radians
-        elif (b > math.pi):
-            HA = b - 2*math.pi   # in radians
-        else:
-            HA = b
-        
-        # sun altitude, not corrected for radiation (in radians):
-        a = math.sin(beta) * math.sin((math.pi/180)*latitude ) + math.cos(beta) * math.cos((math.pi/180)*latitude ) * math.cos(HA)
-        
-        if (a >= -1) and (a <= 1):
-            alpha0 = math.asin(a)
-        elif (a > 1):
-            alpha0 = math.pi/2
-        elif (a < -1):
-            alpha0 = -math.pi/2
-        
-        # sun altitude, corrected for refraction (in radians):
-        alpha0d = 180/math.pi * alpha0
-        
-        if (alpha0d > -0.56):
-            r = 3.51561*((0.1594+0.0196*alpha0d+0.00002*(alpha0d**2))/(1+0.505*alpha0d+0.0845*(alpha0d**2)))
-        elif (alpha0d <= -0.56):
-            r = 0.56
-        
-        if (alpha0d+r > 90):
-            sunAltitudeR = math.pi/2
-        elif (alpha0d+r <= 90):
-            sunAltitudeR = (math.pi/180) * (alpha0d+r)
-        
-        # sun azimuth angle (in radians):
-        a = (math.sin(alpha0)*math.sin(math.pi/180*latitude ) - math.sin(beta))/(math.cos(alpha0)*math.cos(math.pi/180*latitude ))
-        
-        if (a >= -1) and (a <= 1):
-            b = math.acos(a)
-        elif (math.cos(alpha0) == 0) or (a < -1):
-            b = math.pi
-        elif (a > 1):
-            b = 0
-        
-        if (HA < -math.pi):
-            sunAzimuthR = b
-        elif ((HA >= -math.pi) and (HA <= 0)) or (HA >= math.pi):
-            sunAzimuthR = math.pi - b
-        elif (HA > 0) and (HA < math.pi):
-            sunAzimuthR = math.pi + b
-        
-        # sun zenith angle (in radians)
-        sunZenithR = (math.pi/2) - sunAltitudeR
-        
-        sunZenithD = math.degrees(sunZenithR)
-        sunAzimuthD = math.degrees(sunAzimuthR)
-        sunAltitudeD = math.degrees(sunAltitudeR)
+        if north == None:
+            northDeg = 0  # default
+            correctedSrfAzimuthD = srfAzimuthD
+            validNorth = True
+            printMsg = "ok"
+        else:
+            try:  # check if it's a number
+                north = float(north)
+                if north < 0 or north > 360:
+                    correctedSrfAzimuthD = northDeg = None
+                    validNorth = False
+                    printMsg = "Please input north angle value from 0 to 360."
+                    return correctedSrfAzimuthD, validNorth, printMsg
+            except Exception, e:  # check if it's a vector
+                north.Unitize()
+            
+            northRad, northVec = self.angle2northClockwise(north)
+            northDeg = 360-math.degrees(northRad)
+            correctedSrfAzimuthD = northDeg + srfAzimuthD
+            if correctedSrfAzimuthD > 360:
+                correctedSrfAzimuthD = correctedSrfAzimuthD - 360
+            validNorth = True
+            printMsg = "ok"
         
-        return sunZenithD, sunAzimuthD, sunAltitudeD
+        return correctedSrfAzimuthD, northDeg, validNorth, printMsg
+    
+    def NRELsunPosition(self, latitude , longitude, timeZone, year, month, day, hour):
+        # sunZenith, sunAzimuth, sunAltitude angles
+        # based on Michalsky (1988), modified to calculate sun azimuth angles for locations south of the equator using the approach described in (Iqbal, 1983)
+        # use SolarEphemeris(latitude, longitude, timeZone, "NREL").positions for a list of hours
+        return SolarEphemeris(latitude, longitude, timeZone, "NREL").position(year, month, day, hour)
     
     def calculateAlbedo(self, dryBulbTemperature):
         # correcting albedo values for the presence of snow
@@ -5846,6 +8716,49 @@ class Photovoltaics(object):
             divison = ((DHI+DNIshaded)/DHI)
         epsilon = ( divison + k*(sunZenithD**3)) / (1 + k*(sunZenithD**3))
         
+        # Perez model coefficients for irradiance based on epsilon bins
+        f11, f12, f13, f21, f22, f23 = self.perezCoefficients(epsilon)
+        
+        # absolute optical air mass
+        AM0 = 1/(b + 0.15*(1/((93.9 - sunZenithD)**(1.253))))
+        
+        # sky brightness
+        delta = DHI*(AM0/1367)
+        
+        F1 = max(0, (f11 + delta*f12 + sunZenithR*f13))
+        F2 = f21 + delta*f22 + sunZenithR*f23
+        
+        # isotropic, circumsolar, and horizon brightening components of the sky diffuse irradiance:
+        if (sunZenithD <= 87.5):
+            Di = (DHI*(1-F1)*((1+math.cos(srfTiltR))/2)) * SVF
+            Dc = (DHI*F1*(a/b)) * beamTransIndex  # based on assumption that all circumsolar component brightening is concentrated at the position of the sun, and therefor completely blocked in case of shading
+            if SVF >= 0.05:  # based on area of the sky dome intersected with sunZenithD when: 87.5 < sunZenithD <= 90
+                Dh = 0
+            else:
+                Dh = DHI*F2*math.sin(srfTiltR)
+        # only isotropic brightening component of the sky diffuse irradiance:
+        elif (sunZenithD > 87.5):
+            Di = ((1+math.cos(srfTiltR))/2) * SVF
+            Dc = 0
+            Dh = 0
+        
+        Ed_sky = Di + Dc + Dh
+        
+        # Eg ground reflected irradiance by Liu, Jordan, (1963).
+        Eground = ((DNIshaded * math.cos(sunZenithR)) + Ed_sky) * albedo * ((1-math.cos(srfTiltR))/2)
+        
+        Epoa = Eb + Eground + Ed_sky  # in Wh/m2
+        
+        if Eb < 0: Eb = 0
+        if Eground < 0: Eground = 0
+        if Ed_sky < 0: Ed_sky = 0
+        
+        if Epoa < 0 or ((DNIshaded<=0) and (DHI<=0)):
+            Epoa = Eb = Ed_sky = Eground = 0
+        
+        return Epoa, Eb, Ed_sky, Eground, AOI_R
+    
+    def perezCoefficients(self, epsilon):
         # Perez model coefficients for irradiance based on epsilon bins
         if epsilon <= 1.065:
             f11 = -0.0083117
@@ -5904,44 +8817,94 @@ class Photovoltaics(object):
             f22 = -1.3765031
             f23 = 0.2506212
         
-        # absolute optical air mass
-        AM0 = 1/(b + 0.15*(1/((93.9 - sunZenithD)**(1.253))))
-        
-        # sky brightness
-        delta = DHI*(AM0/1367)
-        
-        F1 = max(0, (f11 + delta*f12 + sunZenithR*f13))
-        F2 = f21 + delta*f22 + sunZenithR*f23
-        
-        # isotropic, circumsolar, and horizon brightening components of the sky diffuse irradiance:
-        if (sunZenithD <= 87.5):
-            Di = (DHI*(1-F1)*((1+math.cos(srfTiltR))/2)) * SVF
-            Dc = (DHI*F1*(a/b)) * beamTransIndex  # based on assumption that all circumsolar component brightening is concentrated at the position of the sun, and therefor completely blocked in case of shading
-            if SVF >= 0.05:  # based on area of the sky dome intersected with sunZenithD when: 87.5 < sunZenithD <= 90
-                Dh = 0
-            else:
-                Dh = DHI*F2*math.sin(srfTiltR)
-        # only isotropic brightening component of the sky diffuse irradiance:
-        elif (sunZenithD > 87.5):
-            Di = ((1+math.cos(srfTiltR))/2) * SVF
-            Dc = 0
-            Dh = 0
-        
-        Ed_sky = Di + Dc + Dh
-        
-        # Eg ground reflected irradiance by Liu, Jordan, (1963).
-        Eground = ((DNIshaded * math.cos(sunZenithR)) + Ed_sky) * albedo * ((1-math.cos(srfTiltR))/2)
-        
-        Epoa = Eb + Eground + Ed_sky  # in Wh/m2
+        return f11, f12, f13, f21, f22, f23
+    
+    def POAirradianceHourlyTerms(self, sunZenithD, sunAzimuthD, DNI, DHI, albedo, beamTransIndex = None):
+        # the terms of POAirradiance that only depend on the sun and the weather, for lists of hours
+        # they are calculated once and used for any number of surfaces in POAirradianceTotals
+        if beamTransIndex == None: beamTransIndex = [1] * len(DNI)
+        cosZ = []; sinZcosA = []; sinZsinA = []; DNIshadedL = []; DHIL = []; groundBeam = []
+        circumsolar = []; isotropic = []; horizon = []; albedoL = []; noSun = []; lowSun = []
+        cosZ85 = math.cos(math.radians(85))
+        k = 5.534*(10**(-6))  # for angles in degrees
         
-        if Eb < 0: Eb = 0
-        if Eground < 0: Eground = 0
-        if Ed_sky < 0: Ed_sky = 0
+        for i in xrange(len(DNI)):
+            zenithD = sunZenithD[i]; azimuthD = sunAzimuthD[i]
+            if zenithD > 90:
+                zenithD = 90
+                azimuthD = 0
+            
+            DNIshaded = DNI[i] * beamTransIndex[i]
+            zenithR = math.radians(zenithD)
+            azimuthR = math.radians(azimuthD)
+            cosZenith = math.cos(zenithR)
+            sinZenith = math.sin(zenithR)
+            b = max(cosZ85, cosZenith)
+            
+            # sky clearness
+            if DHI[i] > 0: divison = ((DHI[i]+DNIshaded)/DHI[i])
+            else: divison = 0
+            epsilon = ( divison + k*(zenithD**3)) / (1 + k*(zenithD**3))
+            f11, f12, f13, f21, f22, f23 = self.perezCoefficients(epsilon)
+            
+            # absolute optical air mass and sky brightness
+            AM0 = 1/(b + 0.15*(1/((93.9 - zenithD)**(1.253))))
+            delta = DHI[i]*(AM0/1367)
+            F1 = max(0, (f11 + delta*f12 + zenithR*f13))
+            F2 = f21 + delta*f22 + zenithR*f23
+            
+            cosZ.append(cosZenith)
+            sinZcosA.append(sinZenith * math.cos(azimuthR))
+            sinZsinA.append(sinZenith * math.sin(azimuthR))
+            DNIshadedL.append(DNIshaded)
+            DHIL.append(DHI[i])
+            groundBeam.append(DNIshaded * cosZenith)
+            isotropic.append(DHI[i]*(1-F1))
+            circumsolar.append(DHI[i]*F1/b * beamTransIndex[i])
+            horizon.append(DHI[i]*F2)
+            albedoL.append(albedo[i])
+            lowSun.append(zenithD > 87.5)
+            noSun.append((DNIshaded<=0) and (DHI[i]<=0))
+        
+        return cosZ, sinZcosA, sinZsinA, DNIshadedL, DHIL, groundBeam, isotropic, circumsolar, horizon, albedoL, lowSun, noSun
+    
+    def POAirradianceTotals(self, hourlyTerms, srfTiltDs, srfAzimuthDs, SVF = 1, parallel = False):
+        # sum of the hourly POAirradiance Epoa (Wh/m2) for each surface tilt and azimuth in srfTiltDs and srfAzimuthDs
+        # hourlyTerms: output of POAirradianceHourlyTerms. The sun and sky terms are shared by all the surfaces.
+        cosZ, sinZcosA, sinZsinA, DNIshaded, DHI, groundBeam, isotropic, circumsolar, horizon, albedo, lowSun, noSun = hourlyTerms
+        hours = range(len(cosZ))
+        totals = [0] * len(srfTiltDs)
+        
+        def surfaceTotal(s):
+            srfTiltR = math.radians(srfTiltDs[s])
+            srfAzimuthR = math.radians(srfAzimuthDs[s])
+            cosT = math.cos(srfTiltR); sinT = math.sin(srfTiltR)
+            sinTcosA = sinT * math.cos(srfAzimuthR); sinTsinA = sinT * math.sin(srfAzimuthR)
+            skyView = ((1+cosT)/2) * SVF
+            groundView = (1-cosT)/2
+            horizonOn = SVF < 0.05
+            
+            total = 0
+            for i in hours:
+                if noSun[i]: continue
+                # cosine of the angle of incidence
+                cosAOI = cosZ[i]*cosT + sinZcosA[i]*sinTcosA + sinZsinA[i]*sinTsinA
+                Eb = DNIshaded[i] * cosAOI
+                if lowSun[i]:
+                    Ed_sky = skyView
+                else:
+                    Ed_sky = isotropic[i]*skyView + circumsolar[i]*max(0, cosAOI)
+                    if horizonOn: Ed_sky += horizon[i]*sinT
+                Epoa = Eb + (groundBeam[i] + Ed_sky) * albedo[i] * groundView + Ed_sky
+                if Epoa > 0: total += Epoa
+            totals[s] = total
         
-        if Epoa < 0 or ((DNIshaded<=0) and (DHI<=0)):
-            Epoa = Eb = Ed_sky = Eground = 0
+        if parallel:
+            tasks.Parallel.ForEach(xrange(len(srfTiltDs)), surfaceTotal)
+        else:
+            for s in xrange(len(srfTiltDs)): surfaceTotal(s)
         
-        return Epoa, Eb, Ed_sky, Eground, AOI_R
+        return totals
     
     def pvwatts(self, nameplateDCpowerRating, DCtoACderateFactor, AOI_R, Epoa, Eb, Ed_sky, Eground, moduleType, gamma, Ta, ws10, DNI, DHI):
         # PVWatts v1 Thermal, Module Temperature, Cell Temperature Module and Inverter models
@@ -5959,22 +8922,7 @@ class Photovoltaics(object):
         Etr = Epoa - (1-f)*Eb*math.cos(AOI_R)
         
         # Thermal Model by Fuentes (1987)
-        if moduleType == 0:   # glass/cell/polymer sheet   insulated back
-            a = -2.81
-            b = -0.0455
-            deltaT = 0
-        elif moduleType == 1:   # glass/cell/glass   close roof mount
-            a = -2.98
-            b = -0.0471
-            deltaT = 1
-        elif moduleType == 2:   # glass/cell/polymer sheet   open rack
-            a = -3.56
-            b = -0.0750
-            deltaT = 3
-        elif moduleType == 3:   # for glass/cell/glass   open rack
-            a = -3.47
-            b = -0.0594
-            deltaT = 3
+        a, b, deltaT = self.moduleThermalCoefficients(moduleType)
         
         # Sandia Module Temperature Model
         Tm = Epoa * (math.exp(a+(b*ws10))) + Ta  # in C degrees
@@ -6017,6 +8965,179 @@ class Photovoltaics(object):
         
         return Tm, Tcell, Pdc_, Pac
     
+    def moduleThermalCoefficients(self, moduleType):
+        # Thermal Model by Fuentes (1987)
+        if moduleType == 0:   # glass/cell/polymer sheet   insulated back
+            a = -2.81
+            b = -0.0455
+            deltaT = 0
+        elif moduleType == 1:   # glass/cell/glass   close roof mount
+            a = -2.98
+            b = -0.0471
+            deltaT = 1
+        elif moduleType == 2:   # glass/cell/polymer sheet   open rack
+            a = -3.56
+            b = -0.0750
+            deltaT = 3
+        elif moduleType == 3:   # for glass/cell/glass   open rack
+            a = -3.47
+            b = -0.0594
+            deltaT = 3
+        
+        return a, b, deltaT
+    
+    def POAirradianceSeries(self, sunZenithD, sunAzimuthD, srfTiltDs, srfAzimuthDs, DNI, DHI, albedo, beamTransIndices=None, SVFs=None, parallel=False):
+        # POAirradiance for lists of hours and a batch of surfaces (srfTiltDs and srfAzimuthDs lists)
+        # beamTransIndices: an hourly beamTransIndex list for each surface (None for unshaded surfaces). SVFs: SVF of each surface
+        # the sun and sky terms are calculated once and shared by all the unshaded hours of all the surfaces
+        # returns a list of arrays for each surface: Epoa, Eb, Ed_sky, Eground, AOI_R
+        if beamTransIndices == None: beamTransIndices = [None] * len(srfTiltDs)
+        if SVFs == None: SVFs = [1] * len(srfTiltDs)
+        hourCount = len(DNI)
+        k = 5.534*(10**(-6))  # for angles in degrees
+        cosZ85 = math.cos(math.radians(85))
+        
+        zenithDL = []; zenithRL = []; azimuthRL = []; cosZL = []; sinZL = []; bL = []; kZ3L = []; deltaL = []
+        for i in xrange(hourCount):
+            zenithD = sunZenithD[i]; azimuthD = sunAzimuthD[i]
+            if zenithD > 90:
+                zenithD = 90
+                azimuthD = 0
+            zenithR = math.radians(zenithD)
+            cosZenith = math.cos(zenithR)
+            b = max(cosZ85, cosZenith)
+            AM0 = 1/(b + 0.15*(1/((93.9 - zenithD)**(1.253))))
+            zenithDL.append(zenithD); zenithRL.append(zenithR); azimuthRL.append(math.radians(azimuthD))
+            cosZL.append(cosZenith); sinZL.append(math.sin(zenithR)); bL.append(b)
+            kZ3L.append(k*(zenithD**3)); deltaL.append(DHI[i]*(AM0/1367))
+        
+        def brightness(i, DNIshaded):
+            # Perez F1 and F2 coefficients
+            if DHI[i] > 0: divison = ((DHI[i]+DNIshaded)/DHI[i])
+            else: divison = 0
+            epsilon = ( divison + kZ3L[i]) / (1 + kZ3L[i])
+            f11, f12, f13, f21, f22, f23 = self.perezCoefficients(epsilon)
+            F1 = max(0, (f11 + deltaL[i]*f12 + zenithRL[i]*f13))
+            F2 = f21 + deltaL[i]*f22 + zenithRL[i]*f23
+            return DHI[i]*(1-F1), DHI[i]*F1, DHI[i]*F2
+        
+        unshadedTerms = [brightness(i, DNI[i] * 1) for i in xrange(hourCount)]
+        results = [None] * len(srfTiltDs)
+        
+        def surfaceSeries(s):
+            srfTiltR = math.radians(srfTiltDs[s])
+            srfAzimuthR = math.radians(srfAzimuthDs[s])
+            cosT = math.cos(srfTiltR); sinT = math.sin(srfTiltR)
+            skyView = (1+cosT)/2; groundView = (1-cosT)/2
+            SVF = SVFs[s]
+            horizonOn = SVF < 0.05
+            beamTransIndex = beamTransIndices[s]
+            EpoaL, EbL, Ed_skyL, EgroundL, AOI_RL = [array.array('d', [0]) * hourCount for output in range(5)]
+            
+            for i in xrange(hourCount):
+                cosAOI = cosZL[i]*cosT + sinT * sinZL[i] * math.cos(srfAzimuthR - azimuthRL[i])
+                AOI_R = math.acos(min(1, max(-1, cosAOI)))
+                AOI_RL[i] = AOI_R
+                
+                if beamTransIndex == None or beamTransIndex[i] == 1:
+                    transIndex = 1
+                    DNIshaded = DNI[i] * 1
+                    isotropic, circumsolar, horizon = unshadedTerms[i]
+                else:
+                    transIndex = beamTransIndex[i]
+                    DNIshaded = DNI[i] * transIndex
+                    isotropic, circumsolar, horizon = brightness(i, DNIshaded)
+                if (DNIshaded<=0) and (DHI[i]<=0): continue
+                
+                cosAOI = math.cos(AOI_R)
+                Eb = DNIshaded * cosAOI
+                if (zenithDL[i] <= 87.5):
+                    Ed_sky = (isotropic*skyView) * SVF + (circumsolar*(max(0, cosAOI)/bL[i])) * transIndex
+                    if horizonOn: Ed_sky += horizon*sinT
+                else:
+                    Ed_sky = skyView * SVF
+                Eground = ((DNIshaded * cosZL[i]) + Ed_sky) * albedo[i] * groundView
+                Epoa = Eb + Eground + Ed_sky  # in Wh/m2
+                
+                if Epoa < 0: continue
+                if Eb > 0: EbL[i] = Eb
+                if Ed_sky > 0: Ed_skyL[i] = Ed_sky
+                if Eground > 0: EgroundL[i] = Eground
+                EpoaL[i] = Epoa
+            results[s] = [EpoaL, EbL, Ed_skyL, EgroundL, AOI_RL]
+        
+        if parallel:
+            tasks.Parallel.ForEach(xrange(len(srfTiltDs)), surfaceSeries)
+        else:
+            for s in xrange(len(srfTiltDs)): surfaceSeries(s)
+        
+        return results
+    
+    def pvwattsSeries(self, nameplateDCpowerRatings, DCtoACderateFactor, irradianceSeries, moduleType, gamma, Ta, ws10, DNI, DHI, parallel=False):
+        # pvwatts for lists of hours and a batch of systems (nameplateDCpowerRatings list)
+        # irradianceSeries: the Epoa, Eb, Ed_sky, Eground, AOI_R lists of each system, as returned by POAirradianceSeries
+        # returns a list of arrays for each system: Tm, Tcell, Pdc_, Pac
+        b0 = 1
+        b1 = -2.438e-3
+        b2 = 3.103e-4
+        b3 = -1.246e-5
+        b4 = 2.112e-7
+        b5 = -1.359e-9
+        Eta_inv = 0.92  # default
+        hourCount = len(DNI)
+        
+        a, b, deltaT = self.moduleThermalCoefficients(moduleType)
+        windFactor = [math.exp(a+(b*ws10[i])) for i in xrange(hourCount)]
+        noSun = [((DNI[i]<=0) and (DHI[i]<=0)) for i in xrange(hourCount)]
+        results = [None] * len(nameplateDCpowerRatings)
+        
+        def systemSeries(s):
+            EpoaL, EbL, Ed_skyL, EgroundL, AOI_RL = irradianceSeries[s]
+            Pdc0 = nameplateDCpowerRatings[s]   # in kWatts
+            derate = DCtoACderateFactor/Eta_inv
+            Pac0 = Pdc0
+            Pinv_dc0 = Pac0/Eta_inv
+            TmL, TcellL, Pdc_L, PacL = [array.array('d', [0]) * hourCount for output in range(4)]
+            
+            for i in xrange(hourCount):
+                Epoa = EpoaL[i]
+                Tm = Epoa * windFactor[i] + Ta[i]  # in C degrees
+                Tcell = Tm + (Epoa/1000)*deltaT  # in C degrees
+                TmL[i] = Tm; TcellL[i] = Tcell
+                if noSun[i]: continue
+                
+                AOI_R = AOI_RL[i]
+                f = b0 + b1*AOI_R + b2*(AOI_R**2) + b3*(AOI_R**3) + b4*(AOI_R**4) + b5*(AOI_R**5)
+                Etr = Epoa - (1-f)*EbL[i]*math.cos(AOI_R)
+                if Etr > 125:
+                    Pdc = (Etr/1000)*Pdc0*(1+gamma*(Tcell-25))
+                else:
+                    Pdc = ((0.008*(Etr**2))/1000)*Pdc0*(1+gamma*(Tcell-25))
+                Pdc_ = Pdc*derate
+                
+                f = Pdc_/Pinv_dc0
+                if (f >= 0.1) and (f <= 1):
+                    Eta_op = 0.774 + 0.663 * f - 0.952 * (f**2) + 0.426 * (f**3)
+                    Pac = Pdc_ * Eta_op * (Eta_inv/0.91)
+                elif (f >= 0) and (f < 0.1):
+                    Eta_op = -0.015 + 8.46 * f
+                    Pac = Pdc_ * Eta_op * (Eta_inv/0.91)
+                elif (f > 1):
+                    Pac = Pac0
+                else:
+                    Pac = 0
+                
+                Pdc_L[i] = Pdc_
+                if Pac > 0: PacL[i] = Pac
+            results[s] = [TmL, TcellL, Pdc_L, PacL]
+        
+        if parallel:
+            tasks.Parallel.ForEach(xrange(len(nameplateDCpowerRatings)), systemSeries)
+        else:
+            for s in xrange(len(nameplateDCpowerRatings)): systemSeries(s)
+        
+        return results
+    
     def inletWaterTemperature(self, dryBulbTemperature_C, method=0, minimalTemperature_C=1, depth_m=2, soilThermalDiffusivity_m2_s=2.5):
         # calculate cold (inlet) water temperature
         # soilThermalDiffusivity (m2/s) per material (valid for method "0" only):
@@ -6131,49 +9252,9 @@ class Photovoltaics(object):
         waterDensity = 1000  # kg/m3
         eta_aux = 1  # auxiliaryHeaterEnergyFactor. equals 1 for electric water heater
         
-        # convert test results
-        mDotCp = activeArea * mDot * Cp  # W/C
-        FrTau = FavTa / (1 + (activeArea*FavUL)/(2*mDotCp))
-        FrUL = FavUL / (1 + (activeArea*FavUL)/(2*mDotCp))
-        
-        # capacitance rate corrections
-        F_UL = -(mDotCp / activeArea) * math.log(1 - ((FrUL * activeArea) / mDotCp))
-        r = (mDotCp / activeArea * (1 - math.exp(-activeArea * F_UL / mDotCp))) / FavUL
-        FrTa_capacitanceRate = r * FrTau
-        FrUL_capacitanceRate = r * FrUL
-        
-        # pipe losses
-        if insulT == 0: insulT = 0.0001  # fix for math.log(Do / Di)
-        Do = Di + (2*insulT)
-        Uout = (2 * k) / (Do * math.log(Do / Di))
-        A_pipe = math.pi * Do * L
-        UA_pipe = Uout * A_pipe
-        Fr_pipeloss = FrTa_capacitanceRate / (1 + (UA_pipe / mDotCp))
-        FrUL_pipeloss = FrUL_capacitanceRate * (((1 - (UA_pipe / mDotCp)) + (Uout * (A_pipe + A_pipe)) / (activeArea * FrUL_capacitanceRate)) / (1 + (UA_pipe / mDotCp)))
-        
-        # effect of the heat exchanger
-        Fr_ = Fr_pipeloss / (1 + ((activeArea*FrUL_pipeloss)/mDotCp) * ((mDotCp/(epsilon*mDotCp))-1))
-        FrUL_ = FrUL_pipeloss / (1 + ((activeArea*FrUL_pipeloss)/mDotCp) * ((mDotCp/(epsilon*mDotCp))-1))
-        
-        # incidence angle modifiers (IAM) for Flat plate collectors and longitudinal direction of Evacuated tube collectors (for top-bottom direction of tubes optical axis)
-        AOI_D_b = math.degrees(AOI_R)
-        AOI_D_d = 59.7 - 0.1388*srfTiltD + 0.001497*(srfTiltD**2)
-        AOI_D_g = 90 - 0.5788*srfTiltD + 0.002693*(srfTiltD**2)
-        
-        if (AOI_D_b <= 60):
-            Ktau_b = 1-(bo*((1/math.cos( math.radians(AOI_D_b)))- 1))
-            Ktau_d = 1-(bo*((1/math.cos( math.radians(AOI_D_d)))- 1))
-            Ktau_g = 1-(bo*((1/math.cos( math.radians(AOI_D_g)))- 1))
-        else:
-            Ktau_b = (1-bo)*(1-((AOI_D_b-60)/30))
-            Ktau_d = (1-bo)*(1-((AOI_D_d-60)/30))
-            Ktau_g = (1-bo)*(1-((AOI_D_g-60)/30))
-        # incidence angle modifier cannot be negative
-        if Ktau_b < 0: Ktau_b = 0
-        if Ktau_d < 0: Ktau_d = 0
-        if Ktau_g < 0: Ktau_g = 0
+        Fr_, FrUL_ = self.swhCollectorCoefficients(activeArea, FavTa, FavUL, Cp, mDot, L, Di, insulT, k, epsilon)
         
-        SR_IAM = Eb_shaded*Ktau_b + Ed_shaded*Ktau_d + Eg*Ktau_g  # Wh/m2
+        SR_IAM = self.swhIncidentRadiation(srfTiltD, bo, [AOI_R], [Eb_shaded], [Ed_shaded], [Eg])[0]  # Wh/m2
         
         
         if SR_IAM > 0:
@@ -6227,6 +9308,137 @@ class Photovoltaics(object):
         
         return collectorHeatLoss, collectorEfficiency, Qsolar, Qloss, Qsupply, Qaux, Qdis, Qpump, dQ, dt, Tw
     
+    def swhCollectorCoefficients(self, activeArea, FavTa, FavUL, Cp, mDot, L, Di, insulT, k, epsilon):
+        # collector Fr and FrUL corrected for the capacitance rate, pipe losses and the heat exchanger. they don't change during the year
+        
+        # convert test results
+        mDotCp = activeArea * mDot * Cp  # W/C
+        FrTau = FavTa / (1 + (activeArea*FavUL)/(2*mDotCp))
+        FrUL = FavUL / (1 + (activeArea*FavUL)/(2*mDotCp))
+        
+        # capacitance rate corrections
+        F_UL = -(mDotCp / activeArea) * math.log(1 - ((FrUL * activeArea) / mDotCp))
+        r = (mDotCp / activeArea * (1 - math.exp(-activeArea * F_UL / mDotCp))) / FavUL
+        FrTa_capacitanceRate = r * FrTau
+        FrUL_capacitanceRate = r * FrUL
+        
+        # pipe losses
+        if insulT == 0: insulT = 0.0001  # fix for math.log(Do / Di)
+        Do = Di + (2*insulT)
+        Uout = (2 * k) / (Do * math.log(Do / Di))
+        A_pipe = math.pi * Do * L
+        UA_pipe = Uout * A_pipe
+        Fr_pipeloss = FrTa_capacitanceRate / (1 + (UA_pipe / mDotCp))
+        FrUL_pipeloss = FrUL_capacitanceRate * (((1 - (UA_pipe / mDotCp)) + (Uout * (A_pipe + A_pipe)) / (activeArea * FrUL_capacitanceRate)) / (1 + (UA_pipe / mDotCp)))
+        
+        # effect of the heat exchanger
+        Fr_ = Fr_pipeloss / (1 + ((activeArea*FrUL_pipeloss)/mDotCp) * ((mDotCp/(epsilon*mDotCp))-1))
+        FrUL_ = FrUL_pipeloss / (1 + ((activeArea*FrUL_pipeloss)/mDotCp) * ((mDotCp/(epsilon*mDotCp))-1))
+        
+        return Fr_, FrUL_
+    
+    def swhIncidentRadiation(self, srfTiltD, bo, AOI_RL, Eb_shadedL, Ed_shadedL, EgL):
+        # hourly radiation on the collector corrected by the incidence angle modifiers (Wh/m2)
+        # incidence angle modifiers (IAM) for Flat plate collectors and longitudinal direction of Evacuated tube collectors (for top-bottom direction of tubes optical axis)
+        AOI_D_d = 59.7 - 0.1388*srfTiltD + 0.001497*(srfTiltD**2)
+        AOI_D_g = 90 - 0.5788*srfTiltD + 0.002693*(srfTiltD**2)
+        
+        # diffuse and ground modifiers only depend on the tilt, but the beam angle picks the formula
+        Ktau_dLow = max(0, 1-(bo*((1/math.cos( math.radians(AOI_D_d)))- 1)))
+        Ktau_gLow = max(0, 1-(bo*((1/math.cos( math.radians(AOI_D_g)))- 1)))
+        Ktau_dHigh = max(0, (1-bo)*(1-((AOI_D_d-60)/30)))
+        Ktau_gHigh = max(0, (1-bo)*(1-((AOI_D_g-60)/30)))
+        
+        SR_IAM = []
+        for i in xrange(len(AOI_RL)):
+            AOI_D_b = math.degrees(AOI_RL[i])
+            if (AOI_D_b <= 60):
+                Ktau_b = 1-(bo*((1/math.cos( math.radians(AOI_D_b)))- 1))
+                Ktau_d = Ktau_dLow; Ktau_g = Ktau_gLow
+            else:
+                Ktau_b = (1-bo)*(1-((AOI_D_b-60)/30))
+                Ktau_d = Ktau_dHigh; Ktau_g = Ktau_gHigh
+            # incidence angle modifier cannot be negative
+            if Ktau_b < 0: Ktau_b = 0
+            SR_IAM.append(Eb_shadedL[i]*Ktau_b + Ed_shadedL[i]*Ktau_d + EgL[i]*Ktau_g)
+        return SR_IAM
+    
+    def swhdesignSeries(self, activeAreas, tankSizes, tankAreas, SR_IAMs, FavTa, FavUL, QloadL, Cp, mDot, TaL, TcoldL, Tw, TdeliveryW, TmaxW, TdischargeW, TmechRoomL, L, Di, insulT, k, pumpPower, pumpEfficiency, tankLoss, epsilon, minSR=None):
+        # whole-year swhdesign for a batch of systems (activeAreas, tankSizes and tankAreas lists) stepping through the hours together
+        # SR_IAMs has the hourly output of swhIncidentRadiation for each system. systems on the same surface can share the same list
+        # the other hourly inputs are lists with the same length and Tw is the initial tank temperature
+        # returns a list of arrays for each system: collectorHeatLoss, collectorEfficiency, Qsolar, Qloss, Qsupply, Qaux, Qdis, Qpump, dQ, dt, Tw
+        waterSpecificHeat = 4.18  # kJ/(kg*C)
+        waterDensity = 1000  # kg/m3
+        eta_aux = 1  # auxiliaryHeaterEnergyFactor. equals 1 for electric water heater
+        QpumpOn = (pumpPower * pumpEfficiency)/1000  # kWh
+        
+        systems = range(len(activeAreas))
+        hourCount = len(QloadL)
+        coefficients = [self.swhCollectorCoefficients(activeAreas[c], FavTa, FavUL, Cp, mDot, L, Di, insulT, k, epsilon) for c in systems]
+        Tws = [Tw] * len(activeAreas)
+        results = [[array.array('d', [0]) * hourCount for output in range(11)] for c in systems]
+        
+        for i in xrange(hourCount):
+            Qload = QloadL[i]; Ta = TaL[i]; Tcold = TcoldL[i]; TmechRoom = TmechRoomL[i]
+            for c in systems:
+                Tw = Tws[c]; Fr_, FrUL_ = coefficients[c]; SR_IAM = SR_IAMs[c][i]
+                collectorHeatLossL, collectorEfficiencyL, QsolarL, QlossL, QsupplyL, QauxL, QdisL, QpumpL, dQL, dtL, TwL = results[c]
+                if SR_IAM > 0:
+                    collectorHeatLoss = FrUL_*((Tw-Ta)/SR_IAM)  # unitless
+                    collectorEfficiency = Fr_-collectorHeatLoss  # unitless
+                    if collectorEfficiency < 0: collectorEfficiency = Fr_
+                else:
+                    collectorHeatLoss = 0
+                    collectorEfficiency = Fr_
+                
+                if minSR == None: minSR_ = (FrUL_*(Tw-Ta))/Fr_  # Wh/m2
+                else: minSR_ = minSR
+                if SR_IAM > minSR_:
+                    Qsolar = collectorEfficiency * SR_IAM * activeAreas[c]/1000  # kWh
+                    Qpump = QpumpOn
+                else:
+                    Qsolar = 0
+                    Qpump = 0
+                
+                if Qload != 0:
+                    if Tw >= TdeliveryW:
+                        Qsupply = Qload - Qpump/eta_aux  # kWh
+                        Qaux = 0
+                    else:
+                        HWC = (Qload/0.000277778)/(0.001 * 1000 * 4.2 * (TdeliveryW-Tcold))  # liters
+                        Qsupply = (HWC * 0.001 * 1000 * 4.2 * (Tw-Tcold)* 0.000277778)/eta_aux  # kWh
+                        Qaux = (HWC * 0.001 * 1000 * 4.2 * (TdeliveryW-Tw)* 0.000277778)/eta_aux  # kWh
+                    if Qsupply < 0: Qsupply = 0
+                else:
+                    Qsupply = 0
+                    Qaux = 0
+                
+                tankSize = tankSizes[c]
+                if Tw >= TmaxW:
+                    Qdis = (Tw-TdischargeW)*waterSpecificHeat*tankSize*waterDensity/3600  # kWh
+                    Qpump = 0  # swh system stagnate until excess heat is discharged
+                else:
+                    Qdis = 0
+                
+                Qloss = tankLoss*tankAreas[c]*(Tw-TmechRoom)/1000  # kWh
+                dQ = Qsolar - Qloss - Qsupply - Qdis  # kWh
+                dt = dQ*3600/(waterSpecificHeat*tankSize*waterDensity)  # C
+                Tw = Tw + dt  # C
+                Tws[c] = Tw
+                
+                collectorHeatLossL[i] = collectorHeatLoss; collectorEfficiencyL[i] = collectorEfficiency
+                QsolarL[i] = Qsolar; QlossL[i] = Qloss; QsupplyL[i] = Qsupply; QauxL[i] = Qaux
+                QdisL[i] = Qdis; QpumpL[i] = Qpump; dQL[i] = dQ; dtL[i] = dt; TwL[i] = Tw
+        
+        return results
+    
+    def swhAnnualHeatFromTank(self, activeAreas, tankSizes, tankAreas, srfTiltD, AOI_RL, bo, FavTa, FavUL, Eb_shadedL, Ed_shadedL, EgL, QloadL, Cp, mDot, TaL, TcoldL, Tw, TdeliveryW, TmaxW, TdischargeW, TmechRoomL, L, Di, insulT, k, pumpPower, pumpEfficiency, tankLoss, epsilon):
+        # sum of Qsupply (kWh) for a batch of candidate systems on the same surface
+        SR_IAM = self.swhIncidentRadiation(srfTiltD, bo, AOI_RL, Eb_shadedL, Ed_shadedL, EgL)
+        results = self.swhdesignSeries(activeAreas, tankSizes, tankAreas, [SR_IAM] * len(activeAreas), FavTa, FavUL, QloadL, Cp, mDot, TaL, TcoldL, Tw, TdeliveryW, TmaxW, TdischargeW, TmechRoomL, L, Di, insulT, k, pumpPower, pumpEfficiency, tankLoss, epsilon)
+        return [sum(series[4]) for series in results]
+    
     def WMMcoefficients(self, COFfilePath=None):
         # WMM coefficients extractor and WMM 2015-2020 coefficients
         # written by: Christopher Weiss (cmweiss@gmail.com), source: https://pypi.python.org/pypi/geomag
@@ -6593,14 +9805,26 @@ if checkIn.letItFly:
     #if not sc.sticky.has_key("ladybug_release"):
     sc.sticky["ladybug_release"] = versionCheck()       
     sc.sticky["ladybug_Preparation"] = Preparation
+    sc.sticky["ladybug_EPWData"] = EPWData
+    sc.sticky["ladybug_ConditionalStatement"] = ConditionalStatement
     sc.sticky["ladybug_Mesh"] = MeshPreparation
+    sc.sticky["ladybug_OcclusionEngine"] = OcclusionEngine
+    sc.sticky["ladybug_HorizonProfile"] = HorizonProfile
+    sc.sticky["ladybug_ObstructionMap"] = ObstructionMap
+    # keep the cache between the runs so the BVH of the context won't be re-built
+    if not sc.sticky.has_key("ladybug_BVHCache"): sc.sticky["ladybug_BVHCache"] = BVHCache()
     sc.sticky["ladybug_RunAnalysis"] = RunAnalysisInsideGH
     sc.sticky["ladybug_Export2Radiance"] = ExportAnalysis2Radiance
     sc.sticky["ladybug_ResultVisualization"] = ResultVisualization
+    sc.sticky["ladybug_ChartHistogram"] = ChartHistogram
     sc.sticky["ladybug_SunPath"] = Sunpath
+    sc.sticky["ladybug_SolarEphemeris"] = SolarEphemeris
     sc.sticky["ladybug_SkyColor"] = Sky
+    sc.sticky["ladybug_SkyResultsCollection"] = SkyResultsCollection
+    sc.sticky["ladybug_PerezSkyMatrix"] = PerezSkyMatrix
     sc.sticky["ladybug_Vector"] = Vector
     sc.sticky["ladybug_ComfortModels"] = ComfortModels
+    sc.sticky["ladybug_ThermalComfortIndices"] = ThermalComfortIndices
     sc.sticky["ladybug_WindSpeed"] = WindSpeed
     sc.sticky["ladybug_Photovoltaics"] = Photovoltaics
         